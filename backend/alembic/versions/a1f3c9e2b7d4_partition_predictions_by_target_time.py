@@ -0,0 +1,196 @@
+"""partition predictions by target_time
+
+Converts ``predictions`` into a table range-partitioned by ``target_time``
+with daily partitions (``predictions_pYYYYMMDD``, UTC days). Existing rows,
+indexes, RLS policies, grants and publication membership are carried over;
+publications are switched to ``publish_via_partition_root`` so Realtime keeps
+reporting changes as ``predictions``.
+
+Partitions ahead of time are created by ``ensure_prediction_partitions()``
+and expired ones dropped by ``prune_predictions()``
+(supabase/volumes/db/init/10-prediction-partitions.sql).
+
+Revision ID: a1f3c9e2b7d4
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1f3c9e2b7d4'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Daily partitions are created for this many days past the newest row / today.
+_DAYS_AHEAD = 3
+
+
+def _swap_sql(partitioned: bool) -> str:
+    """
+    Rebuild ``predictions`` as a partitioned (or plain) table in place.
+
+    Policies, grants, RLS flags and publication membership are read from the
+    catalog before the old table is dropped and re-applied to the new one, so
+    the same migration works for the self-hosted policies (03-rls-policies.sql)
+    and the cloud bootstrap ones.
+    """
+    if partitioned:
+        create = """
+        CREATE TABLE predictions (
+            LIKE predictions_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        ) PARTITION BY RANGE (target_time);
+
+        SELECT
+            least(min(target_time), now()) AT TIME ZONE 'UTC',
+            greatest(max(target_time), now()) AT TIME ZONE 'UTC'
+        INTO v_from, v_to
+        FROM predictions_old;
+
+        FOR v_day IN
+            SELECT generate_series(v_from::date, v_to::date + %(days_ahead)d, INTERVAL '1 day')::date
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %%I PARTITION OF predictions FOR VALUES FROM (%%L) TO (%%L)',
+                'predictions_p' || to_char(v_day, 'YYYYMMDD'),
+                v_day::timestamp AT TIME ZONE 'UTC',
+                (v_day + 1)::timestamp AT TIME ZONE 'UTC'
+            );
+        END LOOP;
+
+        ALTER TABLE predictions ADD CONSTRAINT predictions_pkey PRIMARY KEY (id, target_time);
+        """ % {"days_ahead": _DAYS_AHEAD}
+    else:
+        create = """
+        CREATE TABLE predictions (
+            LIKE predictions_old INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+        );
+
+        ALTER TABLE predictions ADD CONSTRAINT predictions_pkey PRIMARY KEY (id);
+        """
+
+    return """
+    DO $$
+    DECLARE
+        v_policies  JSONB;
+        v_grants    JSONB;
+        v_pubs      TEXT[];
+        v_rls       BOOLEAN;
+        v_force     BOOLEAN;
+        v_item      JSONB;
+        v_index     TEXT;
+        v_pub       TEXT;
+        v_from      TIMESTAMP;
+        v_to        TIMESTAMP;
+        v_day       DATE;
+    BEGIN
+        LOCK TABLE predictions IN ACCESS EXCLUSIVE MODE;
+
+        SELECT coalesce(jsonb_agg(to_jsonb(p)), '[]'::jsonb) INTO v_policies
+        FROM pg_policies p
+        WHERE p.schemaname = current_schema() AND p.tablename = 'predictions';
+
+        SELECT coalesce(jsonb_agg(jsonb_build_object(
+                   'grantee', CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE a.grantee::regrole::text END,
+                   'privilege', a.privilege_type)), '[]'::jsonb)
+        INTO v_grants
+        FROM pg_class c, aclexplode(c.relacl) a
+        WHERE c.oid = 'predictions'::regclass AND a.grantee <> c.relowner;
+
+        SELECT array_agg(pubname) INTO v_pubs
+        FROM pg_publication_tables
+        WHERE schemaname = current_schema() AND tablename = 'predictions';
+
+        SELECT relrowsecurity, relforcerowsecurity INTO v_rls, v_force
+        FROM pg_class WHERE oid = 'predictions'::regclass;
+
+        -- Index names are schema-wide; free them for the new table.
+        ALTER TABLE predictions RENAME TO predictions_old;
+        FOR v_index IN
+            SELECT i.relname
+            FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = 'predictions_old'::regclass
+        LOOP
+            EXECUTE format('ALTER INDEX %%I RENAME TO %%I', v_index, v_index || '_old');
+        END LOOP;
+
+        %(create)s
+
+        -- Eski çakışmalar varsa en yeni tahmin kalır.
+        INSERT INTO predictions
+        SELECT DISTINCT ON (zone_id, target_time) *
+        FROM predictions_old
+        ORDER BY zone_id, target_time, predicted_at DESC, id DESC;
+
+        ALTER TABLE predictions
+            ADD CONSTRAINT uq_predictions_zone_target UNIQUE (zone_id, target_time),
+            ADD CONSTRAINT predictions_zone_id_fkey
+                FOREIGN KEY (zone_id) REFERENCES traffic_zones(id) ON DELETE CASCADE,
+            ADD CONSTRAINT predictions_event_id_fkey
+                FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE SET NULL;
+        CREATE INDEX ix_predictions_zone_id ON predictions (zone_id);
+        CREATE INDEX ix_predictions_target_time ON predictions (target_time);
+
+        DROP TABLE predictions_old;
+
+        IF v_rls THEN
+            ALTER TABLE predictions ENABLE ROW LEVEL SECURITY;
+        END IF;
+        IF v_force THEN
+            ALTER TABLE predictions FORCE ROW LEVEL SECURITY;
+        END IF;
+
+        FOR v_item IN SELECT * FROM jsonb_array_elements(v_policies)
+        LOOP
+            EXECUTE format(
+                'CREATE POLICY %%I ON predictions AS %%s FOR %%s TO %%s%%s%%s',
+                v_item->>'policyname',
+                v_item->>'permissive',
+                v_item->>'cmd',
+                (SELECT string_agg(quote_ident(r), ', ')
+                 FROM jsonb_array_elements_text(v_item->'roles') r),
+                CASE WHEN v_item->>'qual' IS NOT NULL
+                     THEN format(' USING (%%s)', v_item->>'qual') ELSE '' END,
+                CASE WHEN v_item->>'with_check' IS NOT NULL
+                     THEN format(' WITH CHECK (%%s)', v_item->>'with_check') ELSE '' END
+            );
+        END LOOP;
+
+        FOR v_item IN SELECT * FROM jsonb_array_elements(v_grants)
+        LOOP
+            EXECUTE format(
+                'GRANT %%s ON predictions TO %%s',
+                v_item->>'privilege',
+                v_item->>'grantee'
+            );
+        END LOOP;
+
+        FOREACH v_pub IN ARRAY coalesce(v_pubs, '{}')
+        LOOP
+            EXECUTE format('ALTER PUBLICATION %%I ADD TABLE predictions', v_pub);
+            %(pub_option)s
+        END LOOP;
+    END
+    $$;
+    """ % {
+        "create": create,
+        "pub_option": (
+            "EXECUTE format('ALTER PUBLICATION %I SET (publish_via_partition_root = true)', v_pub);"
+            if partitioned
+            else ""
+        ),
+    }
+
+
+def upgrade() -> None:
+    op.execute(sa.text(_swap_sql(partitioned=True)))
+
+
+def downgrade() -> None:
+    op.execute(sa.text(_swap_sql(partitioned=False)))
@@ -9,7 +9,9 @@ celery_app = Celery(
     include=[
         "app.tasks.events",
         "app.tasks.traffic",
-        "app.tasks.predictions"
+        "app.tasks.predictions",
+        "app.tasks.rollups",
+        "app.tasks.feature_store",
     ]
 )
 
@@ -26,6 +28,22 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.predictions.run_predictions_task",
         "schedule": crontab(minute=0),
     },
+    "prune-predictions-every-hour": {
+        "task": "app.tasks.predictions.prune_predictions_task",
+        "schedule": crontab(minute=20),
+    },
+    "rollup-traffic-every-hour": {
+        "task": "app.tasks.rollups.rollup_traffic_task",
+        "schedule": crontab(minute=5),
+    },
+    "prune-traffic-history-daily": {
+        "task": "app.tasks.rollups.prune_traffic_history_task",
+        "schedule": crontab(minute=30, hour=3),
+    },
+    "update-feature-store-daily": {
+        "task": "app.tasks.feature_store.update_feature_store_task",
+        "schedule": crontab(minute=45, hour=3),
+    },
 }
 
 celery_app.conf.timezone = "Europe/Istanbul"
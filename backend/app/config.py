@@ -26,6 +26,36 @@ class Settings(BaseSettings):
     # Örn: "party_sites_best_effort,social_signal"
     DISABLED_EVENT_CONNECTORS: str = ""
 
+    # ── Traffic history retention (days) ────────────────────────────────
+    # Ham 15 dk snapshot'lar kısa, saatlik/günlük rollup'lar uzun tutulur.
+    TRAFFIC_RAW_RETENTION_DAYS: int = 7
+    TRAFFIC_HOURLY_RETENTION_DAYS: int = 90
+    TRAFFIC_DAILY_RETENTION_DAYS: int = 730
+
+    # ── Prediction retention (hours past target_time) ──────────────────
+    PREDICTION_RETENTION_HOURS: int = 48
+
+    # ── Delta sync change log retention (hours); eski token'lar reset alır
+    CHANGE_LOG_RETENTION_HOURS: int = 24
+
+    # ── Prediction engine: "sql" (compute_predictions RPC) | "python" ──
+    PREDICTION_ENGINE: str = "sql"
+
+    # ── Prediction model artifact (python engine); boşsa kural motoru ───
+    # joblib/pickle (sklearn tarzı estimator) ya da LightGBM .txt
+    PREDICTION_MODEL_PATH: str = ""
+
+    # ── Offline training feature store (Parquet, günlük partition) ─────
+    FEATURE_STORE_PATH: str = "data/feature_store"
+    FEATURE_STORE_BACKFILL_DAYS: int = 90
+
+    # ── Static prediction snapshots (run başına sıkıştırılmış dosya + manifest)
+    # "local" (SNAPSHOT_PATH) | "supabase" (SNAPSHOT_BUCKET) | "" kapalı
+    SNAPSHOT_STORE: str = "local"
+    SNAPSHOT_PATH: str = "data/snapshots"
+    SNAPSHOT_BUCKET: str = "prediction-snapshots"
+    SNAPSHOT_KEEP_RUNS: int = 24
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
 
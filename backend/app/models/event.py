@@ -2,8 +2,8 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from geoalchemy2 import Geometry
-from sqlalchemy import DateTime, Index, Integer, String, Text
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import Computed, DateTime, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -25,6 +25,12 @@ class Event(Base):
         Geometry(geometry_type="POINT", srid=4326, spatial_index=True),
         nullable=False,
     )
+    # Stored geography copy so radius RPCs hit a GIST index without a cast
+    # (ix_events_location_geog in __table_args__)
+    location_geog: Mapped[Geography] = mapped_column(
+        Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+        Computed("location::geography", persisted=True),
+    )
 
     # Timing
     start_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -49,6 +55,7 @@ class Event(Base):
         Index("ix_events_start_time", "start_time"),
         Index("ix_events_category", "category"),
         Index("ix_events_source_source_id", "source", "source_id", unique=True),
+        Index("ix_events_location_geog", "location_geog", postgresql_using="gist"),
     )
 
     def __repr__(self) -> str:
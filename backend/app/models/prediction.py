@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -48,7 +48,8 @@ class Prediction(Base):
     __table_args__ = (
         Index("ix_predictions_zone_id", "zone_id"),
         Index("ix_predictions_target_time", "target_time"),
-        Index("ix_predictions_zone_target", "zone_id", "target_time"),
+        # Hourly runs upsert into (zone_id, target_time); see upsert_predictions.
+        UniqueConstraint("zone_id", "target_time", name="uq_predictions_zone_target"),
     )
 
     def __repr__(self) -> str:
@@ -1,8 +1,9 @@
 import uuid
 from datetime import datetime
+from typing import Optional
 
-from geoalchemy2 import Geometry
-from sqlalchemy import Float, Index, String
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import Computed, Float, Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -16,12 +17,35 @@ class TrafficZone(Base):
     # Zone info
     name: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
 
+    # Generated zone sets (14-zone-tessellation.sql): stable key such as
+    # "h3:<cell>" the id is derived from, and the generator that owns it.
+    # NULL for hand-drawn zones.
+    zone_key: Mapped[Optional[str]] = mapped_column(String(128), nullable=True, unique=True)
+    source: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
+
     # Location — PostGIS POLYGON with SRID 4326
     polygon: Mapped[Geometry] = mapped_column(
         Geometry(geometry_type="POLYGON", srid=4326, spatial_index=True),
         nullable=False,
     )
 
+    # Derived spatial columns — maintained by PostgreSQL, read by the RPCs so
+    # radius filters can use a geography GIST index and centroids are not
+    # recomputed per call. The GIST index is declared once in __table_args__
+    # under the name the init SQL uses.
+    polygon_geog: Mapped[Geography] = mapped_column(
+        Geography(geometry_type="POLYGON", srid=4326, spatial_index=False),
+        Computed("polygon::geography", persisted=True),
+    )
+    centroid: Mapped[Geometry] = mapped_column(
+        Geometry(geometry_type="POINT", srid=4326, spatial_index=False),
+        Computed("ST_Centroid(polygon)", persisted=True),
+    )
+    centroid_geog: Mapped[Geography] = mapped_column(
+        Geography(geometry_type="POINT", srid=4326, spatial_index=False),
+        Computed("ST_Centroid(polygon)::geography", persisted=True),
+    )
+
     # Congestion characteristics
     base_congestion_level: Mapped[float] = mapped_column(
         Float, nullable=False, default=0.5
@@ -32,6 +56,7 @@ class TrafficZone(Base):
 
     __table_args__ = (
         Index("ix_traffic_zones_name", "name"),
+        Index("ix_traffic_zones_polygon_geog", "polygon_geog", postgresql_using="gist"),
     )
 
     def __repr__(self) -> str:
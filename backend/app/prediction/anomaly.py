@@ -0,0 +1,204 @@
+"""
+Online congestion anomaly detector.
+
+Her (scope, key, hour_of_week) hücresi için sabit boyutlu bir durum tutulur:
+EWMA hız ortalaması, EWMA mutlak sapma (robust ölçek) ve son işlenen slot.
+Yeni gözlem geldiğinde robust z-skoru hesaplanır; z <= -threshold ise ani
+yavaşlama olarak işaretlenir. Uç değerler ölçeğe kırpılarak (winsorize)
+baseline'a katılır, böylece tek bir kaza baseline'ı bozmaz.
+
+Durum Redis hash'inde (toplu HMGET/HSET) ya da Redis yoksa süreç içi
+sözlükte tutulur; her gözlem O(1).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import NamedTuple, Protocol
+from zoneinfo import ZoneInfo
+
+from app.services.cache import CacheService, cache_service
+
+_ISTANBUL_TZ = ZoneInfo("Europe/Istanbul")
+# |x - mean| ortalamasını normal dağılımdaki sigma'ya çeviren katsayı (sqrt(pi/2))
+_MAD_TO_SIGMA = 1.2533
+_STATE_HASH = "traffic_anomaly:baseline"
+# TTL hash'in tamamına uygulanır ve her kayıtta yenilenir: besleme 30 gün
+# durursa baseline'lar düşer. Tek tek hücreler düşmez; durum
+# segment/zone sayısı × 168 saat ile sınırlıdır.
+_STATE_TTL = 30 * 24 * 3600
+
+
+class Observation(NamedTuple):
+    scope: str  # "segment" | "zone"
+    key: str  # İBB GEOHASH veya zone UUID
+    observed_at: datetime
+    speed_kmh: float
+    zone_id: str | None = None
+
+
+class DetectedAnomaly(NamedTuple):
+    scope: str
+    key: str
+    observed_at: datetime
+    speed_kmh: float
+    baseline_kmh: float
+    z_score: float
+    zone_id: str | None = None
+
+
+class BaselineState(NamedTuple):
+    mean: float
+    scale: float  # EWMA |x - mean|
+    count: int
+    last_slot: int  # epoch saniye; aynı slot iki kez işlenmez
+
+    def encode(self) -> str:
+        return f"{self.mean:.3f}|{self.scale:.3f}|{self.count}|{self.last_slot}"
+
+    @classmethod
+    def decode(cls, raw: str | None) -> BaselineState | None:
+        if not raw:
+            return None
+        try:
+            mean, scale, count, last_slot = raw.split("|")
+            return cls(float(mean), float(scale), int(count), int(last_slot))
+        except ValueError:
+            return None
+
+
+def hour_of_week(ts: datetime) -> int:
+    """İstanbul yerel saatine göre 0..167 (Pazartesi 00:00 = 0)."""
+    local = ts.astimezone(_ISTANBUL_TZ)
+    return local.weekday() * 24 + local.hour
+
+
+def state_key(obs: Observation) -> str:
+    return f"{obs.scope}:{obs.key}:{hour_of_week(obs.observed_at)}"
+
+
+class AnomalyDetector:
+    """Saf hesaplama; durum saklamadan bağımsız."""
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        z_threshold: float = 3.0,
+        min_samples: int = 4,
+        min_scale_kmh: float = 2.0,
+    ) -> None:
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self.min_scale_kmh = min_scale_kmh
+
+    def update(
+        self, state: BaselineState | None, value: float, slot: int
+    ) -> tuple[BaselineState, float | None]:
+        """
+        Gözlemi baseline'a kat, (yeni durum, z-skoru) döndür.
+        Isınma süresinde veya tekrar eden slotta z-skoru None'dır.
+        """
+        if state is None:
+            return BaselineState(value, 0.0, 1, slot), None
+        if slot <= state.last_slot:
+            return state, None
+
+        scale = max(state.scale * _MAD_TO_SIGMA, self.min_scale_kmh)
+        z = (value - state.mean) / scale
+        z_score = z if state.count >= self.min_samples else None
+
+        # Winsorize: baseline'a en fazla threshold*scale kadar sapma katılır.
+        bound = self.z_threshold * scale
+        clipped = min(max(value, state.mean - bound), state.mean + bound)
+        mean = state.mean + self.alpha * (clipped - state.mean)
+        mad = state.scale + self.alpha * (abs(clipped - state.mean) - state.scale)
+        return BaselineState(mean, mad, state.count + 1, slot), z_score
+
+    def is_slowdown(self, z_score: float | None) -> bool:
+        return z_score is not None and z_score <= -self.z_threshold
+
+
+class AnomalyStateStore(Protocol):
+    async def load(self, keys: list[str]) -> list[BaselineState | None]: ...
+
+    async def save(self, states: dict[str, BaselineState]) -> None: ...
+
+
+class InMemoryAnomalyStateStore:
+    """Redis yokken süreç ömrü boyunca yaşayan durum."""
+
+    def __init__(self) -> None:
+        self._states: dict[str, BaselineState] = {}
+
+    async def load(self, keys: list[str]) -> list[BaselineState | None]:
+        return [self._states.get(k) for k in keys]
+
+    async def save(self, states: dict[str, BaselineState]) -> None:
+        self._states.update(states)
+
+
+class RedisAnomalyStateStore:
+    """Tek hash, alan başına kodlanmış durum; tur başına bir HMGET + bir HSET."""
+
+    def __init__(self, cache: CacheService) -> None:
+        self._cache = cache
+
+    async def load(self, keys: list[str]) -> list[BaselineState | None]:
+        raw = await self._cache.hget_many(_STATE_HASH, keys)
+        return [BaselineState.decode(r) for r in raw]
+
+    async def save(self, states: dict[str, BaselineState]) -> None:
+        await self._cache.hset_many(
+            _STATE_HASH,
+            {k: s.encode() for k, s in states.items()},
+            ttl=_STATE_TTL,
+        )
+
+
+_process_store = InMemoryAnomalyStateStore()
+
+
+def default_state_store() -> AnomalyStateStore:
+    if cache_service.enabled:
+        return RedisAnomalyStateStore(cache_service)
+    return _process_store
+
+
+async def detect_anomalies(
+    observations: list[Observation],
+    store: AnomalyStateStore,
+    detector: AnomalyDetector | None = None,
+) -> list[DetectedAnomaly]:
+    """Bir fetch turundaki gözlemleri işle, yavaşlama anomalilerini döndür."""
+    if not observations:
+        return []
+    detector = detector or AnomalyDetector()
+
+    keys = [state_key(obs) for obs in observations]
+    states = await store.load(keys)
+
+    updated: dict[str, BaselineState] = {}
+    anomalies: list[DetectedAnomaly] = []
+    for key, obs, state in zip(keys, observations, states):
+        # Aynı turda aynı hücre tekrar gelirse güncel durumdan devam et.
+        state = updated.get(key, state)
+        new_state, z_score = detector.update(
+            state, obs.speed_kmh, int(obs.observed_at.timestamp())
+        )
+        updated[key] = new_state
+        if detector.is_slowdown(z_score):
+            anomalies.append(
+                DetectedAnomaly(
+                    scope=obs.scope,
+                    key=obs.key,
+                    observed_at=obs.observed_at,
+                    speed_kmh=obs.speed_kmh,
+                    baseline_kmh=round(state.mean, 2),
+                    z_score=round(z_score, 2),
+                    zone_id=obs.zone_id,
+                )
+            )
+
+    await store.save(updated)
+    return anomalies
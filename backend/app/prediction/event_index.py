@@ -0,0 +1,111 @@
+import heapq
+import uuid
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.event import Event
+from app.prediction.spatial_index import get_zone_index
+
+# Rule engine window: [start - 2h, end + 1h], or [start - 2h, start + 4h]
+# when end_time is NULL. Multi-day events are a single long interval.
+LEAD_TIME = timedelta(hours=2)
+TAIL_TIME = timedelta(hours=1)
+OPEN_ENDED_DURATION = timedelta(hours=4)
+MIN_CAPACITY = 5000
+
+
+def event_window(event: Event) -> tuple[datetime, datetime]:
+    """Etkinliğin tahminleri etkilediği [başlangıç, bitiş] aralığı (iki uç dahil)."""
+    if event.end_time is not None:
+        return event.start_time - LEAD_TIME, event.end_time + TAIL_TIME
+    return event.start_time - LEAD_TIME, event.start_time + OPEN_ENDED_DURATION
+
+
+class EventIntervalIndex:
+    """
+    Sorted-endpoint index over event windows, built once per prediction run.
+
+    ``active_at(t)`` answers a single instant; ``sweep(times)`` answers a
+    sorted sequence of instants (the 24 horizons) in one pass, keeping the
+    active set in a heap keyed by window end. Each event is one interval, so
+    a week-long festival costs the same as a two-hour concert.
+    """
+
+    def __init__(self, events: Iterable[Event]) -> None:
+        entries = sorted(
+            ((*event_window(e), i, e) for i, e in enumerate(events)),
+            key=lambda entry: (entry[0], entry[2]),
+        )
+        self._starts = [entry[0] for entry in entries]
+        self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def active_at(self, t: datetime) -> list[Event]:
+        """t anında penceresi açık olan etkinlikler."""
+        stop = bisect_right(self._starts, t)
+        return [e for _, end, _, e in self._entries[:stop] if end >= t]
+
+    def sweep(self, times: Sequence[datetime]) -> list[list[Event]]:
+        """Artan sıralı her t için açık etkinlikler; girdi başına bir liste."""
+        if any(b < a for a, b in zip(times, times[1:])):
+            raise ValueError("times must be sorted ascending")
+
+        result: list[list[Event]] = []
+        active: list[tuple[datetime, int, Event]] = []  # (end, seq, event) min-heap
+        next_entry = 0
+        for t in times:
+            while next_entry < len(self._entries) and self._entries[next_entry][0] <= t:
+                _, end, seq, event = self._entries[next_entry]
+                heapq.heappush(active, (end, seq, event))
+                next_entry += 1
+            while active and active[0][0] < t:
+                heapq.heappop(active)
+            result.append([event for _, _, event in active])
+        return result
+
+
+def largest_event(events: Iterable[Event], near: Optional[set] = None) -> Optional[Event]:
+    """
+    Kuralın seçtiği etkinlik: en büyük kapasite, eşitlikte en küçük id
+    (compute_predictions() ile aynı sıra). ``near`` verilirse yalnızca o
+    id'ler.
+    """
+    candidates = [e for e in events if near is None or e.id in near]
+    return min(candidates, key=lambda e: (-(e.capacity or 0), str(e.id)), default=None)
+
+
+async def load_event_candidates(
+    session: AsyncSession,
+    window_from: datetime,
+    window_to: datetime,
+) -> tuple[list[Event], dict[uuid.UUID, set[uuid.UUID]]]:
+    """
+    Bir run için aday etkinlikler ve zone → yakın etkinlik id eşlemesi.
+
+    Adaylar: kapasitesi MIN_CAPACITY üstünde ve penceresi
+    [window_from, window_to] ile kesişen etkinlikler. Yakınlık süreç içi
+    zone index'inden (spatial_index), kural motorundaki gibi EPSG:3857'de
+    RADIUS_M metre.
+    """
+    window_end = func.coalesce(Event.end_time + TAIL_TIME, Event.start_time + OPEN_ENDED_DURATION)
+    rows = (
+        await session.execute(
+            select(Event, func.ST_X(Event.location), func.ST_Y(Event.location)).where(
+                Event.capacity > MIN_CAPACITY,
+                Event.start_time - LEAD_TIME <= window_to,
+                window_end >= window_from,
+            )
+        )
+    ).all()
+    if not rows:
+        return [], {}
+
+    zone_index = await get_zone_index(session)
+    nearby = zone_index.nearby_events((event.id, lon, lat) for event, lon, lat in rows)
+    return [event for event, _, _ in rows], nearby
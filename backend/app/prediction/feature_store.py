@@ -0,0 +1,187 @@
+import logging
+import os
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.traffic_zone import TrafficZone
+from app.prediction.event_index import load_event_candidates
+from app.prediction.features import FEATURE_COLUMNS, build_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# Hive-partitioned by UTC day of target_time:
+#   <root>/features/date=2026-03-05/part-0.parquet
+# A day is written once its hourly rollups are complete (hourly watermark
+# past the day's end) and is not rewritten afterwards.
+DATASET_DIR = "features"
+OBSERVATION_COLUMNS = ("avg_speed_kmh", "avg_vehicle_count", "sample_count")
+
+SCHEMA = pa.schema(
+    [
+        ("zone_id", pa.string()),
+        ("target_time", pa.timestamp("us", tz="UTC")),
+        *[(c, pa.float64() if c == "zone_base_level" else pa.int64()) for c in FEATURE_COLUMNS],
+        ("avg_speed_kmh", pa.float64()),
+        ("avg_vehicle_count", pa.float64()),
+        ("sample_count", pa.int64()),
+    ]
+)
+_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def partition_path(root: str | Path, day: date) -> Path:
+    return Path(root) / DATASET_DIR / f"date={day.isoformat()}" / "part-0.parquet"
+
+
+def stored_dates(root: str | Path) -> list[date]:
+    """Feature store'da yazılmış günler (artan sırada)."""
+    base = Path(root) / DATASET_DIR
+    if not base.is_dir():
+        return []
+    days = []
+    for entry in base.iterdir():
+        if entry.name.startswith("date=") and (entry / "part-0.parquet").is_file():
+            days.append(date.fromisoformat(entry.name[len("date="):]))
+    return sorted(days)
+
+
+def write_partition(root: str | Path, day: date, frame: pd.DataFrame) -> Path:
+    """
+    Bir günün satırlarını SCHEMA ile yazar. Önce geçici dosyaya yazılıp
+    os.replace ile yerine konur; yarım kalan yazım okuyuculara görünmez.
+    Gözlemsiz günler de (0 satır) yazılır ki artımlı güncelleme onları
+    tekrar denemesin.
+    """
+    path = partition_path(root, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(frame[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def read_feature_store(
+    root: str | Path,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> pd.DataFrame:
+    """
+    Parquet'ten okur; yalnızca ``columns`` sütunları ve [start, end)
+    aralığındaki gün partition'ları diskten okunur. Veritabanına gitmez.
+    """
+    base = Path(root) / DATASET_DIR
+    if not stored_dates(root):
+        names = list(columns) if columns else SCHEMA.names
+        return SCHEMA.empty_table().select(names).to_pandas()
+
+    dataset = ds.dataset(
+        base, format="parquet", partitioning=_PARTITIONING, schema=SCHEMA.append(pa.field("date", pa.string()))
+    )
+    condition = None
+    if start is not None:
+        condition = ds.field("date") >= start.isoformat()
+    if end is not None:
+        before_end = ds.field("date") < end.isoformat()
+        condition = before_end if condition is None else condition & before_end
+    table = dataset.to_table(columns=list(columns) if columns else SCHEMA.names, filter=condition)
+    return table.to_pandas()
+
+
+# ── Building from the database ──────────────────────────────────────────────
+
+
+async def build_day_frame(session: AsyncSession, day: date) -> pd.DataFrame:
+    """
+    Bir UTC gününün (zone, saat) satırları: build_feature_matrix() ile
+    tahmin anındakiyle aynı özellikler + o saatin zone rollup gözlemleri.
+    Etkinlikler ve yakınlık load_event_candidates() ile, günün 24 saati
+    tek bir run gibi.
+    """
+    day_start = datetime.combine(day, time(), tzinfo=timezone.utc)
+    hours = [day_start + timedelta(hours=h) for h in range(24)]
+
+    observations = (
+        await session.execute(
+            text(
+                "SELECT scope_key, bucket_start, avg_speed_kmh, avg_vehicle_count, sample_count "
+                "FROM traffic_rollups_hourly "
+                "WHERE scope = 'zone' AND bucket_start >= :start AND bucket_start < :end"
+            ),
+            {"start": hours[0], "end": day_start + timedelta(days=1)},
+        )
+    ).all()
+    if not observations:
+        return SCHEMA.empty_table().to_pandas()
+
+    zone_ids = {uuid.UUID(row[0]) for row in observations}
+    zones = (await session.execute(select(TrafficZone).where(TrafficZone.id.in_(zone_ids)))).scalars().all()
+    events, nearby = await load_event_candidates(session, hours[0], hours[-1])
+
+    features = build_feature_matrix(zones, hours, nearby, events).to_frame()
+    observed = pd.DataFrame(observations, columns=["zone_id", "target_time", *OBSERVATION_COLUMNS])
+    observed["zone_id"] = observed["zone_id"].map(lambda v: str(uuid.UUID(v)))
+    for frame in (features, observed):
+        frame["target_time"] = pd.to_datetime(frame["target_time"], utc=True)
+
+    return features.merge(observed, on=["zone_id", "target_time"], how="inner")
+
+
+async def _hourly_watermark(session: AsyncSession) -> Optional[datetime]:
+    return await session.scalar(
+        text("SELECT processed_until FROM traffic_rollup_watermarks WHERE level = 'hourly'")
+    )
+
+
+async def _first_rollup_day(session: AsyncSession) -> Optional[date]:
+    first = await session.scalar(
+        text("SELECT min(bucket_start) FROM traffic_rollups_hourly WHERE scope = 'zone'")
+    )
+    return first.astimezone(timezone.utc).date() if first is not None else None
+
+
+async def update_feature_store(
+    session: AsyncSession,
+    root: str | Path,
+    backfill_days: int = 90,
+) -> list[date]:
+    """
+    Son yazılan günden sonraki, rollup'ları tamamlanmış günleri yazar.
+
+    Boş store'da en eski zone rollup'ından (en fazla ``backfill_days`` gün
+    geriye) başlar. Hourly watermark'ın henüz geçmediği gün yazılmaz.
+    Yazılan günleri döner.
+    """
+    watermark = await _hourly_watermark(session)
+    if watermark is None:
+        return []
+    # Watermark hariç üst sınır: ondan önce biten son tam gün.
+    until = watermark.astimezone(timezone.utc).date()
+
+    stored = stored_dates(root)
+    if stored:
+        day = stored[-1] + timedelta(days=1)
+    else:
+        first = await _first_rollup_day(session)
+        if first is None:
+            return []
+        day = max(first, until - timedelta(days=backfill_days))
+
+    written = []
+    while day < until:
+        frame = await build_day_frame(session, day)
+        write_partition(root, day, frame)
+        logger.info("Feature store partition %s: %d rows", day.isoformat(), len(frame))
+        written.append(day)
+        day += timedelta(days=1)
+    return written
@@ -1,6 +1,10 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, List, Mapping, Sequence
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from typing import List
 
 from app.models.traffic_zone import TrafficZone
 from app.models.event import Event
@@ -56,3 +60,144 @@ def extract_features(zone: TrafficZone, target_time: datetime, events: List[Even
     }
     
     return pd.DataFrame(features)
+
+
+# ── Batch feature matrix ─────────────────────────────────────────────────────
+
+# extract_features() ile aynı sütunlar, aynı sırada (zone_id / target_time hariç).
+FEATURE_COLUMNS = (
+    "hour_of_day",
+    "day_of_week",
+    "is_weekend",
+    "is_rush_hour",
+    "nearby_event_count",
+    "max_event_capacity",
+    "total_event_capacity",
+    "zone_base_level",
+    "days_until_event",
+)
+NO_EVENT_DAYS = 999
+
+_US_PER_DAY = 86_400_000_000
+
+
+@dataclass(frozen=True)
+class FeatureMatrix:
+    """
+    Columnar features for every (zone, target_time) cell of a run.
+
+    Rows are zone-major: row ``i * len(target_times) + j`` is
+    ``zones[i]`` at ``target_times[j]``. ``values`` is a float64 matrix with
+    one column per FEATURE_COLUMNS entry, ready for batch model inference.
+    """
+
+    zone_ids: list[uuid.UUID]
+    target_times: list[datetime]
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, FEATURE_COLUMNS.index(name)]
+
+    def cell(self, zone_index: int, time_index: int) -> np.ndarray:
+        return self.values[zone_index * len(self.target_times) + time_index]
+
+    def to_frame(self) -> pd.DataFrame:
+        """extract_features() satırlarının birleşimiyle aynı DataFrame."""
+        n_times = len(self.target_times)
+        frame = pd.DataFrame(self.values, columns=list(FEATURE_COLUMNS))
+        int_columns = [c for c in FEATURE_COLUMNS if c != "zone_base_level"]
+        frame[int_columns] = frame[int_columns].astype(np.int64)
+        frame.insert(0, "zone_id", np.repeat([str(z) for z in self.zone_ids], n_times))
+        frame.insert(1, "target_time", self.target_times * len(self.zone_ids))
+        return frame
+
+
+def build_feature_matrix(
+    zones: Sequence[TrafficZone],
+    target_times: Sequence[datetime],
+    nearby: Mapping[uuid.UUID, Iterable[uuid.UUID]],
+    events: Iterable[Event],
+) -> FeatureMatrix:
+    """
+    Tüm zone × horizon hücreleri için tek seferde özellik matrisi.
+
+    ``nearby`` zone → yakın etkinlik id eşlemesidir (load_event_candidates()
+    çıktısı); bir hücrenin özellikleri extract_features(zone, t, yakın
+    etkinlikler) ile birebir aynıdır. Zaman özellikleri horizon başına,
+    etkinlik toplamları zone başına bir kez hesaplanıp yayınlanır; satır
+    başına Python nesnesi oluşturulmaz.
+    """
+    event_pos = {}
+    capacities, starts = [], []
+    for event in events:
+        event_pos[event.id] = len(capacities)
+        capacities.append(event.capacity or 0)
+        starts.append(_epoch_us(event.start_time))
+    capacity = np.asarray(capacities, dtype=np.int64)
+    start_us = np.asarray(starts, dtype=np.int64)
+
+    n_zones, n_times = len(zones), len(target_times)
+
+    # Zone × etkinlik komşuluğu düz (satır, etkinlik) dizileri olarak.
+    rows, cols = [], []
+    for i, zone in enumerate(zones):
+        for event_id in nearby.get(zone.id, ()):
+            rows.append(i)
+            cols.append(event_pos[event_id])
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+
+    event_count = np.bincount(rows, minlength=n_zones).astype(np.int64)
+    max_capacity = np.zeros(n_zones, dtype=np.int64)
+    total_capacity = np.zeros(n_zones, dtype=np.int64)
+    first_start = np.full(n_zones, np.iinfo(np.int64).max, dtype=np.int64)
+    np.maximum.at(max_capacity, rows, capacity[cols])
+    np.add.at(total_capacity, rows, capacity[cols])
+    np.minimum.at(first_start, rows, start_us[cols])
+
+    # Saat / gün hedef zamanın kendi saat diliminde, extract_features gibi.
+    hour = np.array([t.hour for t in target_times], dtype=np.int64)
+    day_of_week = np.array([t.weekday() for t in target_times], dtype=np.int64)
+    is_weekend = (day_of_week >= 5).astype(np.int64)
+    is_rush_hour = (((hour >= 7) & (hour < 9)) | ((hour >= 17) & (hour < 19))).astype(np.int64)
+    target_us = np.array([_epoch_us(t) for t in target_times], dtype=np.int64)
+
+    # min(timedelta.days) = floor(min(start) - t) / gün; floor monotonik.
+    has_events = event_count > 0
+    days_until = np.full((n_zones, n_times), NO_EVENT_DAYS, dtype=np.int64)
+    days_until[has_events] = np.floor_divide(
+        first_start[has_events, None] - target_us[None, :], _US_PER_DAY
+    )
+
+    base_level = np.array(
+        [np.nan if z.base_congestion_level is None else z.base_congestion_level for z in zones],
+        dtype=np.float64,
+    )
+
+    values = np.empty((n_zones, n_times, len(FEATURE_COLUMNS)), dtype=np.float64)
+    values[:, :, 0] = hour
+    values[:, :, 1] = day_of_week
+    values[:, :, 2] = is_weekend
+    values[:, :, 3] = is_rush_hour
+    values[:, :, 4] = event_count[:, None]
+    values[:, :, 5] = max_capacity[:, None]
+    values[:, :, 6] = total_capacity[:, None]
+    values[:, :, 7] = base_level[:, None]
+    values[:, :, 8] = days_until
+
+    return FeatureMatrix(
+        zone_ids=[z.id for z in zones],
+        target_times=list(target_times),
+        values=values.reshape(n_zones * n_times, len(FEATURE_COLUMNS)),
+    )
+
+
+def _epoch_us(t: datetime) -> int:
+    delta = t - _EPOCH if t.tzinfo is not None else t - _EPOCH.replace(tzinfo=None)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
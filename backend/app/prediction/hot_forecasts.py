@@ -0,0 +1,225 @@
+"""
+Hot read model: the current run's per-zone 24-hour forecasts in Redis.
+
+After each published run the prediction job writes
+
+    {forecast}:zones   hash  zone_id -> encoded ZoneForecast (24 scores,
+                             confidence, top factor, event id per hour)
+    {forecast}:geo     geo   zone centroids (GEOADD) for radius lookups
+    {forecast}:meta    hash  run_id, predicted_at, first_target
+
+under per-run staging names and renames all three into place in one
+MULTI/EXEC, so readers see either the previous run or the new one. A radius
+query ("zones near lat/lon with forecasts") is one Lua call: GEOSEARCH plus
+HMGET of the hits, no PostGIS. When Redis is off or the model is missing
+the helpers return None and callers fall back to the database RPCs.
+
+The ``{forecast}`` hash tag keeps every key in one cluster slot (required
+for RENAME and the script).
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.prediction.rule_engine import FACTOR_RULES
+from app.services.cache import CacheService, cache_service
+
+logger = logging.getLogger(__name__)
+
+ZONES_KEY = "{forecast}:zones"
+GEO_KEY = "{forecast}:geo"
+META_KEY = "{forecast}:meta"
+# Yeni run gelmezse model bayatlamadan düşer (okuyucu PostGIS'e döner).
+_TTL = 6 * 3600
+_HORIZONS = 24
+
+# En çok puan katan faktör önce; eşitlikte FACTOR_RULES sırası.
+_FACTORS_BY_POINTS = sorted(FACTOR_RULES.items(), key=lambda item: -item[1][0])
+
+
+def top_factor(bits: int) -> Optional[str]:
+    """Bitmask'teki en çok puanlı kural faktörü (yoksa None)."""
+    for name, (_, bit) in _FACTORS_BY_POINTS:
+        if bits & bit:
+            return name
+    return None
+
+
+class ZoneForecast(NamedTuple):
+    zone_id: str
+    name: str
+    lat: float
+    lon: float
+    first_target: datetime  # horizon h (1..24) → first_target + (h - 1) saat
+    scores: tuple[int, ...]
+    confidence: tuple[float, ...]
+    top_factors: tuple[Optional[str], ...]
+    event_ids: tuple[Optional[str], ...]
+
+    def encode(self) -> str:
+        """Hash alanı; konum geo index'te tutulur, ad en sonda ('|' içerebilir)."""
+        return "|".join((
+            str(int(self.first_target.timestamp())),
+            ",".join(str(s) for s in self.scores),
+            ",".join(f"{c:.2f}" for c in self.confidence),
+            ",".join(f or "" for f in self.top_factors),
+            ",".join(e or "" for e in self.event_ids),
+            self.name,
+        ))
+
+    @classmethod
+    def decode(cls, zone_id: str, raw: str | None, lat: float, lon: float) -> ZoneForecast | None:
+        if not raw:
+            return None
+        try:
+            first, scores, confidence, factors, events, name = raw.split("|", 5)
+            return cls(
+                zone_id=zone_id,
+                name=name,
+                lat=lat,
+                lon=lon,
+                first_target=datetime.fromtimestamp(int(first), tz=timezone.utc),
+                scores=tuple(int(s) for s in scores.split(",")),
+                confidence=tuple(float(c) for c in confidence.split(",")),
+                top_factors=tuple(f or None for f in factors.split(",")),
+                event_ids=tuple(e or None for e in events.split(",")),
+            )
+        except ValueError:
+            return None
+
+    def horizon(self, target: datetime) -> Optional[int]:
+        """target'ı kapsayan saat (1..24); pencere dışındaysa None."""
+        h = int((target - self.first_target) // timedelta(hours=1)) + 1
+        return h if 1 <= h <= len(self.scores) else None
+
+
+class NearbyForecast(NamedTuple):
+    distance_km: float
+    forecast: ZoneForecast
+
+
+# KEYS: geo, zones, meta. ARGV: lon, lat, radius_km, count.
+# → {run_id, {{member, dist, {lon, lat}}, ...}, {encoded, ...}}
+_NEARBY_SCRIPT = """
+local run_id = redis.call('HGET', KEYS[3], 'run_id')
+if not run_id then
+    return false
+end
+local hits = redis.call('GEOSEARCH', KEYS[1], 'FROMLONLAT', ARGV[1], ARGV[2],
+    'BYRADIUS', ARGV[3], 'km', 'ASC', 'COUNT', ARGV[4], 'WITHDIST', 'WITHCOORD')
+if #hits == 0 then
+    return {run_id, {}, {}}
+end
+local ids = {}
+for i, hit in ipairs(hits) do
+    ids[i] = hit[1]
+end
+return {run_id, hits, redis.call('HMGET', KEYS[2], unpack(ids))}
+"""
+
+
+class HotForecastStore:
+    """Redis üzerindeki okuma modeli; yazma run başına, okuma tek round-trip."""
+
+    def __init__(self, cache: CacheService) -> None:
+        self._cache = cache
+
+    async def publish(self, run_id: str, predicted_at: datetime, forecasts: list[ZoneForecast]) -> bool:
+        """Run'ı hazırlık anahtarlarına yazar, sonra üç anahtarı birlikte değiştirir."""
+        if not forecasts:
+            return False
+        staged = {key: f"{key}:{run_id}" for key in (ZONES_KEY, GEO_KEY, META_KEY)}
+        written = (
+            await self._cache.hset_many(
+                staged[ZONES_KEY], {f.zone_id: f.encode() for f in forecasts}, ttl=_TTL
+            )
+            and await self._cache.geoadd_many(
+                staged[GEO_KEY], [(f.lon, f.lat, f.zone_id) for f in forecasts], ttl=_TTL
+            )
+            and await self._cache.hset_many(
+                staged[META_KEY],
+                {
+                    "run_id": run_id,
+                    "predicted_at": predicted_at.isoformat(),
+                    "first_target": min(f.first_target for f in forecasts).isoformat(),
+                    "zones": str(len(forecasts)),
+                },
+                ttl=_TTL,
+            )
+        )
+        if not written:
+            return False
+        # Hazırlık anahtarları kendi TTL'leriyle düşer; rename sonrası yenilenir.
+        return await self._cache.rename_many({v: k for k, v in staged.items()}, ttl=_TTL)
+
+    async def nearby(
+        self, lat: float, lon: float, radius_km: float, limit: int = 50
+    ) -> Optional[list[NearbyForecast]]:
+        """
+        Noktaya en yakın ``limit`` zone (radius_km içinde), yakından uzağa.
+        Model yoksa ya da Redis erişilemezse None.
+        """
+        reply = await self._cache.eval_script(
+            _NEARBY_SCRIPT, [GEO_KEY, ZONES_KEY, META_KEY], [lon, lat, radius_km, limit]
+        )
+        if not reply:
+            return None
+        _run_id, hits, rows = reply
+        nearby = []
+        for (zone_id, dist, (hit_lon, hit_lat)), raw in zip(hits, rows):
+            forecast = ZoneForecast.decode(zone_id, raw, float(hit_lat), float(hit_lon))
+            if forecast is not None:
+                nearby.append(NearbyForecast(float(dist), forecast))
+        return nearby
+
+
+def default_hot_forecast_store() -> Optional[HotForecastStore]:
+    if cache_service.enabled:
+        return HotForecastStore(cache_service)
+    return None
+
+
+async def load_run_forecasts(session: AsyncSession) -> tuple[Optional[dict], list[ZoneForecast]]:
+    """Güncel run'ın (id, predicted_at) bilgisi ve zone başına tahmin vektörü."""
+    run = (
+        await session.execute(
+            text("SELECT id, predicted_at FROM prediction_runs WHERE status = 'current'")
+        )
+    ).first()
+    if run is None:
+        return None, []
+
+    rows = (
+        await session.execute(
+            text(
+                "SELECT c.zone_id, z.name, ST_Y(z.centroid), ST_X(z.centroid), "
+                "       c.first_target, c.scores, c.confidence, c.factor_bits, c.event_ids "
+                "FROM zone_prediction_current c "
+                "JOIN traffic_zones z ON z.id = c.zone_id "
+                "WHERE c.run_id = :run "
+                "ORDER BY c.zone_id"
+            ),
+            {"run": run.id},
+        )
+    ).all()
+    forecasts = [
+        ZoneForecast(
+            zone_id=str(row[0]),
+            name=row[1],
+            lat=row[2],
+            lon=row[3],
+            first_target=row[4],
+            scores=tuple(row[5]),
+            confidence=tuple(round(c, 2) for c in row[6]),
+            top_factors=tuple(top_factor(bits) for bits in row[7]),
+            event_ids=tuple(str(e) if e else None for e in (row[8] or [None] * _HORIZONS)),
+        )
+        for row in rows
+    ]
+    return {"run_id": str(run.id), "predicted_at": run.predicted_at}, forecasts
@@ -0,0 +1,136 @@
+"""
+Predicted congestion along a courier route.
+
+Wraps the ``get_route_congestion`` RPC (21-route-congestion.sql): the route
+(encoded polyline, GeoJSON or a list of lat/lon points) is cut into
+fixed-length segments, each segment gets an arrival time from the departure
+and an average speed, and the zones near it are scored at the horizon of
+that arrival. The heavy lifting (indexed zone lookup, time alignment) stays
+in the database; this module only normalises the input and shapes the rows.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Sequence, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Şehir içi kurye ortalaması; çağıran kendi hızını verebilir.
+DEFAULT_SPEED_KMH = 25.0
+DEFAULT_BUFFER_M = 100.0
+DEFAULT_SEGMENT_M = 500.0
+
+Route = Union[str, dict, Sequence[tuple[float, float]]]
+
+
+class CorridorSegment(NamedTuple):
+    seq: int
+    from_km: float
+    to_km: float
+    eta: datetime
+    target_time: Optional[datetime]
+    congestion_score: Optional[int]  # en yoğun yakın zone; yoksa None
+    mean_score: Optional[float]
+    confidence: Optional[float]
+    zone_count: int
+    worst_zone_id: Optional[str]
+    worst_zone_name: Optional[str]
+    lat: float
+    lon: float
+
+
+class RouteCongestion(NamedTuple):
+    departure: datetime
+    speed_kmh: float
+    segments: list[CorridorSegment]
+
+    @property
+    def length_km(self) -> float:
+        return self.segments[-1].to_km if self.segments else 0.0
+
+    @property
+    def arrival(self) -> datetime:
+        return self.departure + timedelta(hours=self.length_km / self.speed_kmh)
+
+    @property
+    def max_score(self) -> Optional[int]:
+        scores = [s.congestion_score for s in self.segments if s.congestion_score is not None]
+        return max(scores) if scores else None
+
+    @property
+    def mean_score(self) -> Optional[float]:
+        """Parça uzunluğuyla ağırlıklı ortalama (skoru olan parçalar)."""
+        scored = [s for s in self.segments if s.congestion_score is not None]
+        length = sum(s.to_km - s.from_km for s in scored)
+        if not scored or length <= 0:
+            return None
+        return round(sum(s.congestion_score * (s.to_km - s.from_km) for s in scored) / length, 1)
+
+
+def route_param(route: Route) -> str:
+    """
+    RPC'nin p_route parametresi: encoded polyline aynen, GeoJSON metin
+    olarak; (lat, lon) listesi GeoJSON LineString'e ([lon, lat]) çevrilir.
+    """
+    if isinstance(route, str):
+        if not route.strip():
+            raise ValueError("route is empty")
+        return route
+    if isinstance(route, dict):
+        return json.dumps(route)
+    points = list(route)
+    if len(points) < 2:
+        raise ValueError("route needs at least two points")
+    return json.dumps({"type": "LineString", "coordinates": [[lon, lat] for lat, lon in points]})
+
+
+async def route_congestion(
+    session: AsyncSession,
+    route: Route,
+    departure: datetime,
+    *,
+    speed_kmh: float = DEFAULT_SPEED_KMH,
+    buffer_m: float = DEFAULT_BUFFER_M,
+    segment_m: float = DEFAULT_SEGMENT_M,
+    precision: int = 5,
+) -> RouteCongestion:
+    """Güncel run'dan rota boyunca, varış saatine hizalı yoğunluk."""
+    rows = (
+        await session.execute(
+            text(
+                "SELECT * FROM get_route_congestion("
+                "p_route => :route, p_departure => :departure, p_speed_kmh => :speed, "
+                "p_buffer_m => :buffer, p_segment_m => :segment, p_precision => :precision)"
+            ),
+            {
+                "route": route_param(route),
+                "departure": departure,
+                "speed": speed_kmh,
+                "buffer": buffer_m,
+                "segment": segment_m,
+                "precision": precision,
+            },
+        )
+    ).all()
+    segments = [
+        CorridorSegment(
+            seq=row.seq,
+            from_km=row.from_km,
+            to_km=row.to_km,
+            eta=row.eta,
+            target_time=row.target_time,
+            congestion_score=row.congestion_score,
+            mean_score=row.mean_score,
+            confidence=row.confidence,
+            zone_count=row.zone_count,
+            worst_zone_id=str(row.worst_zone_id) if row.worst_zone_id else None,
+            worst_zone_name=row.worst_zone_name,
+            lat=row.lat,
+            lon=row.lon,
+        )
+        for row in rows
+    ]
+    return RouteCongestion(departure=departure, speed_kmh=speed_kmh, segments=segments)
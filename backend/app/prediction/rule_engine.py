@@ -1,14 +1,49 @@
 import uuid
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Mapping, Optional, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
 
 from app.models.traffic_zone import TrafficZone
 from app.models.event import Event
+from app.prediction.event_index import largest_event
 from pydantic import BaseModel
 
+# Additive rule factors: name -> (points, bit in the compact run format).
+# get_prediction_factors() in 08-zone-prediction-current.sql mirrors this.
+FACTOR_RULES: dict[str, tuple[int, int]] = {
+    "rush_hour": (25, 1),
+    "weekend_start": (15, 2),
+    "event_nearby": (20, 4),
+    "large_event": (15, 8),
+    "rain": (10, 16),
+}
+
+
+# Skoru bir model verdi (scorer.apply_scores): kural faktörleri açıklama
+# olarak kalır, kural toplamı (total_score) bu hücre için geçerli değildir.
+MODEL_SCORED_BIT = 32
+
+
+def encode_factors(factors: dict) -> int:
+    """factors sözlüğündeki kural faktörlerini bitmask'e çevirir."""
+    bits = sum(bit for name, (_, bit) in FACTOR_RULES.items() if name in factors)
+    return bits | MODEL_SCORED_BIT if "model" in factors else bits
+
+
+def decode_factors(bits: int, base_score: float, total_score: float) -> dict:
+    """encode_factors'ın tersi: predict()'in ürettiği factors sözlüğünü kurar."""
+    factors: dict = {"base_score": float(base_score)}
+    for name, (points, bit) in FACTOR_RULES.items():
+        if bits & bit:
+            factors[name] = points
+    if bits & MODEL_SCORED_BIT:
+        factors["model"] = True
+    else:
+        factors["total_score"] = float(total_score)
+    return factors
+
 
 class PredictionResult(BaseModel):
     zone_id: uuid.UUID
@@ -43,26 +78,6 @@ async def predict(
     if not zone:
         raise ValueError(f"Zone {zone_id} not found")
 
-    factors = {}
-    base_score = zone.base_congestion_level * 100
-    factors["base_score"] = float(base_score)
-    score = base_score
-    confidence = 0.8  # Default confidence for rule-based engine
-
-    # 2. Rush hour (07-09, 17-19)
-    # Using local time or UTC? The requirement implies local time for Istanbul, but target_time is timezone aware.
-    # Assuming target_time is converted to local time or we just check hour.
-    hour = target_time.hour
-    if (7 <= hour < 9) or (17 <= hour < 19):
-        score += 25
-        factors["rush_hour"] = 25
-
-    # 3. Friday (4) or Saturday (5)
-    weekday = target_time.weekday()
-    if weekday in (4, 5):
-        score += 15
-        factors["weekend_start"] = 15
-
     # 4 & 5. Events
     # Check if there's an event overlapping with target_time or close to it.
     # We will check if target_time is within [start_time - 2h, end_time + 1h]
@@ -98,19 +113,53 @@ async def predict(
     event_result = await db_session.execute(event_stmt)
     event = event_result.scalar_one_or_none()
 
+    return score_cell(zone, target_time, event, is_raining)
+
+
+def score_cell(
+    zone: TrafficZone,
+    target_time: datetime,
+    event: Optional[Event],
+    is_raining: bool = False,
+) -> PredictionResult:
+    """
+    predict()'in kuralları; zone ve (varsa) seçilen etkinlik önceden
+    bulunmuş olarak. Toplu yol (predict_horizons) da bunu kullanır.
+    """
+    factors = {}
+    base_score = zone.base_congestion_level * 100
+    factors["base_score"] = float(base_score)
+    score = base_score
+    confidence = 0.8  # Default confidence for rule-based engine
+
+    # 2. Rush hour (07-09, 17-19)
+    # Using local time or UTC? The requirement implies local time for Istanbul, but target_time is timezone aware.
+    # Assuming target_time is converted to local time or we just check hour.
+    hour = target_time.hour
+    if (7 <= hour < 9) or (17 <= hour < 19):
+        score += FACTOR_RULES["rush_hour"][0]
+        factors["rush_hour"] = FACTOR_RULES["rush_hour"][0]
+
+    # 3. Friday (4) or Saturday (5)
+    weekday = target_time.weekday()
+    if weekday in (4, 5):
+        score += FACTOR_RULES["weekend_start"][0]
+        factors["weekend_start"] = FACTOR_RULES["weekend_start"][0]
+
+    # 4 & 5. Events
     event_id = None
     if event:
         event_id = event.id
-        score += 20
-        factors["event_nearby"] = 20
+        score += FACTOR_RULES["event_nearby"][0]
+        factors["event_nearby"] = FACTOR_RULES["event_nearby"][0]
         if event.capacity and event.capacity > 20000:
-            score += 15
-            factors["large_event"] = 15
+            score += FACTOR_RULES["large_event"][0]
+            factors["large_event"] = FACTOR_RULES["large_event"][0]
 
     # 6. Rain
     if is_raining:
-        score += 10
-        factors["rain"] = 10
+        score += FACTOR_RULES["rain"][0]
+        factors["rain"] = FACTOR_RULES["rain"][0]
         confidence = 0.7  # Weather reduces confidence slightly without real-time data
 
     # 7. Max 100 limit
@@ -120,10 +169,39 @@ async def predict(
     factors["total_score"] = float(score)
 
     return PredictionResult(
-        zone_id=zone_id,
+        zone_id=zone.id,
         target_time=target_time,
         congestion_score=int(score),
         confidence=confidence,
         factors=factors,
         event_id=event_id
     )
+
+
+def predict_horizons(
+    zone: TrafficZone,
+    target_times: Sequence[datetime],
+    active_events: Sequence[Sequence[Event] | Mapping[uuid.UUID, Event]],
+    nearby_event_ids: set,
+    is_raining: bool = False,
+) -> list[PredictionResult]:
+    """
+    Bir zone'un tüm horizon'ları, tek sorgu atmadan.
+
+    ``active_events[i]``: target_times[i] anında penceresi açık aday
+    etkinlikler (EventIntervalIndex.sweep); ``nearby_event_ids``: zone'un
+    2 km çevresindeki etkinlikler (load_event_candidates). Çok zone'lu
+    run'larda ``active_events[i]`` id → Event sözlüğü olarak verilirse
+    hücre başına tüm açık etkinlikler yerine yalnızca zone'un yakın
+    etkinlikleri taranır.
+    """
+    return [
+        score_cell(zone, t, _largest_nearby(active, nearby_event_ids), is_raining)
+        for t, active in zip(target_times, active_events)
+    ]
+
+
+def _largest_nearby(active, nearby_event_ids: set) -> Optional[Event]:
+    if isinstance(active, Mapping):
+        return largest_event(active[i] for i in nearby_event_ids if i in active)
+    return largest_event(active, nearby_event_ids)
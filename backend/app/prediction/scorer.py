@@ -0,0 +1,173 @@
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Optional, Protocol, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.prediction.features import FEATURE_COLUMNS, FeatureMatrix
+from app.prediction.rule_engine import PredictionResult
+
+logger = logging.getLogger(__name__)
+
+
+class Scorer(Protocol):
+    """Bir run'ın tüm hücrelerini tek çağrıda puanlayan model arayüzü."""
+
+    name: str
+    confidence: float
+
+    def score(self, matrix: FeatureMatrix) -> np.ndarray:
+        """``len(matrix)`` uzunluğunda 0..100 congestion skorları (satır sırası korunur)."""
+        ...
+
+
+class ModelScorer:
+    """
+    Wraps any estimator with a scikit-learn / LightGBM style
+    ``predict(X) -> array`` and scores the whole feature matrix in one call.
+
+    ``feature_columns`` is the column order the model was trained on; the
+    matrix is reordered to it if it differs from FEATURE_COLUMNS.
+    """
+
+    def __init__(
+        self,
+        model,
+        feature_columns: Sequence[str] = FEATURE_COLUMNS,
+        version: str = "unversioned",
+        confidence: float = 0.8,
+    ) -> None:
+        unknown = [c for c in feature_columns if c not in FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Model expects unknown features: {unknown}")
+        self.model = model
+        self.feature_columns = tuple(feature_columns)
+        self.version = version
+        self.confidence = confidence
+        self.name = f"model:{version}"
+        self._order = (
+            None
+            if self.feature_columns == FEATURE_COLUMNS
+            else [FEATURE_COLUMNS.index(c) for c in self.feature_columns]
+        )
+
+    def score(self, matrix: FeatureMatrix) -> np.ndarray:
+        X = matrix.values if self._order is None else matrix.values[:, self._order]
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float64)
+        predicted = np.asarray(self.model.predict(X), dtype=np.float64).reshape(-1)
+        if predicted.shape[0] != X.shape[0]:
+            raise ValueError(f"Model returned {predicted.shape[0]} scores for {X.shape[0]} rows")
+        return np.clip(np.nan_to_num(predicted, nan=0.0), 0.0, 100.0)
+
+
+def load_model_scorer(path: str | Path) -> ModelScorer:
+    """
+    Model artefaktını yükler.
+
+    - ``*.txt``: LightGBM native model (lightgbm.Booster).
+    - diğerleri: joblib/pickle ile kaydedilmiş ya estimator'ın kendisi ya da
+      ``{"model", "feature_columns", "version", "confidence"}`` sözlüğü.
+      joblib kuruluysa ``mmap_mode="r"`` ile yüklenir; büyük NumPy
+      dizileri (ör. ağaç tabloları) kopyalanmadan sayfalardan okunur ve
+      aynı makinedeki worker'lar arasında paylaşılır.
+    """
+    path = Path(path)
+    version = f"{path.stem}@{int(path.stat().st_mtime)}"
+
+    if path.suffix == ".txt":
+        import lightgbm
+
+        return ModelScorer(lightgbm.Booster(model_file=str(path)), version=version)
+
+    try:
+        import joblib
+    except ImportError:
+        joblib = None
+
+    if joblib is not None:
+        payload = joblib.load(path, mmap_mode="r")
+    else:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+
+    if isinstance(payload, dict):
+        return ModelScorer(
+            payload["model"],
+            feature_columns=payload.get("feature_columns", FEATURE_COLUMNS),
+            version=str(payload.get("version", version)),
+            confidence=float(payload.get("confidence", 0.8)),
+        )
+    return ModelScorer(payload, version=version)
+
+
+# ── Per-process cache ────────────────────────────────────────────────────────
+
+_cached: dict = {"key": None, "scorer": None}
+
+
+def get_scorer() -> Optional[Scorer]:
+    """
+    PREDICTION_MODEL_PATH'teki model, worker süreci başına bir kez
+    yüklenir (dosya değişirse yeniden). Model yoksa ya da yüklenemezse
+    None döner ve çağıran kural motoruyla devam eder.
+    """
+    path = settings.PREDICTION_MODEL_PATH
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        if _cached["key"] != (path, None):
+            logger.warning("Prediction model bulunamadı: %s; kural motoru kullanılıyor", path)
+            _cached["key"], _cached["scorer"] = (path, None), None
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _cached["key"] == key:
+        return _cached["scorer"]
+
+    try:
+        scorer = load_model_scorer(path)
+        logger.info("Prediction model yüklendi: %s", scorer.name)
+    except Exception:
+        logger.exception("Prediction model yüklenemedi: %s; kural motoru kullanılıyor", path)
+        scorer = None
+    _cached["key"], _cached["scorer"] = key, scorer
+    return scorer
+
+
+def reset_scorer() -> None:
+    """Bir sonraki get_scorer() çağrısında modelin yeniden yüklenmesini zorlar."""
+    _cached["key"], _cached["scorer"] = None, None
+
+
+def apply_scores(
+    results: Sequence[Sequence[PredictionResult]],
+    scores: np.ndarray,
+    confidence: float,
+    model: str,
+) -> Sequence[Sequence[PredictionResult]]:
+    """
+    Kural sonuçlarının (zone-major, build_feature_matrix ile aynı sıra)
+    congestion_score / confidence alanlarını model skorlarıyla yerinde
+    değiştirir. Kural faktörleri ve event_id açıklama olarak kalır; skoru
+    artık onlar vermediği için total_score çıkarılır ve factors["model"]
+    modelin adını taşır (kompakt formatta MODEL_SCORED_BIT).
+    """
+    cells = sum(len(zone_results) for zone_results in results)
+    if cells != len(scores):
+        raise ValueError(f"{len(scores)} scores for {cells} cells")
+
+    rounded = iter(scores.astype(np.int64).tolist())
+    for zone_results in results:
+        for result in zone_results:
+            result.congestion_score = next(rounded)
+            result.confidence = confidence
+            factors = {k: v for k, v in result.factors.items() if k != "total_score"}
+            factors["model"] = model
+            result.factors = factors
+    return results
@@ -0,0 +1,261 @@
+"""
+Static snapshot artifacts per prediction run.
+
+After a run is published the prediction job writes one immutable file with
+every zone's 24-hour scores and the run window's events, compressed
+(gzip, and brotli when the ``brotli`` package is installed), plus a small
+mutable ``manifest.json`` pointing at the latest runs. A map open is then
+one manifest fetch and one cacheable file instead of PostgREST calls.
+
+Layout (local directory or Supabase storage bucket):
+
+    manifest.json
+    runs/<run_id>/snapshot-<sha256[:16]>.json.gz
+    runs/<run_id>/snapshot-<sha256[:16]>.json.br
+
+The snapshot JSON is columnar: ``zones.ids[i]``, ``zones.scores[i]`` (24
+ints, horizon h at index h - 1 for ``first_target + (h - 1) hours``) ...
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+_IMMUTABLE = "public, max-age=31536000, immutable"
+_MANIFEST_CACHE = "public, max-age=60"
+
+
+class SnapshotStore(Protocol):
+    def put(self, path: str, data: bytes, content_type: str, cache_control: str) -> None: ...
+
+    def get(self, path: str) -> Optional[bytes]: ...
+
+    def delete(self, paths: list[str]) -> None: ...
+
+
+class LocalSnapshotStore:
+    """Dosya sistemi (statik sunucu / CDN origin'i ya da geliştirme)."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def put(self, path: str, data: bytes, content_type: str, cache_control: str) -> None:
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+
+    def get(self, path: str) -> Optional[bytes]:
+        target = self.root / path
+        return target.read_bytes() if target.is_file() else None
+
+    def delete(self, paths: list[str]) -> None:
+        for path in paths:
+            target = self.root / path
+            target.unlink(missing_ok=True)
+            try:
+                target.parent.rmdir()
+            except OSError:
+                pass
+
+
+class SupabaseSnapshotStore:
+    """Supabase Storage bucket'ı (public bucket ise dosyalar CDN'den okunur)."""
+
+    def __init__(self, client, bucket: str):
+        self.bucket = client.storage.from_(bucket)
+
+    def put(self, path: str, data: bytes, content_type: str, cache_control: str) -> None:
+        self.bucket.upload(
+            path,
+            data,
+            file_options={"content-type": content_type, "cache-control": cache_control, "upsert": "true"},
+        )
+
+    def get(self, path: str) -> Optional[bytes]:
+        try:
+            return self.bucket.download(path)
+        except Exception:
+            return None
+
+    def delete(self, paths: list[str]) -> None:
+        if paths:
+            self.bucket.remove(paths)
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """SNAPSHOT_STORE: "local" (SNAPSHOT_PATH), "supabase" (SNAPSHOT_BUCKET) ya da boş (kapalı)."""
+    if settings.SNAPSHOT_STORE == "local":
+        return LocalSnapshotStore(settings.SNAPSHOT_PATH)
+    if settings.SNAPSHOT_STORE == "supabase":
+        from app.supabase_client import get_supabase_client
+
+        return SupabaseSnapshotStore(get_supabase_client(), settings.SNAPSHOT_BUCKET)
+    return None
+
+
+# ── Building ────────────────────────────────────────────────────────────────
+
+
+async def load_run_snapshot(session: AsyncSession) -> Optional[dict[str, Any]]:
+    """
+    Güncel run'ın snapshot'ı: zone başına 24 skor / güven ve run
+    penceresindeki (predicted_at .. first_target + 24h) etkinlikler.
+    Yayınlanmış run yoksa None.
+    """
+    run = (
+        await session.execute(
+            text("SELECT id, predicted_at FROM prediction_runs WHERE status = 'current'")
+        )
+    ).first()
+    if run is None:
+        return None
+
+    zones = (
+        await session.execute(
+            text(
+                "SELECT c.zone_id, z.name, ST_Y(z.centroid), ST_X(z.centroid), "
+                "       c.first_target, c.scores, c.confidence "
+                "FROM zone_prediction_current c "
+                "JOIN traffic_zones z ON z.id = c.zone_id "
+                "WHERE c.run_id = :run "
+                "ORDER BY c.zone_id"
+            ),
+            {"run": run.id},
+        )
+    ).all()
+    if not zones:
+        return None
+    first_target = min(row[4] for row in zones)
+
+    events = (
+        await session.execute(
+            text(
+                "SELECT id, name, venue_name, category, start_time, end_time, capacity, "
+                "       ST_Y(location), ST_X(location) "
+                "FROM events "
+                "WHERE start_time < :window_end "
+                "  AND coalesce(end_time, start_time + INTERVAL '4 hours') >= :predicted_at "
+                "ORDER BY start_time, id"
+            ),
+            {"window_end": first_target + timedelta(hours=24), "predicted_at": run.predicted_at},
+        )
+    ).all()
+
+    return {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "run_id": str(run.id),
+        "predicted_at": run.predicted_at.isoformat(),
+        "first_target": first_target.isoformat(),
+        "horizons": 24,
+        "zones": {
+            "ids": [str(row[0]) for row in zones],
+            "names": [row[1] for row in zones],
+            "lat": [round(row[2], 6) for row in zones],
+            "lon": [round(row[3], 6) for row in zones],
+            "scores": [list(row[5]) for row in zones],
+            "confidence": [[round(c, 2) for c in row[6]] for row in zones],
+        },
+        "events": [
+            {
+                "id": str(row[0]),
+                "name": row[1],
+                "venue_name": row[2],
+                "category": row[3],
+                "start_time": row[4].isoformat(),
+                "end_time": row[5].isoformat() if row[5] else None,
+                "capacity": row[6],
+                "lat": round(row[7], 6),
+                "lon": round(row[8], 6),
+            }
+            for row in events
+        ],
+    }
+
+
+def encode_snapshot(body: bytes) -> dict[str, bytes]:
+    """JSON gövdesinin sıkıştırılmış halleri: {"gzip": ..., "br": ...}."""
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return encoded
+    encoded["br"] = brotli.compress(body, quality=11)
+    return encoded
+
+
+_EXTENSIONS = {"gzip": "json.gz", "br": "json.br"}
+
+
+def read_manifest(store: SnapshotStore) -> dict[str, Any]:
+    raw = store.get(MANIFEST_NAME)
+    if not raw:
+        return {"version": SNAPSHOT_FORMAT_VERSION, "latest": None, "runs": []}
+    return json.loads(raw)
+
+
+def publish_snapshot(store: SnapshotStore, snapshot: dict[str, Any], keep_runs: int = 24) -> dict[str, Any]:
+    """
+    Snapshot dosyalarını yazar, ardından manifest'i günceller (manifest hiçbir
+    zaman henüz yazılmamış bir dosyayı göstermez). Dosya adı içerik hash'i
+    içerdiğinden aynı yol hep aynı içeriktir. ``keep_runs``'tan eski run'ların
+    dosyaları silinir. Güncel manifest'i döner.
+    """
+    body = json.dumps(snapshot, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()
+    prefix = f"runs/{snapshot['run_id']}/snapshot-{digest[:16]}"
+
+    files = {}
+    for encoding, data in encode_snapshot(body).items():
+        path = f"{prefix}.{_EXTENSIONS[encoding]}"
+        store.put(path, data, "application/json", _IMMUTABLE)
+        files[encoding] = {"path": path, "bytes": len(data)}
+
+    entry = {
+        "run_id": snapshot["run_id"],
+        "predicted_at": snapshot["predicted_at"],
+        "first_target": snapshot["first_target"],
+        "zone_count": len(snapshot["zones"]["ids"]),
+        "event_count": len(snapshot["events"]),
+        "sha256": digest,
+        "bytes": len(body),
+        "files": files,
+    }
+    manifest = read_manifest(store)
+    # Aynı run yeniden yazıldıysa (etkinlikler değişti) eski dosyası da gider.
+    replaced = [r for r in manifest["runs"] if r["run_id"] == entry["run_id"]]
+    runs = [entry] + [r for r in manifest["runs"] if r["run_id"] != entry["run_id"]]
+    expired = replaced + runs[keep_runs:]
+    manifest = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "latest": entry,
+        "runs": runs[:keep_runs],
+    }
+    store.put(MANIFEST_NAME, json.dumps(manifest, indent=1).encode("utf-8"), "application/json", _MANIFEST_CACHE)
+
+    current = {f["path"] for f in files.values()}
+    stale = [f["path"] for run in expired for f in run["files"].values() if f["path"] not in current]
+    if stale:
+        store.delete(stale)
+    logger.info(
+        "Prediction snapshot %s: %d zone, %d event, %d bytes (%s)",
+        entry["run_id"], entry["zone_count"], entry["event_count"], entry["bytes"],
+        ", ".join(f"{k} {v['bytes']}" for k, v in files.items()),
+    )
+    return manifest
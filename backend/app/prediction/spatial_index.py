@@ -0,0 +1,197 @@
+import json
+import math
+import uuid
+from collections import defaultdict
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.traffic_zone import TrafficZone
+
+# EPSG:3857 (spherical Web Mercator) — ST_Transform(geom, 3857) for
+# EPSG:4326 input is exactly this projection.
+EARTH_RADIUS_M = 6378137.0
+RADIUS_M = 2000
+
+Ring = Sequence[tuple[float, float]]
+
+
+def to_web_mercator(lon: float, lat: float) -> tuple[float, float]:
+    """WGS84 lon/lat → EPSG:3857 metre koordinatları."""
+    x = EARTH_RADIUS_M * math.radians(lon)
+    y = EARTH_RADIUS_M * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+    return x, y
+
+
+def _segment_distance_sq(px: float, py: float, ax: float, ay: float, bx: float, by: float) -> float:
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0.0:
+        t = 0.0
+    else:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    cx, cy = ax + t * dx - px, ay + t * dy - py
+    return cx * cx + cy * cy
+
+
+class _Zone:
+    __slots__ = ("zone_id", "rings", "bbox", "segments")
+
+    def __init__(self, zone_id: uuid.UUID, rings: list[list[tuple[float, float]]]) -> None:
+        self.zone_id = zone_id
+        self.rings = rings
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        # (ax, ay, dx, dy, 1 / |d|²) per edge, for the hot within() loop.
+        self.segments = [
+            (ax, ay, bx - ax, by - ay, 1.0 / ((bx - ax) ** 2 + (by - ay) ** 2) if (ax, ay) != (bx, by) else 0.0)
+            for ring in rings
+            for (ax, ay), (bx, by) in zip(ring, ring[1:])
+        ]
+
+    def contains(self, px: float, py: float) -> bool:
+        # Even-odd over all rings: holes are excluded.
+        inside = False
+        for ring in self.rings:
+            for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+                if (ay > py) != (by > py) and px < ax + (py - ay) * (bx - ax) / (by - ay):
+                    inside = not inside
+        return inside
+
+    def distance(self, px: float, py: float) -> float:
+        if self.contains(px, py):
+            return 0.0
+        best = math.inf
+        for ring in self.rings:
+            for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+                best = min(best, _segment_distance_sq(px, py, ax, ay, bx, by))
+        return math.sqrt(best)
+
+    def within(self, px: float, py: float, r_sq: float) -> bool:
+        """distance(px, py) ** 2 <= r_sq; ilk yakın kenarda döner."""
+        for ax, ay, dx, dy, inv_len_sq in self.segments:
+            t = ((px - ax) * dx + (py - ay) * dy) * inv_len_sq
+            if t < 0.0:
+                t = 0.0
+            elif t > 1.0:
+                t = 1.0
+            cx = ax + t * dx - px
+            cy = ay + t * dy - py
+            if cx * cx + cy * cy <= r_sq:
+                return True
+        return self.contains(px, py)
+
+
+class ZoneSpatialIndex:
+    """
+    Uniform grid over zone polygons projected to EPSG:3857 once.
+
+    ``zones_within(lon, lat)`` returns the zones whose polygon lies within
+    ``radius_m`` metres of the point — the same test as
+    ``ST_DWithin(ST_Transform(polygon, 3857), ST_Transform(point, 3857), radius_m)``.
+    Each zone is registered in the grid cells its radius-expanded bounding
+    box covers, so a query reads one cell; smaller cells mean fewer
+    candidates per query for more registrations per zone.
+    """
+
+    def __init__(
+        self,
+        zones: Iterable[tuple[uuid.UUID, Sequence[Ring]]],
+        radius_m: float = RADIUS_M,
+        cell_size_m: Optional[float] = None,
+    ) -> None:
+        self.radius_m = radius_m
+        self._cell = float(cell_size_m or radius_m / 2)
+        self._zones: dict[uuid.UUID, _Zone] = {}
+        self._grid: dict[tuple[int, int], list[_Zone]] = defaultdict(list)
+
+        for zone_id, rings in zones:
+            projected = [[to_web_mercator(lon, lat) for lon, lat in ring] for ring in rings]
+            zone = _Zone(zone_id, projected)
+            self._zones[zone_id] = zone
+            min_x, min_y, max_x, max_y = zone.bbox
+            for cx in range(self._cell_of(min_x - radius_m), self._cell_of(max_x + radius_m) + 1):
+                for cy in range(self._cell_of(min_y - radius_m), self._cell_of(max_y + radius_m) + 1):
+                    self._grid[(cx, cy)].append(zone)
+
+    @classmethod
+    def from_geojson(cls, rows: Iterable[tuple[uuid.UUID, str]], radius_m: float = RADIUS_M) -> "ZoneSpatialIndex":
+        """(zone_id, ST_AsGeoJSON(polygon)) satırlarından; Polygon ve MultiPolygon."""
+
+        def rings(geojson: str) -> list[Ring]:
+            geometry = json.loads(geojson)
+            if geometry["type"] == "Polygon":
+                return [[tuple(p[:2]) for p in ring] for ring in geometry["coordinates"]]
+            if geometry["type"] == "MultiPolygon":
+                return [[tuple(p[:2]) for p in ring] for poly in geometry["coordinates"] for ring in poly]
+            raise ValueError(f"Unsupported zone geometry: {geometry['type']}")
+
+        return cls(((zone_id, rings(geojson)) for zone_id, geojson in rows), radius_m)
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def _cell_of(self, v: float) -> int:
+        return math.floor(v / self._cell)
+
+    def zones_within(self, lon: float, lat: float) -> list[uuid.UUID]:
+        """Noktaya radius_m metre içindeki zone id'leri."""
+        px, py = to_web_mercator(lon, lat)
+        r = self.radius_m
+        result = []
+        r_sq = r * r
+        for zone in self._grid.get((self._cell_of(px), self._cell_of(py)), ()):
+            min_x, min_y, max_x, max_y = zone.bbox
+            # bbox'a en yakın nokta alt sınır, en uzak köşe üst sınır:
+            # poligon bbox'un içinde ve boş değil.
+            near_x = min_x - px if px < min_x else (px - max_x if px > max_x else 0.0)
+            near_y = min_y - py if py < min_y else (py - max_y if py > max_y else 0.0)
+            if near_x * near_x + near_y * near_y > r_sq:
+                continue
+            far_x = max(px - min_x, max_x - px)
+            far_y = max(py - min_y, max_y - py)
+            if far_x * far_x + far_y * far_y <= r_sq or zone.within(px, py, r_sq):
+                result.append(zone.zone_id)
+        return result
+
+    def distance_m(self, zone_id: uuid.UUID, lon: float, lat: float) -> float:
+        """Zone poligonu ile nokta arasındaki EPSG:3857 mesafesi (içindeyse 0)."""
+        return self._zones[zone_id].distance(*to_web_mercator(lon, lat))
+
+    def nearby_events(
+        self, events: Iterable[tuple[uuid.UUID, float, float]]
+    ) -> dict[uuid.UUID, set[uuid.UUID]]:
+        """(event_id, lon, lat) listesinden zone → yakın etkinlik id eşlemesi."""
+        nearby: dict[uuid.UUID, set[uuid.UUID]] = defaultdict(set)
+        for event_id, lon, lat in events:
+            for zone_id in self.zones_within(lon, lat):
+                nearby[zone_id].add(event_id)
+        return dict(nearby)
+
+
+# ── Per-process cache ────────────────────────────────────────────────────────
+
+_cached: dict = {"version": None, "index": None}
+
+
+async def get_zone_index(session: AsyncSession) -> ZoneSpatialIndex:
+    """
+    Worker süreci başına bir kez kurulan zone index'i. zone_catalog_version
+    değiştiyse (zone eklendi / silindi / poligon güncellendi) yeniden kurulur.
+    """
+    version = await session.scalar(text("SELECT version FROM zone_catalog_version"))
+    index: Optional[ZoneSpatialIndex] = _cached["index"]
+    if index is not None and version is not None and version == _cached["version"]:
+        return index
+
+    rows = await session.execute(select(TrafficZone.id, func.ST_AsGeoJSON(TrafficZone.polygon)))
+    index = ZoneSpatialIndex.from_geojson(rows.all())
+    _cached["version"], _cached["index"] = version, index
+    return index
+
+
+def invalidate_zone_index() -> None:
+    """Bir sonraki get_zone_index() çağrısında yeniden kurulmasını zorlar."""
+    _cached["version"], _cached["index"] = None, None
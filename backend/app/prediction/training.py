@@ -0,0 +1,106 @@
+import json
+import logging
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from app.prediction.feature_store import read_feature_store
+from app.prediction.features import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Gözlenen yoğunluk: zone'un serbest akış hızına göre yavaşlama yüzdesi.
+# Serbest akış = eğitim verisinde zone'un saatlik ortalama hızlarının
+# FREE_FLOW_QUANTILE'ı. Holdout etiketleri de eğitim diliminin serbest akış
+# hızıyla hesaplanır; aksi halde holdout'un kendi hızları etikete sızar.
+FREE_FLOW_QUANTILE = 0.95
+MIN_SAMPLES_PER_HOUR = 2
+HOLDOUT_FRACTION = 0.1
+
+
+def free_flow_speeds(frame: pd.DataFrame) -> pd.Series:
+    """zone_id → serbest akış hızı (km/s)."""
+    return frame.groupby("zone_id")["avg_speed_kmh"].quantile(FREE_FLOW_QUANTILE)
+
+
+def observed_congestion(frame: pd.DataFrame, free_flow: Optional[pd.Series] = None) -> pd.Series:
+    """
+    0..100: 100 * (1 - hız / zone serbest akış hızı), kırpılmış.
+    ``free_flow`` (free_flow_speeds) verilmezse frame'in kendisinden
+    hesaplanır; içinde olmayan zone'lar NaN döner.
+    """
+    if free_flow is None:
+        free_flow = free_flow_speeds(frame)
+    zone_free_flow = frame["zone_id"].map(free_flow)
+    congestion = 100.0 * (1.0 - frame["avg_speed_kmh"] / zone_free_flow.where(zone_free_flow > 0))
+    return congestion.clip(0.0, 100.0).fillna(0.0).where(zone_free_flow.notna())
+
+
+def train_model(
+    store_root: str | Path,
+    output_dir: str | Path,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    max_iter: int = 200,
+) -> Path:
+    """
+    Feature store'dan (yalnızca gereken sütunlar, [start, end) günleri)
+    bir congestion modeli eğitir ve ``output_dir``'e sürümlü artefakt
+    yazar: ``congestion-<UTC zaman damgası>.joblib`` (scorer.load_model_scorer
+    formatı) ve yanında aynı adlı ``.json`` metadata.
+
+    Son HOLDOUT_FRACTION'lık zaman dilimi doğrulama için ayrılır (etiketleri
+    eğitim diliminin serbest akış hızlarıyla), MAE metadata'ya yazılır;
+    model sonra tüm veriyle yeniden eğitilir.
+    """
+    columns = ["zone_id", "target_time", *FEATURE_COLUMNS, "avg_speed_kmh", "sample_count"]
+    frame = read_feature_store(store_root, columns=columns, start=start, end=end)
+    frame = frame[frame["sample_count"] >= MIN_SAMPLES_PER_HOUR]
+    if frame.empty:
+        raise ValueError(f"No training rows in feature store {store_root}")
+
+    frame = frame.sort_values("target_time", kind="stable")
+    X = frame[list(FEATURE_COLUMNS)].to_numpy(dtype=np.float64)
+    y = observed_congestion(frame).to_numpy(dtype=np.float64)
+
+    split = int(len(frame) * (1 - HOLDOUT_FRACTION))
+    metrics: dict = {"rows": int(len(frame))}
+    if 0 < split < len(frame):
+        train, test = frame.iloc[:split], frame.iloc[split:]
+        free_flow = free_flow_speeds(train)
+        y_train = observed_congestion(train, free_flow).to_numpy(dtype=np.float64)
+        y_test = observed_congestion(test, free_flow).to_numpy(dtype=np.float64)
+        # Eğitim diliminde görülmemiş zone'ların etiketi yok.
+        known = ~np.isnan(y_test)
+        if known.any():
+            holdout = HistGradientBoostingRegressor(max_iter=max_iter, random_state=0).fit(X[:split], y_train)
+            predicted = np.clip(holdout.predict(X[split:][known]), 0.0, 100.0)
+            metrics["holdout_rows"] = int(known.sum())
+            metrics["holdout_mae"] = float(np.mean(np.abs(predicted - y_test[known])))
+            metrics["holdout_mae_mean_baseline"] = float(np.mean(np.abs(y_train.mean() - y_test[known])))
+
+    model = HistGradientBoostingRegressor(max_iter=max_iter, random_state=0).fit(X, y)
+
+    trained_at = datetime.now(timezone.utc)
+    version = f"congestion-{trained_at.strftime('%Y%m%dT%H%M%SZ')}"
+    metadata = {
+        "version": version,
+        "trained_at": trained_at.isoformat(),
+        "feature_columns": list(FEATURE_COLUMNS),
+        "train_from": frame["target_time"].min().isoformat(),
+        "train_to": frame["target_time"].max().isoformat(),
+        "metrics": metrics,
+    }
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{version}.joblib"
+    joblib.dump({"model": model, "feature_columns": list(FEATURE_COLUMNS), "version": version}, path)
+    path.with_suffix(".json").write_text(json.dumps(metadata, indent=2))
+    logger.info("Model %s trained on %d rows: %s", version, len(frame), metrics)
+    return path
@@ -5,6 +5,9 @@ Redis Cache Yardımcı Modülü (Görev 2.5)
 - Async redis ile connection pool
 - JSON otomatik serialize / deserialize
 - get, set, delete, get_or_set metodları
+- hget_many / hset_many: toplu hash okuma/yazma (JSON'suz ham string)
+- geoadd_many, rename_many, eval_script: geo index, atomik anahtar değişimi,
+  tek round-trip Lua okuma
 """
 
 from __future__ import annotations
@@ -100,6 +103,106 @@ class CacheService:
             await self.set(key, value, ttl)
         return value
 
+    # ------------------------------------------------------------------
+    # Hash metodları (ham string, JSON yok — sıcak yol için)
+    # ------------------------------------------------------------------
+
+    async def hget_many(self, name: str, fields: list[str]) -> list[str | None]:
+        """Bir hash'ten birden çok alanı tek HMGET ile oku."""
+        if not fields:
+            return []
+        if not self._enabled or self._client is None:
+            return [None] * len(fields)
+        try:
+            return await self._client.hmget(name, fields)
+        except Exception:
+            logger.exception("Cache hmget hatası: key=%s", name)
+            return [None] * len(fields)
+
+    async def hset_many(
+        self,
+        name: str,
+        mapping: dict[str, str],
+        ttl: int | None = None,
+    ) -> bool:
+        """Bir hash'e birden çok alanı tek pipeline ile yaz."""
+        if not mapping:
+            return True
+        if not self._enabled or self._client is None:
+            return False
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.hset(name, mapping=mapping)
+                if ttl:
+                    pipe.expire(name, ttl)
+                await pipe.execute()
+            return True
+        except Exception:
+            logger.exception("Cache hset hatası: key=%s", name)
+            return False
+
+    # ------------------------------------------------------------------
+    # Geo / atomik değişim / script
+    # ------------------------------------------------------------------
+
+    async def geoadd_many(
+        self,
+        name: str,
+        members: list[tuple[float, float, str]],
+        ttl: int | None = None,
+    ) -> bool:
+        """(lon, lat, member) üçlülerini tek GEOADD ile geo set'e yaz."""
+        if not members:
+            return True
+        if not self._enabled or self._client is None:
+            return False
+        try:
+            values = [v for lon, lat, member in members for v in (lon, lat, member)]
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.geoadd(name, values)
+                if ttl:
+                    pipe.expire(name, ttl)
+                await pipe.execute()
+            return True
+        except Exception:
+            logger.exception("Cache geoadd hatası: key=%s", name)
+            return False
+
+    async def rename_many(self, renames: dict[str, str], ttl: int | None = None) -> bool:
+        """
+        Hazırlanan anahtarları tek MULTI/EXEC içinde asıl adlarına taşı;
+        okuyucular ya hepsinin eski ya hepsinin yeni halini görür.
+        """
+        if not renames:
+            return True
+        if not self._enabled or self._client is None:
+            return False
+        try:
+            async with self._client.pipeline(transaction=True) as pipe:
+                for source, target in renames.items():
+                    pipe.rename(source, target)
+                    if ttl:
+                        pipe.expire(target, ttl)
+                await pipe.execute()
+            return True
+        except Exception:
+            logger.exception("Cache rename hatası: keys=%s", list(renames.values()))
+            return False
+
+    async def eval_script(self, script: str, keys: list[str], args: list[Any]) -> Any | None:
+        """Lua script'i çalıştır (EVALSHA, gerekirse EVAL). Hata ya da kapalıysa None."""
+        if not self._enabled or self._client is None:
+            return None
+        try:
+            return await self._client.register_script(script)(keys=keys, args=args)
+        except Exception:
+            logger.exception("Cache script hatası: keys=%s", keys)
+            return None
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and self._client is not None
+
     async def close(self) -> None:
         """Connection pool'ı kapat."""
         if self._client is not None:
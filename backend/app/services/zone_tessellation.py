@@ -0,0 +1,235 @@
+"""
+Zone tessellation: generated zone sets at thousands of zones.
+
+- H3 hex grid at a configurable resolution over an Istanbul boundary
+  (bounding box by default).
+- District / mahalle boundary GeoJSON import.
+
+Zones are bulk-loaded with COPY into traffic_zone_staging and merged by
+merge_zone_staging() (14-zone-tessellation.sql), which validates,
+simplifies and splits the geometry server-side and derives each zone id
+from its zone_key, so regenerating the same set keeps zone ids stable.
+
+Coarser map levels (districts, city sides) are zone groups
+(15-zone-hierarchy.sql), loaded with merge_zone_groups().
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import uuid
+from collections import Counter
+from typing import Any, Iterable, NamedTuple, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# İstanbul il sınırlarını kapsayan kutu (lon/lat).
+ISTANBUL_BBOX = (27.95, 40.80, 29.95, 41.60)
+
+_STAGING_COLUMNS = ("batch_id", "zone_key", "name", "geojson", "base_congestion_level", "rush_hour_multiplier")
+
+
+class ZoneSpec(NamedTuple):
+    zone_key: str
+    name: str
+    geojson: str  # Polygon | MultiPolygon, EPSG:4326
+    base_congestion_level: float = 0.5
+    rush_hour_multiplier: float = 1.5
+
+
+class ZoneGroupSpec(NamedTuple):
+    group_key: str
+    name: str
+    geojson: Optional[str]  # None: union of the groups naming this one as parent
+    parent_key: Optional[str] = None
+
+
+def _bbox_ring(bbox: Sequence[float]) -> list[tuple[float, float]]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return [(min_lon, min_lat), (max_lon, min_lat), (max_lon, max_lat), (min_lon, max_lat), (min_lon, min_lat)]
+
+
+def _polygons(geometry: dict) -> list[list[list]]:
+    """GeoJSON Polygon / MultiPolygon → [[dış halka, delikler...], ...] (lon/lat)."""
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return list(geometry["coordinates"])
+    raise ValueError(f"Unsupported boundary geometry: {geometry['type']}")
+
+
+def h3_zones(
+    resolution: int,
+    boundary: Optional[dict] = None,
+    bbox: Sequence[float] = ISTANBUL_BBOX,
+) -> list[ZoneSpec]:
+    """
+    ``boundary`` (GeoJSON Polygon / MultiPolygon geometry) ya da ``bbox``
+    içinde merkezi kalan H3 hücreleri; zone_key ``h3:<hücre>``.
+    Çözünürlük 7 ≈ 5.2 km² (İstanbul kutusunda ~2.6k hücre), 8 ≈ 0.74 km²
+    (~18k hücre).
+    """
+    import h3
+
+    shapes = _polygons(boundary) if boundary else [[_bbox_ring(bbox)]]
+    cells: set[str] = set()
+    for rings in shapes:
+        outer, *holes = [[(lat, lon) for lon, lat, *_ in ring] for ring in rings]
+        cells.update(h3.polygon_to_cells(h3.LatLngPoly(outer, *holes), resolution))
+
+    zones = []
+    for cell in sorted(cells):
+        ring = [[lon, lat] for lat, lon in h3.cell_to_boundary(cell)]
+        ring.append(ring[0])
+        zones.append(
+            ZoneSpec(
+                zone_key=f"h3:{cell}",
+                name=f"H3 {cell}",
+                geojson=json.dumps({"type": "Polygon", "coordinates": [ring]}),
+            )
+        )
+    return zones
+
+
+def geojson_zones(
+    collection: dict,
+    source: str,
+    key_property: str,
+    name_property: str,
+    base_congestion_property: Optional[str] = None,
+) -> list[ZoneSpec]:
+    """
+    İlçe / mahalle sınırları FeatureCollection'ından zone'lar; zone_key
+    ``<source>:<key_property değeri>``. Aynı ada sahip sınırların
+    (farklı ilçelerde aynı mahalle adı) adına key eklenir.
+    """
+    features = [f for f in collection.get("features", []) if f.get("geometry")]
+    names = Counter(str(f["properties"][name_property]) for f in features)
+
+    zones = []
+    for feature in features:
+        props = feature["properties"]
+        key = f"{source}:{props[key_property]}"
+        name = str(props[name_property])
+        if names[name] > 1:
+            name = f"{name} ({props[key_property]})"
+        _polygons(feature["geometry"])  # desteklenmeyen tipte erken hata
+        zone = ZoneSpec(zone_key=key, name=name, geojson=json.dumps(feature["geometry"]))
+        if base_congestion_property and props.get(base_congestion_property) is not None:
+            zone = zone._replace(base_congestion_level=float(props[base_congestion_property]))
+        zones.append(zone)
+
+    duplicates = [k for k, n in Counter(z.zone_key for z in zones).items() if n > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate zone keys in {source}: {duplicates[:5]}")
+    return zones
+
+
+async def load_zones(
+    session: AsyncSession,
+    zones: Iterable[ZoneSpec],
+    source: str,
+    simplify_m: float = 0.0,
+    prune: bool = False,
+) -> dict[str, Any]:
+    """
+    Zone'ları tek COPY ile staging'e yazar, merge_zone_staging() ile
+    traffic_zones'a birleştirir (commit çağırana kalır). ``simplify_m``: metre
+    cinsinden sadeleştirme toleransı; ``prune``: bu kaynağın listede
+    olmayan zone'larını siler. merge istatistiklerini döner.
+    """
+    batch_id = uuid.uuid4()
+    records = [
+        (batch_id, z.zone_key, z.name, z.geojson, z.base_congestion_level, z.rush_hour_multiplier)
+        for z in zones
+    ]
+
+    connection = await session.connection()
+    # asyncpg adaptörü transaction'ı ilk sorguda açar; COPY ondan önce
+    # gelirse autocommit olur ve merge geri alınsa da staging'de kalır.
+    await connection.execute(text("SELECT 1"))
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "traffic_zone_staging", records=records, columns=_STAGING_COLUMNS
+    )
+
+    stats = await session.scalar(
+        text("SELECT merge_zone_staging(:batch_id, :source, :simplify_m, :prune)"),
+        {"batch_id": batch_id, "source": source, "simplify_m": simplify_m, "prune": prune},
+    )
+    logger.info("Zones merged (%s, %d staged): %s", source, len(records), stats)
+    return stats
+
+
+# ── Zone groups (hierarchy levels) ──────────────────────────────────────────
+
+# 15-zone-hierarchy.sql: 0 = traffic_zones.
+DISTRICT_LEVEL = 1
+CITY_SIDE_LEVEL = 2
+
+
+def geojson_zone_groups(
+    collection: dict,
+    source: str,
+    key_property: str,
+    name_property: str,
+    parent_property: Optional[str] = None,
+    parent_source: Optional[str] = None,
+) -> tuple[list[ZoneGroupSpec], list[ZoneGroupSpec]]:
+    """
+    İlçe sınırlarından zone grupları; group_key ``<source>:<key>``.
+    ``parent_property`` verilirse (ör. yaka) üst grupların anahtarı
+    ``<parent_source>:<değer>`` olur ve geometrisiz üst gruplar da döner
+    (sunucuda çocuklarının birleşimi). (gruplar, üst gruplar) döner.
+    """
+    parent_source = parent_source or parent_property
+    groups = []
+    parents: dict[str, ZoneGroupSpec] = {}
+    for feature in collection.get("features", []):
+        if not feature.get("geometry"):
+            continue
+        props = feature["properties"]
+        _polygons(feature["geometry"])
+        parent_key = None
+        if parent_property and props.get(parent_property) is not None:
+            parent_name = str(props[parent_property])
+            parent_key = f"{parent_source}:{parent_name}"
+            parents.setdefault(parent_key, ZoneGroupSpec(parent_key, parent_name, None))
+        groups.append(
+            ZoneGroupSpec(
+                group_key=f"{source}:{props[key_property]}",
+                name=str(props[name_property]),
+                geojson=json.dumps(feature["geometry"]),
+                parent_key=parent_key,
+            )
+        )
+
+    duplicates = [k for k, n in Counter(g.group_key for g in groups).items() if n > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate zone group keys in {source}: {duplicates[:5]}")
+    return groups, sorted(parents.values())
+
+
+async def load_zone_groups(
+    session: AsyncSession,
+    groups: Sequence[ZoneGroupSpec],
+    level: int,
+    prune: bool = False,
+) -> dict[str, Any]:
+    """
+    Bir seviyenin gruplarını merge_zone_groups() ile yazar; üyelikler ve
+    güncel run'ın grup toplamları yeniden hesaplanır (commit çağırana
+    kalır). Geometrisiz üst gruplar, çocukları yüklendikten sonra
+    yüklenmelidir.
+    """
+    payload = json.dumps([g._asdict() for g in groups])
+    stats = await session.scalar(
+        text("SELECT merge_zone_groups(CAST(:level AS smallint), CAST(:groups AS jsonb), :prune)"),
+        {"level": level, "groups": payload, "prune": prune},
+    )
+    logger.info("Zone groups merged (level %d, %d groups): %s", level, len(groups), stats)
+    return stats
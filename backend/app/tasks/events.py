@@ -138,6 +138,19 @@ async def _fetch_and_store_events():
 
             metrics["missing_start_at"] = metrics.get("missing_start_at", 0) + skipped_count
 
+    # Harita marker'ları için zoom başına küme tablosu (20-event-clusters.sql);
+    # bildirimden önce, istemci refetch ettiğinde yeni kümeleri görsün.
+    try:
+        client.rpc("refresh_event_clusters", {}).execute()
+    except Exception:
+        logger.exception("Event cluster'ları yenilenemedi")
+
+    # Tüm batch için tek Realtime mesajı (events tablosu publication'da değil).
+    try:
+        client.rpc("publish_change_notification", {"p_kind": "events"}).execute()
+    except Exception:
+        logger.exception("Events notification gönderilemedi")
+
     logger.info(
         "Events upserted: %d / %d (skipped_missing_start_at=%d)",
         upserted,
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from app.celery_app import celery_app
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.prediction.feature_store import update_feature_store
+
+logger = logging.getLogger(__name__)
+
+
+async def _update_feature_store() -> int:
+    """
+    Append completed days (hourly rollups past the watermark) to the
+    Parquet feature store used for offline model training.
+    """
+    async with AsyncSessionLocal() as session:
+        written = await update_feature_store(
+            session,
+            settings.FEATURE_STORE_PATH,
+            backfill_days=settings.FEATURE_STORE_BACKFILL_DAYS,
+        )
+    logger.info(
+        "Feature store updated: %d day(s) %s",
+        len(written), ", ".join(day.isoformat() for day in written),
+    )
+    return len(written)
+
+
+@celery_app.task
+def update_feature_store_task():
+    """
+    Daily task to extend the training feature store by completed days.
+    """
+    logger.info("Starting update_feature_store_task...")
+    asyncio.run(_update_feature_store())
+    return "Feature store updated successfully"
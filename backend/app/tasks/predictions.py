@@ -1,19 +1,141 @@
 import asyncio
 import logging
+import uuid
 from app.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
+from app.config import settings
 from app.database import AsyncSessionLocal
 from app.models.traffic_zone import TrafficZone
-from app.prediction.rule_engine import predict
+from app.prediction.event_index import EventIntervalIndex, load_event_candidates
+from app.prediction.features import build_feature_matrix
+from app.prediction.hot_forecasts import default_hot_forecast_store, load_run_forecasts
+from app.prediction.rule_engine import encode_factors, predict_horizons
+from app.prediction.scorer import apply_scores, get_scorer
+from app.prediction.snapshots import get_snapshot_store, load_run_snapshot, publish_snapshot
 from app.supabase_client import get_supabase_client
 from sqlalchemy import select
 from datetime import datetime, timezone, timedelta
 
 
+_CHUNK_SIZE = 500
+
+
+def _current_row(run_id: str, zone_id: str, first_target: datetime, results: list) -> dict:
+    """Bir zone'un 24 saatlik sonuçlarını kompakt zone_prediction_current satırına çevirir."""
+    event_ids = [str(r.event_id) if r.event_id else None for r in results]
+    return {
+        "run_id": run_id,
+        "zone_id": zone_id,
+        "first_target": first_target.isoformat(),
+        "base_score": results[0].factors.get("base_score", 0.0),
+        "scores": [r.congestion_score for r in results],
+        "confidence": [r.confidence for r in results],
+        "factor_bits": [encode_factors(r.factors) for r in results],
+        "event_ids": event_ids if any(event_ids) else None,
+    }
+
+
+def _upsert_predictions(client, rows: list[dict]) -> tuple[int, int]:
+    """
+    Upsert rows via the upsert_predictions RPC (unchanged rows are skipped
+    server-side). Returns (acknowledged, written).
+    """
+    acknowledged = 0
+    written = 0
+    for i in range(0, len(rows), _CHUNK_SIZE):
+        chunk = rows[i : i + _CHUNK_SIZE]
+        try:
+            response = client.rpc("upsert_predictions", {"p_rows": chunk}).execute()
+        except Exception:
+            logger.exception("Prediction upsert hatası (chunk %d)", i)
+            continue
+        for item in response.data or []:
+            acknowledged += 1
+            written += bool(item["written"])
+    return acknowledged, written
+
+
 async def generate_predictions():
-    """Generate predictions for all zones and write to Supabase."""
+    """Generate predictions for all zones and write to Supabase.
+
+    With ``PREDICTION_ENGINE=sql`` (default) the batch is computed, upserted
+    and published server-side by ``run_prediction_batch``, which recomputes
+    only cells whose inputs changed (``prediction_dirty_cells``) and the new
+    horizon hours; the worker only triggers it and logs the stats. ``python``
+    runs the rule engine in the worker. Either way the current run is then
+    written as a static snapshot artifact (SNAPSHOT_STORE) and into the Redis
+    hot read model (app/prediction/hot_forecasts.py).
+    """
+    if settings.PREDICTION_ENGINE == "python":
+        await _generate_predictions_python()
+    else:
+        _generate_predictions_sql()
+    await _publish_snapshot()
+    await _publish_hot_forecasts()
+
+
+async def _publish_snapshot() -> None:
+    """Güncel run'ın snapshot dosyası + manifest; hata run'ı etkilemez."""
+    store = get_snapshot_store()
+    if store is None:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            snapshot = await load_run_snapshot(session)
+        if snapshot is not None:
+            publish_snapshot(store, snapshot, keep_runs=settings.SNAPSHOT_KEEP_RUNS)
+    except Exception:
+        logger.exception("Prediction snapshot yazılamadı")
+
+
+async def _publish_hot_forecasts() -> None:
+    """Güncel run'ı Redis okuma modeline yazar; hata run'ı etkilemez."""
+    store = default_hot_forecast_store()
+    if store is None:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            run, forecasts = await load_run_forecasts(session)
+        if run is not None and await store.publish(run["run_id"], run["predicted_at"], forecasts):
+            logger.info("Hot forecasts published: %s (%d zone)", run["run_id"], len(forecasts))
+    except Exception:
+        logger.exception("Hot forecasts yazılamadı")
+
+
+def _generate_predictions_sql() -> dict:
+    """Dirty hücreler → compute_predictions → upsert → kompakt run → publish, tek RPC çağrısı."""
+    client = get_supabase_client()
+    stats = client.rpc("run_prediction_batch", {}).execute().data or {}
+    logger.info(
+        "Prediction run published: %s (%s zone, %s/%s cells recomputed, %s skipped; "
+        "%s written, %s unchanged)",
+        stats.get("run_id"), stats.get("zones"), stats.get("recomputed"), stats.get("cells"),
+        stats.get("skipped"), stats.get("written"), stats.get("unchanged"),
+    )
+    return stats
+
+
+async def _generate_predictions_python():
+    """Python rule engine path.
+
+    Candidate events are loaded once per run and matched to the 24
+    horizons with an in-memory interval index instead of one event query
+    per cell. When a model artifact is configured (PREDICTION_MODEL_PATH)
+    the whole zone × horizon feature matrix is scored in one model call and
+    the rule results keep only their factors / event_id; otherwise the rule
+    scores are used as they are.
+    Target times are hour-aligned so each run upserts the same
+    (zone_id, target_time) keys the previous run wrote; only changed rows
+    hit ``predictions``. The run is also written, one compact row per zone,
+    under a new ``prediction_runs`` id into ``zone_prediction_current`` and
+    published in one transaction so readers switch over atomically. A run
+    with failed current-row writes is left unpublished and the previous one
+    stays. Every cell is recomputed, so a published run clears the
+    ``prediction_dirty_cells`` entries marked before it started (only
+    ``run_prediction_batch`` reads them).
+    """
     client = get_supabase_client()
 
     async with AsyncSessionLocal() as session:
@@ -22,13 +144,37 @@ async def generate_predictions():
         zones = zones_result.scalars().all()
 
         now = datetime.now(timezone.utc)
-        rows_to_insert = []
+        base_hour = now.replace(minute=0, second=0, microsecond=0)
+        target_times = [base_hour + timedelta(hours=i) for i in range(1, 25)]
+        first_target = target_times[0]
+        run_id = str(uuid.uuid4())
+        rows_to_upsert = []
+        current_rows = []
+
+        # Aday etkinlikler run başına bir kez; 24 horizon tek sweep'te.
+        events, nearby = await load_event_candidates(session, target_times[0], target_times[-1])
+        active_events = [
+            {event.id: event for event in active} for active in EventIntervalIndex(events).sweep(target_times)
+        ]
+
+        results_by_zone = [
+            predict_horizons(zone, target_times, active_events, nearby.get(zone.id, set()))
+            for zone in zones
+        ]
 
-        for zone in zones:
-            for i in range(1, 25):
-                target_time = now + timedelta(hours=i)
-                pred_res = await predict(zone.id, target_time, session)
+        scorer = get_scorer()
+        if scorer is not None and zones:
+            try:
+                matrix = build_feature_matrix(zones, target_times, nearby, events)
+                results_by_zone = apply_scores(
+                    results_by_zone, scorer.score(matrix), scorer.confidence, scorer.name
+                )
+                logger.info("Prediction scores from %s (%d cells)", scorer.name, len(matrix))
+            except Exception:
+                logger.exception("Model scoring hatası (%s); kural skorları kullanılıyor", scorer.name)
 
+        for zone, results in zip(zones, results_by_zone):
+            for target_time, pred_res in zip(target_times, results):
                 row = {
                     "zone_id": str(pred_res.zone_id),
                     "predicted_at": now.isoformat(),
@@ -40,20 +186,84 @@ async def generate_predictions():
                 if pred_res.event_id:
                     row["event_id"] = str(pred_res.event_id)
 
-                rows_to_insert.append(row)
+                rows_to_upsert.append(row)
+
+            current_rows.append(_current_row(run_id, str(zone.id), first_target, results))
+
+    if rows_to_upsert:
+        # Günlük partition'lar yoksa oluştur (varsa / tablo partition'sızsa no-op).
+        client.rpc("ensure_prediction_partitions", {"p_days_ahead": 2}).execute()
+
+    acknowledged, written = _upsert_predictions(client, rows_to_upsert)
+    logger.info(
+        "Predictions upserted: %d written, %d unchanged, %d total",
+        written, acknowledged - written, len(rows_to_upsert),
+    )
 
-    # Batch insert into Supabase (chunks of 100)
-    chunk_size = 100
-    inserted = 0
-    for i in range(0, len(rows_to_insert), chunk_size):
-        chunk = rows_to_insert[i : i + chunk_size]
+    if not current_rows:
+        return
+
+    client.table("prediction_runs").insert(
+        {"id": run_id, "predicted_at": now.isoformat()}
+    ).execute()
+
+    staged = 0
+    for i in range(0, len(current_rows), _CHUNK_SIZE):
+        chunk = current_rows[i : i + _CHUNK_SIZE]
         try:
-            client.table("predictions").insert(chunk).execute()
-            inserted += len(chunk)
+            client.table("zone_prediction_current").insert(chunk).execute()
+            staged += len(chunk)
         except Exception:
-            logger.exception("Prediction insert hatası (chunk %d)", i)
+            logger.exception("Current prediction insert hatası (chunk %d)", i)
+
+    if staged < len(current_rows):
+        # Yarım run yayınlanmaz; önceki run okunmaya devam eder.
+        logger.error(
+            "Prediction run %s yayınlanmadı: %d / %d satır yazıldı",
+            run_id, staged, len(current_rows),
+        )
+        return
+
+    client.rpc("publish_prediction_run", {"p_run_id": run_id}).execute()
+    logger.info("Prediction run published: %s (%d zone)", run_id, staged)
+
+    client.rpc("prune_prediction_dirty_cells", {"p_marked_before": now.isoformat()}).execute()
 
-    logger.info("Predictions inserted: %d / %d", inserted, len(rows_to_insert))
+
+async def _prune_predictions() -> int:
+    """
+    Partition maintenance: create upcoming daily partitions and drop the
+    ones whose target_time range is past the retention window. Also trims
+    the delta-sync change log and expired dirty-cell entries.
+    """
+    client = get_supabase_client()
+    client.rpc("ensure_prediction_partitions", {"p_days_ahead": 3}).execute()
+    deleted = (
+        client.rpc(
+            "prune_predictions",
+            {"p_keep_hours": settings.PREDICTION_RETENTION_HOURS},
+        )
+        .execute()
+        .data
+        or 0
+    )
+    logger.info("Expired predictions pruned: %d partition(s)/row(s)", deleted)
+
+    # Delta sync günlüğü; daha eski token'lar changes_since'tan reset alır.
+    log_rows = (
+        client.rpc(
+            "prune_change_log",
+            {"p_keep_hours": settings.CHANGE_LOG_RETENTION_HOURS},
+        )
+        .execute()
+        .data
+        or 0
+    )
+    logger.info("Change log pruned: %d row(s)", log_rows)
+
+    dirty = client.rpc("prune_prediction_dirty_cells", {}).execute().data or 0
+    logger.info("Expired dirty prediction cells pruned: %d", dirty)
+    return deleted
 
 
 @celery_app.task
@@ -65,3 +275,13 @@ def run_predictions_task():
     logger.info("Starting run_predictions_task...")
     asyncio.run(generate_predictions())
     return "Predictions generated successfully"
+
+
+@celery_app.task
+def prune_predictions_task():
+    """
+    Periodic task to remove predictions for horizons that have expired.
+    """
+    logger.info("Starting prune_predictions_task...")
+    asyncio.run(_prune_predictions())
+    return "Expired predictions pruned successfully"
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from app.celery_app import celery_app
+from app.config import settings
+from app.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_traffic_rollups() -> dict[str, int]:
+    """
+    Roll raw traffic snapshots up into hourly, then daily aggregates.
+
+    Both RPCs are incremental (watermark-based), so running them more often
+    than needed only costs a no-op query.
+    """
+    client = get_supabase_client()
+
+    hourly = client.rpc("rollup_traffic_hourly").execute().data or 0
+    daily = client.rpc("rollup_traffic_daily").execute().data or 0
+
+    logger.info("Traffic rollups written: hourly=%d daily=%d", hourly, daily)
+    return {"hourly": hourly, "daily": daily}
+
+
+async def _prune_traffic_history() -> int:
+    """Apply raw/rollup retention; raw partitions are dropped, not deleted."""
+    client = get_supabase_client()
+    dropped = (
+        client.rpc(
+            "prune_traffic_history",
+            {
+                "p_raw_days": settings.TRAFFIC_RAW_RETENTION_DAYS,
+                "p_hourly_days": settings.TRAFFIC_HOURLY_RETENTION_DAYS,
+                "p_daily_days": settings.TRAFFIC_DAILY_RETENTION_DAYS,
+            },
+        )
+        .execute()
+        .data
+        or 0
+    )
+    logger.info("Traffic snapshot partitions dropped: %d", dropped)
+    return dropped
+
+
+@celery_app.task
+def rollup_traffic_task():
+    """
+    Periodic task to maintain hourly/daily traffic aggregates.
+    """
+    logger.info("Starting rollup_traffic_task...")
+    asyncio.run(_run_traffic_rollups())
+    return "Traffic rollups updated successfully"
+
+
+@celery_app.task
+def prune_traffic_history_task():
+    """
+    Daily task to enforce traffic history retention.
+    """
+    logger.info("Starting prune_traffic_history_task...")
+    asyncio.run(_prune_traffic_history())
+    return "Traffic history pruned successfully"
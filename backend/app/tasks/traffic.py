@@ -1,29 +1,176 @@
 import asyncio
 import logging
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
 from app.celery_app import celery_app
-from app.services.ibb_traffic_service import IBBTrafficService
+from app.config import settings
+from app.prediction.anomaly import (
+    DetectedAnomaly,
+    Observation,
+    default_state_store,
+    detect_anomalies,
+)
+from app.services.ibb_traffic_service import IBBTrafficService, TrafficZone
 from app.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+_ISTANBUL_TZ = ZoneInfo("Europe/Istanbul")
+_SLOT_MINUTES = 15
+_CHUNK_SIZE = 500
+
+
+def _observed_slot(raw_timestamp: str, fallback: datetime) -> datetime:
+    """İBB DATE_TIME değerini 15 dakikalık slot başına (UTC) indirger."""
+    observed = fallback
+    if raw_timestamp:
+        try:
+            observed = datetime.fromisoformat(raw_timestamp.strip())
+        except ValueError:
+            observed = fallback
+    if observed.tzinfo is None:
+        # İBB portalı yerel saat döndürür.
+        observed = observed.replace(tzinfo=_ISTANBUL_TZ)
+    observed = observed.astimezone(timezone.utc)
+    return observed.replace(
+        minute=observed.minute - observed.minute % _SLOT_MINUTES,
+        second=0,
+        microsecond=0,
+    )
+
+
+def _snapshot_rows(zones: list[TrafficZone], now: datetime) -> list[dict]:
+    """İBB kayıtlarını traffic_snapshots satırlarına çevirir (segment+slot tekil)."""
+    rows: dict[tuple[str, str], dict] = {}
+    for zone in zones:
+        if not zone.zone_id:
+            continue
+        observed_at = _observed_slot(zone.timestamp, now).isoformat()
+        row = {
+            "observed_at": observed_at,
+            "segment_id": zone.zone_id,
+            "road_name": zone.road_name or None,
+            "direction": zone.direction or None,
+            "speed_kmh": zone.speed_kmh,
+            "vehicle_count": zone.density,
+        }
+        if zone.lat is not None and zone.lon is not None:
+            row["location"] = f"SRID=4326;POINT({zone.lon} {zone.lat})"
+        # Aynı slotta tekrar eden segmentte son kayıt kazanır.
+        rows[(zone.zone_id, observed_at)] = row
+    return list(rows.values())
+
+
+def _observations(stored_rows: list[dict]) -> list[Observation]:
+    """Segment gözlemleri + zone başına ortalama hız gözlemleri."""
+    observations: list[Observation] = []
+    zone_speeds: dict[tuple[str, str], list[float]] = {}
+    for row in stored_rows:
+        observed_at = datetime.fromisoformat(row["observed_at"])
+        zone_id = row.get("zone_id")
+        observations.append(
+            Observation("segment", row["segment_id"], observed_at, row["speed_kmh"], zone_id)
+        )
+        if zone_id:
+            zone_speeds.setdefault((zone_id, row["observed_at"]), []).append(row["speed_kmh"])
+
+    for (zone_id, observed_at), speeds in zone_speeds.items():
+        observations.append(
+            Observation(
+                "zone",
+                zone_id,
+                datetime.fromisoformat(observed_at),
+                sum(speeds) / len(speeds),
+                zone_id,
+            )
+        )
+    return observations
+
+
+def _within_retention(rows: list[dict], now: datetime) -> list[dict]:
+    """
+    Ham saklama süresinden (TRAFFIC_RAW_RETENTION_DAYS) eski satırları atar:
+    partition'ları prune_traffic_history zaten düşürür / düşürecektir.
+    """
+    cutoff = now - timedelta(days=settings.TRAFFIC_RAW_RETENTION_DAYS)
+    kept = [row for row in rows if datetime.fromisoformat(row["observed_at"]) >= cutoff]
+    if len(kept) < len(rows):
+        logger.warning(
+            "Traffic snapshots older than %d days skipped: %d",
+            settings.TRAFFIC_RAW_RETENTION_DAYS, len(rows) - len(kept),
+        )
+    return kept
+
+
+def _partition_days_back(rows: list[dict], now: datetime) -> int:
+    """En eski satırın UTC gününe kadar kaç gün geriye partition gerektiği."""
+    oldest = min(datetime.fromisoformat(row["observed_at"]) for row in rows)
+    return min(max((now.date() - oldest.date()).days, 0), settings.TRAFFIC_RAW_RETENTION_DAYS)
+
+
+def _anomaly_row(anomaly: DetectedAnomaly) -> dict:
+    return {
+        "scope": anomaly.scope,
+        "scope_key": anomaly.key,
+        "zone_id": anomaly.zone_id,
+        "observed_at": anomaly.observed_at.isoformat(),
+        "speed_kmh": anomaly.speed_kmh,
+        "baseline_kmh": anomaly.baseline_kmh,
+        "z_score": anomaly.z_score,
+    }
+
 
 async def _fetch_and_store_traffic():
-    """Fetch live traffic data from IBB and cache / log results."""
+    """Fetch live traffic data from IBB and append it to traffic_snapshots."""
     svc = IBBTrafficService()
     zones = await svc.get_traffic_zones()
     client = get_supabase_client()
 
     logger.info("IBB trafik verisi: %d kayıt alındı.", len(zones))
 
-    # Traffic data is transient; we log it but primarily use it for predictions.
-    # For now we store a summary in Redis cache via the service layer.
-    # Future: a dedicated traffic_snapshots table can be added.
+    now = datetime.now(timezone.utc)
+    rows = _within_retention(_snapshot_rows(zones, now), now)
+    if not rows:
+        return
+
+    # Günlük partition'lar yoksa oluştur (varsa no-op); geç gelen satırların
+    # günleri de dahil.
+    client.rpc(
+        "ensure_traffic_snapshot_partitions",
+        {"p_days_ahead": 2, "p_days_back": _partition_days_back(rows, now)},
+    ).execute()
+
+    stored_rows: list[dict] = []
+    for i in range(0, len(rows), _CHUNK_SIZE):
+        chunk = rows[i : i + _CHUNK_SIZE]
+        try:
+            response = client.table("traffic_snapshots").upsert(
+                chunk,
+                on_conflict="segment_id,observed_at",
+            ).execute()
+            # Dönen satırlar trigger'ın atadığı zone_id'yi taşır.
+            stored_rows.extend(response.data or chunk)
+        except Exception:
+            logger.exception("Traffic snapshot upsert hatası (chunk %d)", i)
+
+    logger.info("Traffic snapshots stored: %d / %d", len(stored_rows), len(rows))
+
+    anomalies = await detect_anomalies(_observations(stored_rows), default_state_store())
+    if anomalies:
+        try:
+            client.table("traffic_anomalies").insert(
+                [_anomaly_row(a) for a in anomalies]
+            ).execute()
+        except Exception:
+            logger.exception("Traffic anomaly insert hatası")
+    logger.info("Traffic anomalies detected: %d", len(anomalies))
 
 
 @celery_app.task
 def fetch_traffic_task():
     """
-    Periodic task to fetch live traffic data and update cache.
+    Periodic task to fetch live traffic data and store raw snapshots.
     """
     logger.info("Starting fetch_traffic_task...")
     asyncio.run(_fetch_and_store_traffic())
@@ -0,0 +1,130 @@
+"""
+Throughput benchmark: rule engine vs batch model inference.
+
+Builds --zones synthetic zones, --events candidate events and a random
+zone → nearby-event adjacency (as load_event_candidates() returns), then
+times one prediction run (24 horizons) through
+
+  rules  EventIntervalIndex.sweep (keyed by id) + predict_horizons per zone
+  model  the rule pass (factors / event_id) + build_feature_matrix +
+         one ModelScorer.score call + apply_scores
+
+The model is a NumPy linear model by default; --model sklearn or
+--model lightgbm fits a small gradient-boosted model on the rule scores
+when that package is installed.
+
+Usage (from backend/):
+    python -m scripts.benchmark_scorer [--zones 10000] [--events 2000] [--model linear]
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.event import Event
+from app.models.traffic_zone import TrafficZone
+from app.prediction.event_index import EventIntervalIndex
+from app.prediction.features import FEATURE_COLUMNS, build_feature_matrix
+from app.prediction.rule_engine import predict_horizons
+from app.prediction.scorer import ModelScorer, apply_scores
+
+
+class _LinearModel:
+    def __init__(self, coef: np.ndarray, intercept: float) -> None:
+        self.coef, self.intercept = coef, intercept
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.coef + self.intercept
+
+
+def _fixture(zone_count: int, event_count: int, rng: random.Random):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    target_times = [now + timedelta(hours=h) for h in range(1, 25)]
+    zones = [
+        TrafficZone(id=uuid.uuid4(), name=f"Z{i}", base_congestion_level=rng.uniform(0.1, 0.7))
+        for i in range(zone_count)
+    ]
+    events = []
+    for _ in range(event_count):
+        start = now + timedelta(hours=rng.uniform(-6, 30))
+        events.append(
+            Event(
+                id=uuid.uuid4(),
+                name="e",
+                start_time=start,
+                end_time=None if rng.random() < 0.3 else start + timedelta(hours=rng.choice([2, 3, 48])),
+                capacity=rng.choice([6000, 15000, 30000, 52000]),
+            )
+        )
+    nearby = {z.id: {e.id for e in rng.sample(events, rng.randint(0, 4))} for z in zones}
+    return zones, target_times, events, nearby
+
+
+def _model(kind: str, matrix, rule_scores: np.ndarray):
+    if kind == "linear":
+        coef = np.zeros(len(FEATURE_COLUMNS))
+        coef[FEATURE_COLUMNS.index("zone_base_level")] = 100.0
+        coef[FEATURE_COLUMNS.index("is_rush_hour")] = 25.0
+        coef[FEATURE_COLUMNS.index("nearby_event_count")] = 5.0
+        return _LinearModel(coef, 0.0)
+    if kind == "sklearn":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        return HistGradientBoostingRegressor(max_iter=100).fit(matrix.values, rule_scores)
+    if kind == "lightgbm":
+        import lightgbm
+
+        return lightgbm.LGBMRegressor(n_estimators=100, verbose=-1).fit(matrix.values, rule_scores)
+    raise SystemExit(f"unknown --model {kind}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zones", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--model", choices=["linear", "sklearn", "lightgbm"], default="linear")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    zones, target_times, events, nearby = _fixture(args.zones, args.events, random.Random(args.seed))
+    cells = len(zones) * len(target_times)
+
+    started = time.perf_counter()
+    active = [{e.id: e for e in a} for a in EventIntervalIndex(events).sweep(target_times)]
+    results = [predict_horizons(z, target_times, active, nearby.get(z.id, set())) for z in zones]
+    rules_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix = build_feature_matrix(zones, target_times, nearby, events)
+    features_s = time.perf_counter() - started
+
+    rule_scores = np.array([r.congestion_score for zone_results in results for r in zone_results], dtype=np.float64)
+    scorer = ModelScorer(_model(args.model, matrix, rule_scores), version=args.model)
+
+    started = time.perf_counter()
+    scores = scorer.score(matrix)
+    infer_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    apply_scores(results, scores, scorer.confidence)
+    apply_s = time.perf_counter() - started
+
+    model_s = rules_s + features_s + infer_s + apply_s
+    print(f"{len(zones)} zones × {len(target_times)} horizons = {cells} cells, {len(events)} events")
+    print(f"rules         {rules_s * 1000:10.1f} ms   ({cells / rules_s:12,.0f} cells/s)")
+    print(f"features      {features_s * 1000:10.1f} ms   ({cells / features_s:12,.0f} cells/s)")
+    print(f"{args.model + ' predict':<13} {infer_s * 1000:10.1f} ms   ({cells / infer_s:12,.0f} cells/s)")
+    print(f"apply         {apply_s * 1000:10.1f} ms")
+    print(f"model run     {model_s * 1000:10.1f} ms   ({cells / model_s:12,.0f} cells/s)")
+
+
+if __name__ == "__main__":
+    main()
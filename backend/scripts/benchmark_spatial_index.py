@@ -0,0 +1,142 @@
+"""
+Benchmark and semantics check of the in-process zone spatial index.
+
+Builds ZoneSpatialIndex over --zones synthetic zones tessellating the
+Istanbul bounding box (jittered quadrilaterals) and matches --events
+random event points against it, the way load_event_candidates() does for a
+prediction run. Reports build time, match time and zone↔event pair count,
+and checks a sample of events against a brute-force distance scan.
+
+With --verify-db the sample is also checked against PostGIS
+(ST_DWithin(ST_Transform(..., 3857), ..., 2000)) through DATABASE_URL.
+
+Usage (from backend/):
+    python -m scripts.benchmark_spatial_index [--zones 10000] [--events 50000] [--verify-db]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.prediction.spatial_index import RADIUS_M, ZoneSpatialIndex
+
+_BBOX = (28.5, 40.8, 29.5, 41.3)
+
+
+def _zones(n: int, rng: random.Random) -> list[tuple[uuid.UUID, list]]:
+    # Bbox'u kaplayan √n × √n karelaj; köşeler kaydırılmış dörtgenler
+    # (eksene hizalı değil, tam mesafe hesabı da devreye girsin).
+    min_lon, min_lat, max_lon, max_lat = _BBOX
+    side = max(1, round(n ** 0.5))
+    step_lon, step_lat = (max_lon - min_lon) / side, (max_lat - min_lat) / side
+    zones = []
+    for i in range(side):
+        for j in range(side):
+            lon, lat = min_lon + i * step_lon, min_lat + j * step_lat
+
+            def jitter(x, y):
+                return (x + rng.uniform(-0.15, 0.15) * step_lon, y + rng.uniform(-0.15, 0.15) * step_lat)
+
+            corners = [
+                jitter(lon, lat),
+                jitter(lon + step_lon, lat),
+                jitter(lon + step_lon, lat + step_lat),
+                jitter(lon, lat + step_lat),
+            ]
+            zones.append((uuid.uuid4(), [corners + corners[:1]]))
+    return zones
+
+
+def _events(n: int, rng: random.Random) -> list[tuple[uuid.UUID, float, float]]:
+    min_lon, min_lat, max_lon, max_lat = _BBOX
+    return [(uuid.uuid4(), rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)) for _ in range(n)]
+
+
+def _wkt(ring) -> str:
+    return "POLYGON((" + ",".join(f"{x} {y}" for x, y in ring) + "))"
+
+
+async def _db_pairs(zones, sample) -> set[tuple[uuid.UUID, uuid.UUID]]:
+    from sqlalchemy import text
+
+    from app.database import engine
+
+    sql = text(
+        """
+        select z.id, e.id
+        from unnest(cast(:zone_ids as uuid[]), cast(:zone_wkt as text[])) as z(id, wkt)
+        join unnest(cast(:event_ids as uuid[]), cast(:lons as float8[]), cast(:lats as float8[])) as e(id, lon, lat)
+          on ST_DWithin(
+                ST_Transform(ST_GeomFromText(z.wkt, 4326), 3857),
+                ST_Transform(ST_SetSRID(ST_MakePoint(e.lon, e.lat), 4326), 3857),
+                :radius)
+        """
+    )
+    params = {
+        "zone_ids": [zone_id for zone_id, _ in zones],
+        "zone_wkt": [_wkt(rings[0]) for _, rings in zones],
+        "event_ids": [event_id for event_id, _, _ in sample],
+        "lons": [lon for _, lon, _ in sample],
+        "lats": [lat for _, _, lat in sample],
+        "radius": RADIUS_M,
+    }
+    async with engine.connect() as conn:
+        rows = (await conn.execute(sql, params)).all()
+    await engine.dispose()
+    return {(zone_id, event_id) for zone_id, event_id in rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zones", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verify-db", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    zones = _zones(args.zones, rng)
+    events = _events(args.events, rng)
+
+    started = time.perf_counter()
+    index = ZoneSpatialIndex(zones)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    nearby = index.nearby_events(events)
+    match_s = time.perf_counter() - started
+    pairs = sum(len(ids) for ids in nearby.values())
+
+    print(f"{args.zones} zones × {args.events} events, radius {RADIUS_M} m")
+    print(f"build   {build_s * 1000:10.1f} ms")
+    print(f"match   {match_s * 1000:10.1f} ms   ({match_s / args.events * 1e6:.1f} µs/event)")
+    print(f"pairs   {pairs:10d}   zones with events: {len(nearby)}")
+
+    sample = rng.sample(events, min(args.sample, len(events)))
+    indexed = {(zone_id, event_id) for event_id, lon, lat in sample for zone_id in index.zones_within(lon, lat)}
+    brute = {
+        (zone_id, event_id)
+        for event_id, lon, lat in sample
+        for zone_id, _ in zones
+        if index.distance_m(zone_id, lon, lat) <= RADIUS_M
+    }
+    print(f"brute-force check ({len(sample)} events): {'ok' if indexed == brute else 'MISMATCH'}")
+
+    if args.verify_db:
+        db = asyncio.run(_db_pairs(zones, sample))
+        status = "ok" if indexed == db else f"MISMATCH ({len(indexed ^ db)} pairs differ)"
+        print(f"PostGIS check ({len(sample)} events): {status}")
+
+    if indexed != brute:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
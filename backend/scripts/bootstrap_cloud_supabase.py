@@ -5,165 +5,25 @@ What it does:
 1) Verifies DB connectivity via SQLAlchemy async engine
 2) Ensures required extensions (postgis, pgcrypto)
 3) Creates ORM tables (events, traffic_zones, predictions)
-4) Creates/updates RPC function: get_latest_predictions
+4) Adds stored geography/centroid columns + GIST indexes used by the RPCs
+5) Applies the incremental schema files (06-*.sql and later) shared with the
+   self-hosted stack under supabase/volumes/db/init (prediction read model
+   and get_predictions_nearby / get_latest_predictions live in 08,
+   get_events_nearby in 19)
 """
 
 import asyncio
+from pathlib import Path
 
 from sqlalchemy import text
 
 from app.database import engine
 from app.models import Base
 
-
-def _rpc_statements() -> list[str]:
-        return [
-                """
-                create or replace function public.get_predictions_nearby(
-                        p_lat double precision,
-                        p_lon double precision,
-                        p_radius_km double precision default 5.0,
-                        p_target_ts timestamptz default null
-                )
-                returns table (
-                        prediction_id uuid,
-                        zone_id uuid,
-                        zone_name varchar(255),
-                        congestion_score integer,
-                        confidence double precision,
-                        target_time timestamptz,
-                        predicted_at timestamptz,
-                        factors jsonb,
-                        event_id uuid,
-                        zone_centroid_lat double precision,
-                        zone_centroid_lon double precision,
-                        distance_km double precision
-                )
-                language sql
-                stable
-                security definer
-                as $$
-                  select
-                        p.id as prediction_id,
-                        z.id as zone_id,
-                        z.name as zone_name,
-                        p.congestion_score,
-                        p.confidence,
-                        p.target_time,
-                        p.predicted_at,
-                        p.factors,
-                        p.event_id,
-                        st_y(st_centroid(z.polygon)) as zone_centroid_lat,
-                        st_x(st_centroid(z.polygon)) as zone_centroid_lon,
-                        st_distance(
-                                st_centroid(z.polygon)::geography,
-                                st_setsrid(st_makepoint(p_lon, p_lat), 4326)::geography
-                        ) / 1000.0 as distance_km
-                  from public.predictions p
-                  join public.traffic_zones z on p.zone_id = z.id
-                  where st_dwithin(
-                        z.polygon::geography,
-                        st_setsrid(st_makepoint(p_lon, p_lat), 4326)::geography,
-                        p_radius_km * 1000
-                  )
-                    and (
-                        p_target_ts is null
-                        or p.target_time = (
-                                select pp.target_time
-                                from public.predictions pp
-                                where pp.zone_id = z.id
-                                order by abs(extract(epoch from (pp.target_time - p_target_ts)))
-                                limit 1
-                        )
-                    )
-                  order by distance_km;
-                $$;
-                """,
-                """
-                create or replace function public.get_events_nearby(
-                        p_lat double precision,
-                        p_lon double precision,
-                        p_radius_km double precision default 5.0,
-                        p_category varchar default null,
-                        p_start_date timestamptz default null,
-                        p_end_date timestamptz default null
-                )
-                returns table (
-                        event_id uuid,
-                        name varchar(255),
-                        description text,
-                        venue_name varchar(255),
-                        category varchar(50),
-                        start_time timestamptz,
-                        end_time timestamptz,
-                        capacity integer,
-                        source varchar(100),
-                        lat double precision,
-                        lon double precision,
-                        distance_km double precision
-                )
-                language sql
-                stable
-                security definer
-                as $$
-                  select
-                        e.id as event_id,
-                        e.name,
-                        e.description,
-                        e.venue_name,
-                        e.category,
-                        e.start_time,
-                        e.end_time,
-                        e.capacity,
-                        e.source,
-                        st_y(e.location) as lat,
-                        st_x(e.location) as lon,
-                        st_distance(
-                                e.location::geography,
-                                st_setsrid(st_makepoint(p_lon, p_lat), 4326)::geography
-                        ) / 1000.0 as distance_km
-                  from public.events e
-                  where st_dwithin(
-                        e.location::geography,
-                        st_setsrid(st_makepoint(p_lon, p_lat), 4326)::geography,
-                        p_radius_km * 1000
-                  )
-                    and (p_category is null or e.category = p_category)
-                    and (p_start_date is null or e.start_time >= p_start_date)
-                    and (p_end_date is null or e.start_time <= p_end_date)
-                  order by distance_km;
-                $$;
-                """,
-                """
-                create or replace function public.get_latest_predictions()
-                returns setof public.predictions
-                language sql
-                stable
-                as $$
-                  select p.*
-                  from public.predictions p
-                  join (
-                          select zone_id, max(target_time) as max_target_time
-                          from public.predictions
-                          group by zone_id
-                  ) latest
-                        on latest.zone_id = p.zone_id
-                   and latest.max_target_time = p.target_time
-                  order by p.target_time desc;
-                $$;
-                """,
-                "grant execute on function public.get_latest_predictions() to anon",
-                "grant execute on function public.get_latest_predictions() to authenticated",
-                "grant execute on function public.get_latest_predictions() to service_role",
-                (
-                        "grant execute on function public.get_predictions_nearby(double precision, double precision, double precision, timestamptz) "
-                        "to anon, authenticated, service_role"
-                ),
-                (
-                        "grant execute on function public.get_events_nearby(double precision, double precision, double precision, varchar, timestamptz, timestamptz) "
-                        "to anon, authenticated, service_role"
-                ),
-        ]
+_INIT_SQL_DIR = Path(__file__).resolve().parents[2] / "supabase" / "volumes" / "db" / "init"
+# 00-05 are covered by the ORM + statement lists above; later files are
+# idempotent and applied verbatim.
+_FIRST_SHARED_SQL_FILE = 6
 
 
 def _access_statements() -> list[str]:
@@ -203,6 +63,46 @@ def _defaults_statements() -> list[str]:
         ]
 
 
+def _spatial_column_statements() -> list[str]:
+        # create_all() only adds these on fresh tables; existing projects get
+        # them here before the RPCs that read them are (re)created.
+        return [
+                (
+                        "alter table public.traffic_zones add column if not exists polygon_geog "
+                        "geography(polygon, 4326) generated always as (polygon::geography) stored"
+                ),
+                (
+                        "alter table public.traffic_zones add column if not exists centroid "
+                        "geometry(point, 4326) generated always as (st_centroid(polygon)) stored"
+                ),
+                (
+                        "alter table public.traffic_zones add column if not exists centroid_geog "
+                        "geography(point, 4326) generated always as (st_centroid(polygon)::geography) stored"
+                ),
+                (
+                        "alter table public.events add column if not exists location_geog "
+                        "geography(point, 4326) generated always as (location::geography) stored"
+                ),
+                (
+                        "create index if not exists ix_traffic_zones_polygon_geog "
+                        "on public.traffic_zones using gist (polygon_geog)"
+                ),
+                (
+                        "create index if not exists ix_events_location_geog "
+                        "on public.events using gist (location_geog)"
+                ),
+        ]
+
+
+def _shared_sql_files() -> list[Path]:
+    files = []
+    for path in sorted(_INIT_SQL_DIR.glob("*.sql")):
+        prefix = path.name.split("-", 1)[0]
+        if prefix.isdigit() and int(prefix) >= _FIRST_SHARED_SQL_FILE:
+            files.append(path)
+    return files
+
+
 async def main() -> None:
     async with engine.begin() as conn:
         check = await conn.execute(text("select 1"))
@@ -219,13 +119,19 @@ async def main() -> None:
             await conn.execute(text(stmt))
         print("defaults_ok")
 
+        for stmt in _spatial_column_statements():
+            await conn.execute(text(stmt))
+        print("spatial_columns_ok")
+
         for stmt in _access_statements():
             await conn.execute(text(stmt))
         print("access_ok")
 
-        for stmt in _rpc_statements():
-            await conn.execute(text(stmt))
-        print("rpc_ok")
+        # Multi-statement files need asyncpg's simple query protocol.
+        raw = await conn.get_raw_connection()
+        for path in _shared_sql_files():
+            await raw.driver_connection.execute(path.read_text(encoding="utf-8"))
+            print("sql_ok", path.name)
 
     await engine.dispose()
     print("bootstrap_done")
@@ -0,0 +1,155 @@
+"""
+Storage and read-bandwidth comparison of prediction run layouts.
+
+Builds one synthetic run for --zones zones in a scratch schema, twice:
+
+  rows     one row per zone × horizon (the predictions / former
+           zone_prediction_current layout: uuid id, zone_id, predicted_at,
+           target_time, integer score, double confidence, JSONB factors)
+  compact  one row per zone (zone_prediction_current: smallint[24] scores,
+           real[24] confidence, smallint[24] factor bits)
+
+and reports on-disk size (heap + indexes), buffers touched by the heatmap
+read (nearest horizon for every zone) and by a full-run read, and the JSON
+bytes a client would receive when fetching the run as stored.
+
+Usage (from backend/):
+    python -m scripts.compare_prediction_layouts [--zones 2000]
+
+Drops its scratch schema on exit.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import engine
+
+_SCHEMA = "bench_prediction_layouts"
+
+_SETUP = f"""
+drop schema if exists {_SCHEMA} cascade;
+create schema {_SCHEMA};
+create table {_SCHEMA}.rows (
+    id uuid primary key default gen_random_uuid(),
+    created_at timestamptz not null default now(),
+    zone_id uuid not null,
+    event_id uuid,
+    predicted_at timestamptz not null,
+    target_time timestamptz not null,
+    congestion_score integer not null,
+    confidence double precision not null,
+    factors jsonb,
+    unique (zone_id, target_time)
+);
+create table {_SCHEMA}.compact (
+    run_id uuid not null,
+    zone_id uuid not null,
+    first_target timestamptz not null,
+    base_score real not null,
+    scores smallint[] not null,
+    confidence real[] not null,
+    factor_bits smallint[] not null,
+    event_ids uuid[],
+    primary key (run_id, zone_id)
+);
+"""
+
+_LOAD_ROWS = f"""
+insert into {_SCHEMA}.rows (zone_id, predicted_at, target_time, congestion_score, confidence, factors)
+select
+    z.id,
+    now(),
+    date_trunc('hour', now()) + make_interval(hours => h),
+    40 + h,
+    0.8,
+    jsonb_build_object('base_score', 45.0, 'rush_hour', 25, 'total_score', (40 + h)::float8)
+from (select gen_random_uuid() as id from generate_series(1, $1)) z
+cross join generate_series(1, 24) h
+"""
+
+_LOAD_COMPACT = f"""
+insert into {_SCHEMA}.compact
+select
+    gen_random_uuid(),
+    r.zone_id,
+    min(r.target_time),
+    45.0,
+    array_agg(r.congestion_score::smallint order by r.target_time),
+    array_agg(r.confidence::real order by r.target_time),
+    array_agg(1::smallint order by r.target_time),
+    null
+from {_SCHEMA}.rows r
+group by r.zone_id
+"""
+
+_HEATMAP = {
+    "rows": f"""
+        select distinct on (zone_id) zone_id, congestion_score, target_time
+        from {_SCHEMA}.rows
+        order by zone_id, abs(extract(epoch from (target_time - now())))
+    """,
+    "compact": f"""
+        select zone_id, scores[h], first_target + make_interval(hours => h - 1)
+        from (
+            select c.*, least(24, greatest(1,
+                round(extract(epoch from (now() - first_target)) / 3600.0)::int + 1)) as h
+            from {_SCHEMA}.compact c
+        ) k
+    """,
+}
+
+_FULL_RUN = {
+    "rows": f"select * from {_SCHEMA}.rows",
+    "compact": f"select * from {_SCHEMA}.compact",
+}
+
+
+async def _buffers(raw, sql: str) -> int:
+    plan = await raw.fetchval(f"explain (analyze, buffers, format json) {sql}")
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]["Plan"]
+    return top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zones", type=int, default=2000)
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        try:
+            await raw.execute(_SETUP)
+            await raw.execute(_LOAD_ROWS, args.zones)
+            await raw.execute(_LOAD_COMPACT)
+            await raw.execute(f"vacuum analyze {_SCHEMA}.rows")
+            await raw.execute(f"vacuum analyze {_SCHEMA}.compact")
+
+            print(f"{args.zones} zones × 24 horizons")
+            print(f"{'layout':<8} {'rows':>8} {'total size':>12} {'B/zone':>8} "
+                  f"{'heatmap buf':>12} {'full-run buf':>13} {'JSON bytes':>12}")
+            for layout in ("rows", "compact"):
+                table = f"{_SCHEMA}.{layout}"
+                rows = await raw.fetchval(f"select count(*) from {table}")
+                size = await raw.fetchval(f"select pg_total_relation_size('{table}')")
+                wire = await raw.fetchval(
+                    f"select sum(octet_length(row_to_json(t)::text)) from ({_FULL_RUN[layout]}) t"
+                )
+                heatmap = await _buffers(raw, _HEATMAP[layout])
+                full = await _buffers(raw, _FULL_RUN[layout])
+                print(f"{layout:<8} {rows:>8} {size:>12} {size // args.zones:>8} "
+                      f"{heatmap:>12} {full:>13} {wire:>12}")
+        finally:
+            await raw.execute(f"drop schema if exists {_SCHEMA} cascade")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
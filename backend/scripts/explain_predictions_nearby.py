@@ -0,0 +1,180 @@
+"""
+EXPLAIN ANALYZE comparison for the get_predictions_nearby lookup.
+
+Builds a synthetic, PostGIS-free copy of the predictions table in a scratch
+schema (default: 400 zones x 130 hourly runs x 24 horizons = 1.25M rows) and
+compares the per-zone part of the old and new RPC bodies for the zones a
+typical radius query would return. The spatial filter is identical in both
+versions and is left out so the timings isolate the prediction lookup.
+
+The old body re-sorts a zone's whole history for every candidate row, so it
+grows with (history per zone)^2; it runs under --timeout.
+
+Usage (from backend/):
+    python -m scripts.explain_predictions_nearby [--zones 400] [--runs 130] [--nearby 5]
+
+Drops its scratch schema on exit.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+import asyncpg
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import engine
+
+_SCHEMA = "bench_predictions_nearby"
+
+_SETUP = f"""
+drop schema if exists {_SCHEMA} cascade;
+create schema {_SCHEMA};
+create table {_SCHEMA}.zones (id uuid primary key);
+create table {_SCHEMA}.predictions (
+    id uuid primary key default gen_random_uuid(),
+    zone_id uuid not null,
+    predicted_at timestamptz not null,
+    target_time timestamptz not null,
+    congestion_score integer not null,
+    confidence double precision not null,
+    factors jsonb
+);
+"""
+
+_LOAD_ZONES = f"insert into {_SCHEMA}.zones select gen_random_uuid() from generate_series(1, $1)"
+
+_LOAD_PREDICTIONS = f"""
+insert into {_SCHEMA}.predictions (zone_id, predicted_at, target_time, congestion_score, confidence, factors)
+select
+    z.id,
+    run.predicted_at,
+    run.predicted_at + make_interval(hours => h),
+    (random() * 100)::int,
+    0.8,
+    jsonb_build_object('base_score', 50.0, 'total_score', 50.0)
+from {_SCHEMA}.zones z
+cross join (
+    select date_trunc('hour', now()) - make_interval(hours => r) + interval '2.5 seconds' as predicted_at
+    from generate_series(0, $1 - 1) r
+) run
+cross join generate_series(1, 24) h;
+"""
+
+_INDEXES = f"""
+create index on {_SCHEMA}.predictions (zone_id);
+create index on {_SCHEMA}.predictions (target_time);
+create index on {_SCHEMA}.predictions (zone_id, target_time);
+analyze {_SCHEMA}.zones;
+analyze {_SCHEMA}.predictions;
+"""
+
+
+def _nearby(limit: int) -> str:
+    return f"(select id from {_SCHEMA}.zones order by id limit {limit})"
+
+
+def _old_query(nearby: int, target: str) -> str:
+    return f"""
+    select p.*
+    from {_SCHEMA}.predictions p
+    join {_SCHEMA}.zones z on p.zone_id = z.id
+    where z.id in {_nearby(nearby)}
+      and (
+        {target} is null
+        or p.target_time = (
+            select pp.target_time
+            from {_SCHEMA}.predictions pp
+            where pp.zone_id = z.id
+            order by abs(extract(epoch from (pp.target_time - {target})))
+            limit 1
+        )
+      )
+    """
+
+
+def _new_query(nearby: int, target: str) -> str:
+    return f"""
+    select p.*
+    from {_nearby(nearby)} n
+    cross join (select coalesce({target}, now()) as ts) o
+    cross join lateral (
+        select l.predicted_at
+        from {_SCHEMA}.predictions l
+        where l.zone_id = n.id
+        order by l.target_time desc
+        limit 1
+    ) run
+    cross join lateral (
+        select c.*
+        from (
+            (select pp.* from {_SCHEMA}.predictions pp
+             where pp.zone_id = n.id
+               and pp.target_time >= greatest(o.ts, run.predicted_at)
+               and pp.predicted_at = run.predicted_at
+             order by pp.target_time asc limit 1)
+            union all
+            (select pp.* from {_SCHEMA}.predictions pp
+             where pp.zone_id = n.id
+               and pp.target_time < o.ts
+               and pp.target_time >= run.predicted_at
+               and pp.predicted_at = run.predicted_at
+             order by pp.target_time desc limit 1)
+        ) c
+        order by abs(extract(epoch from (c.target_time - o.ts)))
+        limit 1
+    ) p
+    """
+
+
+async def _explain(raw, label: str, sql: str, timeout_s: int) -> None:
+    print(f"\n── {label}", flush=True)
+    try:
+        async with raw.transaction():
+            await raw.execute(f"set local statement_timeout = '{timeout_s}s'")
+            rows = await raw.fetch(f"explain (analyze, buffers, costs off) {sql}")
+    except asyncpg.QueryCanceledError:
+        print(f"    cancelled after {timeout_s}s", flush=True)
+        return
+    for row in rows:
+        print("   ", row[0], flush=True)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zones", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=130)
+    parser.add_argument("--nearby", type=int, default=5)
+    parser.add_argument("--timeout", type=int, default=300, help="per-query seconds")
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        try:
+            await raw.execute(_SETUP)
+            await raw.execute(_LOAD_ZONES, args.zones)
+            await raw.execute(_LOAD_PREDICTIONS, args.runs)
+            await raw.execute(_INDEXES)
+            total = await raw.fetchval(f"select count(*) from {_SCHEMA}.predictions")
+            print(f"synthetic predictions: {total} rows", flush=True)
+
+            target = "(now() + interval '3 hours 10 minutes')"
+            null = "null::timestamptz"
+            cases = [
+                ("old, p_target_ts set", _old_query(args.nearby, target)),
+                ("new, p_target_ts set", _new_query(args.nearby, target)),
+                ("old, p_target_ts NULL", _old_query(args.nearby, null)),
+                ("new, p_target_ts NULL", _new_query(args.nearby, null)),
+            ]
+            for label, sql in cases:
+                await _explain(raw, label, sql, args.timeout)
+        finally:
+            await raw.execute(f"drop schema if exists {_SCHEMA} cascade")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+EXPLAIN ANALYZE and timing for the get_route_congestion RPC.
+
+Runs against DATABASE_URL with the init schema and a published prediction
+run (zones + zone_prediction_current). get_route_congestion is PL/pgSQL, so
+its plan is not visible through EXPLAIN; the script explains the candidate
+zone lookup it starts with (the only query that touches traffic_zones, and
+the one that has to use the polygon_geog GiST index) and times the whole
+RPC for the route at each segment length.
+
+The default route is a straight line across the city (Bakırköy → Kadıköy,
+~14 km); pass --route with an encoded polyline or GeoJSON LineString to use
+a real one.
+
+Usage (from backend/):
+    python -m scripts.explain_route_congestion [--route ...] [--segment-m 250 500 1000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import engine
+from app.prediction.route_corridor import DEFAULT_BUFFER_M
+
+_DEFAULT_ROUTE = json.dumps({"type": "LineString", "coordinates": [[28.87, 40.98], [29.03, 40.99]]})
+
+_CANDIDATES = """
+select z.id, z.name, c.first_target
+from prediction_runs r
+join zone_prediction_current c on c.run_id = r.id
+join traffic_zones z on z.id = c.zone_id
+where r.status = 'current'
+  and ST_DWithin(z.polygon_geog, route_geometry($1, 5)::geography, $2)
+"""
+
+_RPC = "select count(*), count(congestion_score) from get_route_congestion($1, p_buffer_m => $2, p_segment_m => $3)"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--route", default=_DEFAULT_ROUTE, help="encoded polyline or GeoJSON LineString")
+    parser.add_argument("--buffer-m", type=float, default=DEFAULT_BUFFER_M)
+    parser.add_argument("--segment-m", type=float, nargs="+", default=[250.0, 500.0, 1000.0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        if not await raw.fetchval("select exists (select 1 from prediction_runs where status = 'current')"):
+            print("no published prediction run; run the predictions job first", flush=True)
+            sys.exit(1)
+
+        length_km = await raw.fetchval(
+            "select ST_Length(route_geometry($1, 5)::geography) / 1000", args.route
+        )
+        print(f"route {length_km:.1f} km, buffer {args.buffer_m:.0f} m", flush=True)
+
+        print("\n── candidate zones", flush=True)
+        for row in await raw.fetch(
+            f"explain (analyze, buffers, costs off) {_CANDIDATES}", args.route, args.buffer_m
+        ):
+            print("   ", row[0], flush=True)
+
+        print("\n── get_route_congestion", flush=True)
+        for segment_m in args.segment_m:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                pieces, scored = await raw.fetchrow(_RPC, args.route, args.buffer_m, segment_m)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(
+                f"    segment {segment_m:6.0f} m: {pieces:4d} pieces ({scored} scored)  "
+                f"median {statistics.median(timings):7.1f} ms  max {max(timings):7.1f} ms",
+                flush=True,
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
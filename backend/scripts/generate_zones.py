@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Generate traffic zones and bulk-load them (COPY + merge_zone_staging).
+
+  h3       H3 hex grid over the Istanbul bounding box, or over --boundary
+           (GeoJSON Polygon / MultiPolygon / Feature / FeatureCollection)
+  geojson  district / mahalle boundaries from a FeatureCollection
+  groups   district boundaries as zone groups for zoomed-out maps
+           (merge_zone_groups); --parent-property also loads the city sides
+           as the union of their districts
+
+Zone ids are derived from the zone key, so re-running with the same input
+keeps ids stable; unchanged zones are not rewritten. --prune deletes zones
+of the same source that are no longer generated.
+
+Usage (from the backend/ directory):
+    python -m scripts.generate_zones h3 --resolution 8 [--boundary istanbul.geojson] [--prune]
+    python -m scripts.generate_zones geojson mahalleler.geojson --source mahalle \
+        --key-property id --name-property ad [--simplify 15] [--prune]
+    python -m scripts.generate_zones groups ilceler.geojson --source ilce \
+        --key-property kod --name-property ad [--parent-property yaka] [--prune]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ensure backend/app is importable
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import AsyncSessionLocal
+from app.services.zone_tessellation import (
+    CITY_SIDE_LEVEL,
+    DISTRICT_LEVEL,
+    geojson_zone_groups,
+    geojson_zones,
+    h3_zones,
+    load_zone_groups,
+    load_zones,
+)
+
+
+def _boundary_geometry(path: str) -> dict:
+    data = json.loads(Path(path).read_text())
+    if data.get("type") == "FeatureCollection":
+        parts = []
+        for feature in data["features"]:
+            geometry = feature["geometry"]
+            parts.extend([geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"])
+        return {"type": "MultiPolygon", "coordinates": parts}
+    if data.get("type") == "Feature":
+        return data["geometry"]
+    return data
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    hexes = sub.add_parser("h3")
+    hexes.add_argument("--resolution", type=int, default=8)
+    hexes.add_argument("--boundary", default=None)
+    hexes.add_argument("--source", default="h3")
+
+    boundaries = sub.add_parser("geojson")
+    boundaries.add_argument("path")
+    boundaries.add_argument("--source", required=True, help="e.g. ilce, mahalle")
+    boundaries.add_argument("--key-property", required=True)
+    boundaries.add_argument("--name-property", required=True)
+    boundaries.add_argument("--base-congestion-property", default=None)
+    boundaries.add_argument("--simplify", type=float, default=0.0, help="tolerance in metres")
+
+    groups = sub.add_parser("groups")
+    groups.add_argument("path")
+    groups.add_argument("--source", default="ilce")
+    groups.add_argument("--key-property", required=True)
+    groups.add_argument("--name-property", required=True)
+    groups.add_argument("--parent-property", default=None, help="e.g. yaka (Avrupa / Anadolu)")
+
+    for p in (hexes, boundaries, groups):
+        p.add_argument("--prune", action="store_true")
+    return parser.parse_args()
+
+
+async def _load_groups(args: argparse.Namespace) -> None:
+    collection = json.loads(Path(args.path).read_text())
+    districts, sides = geojson_zone_groups(
+        collection, args.source, args.key_property, args.name_property, args.parent_property
+    )
+    async with AsyncSessionLocal() as session:
+        stats = await load_zone_groups(session, districts, DISTRICT_LEVEL, prune=args.prune)
+        print(f"Districts: {stats}")
+        if sides:
+            stats = await load_zone_groups(session, sides, CITY_SIDE_LEVEL, prune=args.prune)
+            print(f"City sides: {stats}")
+        await session.commit()
+
+
+async def main() -> None:
+    args = _parse_args()
+    if args.mode == "groups":
+        await _load_groups(args)
+        return
+    started = time.perf_counter()
+    if args.mode == "h3":
+        boundary = _boundary_geometry(args.boundary) if args.boundary else None
+        zones = h3_zones(args.resolution, boundary=boundary)
+        simplify = 0.0
+    else:
+        collection = json.loads(Path(args.path).read_text())
+        zones = geojson_zones(
+            collection, args.source, args.key_property, args.name_property, args.base_congestion_property
+        )
+        simplify = args.simplify
+    print(f"Generated {len(zones)} zones in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        stats = await load_zones(session, zones, args.source, simplify_m=simplify, prune=args.prune)
+        await session.commit()
+    print(f"Loaded in {time.perf_counter() - started:.1f}s: {stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,7 +17,10 @@ from typing import Iterable
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from app.tasks.events import _fetch_and_store_events
-from app.tasks.predictions import generate_predictions
+from app.tasks.feature_store import _update_feature_store
+from app.tasks.predictions import _prune_predictions, generate_predictions
+from app.tasks.rollups import _prune_traffic_history, _run_traffic_rollups
+from app.tasks.traffic import _fetch_and_store_traffic
 
 
 logger = logging.getLogger(__name__)
@@ -27,7 +30,7 @@ def _parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run scheduled data jobs once.")
     parser.add_argument(
         "--mode",
-        choices=["events", "predictions", "all"],
+        choices=["events", "traffic", "predictions", "rollups", "features", "all"],
         default="all",
         help="Which job group to run.",
     )
@@ -36,7 +39,7 @@ def _parse_args() -> argparse.Namespace:
 
 def _modes(mode: str) -> Iterable[str]:
     if mode == "all":
-        return ("events", "predictions")
+        return ("events", "traffic", "predictions", "rollups")
     return (mode,)
 
 
@@ -47,12 +50,32 @@ async def _run(mode: str) -> None:
         logger.info("Events job completed.")
         return
 
+    if mode == "traffic":
+        logger.info("Starting traffic fetch job...")
+        await _fetch_and_store_traffic()
+        logger.info("Traffic fetch job completed.")
+        return
+
     if mode == "predictions":
         logger.info("Starting predictions job...")
         await generate_predictions()
+        await _prune_predictions()
         logger.info("Predictions job completed.")
         return
 
+    if mode == "rollups":
+        logger.info("Starting traffic rollups job...")
+        await _run_traffic_rollups()
+        await _prune_traffic_history()
+        logger.info("Traffic rollups job completed.")
+        return
+
+    if mode == "features":
+        logger.info("Starting feature store job...")
+        await _update_feature_store()
+        logger.info("Feature store job completed.")
+        return
+
     raise ValueError(f"Unknown mode: {mode}")
 
 
@@ -0,0 +1,44 @@
+"""
+Train a congestion model from the Parquet feature store.
+
+Reads only the feature / observation columns of the selected days from
+FEATURE_STORE_PATH (no database access) and writes a versioned artifact
+``congestion-<timestamp>.joblib`` plus ``.json`` metadata to --output.
+Point PREDICTION_MODEL_PATH at the artifact to serve it.
+
+Usage (from backend/):
+    python -m scripts.train_prediction_model [--store data/feature_store] [--output models]
+        [--from 2026-01-01] [--to 2026-03-01]
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.prediction.training import train_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--store", default=settings.FEATURE_STORE_PATH)
+    parser.add_argument("--output", default="models")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=None)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=None, help="exclusive")
+    parser.add_argument("--max-iter", type=int, default=200)
+    args = parser.parse_args()
+
+    path = train_model(args.store, args.output, start=args.start, end=args.end, max_iter=args.max_iter)
+    print(path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    main()
@@ -0,0 +1,128 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Union
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "db(function): runs against DATABASE_URL; skipped unless the named SQL "
+        "function (supabase/volumes/db/init) is installed",
+    )
+
+
+def pytest_collection_modifyitems(items):
+    # -m db ile yalnızca veritabanı testleri seçilebilsin (CI).
+    for item in items:
+        if "db_session" in getattr(item, "fixturenames", ()):
+            item.add_marker("db")
+
+
+@pytest.fixture
+async def db_session(request):
+    """
+    AsyncSession on one connection; everything the test writes is rolled
+    back. Skips without DATABASE_URL, when the database is unreachable, or
+    when the function named by the test's ``db`` marker is missing.
+    """
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL not set")
+    marker = request.node.get_closest_marker("db")
+    function = marker.args[0] if marker and marker.args else None
+
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as conn:
+            if function is not None:
+                found = await conn.scalar(text("select to_regproc(:name)"), {"name": function})
+                if found is None:
+                    pytest.skip(f"{function}() not installed")
+            session = AsyncSession(bind=conn, autoflush=False)
+            try:
+                yield session
+            finally:
+                await session.close()
+                await conn.rollback()
+    except OSError as exc:
+        pytest.skip(f"database unreachable: {exc}")
+    finally:
+        await engine.dispose()
+
+
+def _square(lon: float, lat: float, d: float) -> list:
+    return [[[lon - d, lat - d], [lon + d, lat - d], [lon + d, lat + d], [lon - d, lat + d], [lon - d, lat - d]]]
+
+
+@pytest.fixture
+def square():
+    """``square(lon, lat, d)``: GeoJSON Polygon coordinates of a 2d-wide box."""
+    return _square
+
+
+@pytest.fixture
+def make_zone(db_session):
+    """
+    ``await make_zone(lon, lat, d=0.003, prefix="zone", **columns)``: inserts
+    a square traffic zone (extra traffic_zones columns as keywords) and
+    returns its id.
+    """
+
+    async def make(lon: float, lat: float, d: float = 0.003, prefix: str = "zone", **columns) -> uuid.UUID:
+        columns = {"name": f"{prefix}-{uuid.uuid4().hex[:8]}", **columns}
+        wkt = "POLYGON((" + ",".join(f"{x} {y}" for x, y in _square(lon, lat, d)[0]) + "))"
+        return await db_session.scalar(
+            text(
+                f"insert into traffic_zones (polygon, {', '.join(columns)}) "
+                f"values (ST_GeomFromText(:wkt, 4326), {', '.join(':' + c for c in columns)}) returning id"
+            ),
+            {"wkt": wkt, **columns},
+        )
+
+    return make
+
+
+@pytest.fixture
+def publish_run(db_session):
+    """
+    ``await publish_run(first_target, {zone_id: score or 24 scores}, ...)``:
+    writes a compact run to zone_prediction_current, publishes it and
+    returns the run id.
+    """
+
+    async def publish(
+        first_target: datetime,
+        scores: dict[uuid.UUID, Union[int, Sequence[int]]],
+        confidence: float = 0.5,
+        factor_bits: int = 0,
+        predicted_at: Optional[datetime] = None,
+    ) -> uuid.UUID:
+        run_id = await db_session.scalar(
+            text("insert into prediction_runs (predicted_at) values (:at) returning id"),
+            {"at": predicted_at or first_target - timedelta(hours=1)},
+        )
+        for zone_id, zone_scores in scores.items():
+            if isinstance(zone_scores, int):
+                zone_scores = [zone_scores] * 24
+            await db_session.execute(
+                text(
+                    "insert into zone_prediction_current "
+                    "(run_id, zone_id, first_target, base_score, scores, confidence, factor_bits) values "
+                    "(:run, :zone, :first, 0, CAST(:scores AS smallint[]), "
+                    "array_fill(CAST(:confidence AS real), ARRAY[24]), "
+                    "array_fill(CAST(:factor_bits AS smallint), ARRAY[24]))"
+                ),
+                {
+                    "run": run_id, "zone": zone_id, "first": first_target, "scores": list(zone_scores),
+                    "confidence": confidence, "factor_bits": factor_bits,
+                },
+            )
+        await db_session.execute(text("select publish_prediction_run(:run)"), {"run": run_id})
+        return run_id
+
+    return publish
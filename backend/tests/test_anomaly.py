@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.prediction.anomaly import (
+    AnomalyDetector,
+    BaselineState,
+    InMemoryAnomalyStateStore,
+    Observation,
+    detect_anomalies,
+    hour_of_week,
+)
+from app.tasks.traffic import _observations
+
+# Pazartesi 08:00 İstanbul
+_MONDAY_8 = datetime(2026, 3, 2, 5, 0, tzinfo=timezone.utc)
+
+
+def _weekly(obs_speed: float, week: int, key: str = "sxk9") -> Observation:
+    return Observation("segment", key, _MONDAY_8 + timedelta(weeks=week), obs_speed)
+
+
+def test_hour_of_week_uses_istanbul_local_time():
+    assert hour_of_week(_MONDAY_8) == 8
+    # Pazar 23:30 İstanbul = Pazar 20:30 UTC
+    assert hour_of_week(datetime(2026, 3, 1, 20, 30, tzinfo=timezone.utc)) == 167
+
+
+def test_baseline_state_roundtrip():
+    state = BaselineState(42.5, 3.25, 7, 1772420400)
+    assert BaselineState.decode(state.encode()) == state
+    assert BaselineState.decode("bozuk") is None
+
+
+def test_detector_ignores_repeated_slot():
+    detector = AnomalyDetector()
+    state, _ = detector.update(None, 50.0, slot=100)
+    same, z = detector.update(state, 5.0, slot=100)
+    assert same == state
+    assert z is None
+
+
+@pytest.mark.asyncio
+async def test_sudden_slowdown_is_flagged_after_warmup():
+    store = InMemoryAnomalyStateStore()
+    for week, speed in enumerate([50, 52, 48, 51, 49, 50]):
+        assert await detect_anomalies([_weekly(speed, week)], store) == []
+
+    anomalies = await detect_anomalies([_weekly(12.0, 6)], store)
+
+    assert len(anomalies) == 1
+    assert anomalies[0].key == "sxk9"
+    assert anomalies[0].z_score <= -3.0
+    assert 48 <= anomalies[0].baseline_kmh <= 52
+
+
+@pytest.mark.asyncio
+async def test_outlier_does_not_poison_baseline():
+    store = InMemoryAnomalyStateStore()
+    for week, speed in enumerate([50, 50, 50, 50, 50]):
+        await detect_anomalies([_weekly(speed, week)], store)
+    await detect_anomalies([_weekly(0.0, 5)], store)
+
+    (state,) = await store.load(["segment:sxk9:8"])
+    assert state.mean > 45
+
+
+@pytest.mark.asyncio
+async def test_baselines_are_separate_per_hour_of_week():
+    store = InMemoryAnomalyStateStore()
+    for week in range(6):
+        await detect_anomalies([_weekly(50.0, week)], store)
+
+    # Aynı segment, farklı saat: ısınmamış baseline → anomali yok.
+    other_hour = Observation("segment", "sxk9", _MONDAY_8 + timedelta(weeks=6, hours=3), 10.0)
+    assert await detect_anomalies([other_hour], store) == []
+
+
+def test_observations_add_zone_mean_per_slot():
+    rows = [
+        {"segment_id": "a", "zone_id": "z1", "observed_at": "2026-03-02T05:00:00+00:00", "speed_kmh": 30.0},
+        {"segment_id": "b", "zone_id": "z1", "observed_at": "2026-03-02T05:00:00+00:00", "speed_kmh": 50.0},
+        {"segment_id": "c", "zone_id": None, "observed_at": "2026-03-02T05:00:00+00:00", "speed_kmh": 70.0},
+    ]
+
+    observations = _observations(rows)
+
+    assert [o.scope for o in observations] == ["segment", "segment", "segment", "zone"]
+    zone_obs = observations[-1]
+    assert zone_obs.key == "z1"
+    assert zone_obs.speed_kmh == 40.0
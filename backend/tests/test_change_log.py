@@ -0,0 +1,165 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+pytestmark = pytest.mark.db("changes_since")
+
+
+# Seed zone'lardan uzak bir kutu.
+LON, LAT = 10.1, 10.0
+BBOX = {"a": 9.9, "b": 9.9, "c": 10.3, "d": 10.1}
+FIRST_TARGET = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+
+
+async def _changes(session: AsyncSession, version, limit: int = 5000) -> dict:
+    return await session.scalar(
+        text("select changes_since(:v, :a, :b, :c, :d, :limit)"),
+        {"v": version, "limit": limit, **BBOX},
+    )
+
+
+def _cells(changes: dict) -> list:
+    return [(c["zone_id"], c["target_time"][:13], c["congestion_score"]) for c in changes["predictions"]]
+
+
+@pytest.mark.asyncio
+async def test_changes_since_returns_only_changed_cells_and_events(db_session, make_zone, publish_run):
+    first = await db_session.scalar(text("select changes_since(NULL)"))
+    assert first["reset"] is True
+    token = first["version"]
+
+    zone_a, zone_b = await make_zone(LON, LAT, prefix="delta"), await make_zone(LON + 0.05, LAT, prefix="delta")
+    await publish_run(FIRST_TARGET, {zone_a: [30] * 24, zone_b: [50] * 24})
+
+    initial = await _changes(db_session, token)
+    assert initial["reset"] is False and initial["has_more"] is False
+    assert len(initial["predictions"]) == 48
+    token = initial["version"]
+    assert (await _changes(db_session, token))["predictions"] == []
+
+    # Bir saat sonraki run: zone_a'nın bir hücresi değişir, zone_b aynı kalır;
+    # her iki zone için yalnızca pencereye yeni giren saat eklenir.
+    scores_a = [30] * 24
+    scores_a[4] = 75
+    await publish_run(FIRST_TARGET + timedelta(hours=1), {zone_a: scores_a, zone_b: [50] * 24})
+
+    delta = await _changes(db_session, token)
+    last_hour = (FIRST_TARGET + timedelta(hours=24)).isoformat()[:13]
+    assert sorted(_cells(delta)) == sorted([
+        (str(zone_a), (FIRST_TARGET + timedelta(hours=5)).isoformat()[:13], 75),
+        (str(zone_a), last_hour, 30),
+        (str(zone_b), last_hour, 50),
+    ])
+    assert delta["deleted"] == {"predictions": [], "zones": [], "events": []}
+    token = delta["version"]
+
+    source_id = uuid.uuid4().hex
+    upsert_event = text(
+        "insert into events (name, venue_name, category, start_time, location, capacity, source, source_id) "
+        "values (:name, 'Arena', 'concert', :start, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 9000, "
+        "'test', :source_id) "
+        "on conflict (source, source_id) do update "
+        "set name = excluded.name, capacity = excluded.capacity, updated_at = now()"
+    )
+    params = {"name": "Konser", "start": FIRST_TARGET, "lon": LON, "lat": LAT, "source_id": source_id}
+    await db_session.execute(upsert_event, params)
+    # Kutunun dışındaki etkinlik görünmez.
+    await db_session.execute(upsert_event, {**params, "lon": 20.0, "source_id": uuid.uuid4().hex})
+
+    delta = await _changes(db_session, token)
+    assert [e["name"] for e in delta["events"]] == ["Konser"]
+    event_id = delta["events"][0]["event_id"]
+    token = delta["version"]
+
+    # Değişmeden yeniden yazılan etkinlik günlüğe girmez.
+    await db_session.execute(upsert_event, params)
+    assert (await _changes(db_session, token))["version"] == token
+
+    await db_session.execute(text("delete from events where id = :id"), {"id": event_id})
+    await db_session.execute(text("delete from traffic_zones where id = :id"), {"id": zone_b})
+    delta = await _changes(db_session, token)
+    assert delta["events"] == [] and delta["predictions"] == []
+    assert delta["deleted"]["events"] == [event_id]
+    assert delta["deleted"]["zones"] == [str(zone_b)]
+
+
+@pytest.mark.asyncio
+async def test_changes_since_pages_and_resets_after_prune(db_session, make_zone, publish_run):
+    token = (await db_session.scalar(text("select changes_since(NULL)")))["version"]
+    zone_id = await make_zone(LON, LAT, prefix="delta")
+    await publish_run(FIRST_TARGET, {zone_id: [40] * 24})
+
+    seen = []
+    version = token
+    while True:
+        page = await _changes(db_session, version, limit=10)
+        seen.extend(_cells(page))
+        version = page["version"]
+        if not page["has_more"]:
+            break
+    assert len(seen) == len(set(seen)) == 24
+
+    await db_session.execute(text("update change_log set changed_at = now() - interval '2 days'"))
+    assert await db_session.scalar(text("select prune_change_log(24)")) >= 24
+    stale = await _changes(db_session, token)
+    assert stale["reset"] is True and stale["version"] >= version
+    assert (await _changes(db_session, stale["version"]))["reset"] is False
+
+
+@pytest.mark.asyncio
+async def test_versions_are_handed_out_in_commit_order(db_session):
+    # İki ayrı bağlantı: ilk yazıcı commit etmeden ikincisi versiyon alamaz,
+    # yoksa açık kalan düşük versiyonu token atlar.
+    source_ids = [uuid.uuid4().hex, uuid.uuid4().hex]
+    insert_event = text(
+        "insert into events (name, venue_name, category, start_time, location, capacity, source, source_id) "
+        "values ('Sıra', 'Arena', 'concert', :start, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 9000, "
+        "'test', :source_id) returning id"
+    )
+    params = {"start": FIRST_TARGET, "lon": LON, "lat": LAT}
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            token = (await first.scalar(text("select changes_since(NULL)")))["version"]
+            await first.commit()
+
+            first_id = await first.scalar(insert_event, {**params, "source_id": source_ids[0]})
+            second_insert = asyncio.create_task(
+                second.scalar(insert_event, {**params, "source_id": source_ids[1]})
+            )
+            await asyncio.sleep(0.3)
+            assert not second_insert.done()
+
+            await first.commit()
+            second_id = await asyncio.wait_for(second_insert, 5)
+            await second.commit()
+
+            versions = dict(
+                (
+                    await first.execute(
+                        text("select entity_id, version from change_log where entity_id in (:a, :b)"),
+                        {"a": first_id, "b": second_id},
+                    )
+                ).all()
+            )
+            assert versions[second_id] > versions[first_id]
+            delta = await first.scalar(text("select changes_since(:v)"), {"v": token})
+            assert {str(first_id), str(second_id)} <= {e["event_id"] for e in delta["events"]}
+            assert delta["version"] >= versions[second_id]
+            await first.commit()
+    finally:
+        async with engine.begin() as conn:
+            ids = (
+                await conn.execute(
+                    text("delete from events where source = 'test' and source_id in (:a, :b) returning id"),
+                    {"a": source_ids[0], "b": source_ids[1]},
+                )
+            ).scalars().all()
+            if ids:
+                await conn.execute(text("delete from change_log where entity_id = any(:ids)"), {"ids": ids})
+        await engine.dispose()
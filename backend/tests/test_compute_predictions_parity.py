@@ -0,0 +1,210 @@
+"""
+Parity between rule_engine.predict() and the compute_predictions() SQL
+function (11-compute-predictions.sql), and between incremental and full
+run_prediction_batch() runs (12-prediction-dirty-cells.sql).
+
+Needs a database with the init schema applied; set DATABASE_URL to run.
+Seed rows are written inside a transaction that is rolled back.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.traffic_zone import TrafficZone
+from app.prediction.event_index import EventIntervalIndex, load_event_candidates
+from app.prediction.rule_engine import MODEL_SCORED_BIT, decode_factors, predict, predict_horizons
+
+pytestmark = pytest.mark.db("compute_predictions")
+
+# Perşembe 05:30 UTC → horizon'lar akşam rush hour'unu ve Cuma'yı kapsar.
+_NOW = datetime(2026, 3, 5, 5, 30, tzinfo=timezone.utc)
+_BASE_HOUR = _NOW.replace(minute=0)
+
+_ZONES = [
+    # (base_congestion_level, polygon around lon/lat)
+    (0.65, (29.00, 41.00)),
+    (0.555, (29.01, 41.01)),
+    (0.95, (28.50, 41.20)),
+]
+
+_EVENTS = [
+    # (capacity, start offset h, end offset h | None, lon/lat)
+    (30000, 5, 8, (29.001, 41.001)),
+    (8000, 15, None, (29.011, 41.011)),
+    (4000, 3, 6, (29.001, 41.001)),     # kapasite eşiğinin altında
+    (50000, -30, -26, (28.501, 41.201)),  # batch penceresinden önce
+]
+
+
+async def _seed(session: AsyncSession, make_zone, base_hour: datetime = _BASE_HOUR) -> list[uuid.UUID]:
+    suffix = uuid.uuid4().hex[:8]
+    zone_ids = [
+        await make_zone(lon, lat, d=0.002, prefix="parity", base_congestion_level=level)
+        for level, (lon, lat) in _ZONES
+    ]
+
+    for i, (capacity, start_h, end_h, (lon, lat)) in enumerate(_EVENTS):
+        await session.execute(
+            text(
+                "insert into events (name, venue_name, category, start_time, end_time, location, "
+                "capacity, source, source_id) "
+                "values (:name, 'Parity Arena', 'concert', :start, :end, "
+                "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), :capacity, 'parity', :name)"
+            ),
+            {
+                "name": f"parity-{suffix}-{i}",
+                "start": base_hour + timedelta(hours=start_h),
+                "end": base_hour + timedelta(hours=end_h) if end_h is not None else None,
+                "lon": lon,
+                "lat": lat,
+                "capacity": capacity,
+            },
+        )
+    return zone_ids
+
+
+@pytest.mark.asyncio
+async def test_compute_predictions_matches_python_rule_engine(db_session, make_zone):
+    zone_ids = await _seed(db_session, make_zone)
+
+    rows = (
+        await db_session.execute(
+            text("select * from compute_predictions(:now, 24) where zone_id = any(:zones)"),
+            {"now": _NOW, "zones": zone_ids},
+        )
+    ).mappings().all()
+    sql = {(row["zone_id"], row["horizon"]): row for row in rows}
+    assert len(sql) == len(zone_ids) * 24
+    # İlk zone etkinliklerin yanında, sonuncusu 2 km'nin çok dışında.
+    assert any(sql[(zone_ids[0], h)]["event_id"] for h in range(1, 25))
+    assert not any(sql[(zone_ids[-1], h)]["event_id"] for h in range(1, 25))
+
+    # Worker'ın toplu yolu: aday yükleme + interval index sweep.
+    targets = [_BASE_HOUR + timedelta(hours=h) for h in range(1, 25)]
+    events, nearby = await load_event_candidates(db_session, targets[0], targets[-1])
+    active = EventIntervalIndex(events).sweep(targets)
+
+    for zone_id in zone_ids:
+        zone = await db_session.get(TrafficZone, zone_id)
+        batch = predict_horizons(zone, targets, active, nearby.get(zone_id, set()))
+        for h in range(1, 25):
+            target = targets[h - 1]
+            expected = await predict(zone_id, target, db_session)
+            assert batch[h - 1] == expected, (zone_id, h)
+            got = sql[(zone_id, h)]
+
+            assert got["target_time"] == target
+            assert got["congestion_score"] == expected.congestion_score, (zone_id, h)
+            assert got["confidence"] == pytest.approx(expected.confidence)
+            assert got["event_id"] == expected.event_id, (zone_id, h)
+            assert got["factors"].keys() == expected.factors.keys(), (zone_id, h)
+            for name, value in expected.factors.items():
+                assert got["factors"][name] == pytest.approx(value), (zone_id, h, name)
+
+
+@pytest.mark.asyncio
+async def test_incremental_run_matches_full_recompute(db_session, make_zone):
+    # Dirty işaretleri geçmiş pencereleri atladığı için gerçek saatle çalışır.
+    now = datetime.now(timezone.utc)
+    zone_ids = await _seed(db_session, make_zone, now.replace(minute=0, second=0, microsecond=0))
+    await db_session.execute(text("select run_prediction_batch(:now, true)"), {"now": now})
+
+    # Girdi değişiklikleri: yeni büyük etkinlik, zone base seviyesi.
+    await db_session.execute(
+        text(
+            "insert into events (name, venue_name, category, start_time, end_time, location, "
+            "capacity, source, source_id) "
+            "values ('parity-late', 'Parity Arena', 'sports', :start, null, "
+            "ST_SetSRID(ST_MakePoint(29.0, 41.0), 4326), 25000, 'parity', 'parity-late')"
+        ),
+        {"start": now + timedelta(hours=10)},
+    )
+    await db_session.execute(
+        text("update traffic_zones set base_congestion_level = 0.4 where id = :id"),
+        {"id": zone_ids[2]},
+    )
+
+    later = now + timedelta(hours=1)
+    stats = await db_session.scalar(text("select run_prediction_batch(:now)"), {"now": later})
+    assert 0 < stats["recomputed"] < stats["cells"]
+    assert stats["recomputed"] + stats["skipped"] == stats["cells"]
+
+    served = (
+        await db_session.execute(
+            text("select * from expand_zone_predictions(:zones)"), {"zones": zone_ids}
+        )
+    ).mappings().all()
+    expected = (
+        await db_session.execute(
+            text("select * from compute_predictions(:now, 24) where zone_id = any(:zones)"),
+            {"now": later, "zones": zone_ids},
+        )
+    ).mappings().all()
+    expected = {(row["zone_id"], row["target_time"]): row for row in expected}
+    assert len(served) == len(expected) == len(zone_ids) * 24
+
+    for row in served:
+        want = expected[(row["zone_id"], row["target_time"])]
+        assert row["congestion_score"] == want["congestion_score"], row
+        assert row["event_id"] == want["event_id"], row
+        assert row["factors"]["total_score"] == pytest.approx(want["factors"]["total_score"], abs=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_factor_json_matches_python_decode_for_model_scored_cells(db_session):
+    bits = 1 | 4 | MODEL_SCORED_BIT
+    factors = await db_session.scalar(
+        text("select get_prediction_factors(:bits, 40.0)"), {"bits": bits}
+    )
+    assert factors == decode_factors(bits, 40.0, 99.0) == {
+        "base_score": 40.0, "rush_hour": 25, "event_nearby": 20, "model": True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_prune_dirty_cells_drops_expired_and_consumed_entries(db_session, make_zone):
+    (zone_id, *_) = await _seed(db_session, make_zone)
+    await db_session.execute(text("delete from prediction_dirty_cells"))
+    now = datetime.now(timezone.utc)
+    for marked_h, from_h, to_h in [(0, -5, -1), (-2, 1, 3), (0, 1, 3)]:
+        await db_session.execute(
+            text(
+                "insert into prediction_dirty_cells (marked_at, zone_id, dirty_from, dirty_to, reason) "
+                "values (:marked, :zone, :from_, :to, 'event')"
+            ),
+            {
+                "marked": now + timedelta(hours=marked_h),
+                "zone": zone_id,
+                "from_": now + timedelta(hours=from_h),
+                "to": now + timedelta(hours=to_h),
+            },
+        )
+
+    # Penceresi geçmiş kayıt her zaman; tam run'dan önceki işaretler isteğe bağlı.
+    assert await db_session.scalar(text("select prune_prediction_dirty_cells()")) == 1
+    assert await db_session.scalar(
+        text("select prune_prediction_dirty_cells(:before)"), {"before": now - timedelta(hours=1)}
+    ) == 1
+    assert await db_session.scalar(text("select count(*) from prediction_dirty_cells")) == 1
+
+
+@pytest.mark.asyncio
+async def test_event_radius_lookup_uses_the_3857_index(db_session):
+    if await db_session.scalar(text("select to_regproc('postgis_version')")) is None:
+        pytest.skip("needs PostGIS (GiST)")
+    await db_session.execute(text("set local enable_seqscan = off"))
+
+    plan = await db_session.scalar(
+        text(
+            "explain (format json) select z.id from traffic_zones z "
+            "where ST_DWithin(ST_Transform(z.polygon, 3857), "
+            "ST_Transform(ST_SetSRID(ST_MakePoint(29.0, 41.0), 4326), 3857), 2000)"
+        )
+    )
+    assert "ix_traffic_zones_polygon_3857" in str(plan)
@@ -0,0 +1,66 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.db("refresh_event_clusters")
+
+
+LON, LAT = 10.1, 10.0
+
+
+async def _insert_event(
+    session: AsyncSession, lon: float, capacity: int, start: datetime, end: datetime | None = None
+) -> uuid.UUID:
+    return await session.scalar(
+        text(
+            "insert into events (name, venue_name, category, start_time, end_time, location, capacity, "
+            "source, source_id) values ('Konser', 'Salon', 'concert', :start, :end, "
+            "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), :capacity, 'test', :source_id) returning id"
+        ),
+        {
+            "start": start,
+            "end": end,
+            "lon": lon,
+            "lat": LAT,
+            "capacity": capacity,
+            "source_id": uuid.uuid4().hex,
+        },
+    )
+
+
+async def _clusters(session: AsyncSession, zoom: float) -> list:
+    return (
+        await session.execute(
+            text(
+                "select * from get_event_clusters(:zoom, :lon - 0.1, :lat - 0.1, :lon + 0.1, :lat + 0.1)"
+            ),
+            {"zoom": zoom, "lon": LON, "lat": LAT},
+        )
+    ).all()
+
+
+@pytest.mark.asyncio
+async def test_clusters_split_as_zoom_increases(db_session):
+    start = datetime.now(timezone.utc) + timedelta(hours=2)
+    await _insert_event(db_session, LON, 500, start)
+    await _insert_event(db_session, LON, 2000, start + timedelta(hours=1))
+    single = await _insert_event(db_session, LON + 0.01, 100, start)
+    # Bitmiş etkinlik kümelere girmez.
+    await _insert_event(db_session, LON, 90000, start - timedelta(days=1), start - timedelta(hours=20))
+
+    assert await db_session.scalar(text("select refresh_event_clusters()")) > 0
+
+    (far,) = await _clusters(db_session, 6.4)
+    assert far.cluster_key.startswith("6/")
+    assert (far.event_count, far.max_capacity, far.event_id) == (3, 2000, None)
+    assert far.first_start == start
+    assert (far.min_lon, far.max_lon) == pytest.approx((LON, LON + 0.01))
+
+    near = sorted(await _clusters(db_session, 18), key=lambda c: -c.event_count)
+    assert [c.event_count for c in near] == [2, 1]
+    assert near[0].lon == pytest.approx(LON) and near[0].event_id is None
+    assert near[1].event_id == single and near[1].name == "Konser"
+    assert near[1].category == "concert"
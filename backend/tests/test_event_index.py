@@ -0,0 +1,112 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.event import Event
+from app.models.traffic_zone import TrafficZone
+from app.prediction.event_index import EventIntervalIndex, event_window, largest_event
+from app.prediction.rule_engine import predict_horizons, score_cell
+
+T0 = datetime(2026, 3, 5, 0, 0, tzinfo=timezone.utc)
+
+
+def _event(start_h: float, end_h: float | None, capacity: int = 10000, event_id: str | None = None) -> Event:
+    return Event(
+        id=uuid.UUID(event_id) if event_id else uuid.uuid4(),
+        name="e",
+        venue_name="v",
+        category="concert",
+        source="test",
+        source_id=str(uuid.uuid4()),
+        start_time=T0 + timedelta(hours=start_h),
+        end_time=T0 + timedelta(hours=end_h) if end_h is not None else None,
+        capacity=capacity,
+    )
+
+
+def _hours(*hs: float) -> list[datetime]:
+    return [T0 + timedelta(hours=h) for h in hs]
+
+
+def test_window_boundaries_are_inclusive():
+    closed = _event(10, 12)
+    open_ended = _event(10, None)
+
+    assert event_window(closed) == (T0 + timedelta(hours=8), T0 + timedelta(hours=13))
+    assert event_window(open_ended) == (T0 + timedelta(hours=8), T0 + timedelta(hours=14))
+
+    index = EventIntervalIndex([closed, open_ended])
+    assert index.active_at(T0 + timedelta(hours=7, minutes=59)) == []
+    assert set(e.id for e in index.active_at(T0 + timedelta(hours=8))) == {closed.id, open_ended.id}
+    assert [e.id for e in index.active_at(T0 + timedelta(hours=14))] == [open_ended.id]
+    assert index.active_at(T0 + timedelta(hours=14, seconds=1)) == []
+
+
+def test_multi_day_event_is_one_interval():
+    festival = _event(-48, 24 * 5)
+    index = EventIntervalIndex([festival])
+
+    assert len(index) == 1
+    assert all(active == [festival] for active in index.sweep(_hours(*range(1, 25))))
+
+
+def test_sweep_matches_point_queries():
+    rng = random.Random(7)
+    events = []
+    for _ in range(300):
+        start = rng.uniform(-72, 48)
+        end = None if rng.random() < 0.3 else start + rng.choice([1, 3, 30, 100])
+        events.append(_event(start, end))
+    index = EventIntervalIndex(events)
+    times = _hours(*range(1, 25))
+
+    swept = index.sweep(times)
+
+    for t, active in zip(times, swept):
+        expected = {e.id for e in events if event_window(e)[0] <= t <= event_window(e)[1]}
+        assert {e.id for e in active} == expected
+        assert {e.id for e in index.active_at(t)} == expected
+
+
+def test_sweep_rejects_unsorted_times():
+    with pytest.raises(ValueError):
+        EventIntervalIndex([]).sweep(_hours(2, 1))
+
+
+def test_largest_event_prefers_capacity_then_lowest_id():
+    a = _event(0, 1, 30000, "00000000-0000-0000-0000-00000000000b")
+    b = _event(0, 1, 30000, "00000000-0000-0000-0000-00000000000a")
+    c = _event(0, 1, 50000)
+
+    assert largest_event([a, b]) is b
+    assert largest_event([a, b, c], near={a.id, b.id}) is b
+    assert largest_event([a, b, c], near=set()) is None
+
+
+def test_predict_horizons_uses_nearby_active_event():
+    zone = TrafficZone(id=uuid.uuid4(), name="Z", base_congestion_level=0.5)
+    near = _event(5, 7, 25000)
+    far = _event(5, 7, 40000)
+    times = _hours(*range(1, 25))
+
+    results = predict_horizons(zone, times, EventIntervalIndex([near, far]).sweep(times), {near.id})
+
+    for t, result in zip(times, results):
+        expected_event = near if event_window(near)[0] <= t <= event_window(near)[1] else None
+        assert result == score_cell(zone, t, expected_event)
+    assert results[4].event_id == near.id
+    assert results[4].factors["large_event"] == 15
+
+
+def test_predict_horizons_accepts_active_sets_keyed_by_id():
+    zone = TrafficZone(id=uuid.uuid4(), name="Z", base_congestion_level=0.5)
+    events = [_event(h, h + 2, 6000 + 1000 * h) for h in range(0, 24, 3)]
+    near = {e.id for e in events[::2]}
+    times = _hours(*range(1, 25))
+    swept = EventIntervalIndex(events).sweep(times)
+
+    keyed = [{e.id: e for e in active} for active in swept]
+
+    assert predict_horizons(zone, times, keyed, near) == predict_horizons(zone, times, swept, near)
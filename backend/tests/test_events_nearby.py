@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.db("get_events_nearby")
+
+
+LON, LAT = 10.1, 10.0
+
+
+async def _insert_event(session: AsyncSession, start: datetime, end: datetime | None = None) -> uuid.UUID:
+    return await session.scalar(
+        text(
+            "insert into events (name, venue_name, category, start_time, end_time, location, source, source_id) "
+            "values ('Konser', 'Salon', 'concert', :start, :end, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), "
+            "'test', :source_id) returning id"
+        ),
+        {"start": start, "end": end, "lon": LON, "lat": LAT, "source_id": uuid.uuid4().hex},
+    )
+
+
+async def _nearby(session: AsyncSession, **params) -> list:
+    names = ", ".join(f"{key} => :{key}" for key in params)
+    return (
+        await session.execute(
+            text(
+                "select event_id, distance_km from get_events_nearby("
+                f"p_lat => :lat, p_lon => :lon, p_radius_km => 1.0{', ' + names if names else ''})"
+            ),
+            {"lat": LAT, "lon": LON, **params},
+        )
+    ).all()
+
+
+@pytest.mark.asyncio
+async def test_default_window_skips_finished_events(db_session):
+    now = datetime.now(timezone.utc)
+    upcoming = await _insert_event(db_session, now + timedelta(hours=3))
+    ongoing = await _insert_event(db_session, now - timedelta(hours=1), now + timedelta(hours=1))
+    finished = await _insert_event(db_session, now - timedelta(hours=6), now - timedelta(hours=4))
+    unknown_end = await _insert_event(db_session, now - timedelta(hours=5))
+    stale = await _insert_event(db_session, now - timedelta(days=10), now + timedelta(days=1))
+
+    assert {row.event_id for row in await _nearby(db_session)} == {upcoming, ongoing}
+
+    history = await _nearby(db_session, p_start_date=now - timedelta(days=30))
+    assert {row.event_id for row in history} == {upcoming, ongoing, finished, unknown_end, stale}
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_event_once(db_session):
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    inserted = {await _insert_event(db_session, start + timedelta(minutes=i)) for i in range(7)}
+
+    seen, after = [], {}
+    while True:
+        page = await _nearby(db_session, p_limit=3, **after)
+        assert len(page) <= 3
+        if not page:
+            break
+        seen.extend(row.event_id for row in page)
+        last = page[-1]
+        after = {"p_after_distance_km": last.distance_km, "p_after_id": last.event_id}
+
+    assert len(seen) == len(set(seen)) and set(seen) == inserted
+
+    # Sınır: p_limit 1..1000 aralığına çekilir.
+    assert len(await _nearby(db_session, p_limit=0)) == 1
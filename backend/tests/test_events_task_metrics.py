@@ -25,11 +25,16 @@ class _EventsTableStub:
 class _SupabaseStub:
     def __init__(self) -> None:
         self.events_table = _EventsTableStub()
+        self.rpc_calls: list[tuple[str, dict]] = []
 
     def table(self, name: str):
         assert name == "events"
         return self.events_table
 
+    def rpc(self, name: str, params: dict):
+        self.rpc_calls.append((name, params))
+        return self.events_table
+
 
 class _EventServiceStub:
     def __init__(self, events: list[Event], source_health: dict[str, dict[str, int]]) -> None:
@@ -120,6 +125,10 @@ async def test_fetch_and_store_events_skips_missing_start_at(monkeypatch):
     assert inserted_row["start_time"] == valid_start.isoformat()
 
     assert source_health["social_signal"]["missing_start_at"] == 1
+    assert supabase.rpc_calls == [
+        ("refresh_event_clusters", {}),
+        ("publish_change_notification", {"p_kind": "events"}),
+    ]
 
     fake_record_metrics.assert_awaited_once()
     args = fake_record_metrics.await_args.args
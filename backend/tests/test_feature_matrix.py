@@ -0,0 +1,85 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.event import Event
+from app.models.traffic_zone import TrafficZone
+from app.prediction.features import FEATURE_COLUMNS, NO_EVENT_DAYS, build_feature_matrix, extract_features
+
+T0 = datetime(2026, 3, 6, 13, 30, tzinfo=timezone.utc)
+
+
+def _event(start: datetime, capacity: int | None) -> Event:
+    return Event(id=uuid.uuid4(), name="e", start_time=start, capacity=capacity)
+
+
+def test_matrix_matches_extract_features_row_by_row():
+    rng = random.Random(11)
+    zones = [TrafficZone(id=uuid.uuid4(), name=f"Z{i}", base_congestion_level=rng.random()) for i in range(40)]
+    events = [
+        _event(T0 + timedelta(hours=rng.uniform(-72, 72)), rng.choice([None, 0, 6000, 30000, 80000]))
+        for _ in range(60)
+    ]
+    nearby = {z.id: {e.id for e in rng.sample(events, rng.randint(0, 6))} for z in zones[:30]}
+    times = [T0 + timedelta(hours=h) for h in range(1, 25)]
+
+    matrix = build_feature_matrix(zones, times, nearby, events)
+
+    assert matrix.values.shape == (len(zones) * len(times), len(FEATURE_COLUMNS))
+    by_id = {e.id: e for e in events}
+    expected = pd.concat(
+        [
+            extract_features(zone, t, [by_id[i] for i in nearby.get(zone.id, ())])
+            for zone in zones
+            for t in times
+        ],
+        ignore_index=True,
+    )
+    pd.testing.assert_frame_equal(matrix.to_frame(), expected, check_dtype=False)
+
+
+def test_days_until_event_floors_like_timedelta_days():
+    zone = TrafficZone(id=uuid.uuid4(), name="Z", base_congestion_level=0.5)
+    past = _event(T0 - timedelta(hours=1), 10000)
+    times = [T0, T0 + timedelta(hours=26)]
+
+    matrix = build_feature_matrix([zone], times, {zone.id: {past.id}}, [past])
+
+    # (-1 saat).days == -1, (-27 saat).days == -2
+    assert matrix.column("days_until_event").tolist() == [-1, -2]
+
+
+def test_zone_without_events_gets_defaults():
+    zone = TrafficZone(id=uuid.uuid4(), name="Z", base_congestion_level=0.25)
+
+    matrix = build_feature_matrix([zone], [T0], {}, [])
+
+    row = dict(zip(FEATURE_COLUMNS, matrix.cell(0, 0)))
+    assert row["nearby_event_count"] == 0
+    assert row["max_event_capacity"] == 0
+    assert row["total_event_capacity"] == 0
+    assert row["days_until_event"] == NO_EVENT_DAYS
+    assert row["zone_base_level"] == pytest.approx(0.25)
+    assert row["hour_of_day"] == 13 and row["day_of_week"] == 4
+
+
+def test_unknown_event_id_in_adjacency_is_an_error():
+    zone = TrafficZone(id=uuid.uuid4(), name="Z", base_congestion_level=0.5)
+
+    with pytest.raises(KeyError):
+        build_feature_matrix([zone], [T0], {zone.id: {uuid.uuid4()}}, [])
+
+
+def test_matrix_is_float64_and_zone_major():
+    zones = [TrafficZone(id=uuid.uuid4(), name=f"Z{i}", base_congestion_level=0.1 * i) for i in range(3)]
+    times = [T0 + timedelta(hours=h) for h in range(4)]
+
+    matrix = build_feature_matrix(zones, times, {}, [])
+
+    assert matrix.values.dtype == np.float64
+    assert len(matrix) == 12
+    assert matrix.column("zone_base_level").tolist() == pytest.approx([0.0] * 4 + [0.1] * 4 + [0.2] * 4)
@@ -0,0 +1,194 @@
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from app.prediction import feature_store
+from app.prediction.feature_store import (
+    SCHEMA,
+    build_day_frame,
+    read_feature_store,
+    stored_dates,
+    update_feature_store,
+    write_partition,
+)
+from app.prediction.features import FEATURE_COLUMNS
+from app.prediction.scorer import load_model_scorer
+from app.prediction.training import free_flow_speeds, observed_congestion, train_model
+
+DAY = date(2026, 3, 5)
+
+
+def _frame(day: date, zone_count: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    zones = [str(uuid.UUID(int=i + 1)) for i in range(zone_count)]
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    rows = []
+    for zone_index, zone_id in enumerate(zones):
+        for hour in range(24):
+            rush = int(hour in (7, 8, 17, 18))
+            rows.append({
+                "zone_id": zone_id,
+                "target_time": start + timedelta(hours=hour),
+                "hour_of_day": hour,
+                "day_of_week": day.weekday(),
+                "is_weekend": int(day.weekday() >= 5),
+                "is_rush_hour": rush,
+                "nearby_event_count": 0,
+                "max_event_capacity": 0,
+                "total_event_capacity": 0,
+                "zone_base_level": 0.2 + 0.2 * zone_index,
+                "days_until_event": 999,
+                # Rush hour'da belirgin yavaşlama → öğrenilebilir sinyal.
+                "avg_speed_kmh": float(60 - 30 * rush + rng.normal(0, 2)),
+                "avg_vehicle_count": 10.0,
+                "sample_count": 4,
+            })
+    frame = pd.DataFrame(rows)
+    frame["target_time"] = pd.to_datetime(frame["target_time"], utc=True)
+    return frame
+
+
+def test_partitions_roundtrip_with_projection_and_day_filter(tmp_path):
+    for offset in range(3):
+        write_partition(tmp_path, DAY + timedelta(days=offset), _frame(DAY + timedelta(days=offset)))
+    write_partition(tmp_path, DAY + timedelta(days=3), SCHEMA.empty_table().to_pandas())
+
+    assert stored_dates(tmp_path) == [DAY + timedelta(days=i) for i in range(4)]
+
+    projected = read_feature_store(
+        tmp_path, columns=["zone_id", "hour_of_day"], start=DAY + timedelta(days=1), end=DAY + timedelta(days=3)
+    )
+    assert list(projected.columns) == ["zone_id", "hour_of_day"]
+    assert len(projected) == 2 * 3 * 24
+
+    everything = read_feature_store(tmp_path)
+    assert list(everything.columns) == SCHEMA.names
+    assert len(everything) == 3 * 3 * 24
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_empty_store_reads_as_empty_frame(tmp_path):
+    frame = read_feature_store(tmp_path, columns=["zone_id", "avg_speed_kmh"])
+
+    assert frame.empty
+    assert list(frame.columns) == ["zone_id", "avg_speed_kmh"]
+
+
+@pytest.mark.asyncio
+async def test_update_is_incremental_and_stops_before_watermark(tmp_path, monkeypatch):
+    built: list[date] = []
+    watermark = {"value": datetime(2026, 3, 8, 0, 0, tzinfo=timezone.utc)}
+
+    async def fake_watermark(_session):
+        return watermark["value"]
+
+    async def fake_first_day(_session):
+        return DAY
+
+    async def fake_build(_session, day):
+        built.append(day)
+        return _frame(day)
+
+    monkeypatch.setattr(feature_store, "_hourly_watermark", fake_watermark)
+    monkeypatch.setattr(feature_store, "_first_rollup_day", fake_first_day)
+    monkeypatch.setattr(feature_store, "build_day_frame", fake_build)
+
+    assert await update_feature_store(None, tmp_path) == [DAY, DAY + timedelta(days=1), DAY + timedelta(days=2)]
+
+    # Watermark gün ortasında: 8 Mart henüz tamamlanmadı.
+    watermark["value"] = datetime(2026, 3, 8, 13, 0, tzinfo=timezone.utc)
+    assert await update_feature_store(None, tmp_path) == []
+
+    watermark["value"] = datetime(2026, 3, 9, 1, 0, tzinfo=timezone.utc)
+    assert await update_feature_store(None, tmp_path) == [DAY + timedelta(days=3)]
+    assert built == [DAY + timedelta(days=i) for i in range(4)]
+
+
+def test_observed_congestion_is_relative_to_zone_free_flow():
+    frame = pd.DataFrame({
+        "zone_id": ["a"] * 20 + ["b"] * 20,
+        "avg_speed_kmh": [80.0] * 19 + [40.0] + [30.0] * 19 + [15.0],
+    })
+
+    congestion = observed_congestion(frame)
+
+    assert congestion.iloc[0] == pytest.approx(0.0)
+    assert congestion.iloc[19] == pytest.approx(50.0)
+    assert congestion.iloc[39] == pytest.approx(50.0)
+
+
+def test_holdout_congestion_uses_training_free_flow():
+    train = pd.DataFrame({"zone_id": ["a"] * 20, "avg_speed_kmh": [80.0] * 20})
+    holdout = pd.DataFrame({"zone_id": ["a", "a", "b"], "avg_speed_kmh": [40.0, 100.0, 30.0]})
+
+    congestion = observed_congestion(holdout, free_flow_speeds(train))
+
+    # Holdout'un kendi p95'i (≈94 km/s) değil, eğitimin 80 km/s'si; yeni zone etiketsiz.
+    assert congestion.iloc[0] == pytest.approx(50.0)
+    assert congestion.iloc[1] == pytest.approx(0.0)
+    assert pd.isna(congestion.iloc[2])
+
+
+def test_train_writes_versioned_artifact_the_scorer_can_load(tmp_path):
+    store = tmp_path / "store"
+    for offset in range(14):
+        write_partition(store, DAY + timedelta(days=offset), _frame(DAY + timedelta(days=offset), seed=offset))
+
+    path = train_model(store, tmp_path / "models", max_iter=50)
+
+    assert path.name.startswith("congestion-") and path.suffix == ".joblib"
+    metadata = json.loads(path.with_suffix(".json").read_text())
+    assert metadata["feature_columns"] == list(FEATURE_COLUMNS)
+    assert metadata["metrics"]["rows"] == 14 * 3 * 24
+    assert metadata["metrics"]["holdout_mae"] < metadata["metrics"]["holdout_mae_mean_baseline"]
+
+    scorer = load_model_scorer(path)
+    assert scorer.name == f"model:{metadata['version']}"
+
+
+def test_train_without_rows_fails(tmp_path):
+    with pytest.raises(ValueError):
+        train_model(tmp_path / "empty", tmp_path / "models")
+
+
+# ── build_day_frame against the database ────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_build_day_frame_joins_features_with_zone_rollups(db_session, make_zone):
+    day_start = datetime(2026, 3, 5, tzinfo=timezone.utc)
+    zone_id = await make_zone(29.002, 41.002, d=0.002, prefix="store", base_congestion_level=0.4)
+    await db_session.execute(
+        text(
+            "insert into events (name, venue_name, category, start_time, end_time, location, capacity, source, "
+            "source_id) values ('store', 'Arena', 'concert', :start, :end, "
+            "ST_SetSRID(ST_MakePoint(29.002, 41.002), 4326), 30000, 'test', :source_id)"
+        ),
+        {"start": day_start + timedelta(hours=18), "end": day_start + timedelta(hours=21),
+         "source_id": uuid.uuid4().hex},
+    )
+    for hour, speed in ((8, 22.0), (12, 48.0)):
+        await db_session.execute(
+            text(
+                "insert into traffic_rollups_hourly (scope, scope_key, bucket_start, sample_count, avg_speed_kmh, "
+                "min_speed_kmh, max_speed_kmh, avg_vehicle_count, max_vehicle_count) "
+                "values ('zone', :zone, :bucket, 4, :speed, :speed, :speed, 12, 15)"
+            ),
+            {"zone": str(zone_id), "bucket": day_start + timedelta(hours=hour), "speed": speed},
+        )
+
+    frame = await build_day_frame(db_session, day_start.date())
+
+    rows = frame[frame["zone_id"] == str(zone_id)].sort_values("hour_of_day")
+    assert rows["hour_of_day"].tolist() == [8, 12]
+    assert rows["avg_speed_kmh"].tolist() == [22.0, 48.0]
+    assert rows["is_rush_hour"].tolist() == [1, 0]
+    assert rows["nearby_event_count"].tolist() == [1, 1]
+    assert rows["max_event_capacity"].tolist() == [30000, 30000]
+    assert rows["days_until_event"].tolist() == [0, 0]
+    assert rows["zone_base_level"].tolist() == pytest.approx([0.4, 0.4])
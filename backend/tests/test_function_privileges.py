@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import text
+
+pytestmark = pytest.mark.db("rollup_traffic_hourly")
+
+# SECURITY DEFINER yazıcılar: yalnızca service_role çalıştırabilir.
+SERVICE_ONLY = [
+    "ensure_traffic_snapshot_partitions",
+    "rollup_traffic_hourly",
+    "rollup_traffic_daily",
+    "prune_traffic_history",
+    "publish_prediction_run",
+    "upsert_predictions",
+    "ensure_prediction_partitions",
+    "prune_predictions",
+    "compute_predictions",
+    "mark_event_cells_dirty",
+    "run_prediction_batch",
+    "prune_prediction_dirty_cells",
+    "merge_zone_staging",
+    "assign_zone_groups",
+    "rollup_prediction_run",
+    "merge_zone_groups",
+    "build_map_tile",
+    "log_prediction_run_changes",
+    "prune_change_log",
+    "publish_change_notification",
+    "refresh_event_clusters",
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("function", SERVICE_ONLY)
+async def test_mutators_are_only_executable_by_service_role(db_session, function):
+    rows = (
+        await db_session.execute(
+            text(
+                "select role, has_function_privilege(role, p.oid, 'EXECUTE') as allowed "
+                "from pg_proc p cross join unnest(array['public', 'anon', 'authenticated', 'service_role']) role "
+                "where p.proname = :name and p.pronamespace = 'public'::regnamespace"
+            ),
+            {"name": function},
+        )
+    ).all()
+    if not rows:
+        pytest.skip(f"{function}() not installed")
+
+    assert {role for role, allowed in rows if allowed} == {"service_role"}
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.prediction.hot_forecasts import (
+    GEO_KEY,
+    META_KEY,
+    ZONES_KEY,
+    HotForecastStore,
+    ZoneForecast,
+    load_run_forecasts,
+    top_factor,
+)
+
+FIRST_TARGET = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+
+
+def _forecast(zone_id: str = "z1", name: str = "Kadıköy | Moda") -> ZoneForecast:
+    return ZoneForecast(
+        zone_id=zone_id,
+        name=name,
+        lat=40.99,
+        lon=29.03,
+        first_target=FIRST_TARGET,
+        scores=tuple(range(24)),
+        confidence=(0.83,) * 24,
+        top_factors=("rush_hour",) + (None,) * 23,
+        event_ids=(None,) * 23 + ("e1",),
+    )
+
+
+def test_top_factor_prefers_most_points():
+    assert top_factor(0) is None
+    assert top_factor(4 | 16) == "event_nearby"
+    assert top_factor(1 | 4 | 8) == "rush_hour"
+    assert top_factor(2 | 8) == "weekend_start"
+
+
+def test_forecast_encoding_roundtrips():
+    forecast = _forecast()
+    assert ZoneForecast.decode("z1", forecast.encode(), 40.99, 29.03) == forecast
+    assert ZoneForecast.decode("z1", None, 0, 0) is None
+    assert forecast.horizon(FIRST_TARGET + timedelta(hours=2, minutes=30)) == 3
+    assert forecast.horizon(FIRST_TARGET - timedelta(minutes=1)) is None
+
+
+def _cache() -> MagicMock:
+    cache = MagicMock()
+    cache.hset_many = AsyncMock(return_value=True)
+    cache.geoadd_many = AsyncMock(return_value=True)
+    cache.rename_many = AsyncMock(return_value=True)
+    cache.eval_script = AsyncMock()
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_publish_stages_run_then_swaps_keys_together():
+    cache = _cache()
+    store = HotForecastStore(cache)
+
+    assert await store.publish("run-1", FIRST_TARGET, [_forecast("z1"), _forecast("z2")])
+
+    zones_call = cache.hset_many.await_args_list[0]
+    assert zones_call.args[0] == f"{ZONES_KEY}:run-1"
+    assert set(zones_call.args[1]) == {"z1", "z2"}
+    cache.geoadd_many.assert_awaited_once()
+    assert cache.geoadd_many.await_args.args == (
+        f"{GEO_KEY}:run-1", [(29.03, 40.99, "z1"), (29.03, 40.99, "z2")]
+    )
+    renames = cache.rename_many.await_args.args[0]
+    assert renames == {f"{key}:run-1": key for key in (ZONES_KEY, GEO_KEY, META_KEY)}
+
+
+@pytest.mark.asyncio
+async def test_failed_staging_does_not_swap():
+    cache = _cache()
+    cache.geoadd_many.return_value = False
+
+    assert not await HotForecastStore(cache).publish("run-1", FIRST_TARGET, [_forecast()])
+    cache.rename_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_nearby_decodes_script_reply():
+    cache = _cache()
+    near, far = _forecast("z1"), _forecast("z2", name="Üsküdar")
+    cache.eval_script.return_value = [
+        "run-1",
+        [["z1", "0.4210", ["29.03", "40.99"]], ["z2", "2.1000", ["29.01", "41.02"]]],
+        [near.encode(), far.encode()],
+    ]
+    store = HotForecastStore(cache)
+
+    result = await store.nearby(40.99, 29.03, 5.0, limit=10)
+
+    keys, args = cache.eval_script.await_args.args[1:]
+    assert keys == [GEO_KEY, ZONES_KEY, META_KEY] and args == [29.03, 40.99, 5.0, 10]
+    assert [(r.distance_km, r.forecast.zone_id, r.forecast.name) for r in result] == [
+        (0.421, "z1", near.name),
+        (2.1, "z2", "Üsküdar"),
+    ]
+    assert result[1].forecast.lat == 41.02
+
+    # Model yoksa (meta anahtarı düşmüş) None: çağıran PostGIS'e döner.
+    cache.eval_script.return_value = None
+    assert await store.nearby(40.99, 29.03, 5.0) is None
+
+
+# ── load_run_forecasts against the database ─────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_load_run_forecasts_reads_current_run(db_session, make_zone, publish_run):
+    zone_id = await make_zone(29.002, 41.002, d=0.002, prefix="hot")
+    run_id = await publish_run(
+        FIRST_TARGET, {zone_id: 70}, confidence=0.834, factor_bits=5, predicted_at=FIRST_TARGET - timedelta(minutes=5)
+    )
+
+    run, forecasts = await load_run_forecasts(db_session)
+
+    assert run["run_id"] == str(run_id)
+    forecast = next(f for f in forecasts if f.zone_id == str(zone_id))
+    assert forecast.first_target == FIRST_TARGET
+    assert forecast.scores == (70,) * 24 and forecast.confidence == (0.83,) * 24
+    assert forecast.top_factors == ("rush_hour",) * 24
+    assert forecast.event_ids == (None,) * 24
+    assert forecast.lat == pytest.approx(41.002, abs=0.01) and forecast.lon == pytest.approx(29.002, abs=0.01)
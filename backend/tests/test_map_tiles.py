@@ -0,0 +1,86 @@
+import math
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.db("get_map_tile")
+
+
+LON, LAT, ZOOM = 10.1, 10.0, 14
+
+
+def _tile(lon: float, lat: float, zoom: int) -> tuple[int, int, int]:
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return zoom, x, y
+
+
+async def _get_tile(session: AsyncSession, tile: tuple[int, int, int], ts: datetime | None = None) -> bytes:
+    z, x, y = tile
+    return await session.scalar(
+        text("select get_map_tile(:z, :x, :y, :ts)"), {"z": z, "x": x, "y": y, "ts": ts}
+    )
+
+
+async def _cached(session: AsyncSession, run_id: uuid.UUID) -> list:
+    rows = await session.execute(
+        text("select z, x, y, horizon, event_version from map_tile_cache where run_id = :run order by z, x, y"),
+        {"run": run_id},
+    )
+    return [tuple(r) for r in rows.all()]
+
+
+@pytest.mark.asyncio
+async def test_tiles_are_cached_per_run_and_rebuilt_after_event_changes(db_session, make_zone, publish_run):
+    first_target = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    zone_id = await make_zone(LON, LAT, prefix="tile")
+    run_id = await publish_run(first_target, {zone_id: 55})
+    horizon = await db_session.scalar(text("select prediction_horizon(:first, now())"), {"first": first_target})
+    tile = _tile(LON, LAT, ZOOM)
+
+    body = await _get_tile(db_session, tile)
+    assert body
+    assert await _get_tile(db_session, tile) == body
+    # Boş karo: hata değil, boş gövde; önbelleğe yazılmaz.
+    assert await _get_tile(db_session, (ZOOM, 0, 0)) == b""
+    # Başka saatler ve yüksek zoom her istekte üretilir.
+    assert await _get_tile(db_session, tile, first_target + timedelta(hours=12))
+    assert await _get_tile(db_session, _tile(LON, LAT, 17))
+
+    cached = await _cached(db_session, run_id)
+    assert [(z, x, y, h) for z, x, y, h, _ in cached] == [(*tile, horizon)]
+    version = cached[0][4]
+
+    source_id = uuid.uuid4().hex
+    insert_event = text(
+        "insert into events (name, venue_name, category, start_time, location, capacity, source, source_id) "
+        "values ('Maç', 'Stadyum', 'sports', :start, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 40000, "
+        "'test', :source_id) "
+        "on conflict (source, source_id) do update set name = excluded.name, capacity = excluded.capacity"
+    )
+    params = {"start": first_target + timedelta(hours=3), "lon": LON, "lat": LAT, "source_id": source_id}
+    await db_session.execute(insert_event, params)
+
+    with_event = await _get_tile(db_session, tile)
+    assert with_event != body
+    assert (await _cached(db_session, run_id))[0][4] == version + 1
+
+    # Aynı etkinliğin değişmeden yeniden yazılması karoyu geçersiz kılmaz.
+    await db_session.execute(insert_event, params)
+    assert (await _cached(db_session, run_id))[0][4] == version + 1
+    await _get_tile(db_session, tile)
+    assert (await _cached(db_session, run_id))[0][4] == version + 1
+
+    # Yeni run öncekinin karolarını siler.
+    await publish_run(first_target + timedelta(hours=1), {zone_id: 55})
+    assert await _cached(db_session, run_id) == []
+
+
+@pytest.mark.asyncio
+async def test_invalid_tile_coordinates_are_rejected(db_session):
+    with pytest.raises(Exception):
+        await _get_tile(db_session, (3, 8, 0), datetime.now(timezone.utc))
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.prediction.rule_engine import MODEL_SCORED_BIT, PredictionResult, decode_factors, encode_factors
+from app.tasks import predictions as predictions_task
+
+
+class _Response:
+    def __init__(self, data) -> None:
+        self.data = data
+
+
+class _TableStub:
+    def __init__(self, fail_on_insert: int | None = None) -> None:
+        self.inserts: list = []
+        self._fail_on_insert = fail_on_insert
+
+    def insert(self, rows):
+        if self._fail_on_insert is not None and len(self.inserts) == self._fail_on_insert:
+            self.inserts.append(None)
+            raise RuntimeError("insert failed")
+        self.inserts.append(rows)
+        return self
+
+    def execute(self):
+        return _Response(None)
+
+
+class _SupabaseStub:
+    def __init__(self, failing: dict[str, int] | None = None) -> None:
+        self.tables: dict[str, _TableStub] = {}
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self._failing = failing or {}
+
+    def table(self, name: str):
+        if name not in self.tables:
+            self.tables[name] = _TableStub(self._failing.get(name))
+        return self.tables[name]
+
+    def rpc(self, name: str, params: dict):
+        self.rpc_calls.append((name, params))
+        if name == "upsert_predictions":
+            data = [
+                {
+                    "zone_id": row["zone_id"],
+                    "target_time": row["target_time"],
+                    "prediction_id": str(uuid.uuid5(uuid.NAMESPACE_OID, row["zone_id"] + row["target_time"])),
+                    "written": row["congestion_score"] != 40,
+                }
+                for row in params["p_rows"]
+            ]
+            return SimpleNamespace(execute=lambda: _Response(data))
+        if name == "run_prediction_batch":
+            stats = {
+                "run_id": "r1", "zones": 5, "cells": 120, "recomputed": 10,
+                "skipped": 110, "written": 7, "unchanged": 3,
+            }
+            return SimpleNamespace(execute=lambda: _Response(stats))
+        return SimpleNamespace(execute=lambda: _Response(1))
+
+
+class _SessionStub:
+    def __init__(self, zones) -> None:
+        self._zones = zones
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, _stmt):
+        zones = self._zones
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: zones))
+
+
+def _fake_predict_horizons(zone, target_times, _active, _nearby, is_raining=False):
+    return [
+        PredictionResult(
+            zone_id=zone.id,
+            target_time=target_time,
+            congestion_score=40,
+            confidence=0.8,
+            factors={"total_score": 40.0},
+        )
+        for target_time in target_times
+    ]
+
+
+async def _no_event_candidates(_session, _from, _to):
+    return [], {}
+
+
+def _patch(monkeypatch, client, zone_count: int = 5) -> None:
+    zones = [SimpleNamespace(id=uuid.uuid4(), base_congestion_level=0.4) for _ in range(zone_count)]
+    monkeypatch.setattr(predictions_task, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(predictions_task, "AsyncSessionLocal", lambda: _SessionStub(zones))
+    monkeypatch.setattr(predictions_task, "predict_horizons", _fake_predict_horizons)
+    monkeypatch.setattr(predictions_task, "load_event_candidates", _no_event_candidates)
+    monkeypatch.setattr(predictions_task.settings, "PREDICTION_ENGINE", "python")
+    monkeypatch.setattr(predictions_task, "get_scorer", lambda: None)
+    monkeypatch.setattr(predictions_task, "get_snapshot_store", lambda: None)
+    monkeypatch.setattr(predictions_task, "default_hot_forecast_store", lambda: None)
+
+
+def _flatten(table: _TableStub) -> list[dict]:
+    return [row for chunk in table.inserts if chunk for row in chunk]
+
+
+def _rpc_names(client: _SupabaseStub) -> list[str]:
+    return [name for name, _ in client.rpc_calls]
+
+
+@pytest.mark.asyncio
+async def test_generate_predictions_upserts_hour_aligned_keys(monkeypatch):
+    client = _SupabaseStub()
+    _patch(monkeypatch, client)
+
+    await predictions_task.generate_predictions()
+
+    upserted = [row for name, params in client.rpc_calls if name == "upsert_predictions" for row in params["p_rows"]]
+    assert "predictions" not in client.tables
+    assert len(upserted) == 5 * 24
+    assert _rpc_names(client)[0] == "ensure_prediction_partitions"
+    for row in upserted:
+        target = datetime.fromisoformat(row["target_time"])
+        assert (target.minute, target.second, target.microsecond) == (0, 0, 0)
+    assert len({(row["zone_id"], row["target_time"]) for row in upserted}) == len(upserted)
+
+
+@pytest.mark.asyncio
+async def test_generate_predictions_publishes_complete_run(monkeypatch):
+    client = _SupabaseStub()
+    _patch(monkeypatch, client)
+
+    await predictions_task.generate_predictions()
+
+    current = _flatten(client.tables["zone_prediction_current"])
+    (run,) = client.tables["prediction_runs"].inserts
+
+    # Zone başına tek kompakt satır, 24 horizon dizilerde.
+    assert len(current) == 5
+    assert {row["run_id"] for row in current} == {run["id"]}
+    for row in current:
+        assert len(row["scores"]) == len(row["confidence"]) == len(row["factor_bits"]) == 24
+        assert row["event_ids"] is None
+        first = datetime.fromisoformat(row["first_target"])
+        assert (first.minute, first.second) == (0, 0)
+    assert _rpc_names(client)[-2:] == ["publish_prediction_run", "prune_prediction_dirty_cells"]
+    assert client.rpc_calls[-2][1] == {"p_run_id": run["id"]}
+    # Tüm hücreler yeniden hesaplandı: run'dan önce işaretlenen kuyruk boşalır.
+    assert client.rpc_calls[-1][1] == {"p_marked_before": run["predicted_at"]}
+
+
+@pytest.mark.asyncio
+async def test_generate_predictions_keeps_previous_run_on_partial_write(monkeypatch):
+    client = _SupabaseStub(failing={"zone_prediction_current": 0})
+    _patch(monkeypatch, client)
+
+    await predictions_task.generate_predictions()
+
+    assert client.tables["prediction_runs"].inserts
+    assert "publish_prediction_run" not in _rpc_names(client)
+    assert "prune_prediction_dirty_cells" not in _rpc_names(client)
+
+
+@pytest.mark.asyncio
+async def test_sql_engine_runs_whole_batch_in_one_rpc(monkeypatch):
+    client = _SupabaseStub()
+    _patch(monkeypatch, client)
+    monkeypatch.setattr(predictions_task.settings, "PREDICTION_ENGINE", "sql")
+
+    def _no_predict(*_args):
+        raise AssertionError("python engine used")
+
+    monkeypatch.setattr(predictions_task, "predict_horizons", _no_predict)
+
+    await predictions_task.generate_predictions()
+
+    assert client.rpc_calls == [("run_prediction_batch", {})]
+    assert client.tables == {}
+
+
+class _ConstantScorer:
+    name = "model:test"
+    confidence = 0.9
+
+    def __init__(self, value: float | None) -> None:
+        self.value = value
+        self.calls = 0
+
+    def score(self, matrix):
+        self.calls += 1
+        if self.value is None:
+            raise RuntimeError("model failed")
+        return np.full(len(matrix), self.value)
+
+
+@pytest.mark.asyncio
+async def test_model_scorer_scores_whole_run_in_one_call(monkeypatch):
+    client = _SupabaseStub()
+    _patch(monkeypatch, client)
+    scorer = _ConstantScorer(77.6)
+    monkeypatch.setattr(predictions_task, "get_scorer", lambda: scorer)
+
+    await predictions_task.generate_predictions()
+
+    upserted = [row for name, params in client.rpc_calls if name == "upsert_predictions" for row in params["p_rows"]]
+    assert scorer.calls == 1
+    assert {(row["congestion_score"], row["confidence"]) for row in upserted} == {(77, 0.9)}
+    assert all(row["factors"] == {"model": "model:test"} for row in upserted)
+    current = _flatten(client.tables["zone_prediction_current"])
+    assert all(row["scores"] == [77] * 24 for row in current)
+    assert all(row["factor_bits"] == [MODEL_SCORED_BIT] * 24 for row in current)
+
+
+@pytest.mark.asyncio
+async def test_failing_model_falls_back_to_rule_scores(monkeypatch):
+    client = _SupabaseStub()
+    _patch(monkeypatch, client)
+    monkeypatch.setattr(predictions_task, "get_scorer", lambda: _ConstantScorer(None))
+
+    await predictions_task.generate_predictions()
+
+    upserted = [row for name, params in client.rpc_calls if name == "upsert_predictions" for row in params["p_rows"]]
+    assert len(upserted) == 5 * 24
+    assert {row["congestion_score"] for row in upserted} == {40}
+
+
+@pytest.mark.asyncio
+async def test_prune_predictions_uses_configured_retention(monkeypatch):
+    client = _SupabaseStub()
+    monkeypatch.setattr(predictions_task, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(predictions_task.settings, "PREDICTION_RETENTION_HOURS", 12)
+    monkeypatch.setattr(predictions_task.settings, "CHANGE_LOG_RETENTION_HOURS", 6)
+
+    assert await predictions_task._prune_predictions() == 1
+    assert client.rpc_calls == [
+        ("ensure_prediction_partitions", {"p_days_ahead": 3}),
+        ("prune_predictions", {"p_keep_hours": 12}),
+        ("prune_change_log", {"p_keep_hours": 6}),
+        ("prune_prediction_dirty_cells", {}),
+    ]
+
+
+def test_factor_bitmask_roundtrips_rule_engine_factors():
+    factors = {
+        "base_score": 45.0,
+        "rush_hour": 25,
+        "event_nearby": 20,
+        "large_event": 15,
+        "total_score": 100.0,
+    }
+    bits = encode_factors(factors)
+
+    assert bits == 1 | 4 | 8
+    assert decode_factors(bits, 45.0, 100.0) == factors
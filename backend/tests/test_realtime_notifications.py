@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.db("publish_change_notification")
+
+
+LON, LAT = 10.1, 10.0
+FIRST_TARGET = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+
+
+async def _latest(session: AsyncSession, kind: str):
+    return (
+        await session.execute(
+            text(
+                "select id, run_id, from_version, to_version, summary from realtime_notifications "
+                "where kind = :kind order by id desc limit 1"
+            ),
+            {"kind": kind},
+        )
+    ).first()
+
+
+@pytest.mark.asyncio
+async def test_big_tables_are_not_published_row_by_row(db_session):
+    published = set(
+        (
+            await db_session.execute(
+                text("select tablename from pg_publication_tables where pubname = 'supabase_realtime'")
+            )
+        ).scalars()
+    )
+    assert "realtime_notifications" in published
+    assert not published & {"predictions", "events"}
+
+
+@pytest.mark.asyncio
+async def test_one_notification_per_run_and_per_changed_event_batch(db_session, make_zone, publish_run):
+    zone_ids = [await make_zone(LON + dx, LAT, prefix="notify") for dx in (0.0, 0.05)]
+    run_id = await publish_run(FIRST_TARGET, {zone_id: 45 for zone_id in zone_ids})
+
+    note = await _latest(db_session, "prediction_run")
+    assert note.run_id == run_id
+    assert note.summary["zones"] >= 2 and note.summary["cells"] >= 48
+    assert note.summary["first_target"].startswith("2026-03-05T09:00:00")
+    token = await db_session.scalar(text("select changes_since(:v)"), {"v": note.from_version})
+    assert token["version"] >= note.to_version
+
+    source_id = uuid.uuid4().hex
+    upsert_event = text(
+        "insert into events (name, venue_name, category, start_time, location, capacity, source, source_id) "
+        "values ('Maç', 'Stadyum', 'sports', :start, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), 40000, "
+        "'test', :source_id) on conflict (source, source_id) do update set capacity = excluded.capacity"
+    )
+    params = {"start": FIRST_TARGET, "lon": LON, "lat": LAT, "source_id": source_id}
+    await db_session.execute(upsert_event, params)
+    await db_session.execute(upsert_event, {**params, "source_id": uuid.uuid4().hex})
+
+    first_id = await db_session.scalar(text("select publish_change_notification('events')"))
+    note = await _latest(db_session, "events")
+    assert note.id == first_id
+    assert note.summary["events"] == 2 and note.summary["deleted"] == 0
+    assert note.summary["bbox"] == pytest.approx([LON, LAT, LON, LAT])
+
+    # Hiçbir şey değiştirmeyen batch mesaj üretmez.
+    await db_session.execute(upsert_event, params)
+    assert await db_session.scalar(text("select publish_change_notification('events')")) is None
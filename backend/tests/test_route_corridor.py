@@ -0,0 +1,84 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.prediction.route_corridor import CorridorSegment, RouteCongestion, route_congestion, route_param
+
+pytestmark = pytest.mark.db("get_route_congestion")
+
+FIRST_TARGET = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+LON, LAT = 10.1, 10.0
+
+
+def test_route_param_accepts_polyline_geojson_and_points():
+    assert route_param("_p~iF~ps|U_ulLnnqC") == "_p~iF~ps|U_ulLnnqC"
+    line = {"type": "LineString", "coordinates": [[29.0, 41.0], [29.1, 41.0]]}
+    assert json.loads(route_param(line)) == line
+    assert json.loads(route_param([(41.0, 29.0), (41.0, 29.1)])) == line
+    with pytest.raises(ValueError):
+        route_param([(41.0, 29.0)])
+    with pytest.raises(ValueError):
+        route_param("  ")
+
+
+def _segment(seq: int, from_km: float, to_km: float, score: int | None) -> CorridorSegment:
+    return CorridorSegment(
+        seq, from_km, to_km, FIRST_TARGET, None, score, None, None, 0 if score is None else 1, None, None, LAT, LON
+    )
+
+
+def test_route_summary_weights_by_segment_length():
+    result = RouteCongestion(
+        departure=FIRST_TARGET,
+        speed_kmh=20.0,
+        segments=[_segment(1, 0, 0.5, 80), _segment(2, 0.5, 1.0, None), _segment(3, 1.0, 2.0, 20)],
+    )
+    assert result.length_km == 2.0
+    assert result.arrival == FIRST_TARGET + timedelta(minutes=6)
+    assert result.max_score == 80
+    assert result.mean_score == 40.0
+    assert RouteCongestion(FIRST_TARGET, 20.0, []).mean_score is None
+
+
+# ── get_route_congestion against the database ───────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_segments_are_scored_at_their_arrival_hour(db_session, make_zone, publish_run):
+    start_zone = await make_zone(LON + 0.001, LAT, d=0.002, prefix="route")
+    end_zone = await make_zone(LON + 0.09, LAT, d=0.002, prefix="route")
+    # Horizon h → skor 4·h: hangi saatin okunduğu skordan görünür.
+    scores = [4 * h for h in range(1, 25)]
+    await publish_run(
+        FIRST_TARGET, {start_zone: scores, end_zone: scores},
+        confidence=0.8, predicted_at=FIRST_TARGET - timedelta(minutes=5),
+    )
+
+    # ~11 km doğuya, 10 km/s: başlangıç zone'u ilk saatte, bitiş ~1 saat sonra.
+    route = [(LAT, LON), (LAT, LON + 0.1)]
+    result = await route_congestion(db_session, route, FIRST_TARGET, speed_kmh=10.0)
+
+    segments = result.segments
+    assert [s.seq for s in segments] == list(range(1, len(segments) + 1))
+    assert result.length_km == pytest.approx(10.95, abs=0.1)
+    assert segments[0].from_km == 0 and segments[0].eta > FIRST_TARGET
+
+    # Zone'a buffer mesafesindeki komşu parçalar da onu görür.
+    scored = [s for s in segments if s.zone_count]
+    assert {s.worst_zone_id for s in scored} == {str(start_zone), str(end_zone)}
+    assert scored[0].worst_zone_id == str(start_zone) and scored[-1].worst_zone_id == str(end_zone)
+    assert (scored[0].congestion_score, scored[0].target_time) == (4, FIRST_TARGET)
+    assert (scored[-1].congestion_score, scored[-1].target_time) == (8, FIRST_TARGET + timedelta(hours=1))
+    assert result.max_score == 8
+
+    # 24 saat sonrası run'ın dışında: skor yok.
+    late = await route_congestion(db_session, route, FIRST_TARGET + timedelta(days=2), speed_kmh=10.0)
+    assert late.max_score is None and all(s.zone_count == 0 for s in late.segments)
+
+
+@pytest.mark.asyncio
+async def test_rejects_overlong_routes(db_session):
+    with pytest.raises(DBAPIError, match="longer than"):
+        await route_congestion(db_session, [(LAT, LON), (LAT, LON + 3)], FIRST_TARGET)
@@ -0,0 +1,115 @@
+import os
+import pickle
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.models.traffic_zone import TrafficZone
+from app.prediction import scorer as scorer_module
+from app.prediction.features import FEATURE_COLUMNS, build_feature_matrix
+from app.prediction.rule_engine import MODEL_SCORED_BIT, PredictionResult, decode_factors, encode_factors
+from app.prediction.scorer import ModelScorer, apply_scores, get_scorer, load_model_scorer
+
+T0 = datetime(2026, 3, 6, 0, 0, tzinfo=timezone.utc)
+
+
+class LinearModel:
+    """Pickle'lanabilir, sklearn tarzı predict() arayüzlü test modeli."""
+
+    def __init__(self, coef, intercept: float = 0.0) -> None:
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = intercept
+
+    def predict(self, X):
+        return X @ self.coef + self.intercept
+
+
+def _matrix(zone_count: int = 3, hours: int = 24):
+    zones = [TrafficZone(id=uuid.uuid4(), name=f"Z{i}", base_congestion_level=0.2 * i) for i in range(zone_count)]
+    times = [T0 + timedelta(hours=h) for h in range(1, hours + 1)]
+    return build_feature_matrix(zones, times, {}, [])
+
+
+def test_model_scores_every_cell_and_clips():
+    matrix = _matrix()
+    # skor = 4 * saat - 10 → 0..100'e kırpılır
+    coef = [4.0 if c == "hour_of_day" else 0.0 for c in FEATURE_COLUMNS]
+
+    scores = ModelScorer(LinearModel(coef, -10.0)).score(matrix)
+
+    expected = np.clip(4.0 * matrix.column("hour_of_day") - 10.0, 0, 100)
+    assert scores.tolist() == expected.tolist()
+    assert scores.min() == 0.0 and scores.max() == 82.0
+
+
+def test_model_columns_are_reordered_to_training_order():
+    matrix = _matrix()
+    model = LinearModel([100.0, 0.0])
+
+    scores = ModelScorer(model, feature_columns=["zone_base_level", "hour_of_day"]).score(matrix)
+
+    assert scores.tolist() == pytest.approx((100 * matrix.column("zone_base_level")).tolist())
+
+
+def test_unknown_feature_column_is_rejected():
+    with pytest.raises(ValueError):
+        ModelScorer(LinearModel([1.0]), feature_columns=["wind_speed"])
+
+
+def test_apply_scores_marks_model_scored_factors():
+    zone_id = uuid.uuid4()
+    results = [[
+        PredictionResult(zone_id=zone_id, target_time=T0, congestion_score=40, confidence=0.8,
+                         factors={"base_score": 40.0, "rush_hour": 25, "total_score": 65.0})
+        for _ in range(2)
+    ]]
+
+    scored = apply_scores(results, np.array([12.9, 99.0]), 0.75, "model:v1")
+
+    assert [r.congestion_score for r in scored[0]] == [12, 99]
+    assert {r.confidence for r in scored[0]} == {0.75}
+    # Kural faktörleri açıklama olarak kalır; kural toplamı model skoruyla çelişmesin.
+    assert scored[0][0].factors == {"base_score": 40.0, "rush_hour": 25, "model": "model:v1"}
+    assert encode_factors(scored[0][0].factors) == 1 | MODEL_SCORED_BIT
+    assert decode_factors(1 | MODEL_SCORED_BIT, 40.0, 99.0) == {"base_score": 40.0, "rush_hour": 25, "model": True}
+
+    with pytest.raises(ValueError):
+        apply_scores(results, np.array([1.0]), 0.75, "model:v1")
+
+
+def test_artifact_roundtrip(tmp_path):
+    path = tmp_path / "congestion.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"model": LinearModel([1.0]), "feature_columns": ["hour_of_day"], "version": "v3",
+                     "confidence": 0.65}, f)
+
+    loaded = load_model_scorer(path)
+
+    assert loaded.name == "model:v3"
+    assert loaded.confidence == 0.65
+    assert loaded.score(_matrix(1, 3)).tolist() == [1.0, 2.0, 3.0]
+
+
+def test_get_scorer_caches_per_process_and_falls_back(tmp_path, monkeypatch):
+    scorer_module.reset_scorer()
+    path = tmp_path / "model.pkl"
+    monkeypatch.setattr(scorer_module.settings, "PREDICTION_MODEL_PATH", str(path))
+
+    assert get_scorer() is None  # dosya yok → kurallar
+
+    with open(path, "wb") as f:
+        pickle.dump(LinearModel([1.0] * len(FEATURE_COLUMNS)), f)
+    first = get_scorer()
+    assert isinstance(first, ModelScorer)
+    assert get_scorer() is first
+
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+    os.utime(path, ns=(1, 1))
+    assert get_scorer() is None  # bozuk artefakt → kurallar
+
+    monkeypatch.setattr(scorer_module.settings, "PREDICTION_MODEL_PATH", "")
+    assert get_scorer() is None
+    scorer_module.reset_scorer()
@@ -0,0 +1,132 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.prediction.snapshots import (
+    MANIFEST_NAME,
+    LocalSnapshotStore,
+    load_run_snapshot,
+    publish_snapshot,
+    read_manifest,
+)
+from app.tasks import predictions as predictions_task
+
+FIRST_TARGET = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+
+
+def _snapshot(run_id: str, score: int = 40) -> dict:
+    return {
+        "version": 1,
+        "run_id": run_id,
+        "predicted_at": (FIRST_TARGET - timedelta(minutes=5)).isoformat(),
+        "first_target": FIRST_TARGET.isoformat(),
+        "horizons": 24,
+        "zones": {
+            "ids": ["z1", "z2"],
+            "names": ["Kadıköy", "Beşiktaş"],
+            "lat": [40.99, 41.04],
+            "lon": [29.03, 29.0],
+            "scores": [[score] * 24, [score + 10] * 24],
+            "confidence": [[0.8] * 24, [0.8] * 24],
+        },
+        "events": [],
+    }
+
+
+def test_publish_writes_compressed_artifact_then_manifest(tmp_path):
+    store = LocalSnapshotStore(tmp_path)
+
+    manifest = publish_snapshot(store, _snapshot("run-1"))
+
+    latest = manifest["latest"]
+    assert latest["run_id"] == "run-1" and latest["zone_count"] == 2
+    gz = latest["files"]["gzip"]
+    assert gz["path"].startswith("runs/run-1/snapshot-") and gz["path"].endswith(".json.gz")
+    assert json.loads(gzip.decompress((tmp_path / gz["path"]).read_bytes())) == _snapshot("run-1")
+    assert read_manifest(store) == manifest
+    assert not list(tmp_path.rglob("*.tmp"))
+
+    # Aynı içerik → aynı dosya adı ve aynı bayt dizisi.
+    again = publish_snapshot(store, _snapshot("run-1"))
+    assert again["latest"]["files"] == latest["files"]
+    assert [r["run_id"] for r in again["runs"]] == ["run-1"]
+    assert (tmp_path / gz["path"]).exists()
+
+    changed = publish_snapshot(store, _snapshot("run-1", score=70))
+    assert changed["latest"]["files"]["gzip"]["path"] != gz["path"]
+    assert not (tmp_path / gz["path"]).exists()
+
+
+def test_old_runs_are_dropped_from_manifest_and_storage(tmp_path):
+    store = LocalSnapshotStore(tmp_path)
+    paths = []
+    for i in range(4):
+        manifest = publish_snapshot(store, _snapshot(f"run-{i}", score=10 * i), keep_runs=2)
+        paths.append(manifest["latest"]["files"]["gzip"]["path"])
+
+    assert [r["run_id"] for r in manifest["runs"]] == ["run-3", "run-2"]
+    assert [(tmp_path / p).exists() for p in paths] == [False, False, True, True]
+    assert not (tmp_path / "runs" / "run-0").exists()
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+
+@pytest.mark.asyncio
+async def test_prediction_job_publishes_snapshot_after_run(monkeypatch, tmp_path):
+    class _Client:
+        def rpc(self, name, params):
+            return type("Call", (), {"execute": lambda self: type("R", (), {"data": {"run_id": "r1"}})()})()
+
+    class _Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def fake_snapshot(_session):
+        return _snapshot("r1")
+
+    monkeypatch.setattr(predictions_task.settings, "PREDICTION_ENGINE", "sql")
+    monkeypatch.setattr(predictions_task, "get_supabase_client", lambda: _Client())
+    monkeypatch.setattr(predictions_task, "AsyncSessionLocal", _Session)
+    monkeypatch.setattr(predictions_task, "load_run_snapshot", fake_snapshot)
+    monkeypatch.setattr(predictions_task, "get_snapshot_store", lambda: LocalSnapshotStore(tmp_path))
+    monkeypatch.setattr(predictions_task, "default_hot_forecast_store", lambda: None)
+
+    await predictions_task.generate_predictions()
+
+    assert read_manifest(LocalSnapshotStore(tmp_path))["latest"]["run_id"] == "r1"
+
+
+# ── load_run_snapshot against the database ──────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_snapshot_holds_current_run_and_window_events(db_session, make_zone, publish_run):
+    zone_id = await make_zone(29.002, 41.002, d=0.002, prefix="snap")
+    run_id = await publish_run(
+        FIRST_TARGET, {zone_id: 61}, confidence=0.834, predicted_at=FIRST_TARGET - timedelta(minutes=5)
+    )
+    for name, start in (("in-window", FIRST_TARGET + timedelta(hours=5)), ("later", FIRST_TARGET + timedelta(days=2))):
+        await db_session.execute(
+            text(
+                "insert into events (name, venue_name, category, start_time, location, capacity, source, source_id) "
+                "values (:name, 'Arena', 'concert', :start, ST_SetSRID(ST_MakePoint(29.002, 41.002), 4326), 9000, "
+                "'test', :source_id)"
+            ),
+            {"name": f"{name}-{run_id}", "start": start, "source_id": uuid.uuid4().hex},
+        )
+
+    snapshot = await load_run_snapshot(db_session)
+
+    assert snapshot["run_id"] == str(run_id)
+    assert snapshot["first_target"] == FIRST_TARGET.isoformat()
+    index = snapshot["zones"]["ids"].index(str(zone_id))
+    assert snapshot["zones"]["scores"][index] == [61] * 24
+    assert snapshot["zones"]["confidence"][index] == [0.83] * 24
+    names = [e["name"] for e in snapshot["events"]]
+    assert f"in-window-{run_id}" in names and f"later-{run_id}" not in names
@@ -0,0 +1,117 @@
+import math
+import random
+import uuid
+
+import pytest
+
+from app.prediction import spatial_index
+from app.prediction.spatial_index import ZoneSpatialIndex, to_web_mercator
+
+
+def test_web_mercator_matches_epsg_3857():
+    assert to_web_mercator(0.0, 0.0) == pytest.approx((0.0, 0.0), abs=1e-6)
+    assert to_web_mercator(180.0, 0.0)[0] == pytest.approx(20037508.342789244)
+    # Web Mercator dünyası kare: 85.0511...° enlem = 180° boylam.
+    assert to_web_mercator(0.0, 85.0511287798066)[1] == pytest.approx(20037508.342789244, abs=1e-3)
+    assert to_web_mercator(29.0, 41.0)[0] == pytest.approx(3228265.233, abs=1e-3)
+
+
+def test_distance_is_zero_inside_and_planar_outside(square):
+    zone_id = uuid.uuid4()
+    index = ZoneSpatialIndex([(zone_id, square(29.0, 41.0, 0.01))])
+
+    assert index.distance_m(zone_id, 29.0, 41.0) == 0.0
+
+    # Doğu kenarından 3857'de tam 1500 m uzaktaki nokta.
+    edge_x, _ = to_web_mercator(29.01, 41.0)
+    lon = math.degrees((edge_x + 1500) / spatial_index.EARTH_RADIUS_M)
+    assert index.distance_m(zone_id, lon, 41.0) == pytest.approx(1500, abs=1e-6)
+    assert index.zones_within(lon, 41.0) == [zone_id]
+
+    lon_far = math.degrees((edge_x + 2000.5) / spatial_index.EARTH_RADIUS_M)
+    assert index.zones_within(lon_far, 41.0) == []
+
+
+def test_hole_is_outside(square):
+    zone_id = uuid.uuid4()
+    rings = square(29.0, 41.0, 0.1) + square(29.0, 41.0, 0.05)
+    index = ZoneSpatialIndex([(zone_id, rings)])
+
+    # Deliğin merkezi en yakın kenara ~0.05° → 2 km'den uzak.
+    assert index.distance_m(zone_id, 29.0, 41.0) > 2000
+    assert index.zones_within(29.0, 41.0) == []
+    assert index.zones_within(29.0, 41.0 + 0.075) == [zone_id]
+
+
+def test_grid_matches_brute_force(square):
+    rng = random.Random(3)
+    zones = [
+        (uuid.uuid4(), square(rng.uniform(28.6, 29.4), rng.uniform(40.8, 41.3), rng.uniform(0.002, 0.03)))
+        for _ in range(300)
+    ]
+    index = ZoneSpatialIndex(zones)
+
+    for _ in range(500):
+        lon, lat = rng.uniform(28.6, 29.4), rng.uniform(40.8, 41.3)
+        expected = {zone_id for zone_id, _ in zones if index.distance_m(zone_id, lon, lat) <= 2000}
+        assert set(index.zones_within(lon, lat)) == expected
+
+
+def test_nearby_events_groups_by_zone(square):
+    a, b = uuid.uuid4(), uuid.uuid4()
+    index = ZoneSpatialIndex([(a, square(29.0, 41.0, 0.002)), (b, square(29.5, 41.0, 0.002))])
+    e1, e2 = uuid.uuid4(), uuid.uuid4()
+
+    assert index.nearby_events([(e1, 29.001, 41.0), (e2, 30.0, 41.0)]) == {a: {e1}}
+
+
+def test_from_geojson_reads_polygon_and_multipolygon():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    index = ZoneSpatialIndex.from_geojson([
+        (a, '{"type":"Polygon","coordinates":[[[29,41],[29.01,41],[29.01,41.01],[29,41]]]}'),
+        (b, '{"type":"MultiPolygon","coordinates":[[[[30,41],[30.01,41],[30.01,41.01],[30,41]]]]}'),
+    ])
+
+    assert index.zones_within(29.008, 41.002) == [a]
+    assert index.zones_within(30.008, 41.002) == [b]
+
+
+class _Result:
+    def __init__(self, rows) -> None:
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+class _SessionStub:
+    def __init__(self) -> None:
+        self.version = 1
+        self.loads = 0
+
+    async def scalar(self, _stmt):
+        return self.version
+
+    async def execute(self, _stmt):
+        self.loads += 1
+        return _Result([(uuid.uuid4(), '{"type":"Polygon","coordinates":[[[29,41],[29.01,41],[29,41.01],[29,41]]]}')])
+
+
+@pytest.mark.asyncio
+async def test_zone_index_is_cached_until_catalog_version_changes():
+    spatial_index.invalidate_zone_index()
+    session = _SessionStub()
+
+    first = await spatial_index.get_zone_index(session)
+    assert await spatial_index.get_zone_index(session) is first
+    assert session.loads == 1
+
+    session.version = 2
+    rebuilt = await spatial_index.get_zone_index(session)
+    assert rebuilt is not first
+    assert session.loads == 2
+
+    spatial_index.invalidate_zone_index()
+    await spatial_index.get_zone_index(session)
+    assert session.loads == 3
+    spatial_index.invalidate_zone_index()
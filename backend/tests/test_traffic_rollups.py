@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import text
+
+from app.services.ibb_traffic_service import TrafficZone
+from app.tasks.rollups import _prune_traffic_history, _run_traffic_rollups
+from app.tasks.traffic import _ISTANBUL_TZ, _fetch_and_store_traffic, _observed_slot, _snapshot_rows
+
+
+class _Response:
+    def __init__(self, data) -> None:
+        self.data = data
+
+
+class _TableStub:
+    def __init__(self) -> None:
+        self.upserts: list[dict] = []
+
+    def upsert(self, rows, on_conflict: str):
+        self.upserts.append({"rows": rows, "on_conflict": on_conflict})
+        return self
+
+    def execute(self):
+        return _Response(None)
+
+
+class _RpcCall:
+    def __init__(self, result) -> None:
+        self._result = result
+
+    def execute(self):
+        return _Response(self._result)
+
+
+class _SupabaseStub:
+    def __init__(self, rpc_results: dict | None = None) -> None:
+        self.tables: dict[str, _TableStub] = {}
+        self.rpc_calls: list[tuple[str, dict | None]] = []
+        self._rpc_results = rpc_results or {}
+
+    def table(self, name: str):
+        return self.tables.setdefault(name, _TableStub())
+
+    def rpc(self, name: str, params: dict | None = None):
+        self.rpc_calls.append((name, params))
+        return _RpcCall(self._rpc_results.get(name))
+
+
+def _zone(geohash: str, timestamp: str, speed: float = 40.0) -> TrafficZone:
+    return TrafficZone(
+        zone_id=geohash,
+        road_name="D100",
+        direction="Batı",
+        speed_kmh=speed,
+        density=12,
+        lat=41.05,
+        lon=29.01,
+        timestamp=timestamp,
+    )
+
+
+def test_observed_slot_floors_local_time_to_quarter_hour_utc():
+    fallback = datetime(2026, 3, 1, 0, 0, tzinfo=timezone.utc)
+    slot = _observed_slot("2026-03-01 10:29:59", fallback)
+    # İstanbul UTC+3
+    assert slot == datetime(2026, 3, 1, 7, 15, tzinfo=timezone.utc)
+
+
+def test_observed_slot_falls_back_on_unparseable_timestamp():
+    fallback = datetime(2026, 3, 1, 8, 44, 10, tzinfo=timezone.utc)
+    assert _observed_slot("dün akşam", fallback) == datetime(
+        2026, 3, 1, 8, 30, tzinfo=timezone.utc
+    )
+
+
+def test_snapshot_rows_deduplicates_segment_within_slot():
+    now = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+    rows = _snapshot_rows(
+        [
+            _zone("sxk9", "2026-03-01 12:01:00", speed=30.0),
+            _zone("sxk9", "2026-03-01 12:14:00", speed=25.0),
+            _zone("sxk8", "2026-03-01 12:14:00"),
+            _zone("", "2026-03-01 12:14:00"),
+        ],
+        now,
+    )
+
+    assert len(rows) == 2
+    by_segment = {row["segment_id"]: row for row in rows}
+    assert by_segment["sxk9"]["speed_kmh"] == 25.0
+    assert by_segment["sxk9"]["observed_at"] == "2026-03-01T09:00:00+00:00"
+    assert by_segment["sxk9"]["location"] == "SRID=4326;POINT(29.01 41.05)"
+
+
+def _local(ago: timedelta = timedelta()) -> str:
+    """İBB biçiminde (İstanbul yerel saati) bir zaman damgası."""
+    return (datetime.now(timezone.utc) - ago).astimezone(_ISTANBUL_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@pytest.mark.asyncio
+async def test_fetch_and_store_traffic_ensures_partitions_then_upserts(monkeypatch):
+    svc = AsyncMock()
+    svc.get_traffic_zones.return_value = [_zone("sxk9", _local())]
+    supabase = _SupabaseStub()
+
+    monkeypatch.setattr("app.tasks.traffic.IBBTrafficService", lambda: svc)
+    monkeypatch.setattr("app.tasks.traffic.get_supabase_client", lambda: supabase)
+
+    await _fetch_and_store_traffic()
+
+    assert supabase.rpc_calls == [
+        ("ensure_traffic_snapshot_partitions", {"p_days_ahead": 2, "p_days_back": 0})
+    ]
+    upserts = supabase.tables["traffic_snapshots"].upserts
+    assert len(upserts) == 1
+    assert upserts[0]["on_conflict"] == "segment_id,observed_at"
+    assert upserts[0]["rows"][0]["segment_id"] == "sxk9"
+
+
+@pytest.mark.asyncio
+async def test_late_rows_get_partitions_and_expired_rows_are_skipped(monkeypatch, caplog):
+    svc = AsyncMock()
+    svc.get_traffic_zones.return_value = [
+        _zone("sxk9", _local()),
+        _zone("sxk8", _local(timedelta(days=2, hours=1))),
+        _zone("sxk7", _local(timedelta(days=9))),
+    ]
+    supabase = _SupabaseStub()
+
+    monkeypatch.setattr("app.tasks.traffic.IBBTrafficService", lambda: svc)
+    monkeypatch.setattr("app.tasks.traffic.get_supabase_client", lambda: supabase)
+    monkeypatch.setattr("app.tasks.traffic.settings.TRAFFIC_RAW_RETENTION_DAYS", 7)
+
+    await _fetch_and_store_traffic()
+
+    ((name, params),) = supabase.rpc_calls
+    assert name == "ensure_traffic_snapshot_partitions"
+    # 2 gün 1 saat önceki satır UTC takviminde 2 ya da 3 gün geride olabilir.
+    assert params["p_days_ahead"] == 2 and params["p_days_back"] in (2, 3)
+    (upsert,) = supabase.tables["traffic_snapshots"].upserts
+    assert {row["segment_id"] for row in upsert["rows"]} == {"sxk9", "sxk8"}
+    assert "older than 7 days skipped: 1" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_run_traffic_rollups_runs_hourly_before_daily(monkeypatch):
+    supabase = _SupabaseStub({"rollup_traffic_hourly": 120, "rollup_traffic_daily": 0})
+    monkeypatch.setattr("app.tasks.rollups.get_supabase_client", lambda: supabase)
+
+    result = await _run_traffic_rollups()
+
+    assert [name for name, _ in supabase.rpc_calls] == [
+        "rollup_traffic_hourly",
+        "rollup_traffic_daily",
+    ]
+    assert result == {"hourly": 120, "daily": 0}
+
+
+@pytest.mark.asyncio
+async def test_prune_traffic_history_passes_retention_settings(monkeypatch):
+    supabase = _SupabaseStub({"prune_traffic_history": 2})
+    monkeypatch.setattr("app.tasks.rollups.get_supabase_client", lambda: supabase)
+    monkeypatch.setattr("app.tasks.rollups.settings.TRAFFIC_RAW_RETENTION_DAYS", 3)
+
+    dropped = await _prune_traffic_history()
+
+    assert dropped == 2
+    name, params = supabase.rpc_calls[0]
+    assert name == "prune_traffic_history"
+    assert params["p_raw_days"] == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.db("rollup_traffic_hourly")
+async def test_late_snapshots_are_rolled_up_again(db_session):
+    segment = f"late-{datetime.now().timestamp():.0f}"
+    hour = await db_session.scalar(text("select date_trunc('hour', now() - interval '2 days')"))
+    insert = text(
+        "insert into traffic_snapshots (observed_at, segment_id, speed_kmh, vehicle_count) "
+        "values (:at, :segment, :speed, 10)"
+    )
+
+    async def rollup_row(table: str) -> tuple[int, float]:
+        return (
+            await db_session.execute(
+                text(
+                    f"select sample_count, avg_speed_kmh from {table} "
+                    "where scope = 'segment' and scope_key = :segment"
+                ),
+                {"segment": segment},
+            )
+        ).one()
+
+    await db_session.execute(text("delete from traffic_rollup_watermarks"))
+    await db_session.execute(text("select ensure_traffic_snapshot_partitions(2, 3)"))
+    await db_session.execute(insert, {"at": hour, "segment": segment, "speed": 40.0})
+    await db_session.execute(text("select rollup_traffic_hourly()"))
+    await db_session.execute(text("select rollup_traffic_daily()"))
+    assert await rollup_row("traffic_rollups_hourly") == (1, 40.0)
+    assert await rollup_row("traffic_rollups_daily") == (1, 40.0)
+
+    # Saatlik watermark'ın gerisine düşen örnek.
+    await db_session.execute(insert, {"at": hour + timedelta(minutes=15), "segment": segment, "speed": 20.0})
+    assert await db_session.scalar(
+        text("select dirty_from from traffic_rollup_watermarks where level = 'hourly'")
+    ) == hour + timedelta(minutes=15)
+
+    await db_session.execute(text("select rollup_traffic_hourly()"))
+    assert await rollup_row("traffic_rollups_hourly") == (2, 30.0)
+    await db_session.execute(text("select rollup_traffic_daily()"))
+    assert await rollup_row("traffic_rollups_daily") == (2, 30.0)
+    assert (
+        await db_session.execute(text("select count(*) from traffic_rollup_watermarks where dirty_from is not null"))
+    ).scalar() == 0
@@ -0,0 +1,112 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.zone_tessellation import (
+    CITY_SIDE_LEVEL,
+    DISTRICT_LEVEL,
+    ZoneGroupSpec,
+    geojson_zone_groups,
+    load_zone_groups,
+)
+
+pytestmark = pytest.mark.db("get_congestion_overlay")
+
+
+def _district(code, name, side, coordinates) -> dict:
+    return {
+        "type": "Feature",
+        "properties": {"kod": code, "ad": name, "yaka": side},
+        "geometry": {"type": "Polygon", "coordinates": coordinates},
+    }
+
+
+def test_district_groups_name_dissolved_city_side_parents(square):
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            _district(1, "Kadıköy", "Anadolu", square(29.05, 40.98, 0.1)),
+            _district(2, "Üsküdar", "Anadolu", square(29.05, 41.03, 0.1)),
+            _district(3, "Fatih", "Avrupa", square(28.95, 41.01, 0.1)),
+        ],
+    }
+
+    districts, sides = geojson_zone_groups(collection, "ilce", "kod", "ad", parent_property="yaka")
+
+    assert [(g.group_key, g.parent_key) for g in districts] == [
+        ("ilce:1", "yaka:Anadolu"),
+        ("ilce:2", "yaka:Anadolu"),
+        ("ilce:3", "yaka:Avrupa"),
+    ]
+    assert sides == [
+        ZoneGroupSpec("yaka:Anadolu", "Anadolu", None),
+        ZoneGroupSpec("yaka:Avrupa", "Avrupa", None),
+    ]
+
+    collection["features"].append(_district(3, "Fatih 2", "Avrupa", square(28.9, 41.0, 0.1)))
+    with pytest.raises(ValueError):
+        geojson_zone_groups(collection, "ilce", "kod", "ad")
+
+
+# ── Rollups and get_congestion_overlay against the database ─────────────────
+
+
+# Seed zone'lardan uzak bir kutu: iki ilçe (batı / doğu), tek yaka.
+WEST, EAST, LAT = 10.1, 10.3, 10.0
+BBOX = (9.9, 9.8, 10.5, 10.2)
+
+
+async def _overlay(session: AsyncSession, zoom: float, ts: datetime, limit: int = 300) -> list:
+    rows = await session.execute(
+        text(
+            "select level, zone_name, congestion_score, max_congestion_score, zone_count "
+            "from get_congestion_overlay(:zoom, :a, :b, :c, :d, :ts, :limit)"
+        ),
+        {"zoom": zoom, "a": BBOX[0], "b": BBOX[1], "c": BBOX[2], "d": BBOX[3], "ts": ts, "limit": limit},
+    )
+    return [tuple(r) for r in rows.all()]
+
+
+@pytest.mark.asyncio
+async def test_overlay_level_follows_zoom_and_groups_aggregate_the_run(db_session, square, make_zone, publish_run):
+    prefix = uuid.uuid4().hex[:8]
+    first_target = datetime(2026, 3, 5, 9, tzinfo=timezone.utc)
+    west = [await make_zone(WEST + dx, LAT, d=0.01, prefix=prefix) for dx in (-0.02, 0.02)]
+    east = [await make_zone(EAST + dx, LAT, d=0.01, prefix=prefix) for dx in (-0.02, 0.02)]
+
+    district = lambda lon: json.dumps({"type": "Polygon", "coordinates": square(lon, LAT, 0.1)})
+    side = f"yaka:{prefix}"
+    await load_zone_groups(
+        db_session,
+        [
+            ZoneGroupSpec(f"ilce:{prefix}:w", f"Batı {prefix}", district(WEST), side),
+            ZoneGroupSpec(f"ilce:{prefix}:e", f"Doğu {prefix}", district(EAST), side),
+        ],
+        DISTRICT_LEVEL,
+    )
+    stats = await load_zone_groups(db_session, [ZoneGroupSpec(side, f"Yaka {prefix}", None)], CITY_SIDE_LEVEL)
+    assert stats["groups"] == 1
+
+    # Gruplar yüklendikten sonra eklenen zone da trigger ile üye olur.
+    east.append(await make_zone(EAST, LAT + 0.05, d=0.01, prefix=prefix))
+    await publish_run(first_target, {west[0]: 20, west[1]: 40, east[0]: 60, east[1]: 80, east[2]: 100})
+
+    fine = await _overlay(db_session, 14, first_target)
+    assert [r[0] for r in fine] == [0] * 5
+    assert [r[2] for r in fine] == [100, 80, 60, 40, 20]
+
+    districts = await _overlay(db_session, 11, first_target)
+    assert districts == [
+        (1, f"Doğu {prefix}", 80, 100, 3),
+        (1, f"Batı {prefix}", 30, 40, 2),
+    ]
+
+    assert await _overlay(db_session, 6, first_target) == [(2, f"Yaka {prefix}", 60, 100, 5)]
+
+    # Sınırı aşan ince seviye bir üst seviyeye çıkar; yanıt p_limit ile sınırlı.
+    assert [r[0] for r in await _overlay(db_session, 14, first_target, limit=3)] == [1, 1]
+    assert len(await _overlay(db_session, 14, first_target, limit=1)) == 1
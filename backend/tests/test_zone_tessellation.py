@@ -0,0 +1,136 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.zone_tessellation import ZoneSpec, geojson_zones, h3_zones, load_zones
+
+pytestmark = pytest.mark.db("merge_zone_staging")
+
+
+def _feature(key, name, coordinates, kind="Polygon", **props) -> dict:
+    return {
+        "type": "Feature",
+        "properties": {"kod": key, "ad": name, **props},
+        "geometry": {"type": kind, "coordinates": coordinates},
+    }
+
+
+def test_h3_grid_is_deterministic_and_closed(square):
+    pytest.importorskip("h3")
+    boundary = {"type": "Polygon", "coordinates": square(29.0, 41.0, 0.05)}
+
+    zones = h3_zones(8, boundary=boundary)
+
+    assert zones == h3_zones(8, boundary=boundary)
+    assert 100 < len(zones) < 150  # ~0.74 km² hücre, ~93 km² kutu
+    assert len({z.zone_key for z in zones}) == len(zones)
+    assert all(z.zone_key.startswith("h3:") for z in zones)
+    ring = json.loads(zones[0].geojson)["coordinates"][0]
+    assert len(ring) == 7 and ring[0] == ring[-1]
+
+
+def test_geojson_import_disambiguates_names_and_rejects_duplicate_keys(square):
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            _feature(1, "Cumhuriyet", square(29.0, 41.0, 0.01), base=0.7),
+            _feature(2, "Cumhuriyet", square(29.1, 41.0, 0.01)),
+            _feature(3, "Moda", [square(29.2, 41.0, 0.01), square(29.3, 41.0, 0.01)], kind="MultiPolygon"),
+        ],
+    }
+
+    zones = geojson_zones(collection, "mahalle", "kod", "ad", base_congestion_property="base")
+
+    assert [(z.zone_key, z.name) for z in zones] == [
+        ("mahalle:1", "Cumhuriyet (1)"),
+        ("mahalle:2", "Cumhuriyet (2)"),
+        ("mahalle:3", "Moda"),
+    ]
+    assert [z.base_congestion_level for z in zones] == [0.7, 0.5, 0.5]
+
+    collection["features"].append(_feature(3, "Moda 2", square(29.4, 41.0, 0.01)))
+    with pytest.raises(ValueError):
+        geojson_zones(collection, "mahalle", "kod", "ad")
+
+
+# ── merge_zone_staging against the database ─────────────────────────────────
+
+
+def _zones(square, source: str, count: int) -> list[ZoneSpec]:
+    return [
+        ZoneSpec(
+            zone_key=f"{source}:{i}",
+            name=f"{source} {i}",
+            geojson=json.dumps({"type": "Polygon", "coordinates": square(29.0 + 0.03 * i, 41.0, 0.01)}),
+        )
+        for i in range(count)
+    ]
+
+
+async def _ids(session: AsyncSession, source: str) -> dict[str, uuid.UUID]:
+    rows = await session.execute(
+        text("select zone_key, id from traffic_zones where source = :source"), {"source": source}
+    )
+    return dict(rows.all())
+
+
+@pytest.mark.asyncio
+async def test_regeneration_keeps_ids_and_skips_unchanged_zones(db_session, square):
+    source = f"t{uuid.uuid4().hex[:8]}"
+    zones = _zones(square, source, 4)
+
+    first = await load_zones(db_session, zones, source)
+    ids = await _ids(db_session, source)
+    await db_session.execute(
+        text("update traffic_zones set base_congestion_level = 0.9 where zone_key = :key"),
+        {"key": f"{source}:0"},
+    )
+
+    moved = zones[1]._replace(geojson=json.dumps({"type": "Polygon", "coordinates": square(30.0, 41.0, 0.01)}))
+    second = await load_zones(db_session, [zones[0], moved, zones[2]], source, prune=True)
+
+    assert first == {"zones": 4, "inserted": 4, "updated": 0, "unchanged": 0, "deleted": 0}
+    assert second == {"zones": 3, "inserted": 0, "updated": 1, "unchanged": 2, "deleted": 1}
+    after = await _ids(db_session, source)
+    assert after == {key: ids[key] for key in (f"{source}:0", f"{source}:1", f"{source}:2")}
+    assert after[f"{source}:0"] == await db_session.scalar(
+        text("select zone_id_for_key(:key)"), {"key": f"{source}:0"}
+    )
+    # Ayarlanmış taban yoğunluk yeniden üretimde korunur.
+    assert await db_session.scalar(
+        text("select base_congestion_level from traffic_zones where zone_key = :key"), {"key": f"{source}:0"}
+    ) == 0.9
+    assert await db_session.scalar(text("select count(*) from traffic_zone_staging")) == 0
+
+
+@pytest.mark.asyncio
+async def test_multipolygons_split_and_name_collisions_get_key_suffix(db_session, square):
+    source = f"t{uuid.uuid4().hex[:8]}"
+    taken = await db_session.scalar(text("select name from traffic_zones where zone_key is null limit 1"))
+    multi = ZoneSpec(
+        zone_key=f"{source}:adalar",
+        name="Adalar",
+        geojson=json.dumps(
+            {"type": "MultiPolygon", "coordinates": [square(29.1, 40.87, 0.01), square(29.2, 40.85, 0.01)]}
+        ),
+    )
+    clash = ZoneSpec(
+        zone_key=f"{source}:clash",
+        name=taken,
+        geojson=json.dumps({"type": "Polygon", "coordinates": square(28.9, 41.1, 0.01)}),
+    )
+
+    stats = await load_zones(db_session, [multi, clash], source)
+
+    names = dict(
+        (await db_session.execute(
+            text("select zone_key, name from traffic_zones where source = :source"), {"source": source}
+        )).all()
+    )
+    assert stats["inserted"] == 3
+    assert set(names) == {f"{source}:adalar#1", f"{source}:adalar#2", f"{source}:clash"}
+    assert {names[f"{source}:adalar#1"], names[f"{source}:adalar#2"]} == {"Adalar #1", "Adalar #2"}
+    assert names[f"{source}:clash"] == f"{taken} ({source}:clash)"
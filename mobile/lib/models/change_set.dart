@@ -0,0 +1,44 @@
+import 'event.dart';
+import 'prediction.dart';
+
+/// changes_since RPC yanıtı: bir version token'dan bu yana değişenler.
+///
+/// [reset] true ise token çok eski (ya da ilk senkron): istemci listeleri
+/// normal RPC'lerle baştan yükler ve [version]'dan devam eder. [hasMore]
+/// true ise aynı çağrı yeni [version] ile tekrarlanır.
+class ChangeSet {
+  final int version;
+  final bool reset;
+  final bool hasMore;
+  final List<Prediction> predictions;
+  final List<TrafficEvent> events;
+  final List<DeletedPrediction> deletedPredictions;
+  final List<int> deletedZoneIds;
+  final List<int> deletedEventIds;
+
+  const ChangeSet({
+    required this.version,
+    required this.reset,
+    required this.hasMore,
+    this.predictions = const [],
+    this.events = const [],
+    this.deletedPredictions = const [],
+    this.deletedZoneIds = const [],
+    this.deletedEventIds = const [],
+  });
+
+  bool get isEmpty =>
+      predictions.isEmpty &&
+      events.isEmpty &&
+      deletedPredictions.isEmpty &&
+      deletedZoneIds.isEmpty &&
+      deletedEventIds.isEmpty;
+}
+
+/// Silinen (ya da güncel run'dan çıkan) tek tahmin hücresi.
+class DeletedPrediction {
+  final int zoneId;
+  final DateTime targetTime;
+
+  const DeletedPrediction({required this.zoneId, required this.targetTime});
+}
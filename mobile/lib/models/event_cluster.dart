@@ -0,0 +1,61 @@
+import 'package:flutter_map/flutter_map.dart';
+import 'package:latlong2/latlong.dart';
+
+/// get_event_clusters RPC satırı: bir zoom seviyesinde aynı grid hücresine
+/// düşen yaklaşan etkinlikler.
+///
+/// Tek etkinlikli kümelerde [eventId] ve [name] dolu gelir; [bounds]'a
+/// yakınlaşınca küme bölünür.
+class EventCluster {
+  final String key;
+  final double lat;
+  final double lon;
+  final int count;
+  final int? maxCapacity;
+  final DateTime? firstStart;
+  final String category;
+  final int? eventId;
+  final String? name;
+  final LatLngBounds bounds;
+
+  const EventCluster({
+    required this.key,
+    required this.lat,
+    required this.lon,
+    required this.count,
+    this.maxCapacity,
+    this.firstStart,
+    required this.category,
+    this.eventId,
+    this.name,
+    required this.bounds,
+  });
+
+  factory EventCluster.fromRow(Map<String, dynamic> map) {
+    final lat = (map['lat'] as num?)?.toDouble() ?? 0.0;
+    final lon = (map['lon'] as num?)?.toDouble() ?? 0.0;
+    return EventCluster(
+      key: map['cluster_key'] as String? ?? '',
+      lat: lat,
+      lon: lon,
+      count: (map['event_count'] as num?)?.toInt() ?? 0,
+      maxCapacity: (map['max_capacity'] as num?)?.toInt(),
+      firstStart: DateTime.tryParse(map['first_start'] as String? ?? ''),
+      category: map['category'] as String? ?? 'other',
+      eventId: map['event_id']?.hashCode,
+      name: map['name'] as String?,
+      bounds: LatLngBounds(
+        LatLng(
+          (map['min_lat'] as num?)?.toDouble() ?? lat,
+          (map['min_lon'] as num?)?.toDouble() ?? lon,
+        ),
+        LatLng(
+          (map['max_lat'] as num?)?.toDouble() ?? lat,
+          (map['max_lon'] as num?)?.toDouble() ?? lon,
+        ),
+      ),
+    );
+  }
+
+  bool get isSingle => count == 1;
+}
@@ -1,27 +1,39 @@
 import 'package:flutter_riverpod/flutter_riverpod.dart';
+import 'package:flutter_map/flutter_map.dart';
 import 'package:latlong2/latlong.dart';
 import '../models/prediction.dart';
 import '../models/event.dart';
+import '../models/event_cluster.dart';
 import '../services/supabase_service.dart';
 import '../core/constants.dart';
+import 'realtime_provider.dart';
 
 // State to hold map center and radius for data fetching
 class MapViewState {
   final LatLng center;
   final double radiusKm;
+  final double zoom;
+  // Görünen alan; null ise (harita henüz hareket etmedi) yarıçap sorgusu.
+  final LatLngBounds? bounds;
 
   const MapViewState({
     required this.center,
     required this.radiusKm,
+    this.zoom = AppConstants.defaultZoom,
+    this.bounds,
   });
 
   MapViewState copyWith({
     LatLng? center,
     double? radiusKm,
+    double? zoom,
+    LatLngBounds? bounds,
   }) {
     return MapViewState(
       center: center ?? this.center,
       radiusKm: radiusKm ?? this.radiusKm,
+      zoom: zoom ?? this.zoom,
+      bounds: bounds ?? this.bounds,
     );
   }
 }
@@ -43,11 +55,15 @@ final predictionsProvider = FutureProvider<List<Prediction>>((ref) async {
   final mapState = ref.watch(mapViewStateProvider);
   final svc = SupabaseService.instance;
 
-  final predictions = await svc.getPredictions(
-    mapState.center.latitude,
-    mapState.center.longitude,
-    mapState.radiusKm,
-  );
+  // Uzaklaştırılmış haritada zone yerine ilçe / yaka toplamları gelir.
+  final bounds = mapState.bounds;
+  final predictions = bounds != null
+      ? await svc.getCongestionOverlay(mapState.zoom, bounds)
+      : await svc.getPredictions(
+          mapState.center.latitude,
+          mapState.center.longitude,
+          mapState.radiusKm,
+        );
 
   ref.read(predictionsCacheProvider.notifier).state = predictions;
   return predictions;
@@ -68,5 +84,25 @@ final eventsProvider = FutureProvider<List<TrafficEvent>>((ref) async {
   return events;
 });
 
+final eventClustersCacheProvider =
+    StateProvider<List<EventCluster>>((ref) => const []);
+
+// Görünen alandaki etkinlik kümeleri; harita henüz hareket etmediyse (bbox
+// yok) boş liste ve ekran tek tek marker'a döner.
+final eventClustersProvider = FutureProvider<List<EventCluster>>((ref) async {
+  final mapState = ref.watch(mapViewStateProvider);
+  // Etkinlik batch'i gelince kümeler de sunucuda yenilenmiştir.
+  ref.watch(realtimeEventsProvider);
+
+  final bounds = mapState.bounds;
+  if (bounds == null) return const [];
+
+  final clusters =
+      await SupabaseService.instance.getEventClusters(mapState.zoom, bounds);
+
+  ref.read(eventClustersCacheProvider.notifier).state = clusters;
+  return clusters;
+});
+
 // A provider for selected event details
 final selectedEventProvider = StateProvider<TrafficEvent?>((ref) => null);
@@ -1,63 +1,120 @@
 import 'package:flutter/foundation.dart';
 import 'package:flutter_riverpod/flutter_riverpod.dart';
 import 'package:supabase_flutter/supabase_flutter.dart';
+import '../models/change_set.dart';
 import '../models/prediction.dart';
 import '../services/supabase_service.dart';
 
-/// Supabase Realtime ile predictions tablosundaki değişiklikleri dinler.
-/// Yeni bir prediction INSERT edildiğinde haritayı otomatik günceller.
+/// changes_since ile [version]'dan bu yana değişenleri sayfa sayfa çeker.
+/// İlk çağrıda (version null) yalnızca güncel token gelir. Hata olursa null.
+Future<ChangeSet?> _fetchChanges(int? version) async {
+  final svc = SupabaseService.instance;
+  var changes = await svc.getChangesSince(version);
+  if (changes == null || changes.reset) return changes;
+
+  final predictions = [...changes.predictions];
+  final events = [...changes.events];
+  final deletedPredictions = [...changes.deletedPredictions];
+  final deletedZoneIds = [...changes.deletedZoneIds];
+  final deletedEventIds = [...changes.deletedEventIds];
+  while (changes!.hasMore) {
+    changes = await svc.getChangesSince(changes.version);
+    if (changes == null) return null;
+    predictions.addAll(changes.predictions);
+    events.addAll(changes.events);
+    deletedPredictions.addAll(changes.deletedPredictions);
+    deletedZoneIds.addAll(changes.deletedZoneIds);
+    deletedEventIds.addAll(changes.deletedEventIds);
+  }
+  return ChangeSet(
+    version: changes.version,
+    reset: false,
+    hasMore: false,
+    predictions: predictions,
+    events: events,
+    deletedPredictions: deletedPredictions,
+    deletedZoneIds: deletedZoneIds,
+    deletedEventIds: deletedEventIds,
+  );
+}
+
+/// realtime_notifications tablosuna [kind] türündeki INSERT'leri dinleyen
+/// kanal. Sunucu her prediction run / etkinlik batch'i için tek satır yazar;
+/// satırların kendisi changes_since ile çekilir.
+RealtimeChannel _subscribeNotifications(
+  String kind,
+  void Function(Map<String, dynamic> record) onNotification,
+  void Function() onSubscribed,
+) {
+  return Supabase.instance.client
+      .channel('public:realtime_notifications:$kind')
+      .onPostgresChanges(
+        event: PostgresChangeEvent.insert,
+        schema: 'public',
+        table: 'realtime_notifications',
+        filter: PostgresChangeFilter(
+          type: PostgresChangeFilterType.eq,
+          column: 'kind',
+          value: kind,
+        ),
+        callback: (payload) => onNotification(payload.newRecord),
+      )
+      .subscribe((status, [error]) {
+        if (status == RealtimeSubscribeStatus.subscribed) onSubscribed();
+      });
+}
+
+/// Yeni prediction run bildirimlerini dinler ve run'ın değiştirdiği
+/// hücreleri changes_since ile (yalnızca fark) alıp haritayı günceller.
+/// Bağlantı koptuktan sonra yeniden abone olunca da aradaki değişiklikler
+/// aynı şekilde alınır.
 class RealtimePredictionsNotifier extends StateNotifier<List<Prediction>> {
   RealtimeChannel? _channel;
+  int? _version;
 
   RealtimePredictionsNotifier() : super([]) {
     _subscribe();
   }
 
   void _subscribe() {
-    final client = Supabase.instance.client;
-
-    _channel = client
-        .channel('public:predictions')
-        .onPostgresChanges(
-          event: PostgresChangeEvent.insert,
-          schema: 'public',
-          table: 'predictions',
-          callback: (payload) {
-            debugPrint('[Realtime] New prediction: ${payload.newRecord}');
-            _onNewPrediction(payload.newRecord);
-          },
-        )
-        .subscribe();
-
-    debugPrint('[Realtime] Subscribed to predictions channel');
+    _channel = _subscribeNotifications(
+      'prediction_run',
+      (record) {
+        debugPrint('[Realtime] Prediction run: ${record['run_id']} '
+            '${record['summary']}');
+        _catchUp();
+      },
+      _catchUp,
+    );
+
+    debugPrint('[Realtime] Subscribed to prediction run notifications');
   }
 
-  void _onNewPrediction(Map<String, dynamic> record) {
-    try {
-      final pred = Prediction(
-        zoneId: record['zone_id']?.hashCode ?? 0,
-        lat: 0, // Will be resolved on next full fetch
-        lon: 0,
-        score: (record['congestion_score'] as num?)?.toInt() ?? 0,
-        timestamp:
-            DateTime.tryParse(record['target_time'] ?? '') ?? DateTime.now(),
-        label: SupabaseService.scoreToLabel(
-            (record['congestion_score'] as num?)?.toInt() ?? 0),
-        zoneName: null,
-      );
-
-      // Update state: replace existing zone prediction or add new
-      final updated = [...state];
-      final idx = updated.indexWhere((p) => p.zoneId == pred.zoneId);
-      if (idx >= 0) {
-        updated[idx] = pred;
-      } else {
-        updated.add(pred);
+  Future<void> _catchUp() async {
+    final changes = await _fetchChanges(_version);
+    if (changes == null || !mounted) return;
+    _version = changes.version;
+    if (changes.reset || changes.isEmpty) return;
+
+    // Zone başına şu andan sonraki ilk saat (haritanın gösterdiği hücre).
+    final now = DateTime.now();
+    final nextByZone = <int, Prediction>{};
+    for (final cell in changes.predictions) {
+      if (!cell.timestamp.isAfter(now)) continue;
+      final current = nextByZone[cell.zoneId];
+      if (current == null || cell.timestamp.isBefore(current.timestamp)) {
+        nextByZone[cell.zoneId] = cell;
       }
-      state = updated;
-    } catch (e) {
-      debugPrint('[Realtime] Error parsing prediction: $e');
     }
+
+    final deleted = changes.deletedZoneIds.toSet();
+    final updated = state
+        .where((p) => !deleted.contains(p.zoneId))
+        .map((p) => nextByZone.remove(p.zoneId) ?? p)
+        .toList()
+      ..addAll(nextByZone.values);
+    state = updated;
+    debugPrint('[Realtime] Caught up predictions to v${changes.version}');
   }
 
   @override
@@ -73,31 +130,40 @@ final realtimePredictionsProvider =
   (ref) => RealtimePredictionsNotifier(),
 );
 
-/// Supabase Realtime ile events tablosundaki değişiklikleri dinler.
+/// Etkinlik batch bildirimlerini dinler. Batch (ya da bağlantı koptuğu
+/// sırada kaçırılanlar) görünen etkinlikleri değiştirdiyse refetch tetikler.
 class RealtimeEventsNotifier extends StateNotifier<int> {
   RealtimeChannel? _channel;
+  int? _version;
 
-  /// State is a simple counter that increments on each new event,
+  /// State is a simple counter that increments when events changed,
   /// triggering a refetch in the UI.
   RealtimeEventsNotifier() : super(0) {
     _subscribe();
   }
 
   void _subscribe() {
-    final client = Supabase.instance.client;
-
-    _channel = client
-        .channel('public:events')
-        .onPostgresChanges(
-          event: PostgresChangeEvent.insert,
-          schema: 'public',
-          table: 'events',
-          callback: (payload) {
-            debugPrint('[Realtime] New event: ${payload.newRecord['name']}');
-            state = state + 1; // Trigger refetch
-          },
-        )
-        .subscribe();
+    _channel = _subscribeNotifications(
+      'events',
+      (record) {
+        debugPrint('[Realtime] Events batch: ${record['summary']}');
+        _catchUp();
+      },
+      _catchUp,
+    );
+  }
+
+  Future<void> _catchUp() async {
+    final first = _version == null;
+    final changes = await _fetchChanges(_version);
+    if (changes == null || !mounted) return;
+    _version = changes.version;
+    if (first) return;
+    if (changes.reset ||
+        changes.events.isNotEmpty ||
+        changes.deletedEventIds.isNotEmpty) {
+      state = state + 1; // Trigger refetch
+    }
   }
 
   @override
@@ -107,7 +173,7 @@ class RealtimeEventsNotifier extends StateNotifier<int> {
   }
 }
 
-/// Provider that signals new events have been inserted.
+/// Provider that signals events have changed.
 final realtimeEventsProvider =
     StateNotifierProvider<RealtimeEventsNotifier, int>(
   (ref) => RealtimeEventsNotifier(),
@@ -9,6 +9,7 @@ import '../core/constants.dart';
 import '../core/api_keys.dart';
 import '../models/prediction.dart';
 import '../models/event.dart';
+import '../models/event_cluster.dart';
 import '../providers/map_provider.dart';
 import '../providers/settings_provider.dart';
 import '../providers/realtime_provider.dart';
@@ -57,7 +58,10 @@ class _MapScreenState extends ConsumerState<MapScreen> {
 
   void _onPositionChanged(MapCamera camera, bool hasGesture) {
     if (!hasGesture) return;
+    _updateViewState(camera);
+  }
 
+  void _updateViewState(MapCamera camera) {
     final center = camera.center;
     final bounds = camera.visibleBounds;
 
@@ -72,6 +76,8 @@ class _MapScreenState extends ConsumerState<MapScreen> {
     ref.read(mapViewStateProvider.notifier).state = MapViewState(
       center: center,
       radiusKm: radius.clamp(1.0, 50.0),
+      zoom: camera.zoom,
+      bounds: bounds,
     );
   }
 
@@ -104,10 +110,22 @@ class _MapScreenState extends ConsumerState<MapScreen> {
     final circleMarkers =
         CongestionOverlay.buildCircles(visiblePredictions, isDark: isDark);
 
-    // Etkinlik marker'larını oluştur
-    final markers = visibleEvents
-        .map((event) => EventMarker.buildMarker(context, ref, event))
-        .toList();
+    // Etkinlik marker'larını oluştur: bbox varsa sunucu kümeleri (hücre
+    // başına bir marker), yoksa tek tek etkinlikler.
+    final clusters = ref.watch(eventClustersProvider).valueOrNull ??
+        ref.watch(eventClustersCacheProvider);
+    final eventsById = {for (final event in visibleEvents) event.id: event};
+    final markers = clusters.isEmpty
+        ? visibleEvents
+            .map((event) => EventMarker.buildMarker(context, ref, event))
+            .toList()
+        : clusters.map((cluster) {
+            final event = cluster.isSingle ? eventsById[cluster.eventId] : null;
+            return event != null
+                ? EventMarker.buildMarker(context, ref, event)
+                : EventMarker.buildClusterMarker(
+                    cluster, () => _zoomToCluster(cluster));
+          }).toList();
 
     final overlayColor = isDark ? Colors.black : Colors.white;
     final overlayTextColor = isDark ? Colors.white : Colors.black87;
@@ -365,6 +383,27 @@ class _MapScreenState extends ConsumerState<MapScreen> {
     );
   }
 
+  /// Kümenin etkinliklerini kapsayan alana yakınlaşır; küme bir sonraki
+  /// zoom seviyesinde bölünür.
+  void _zoomToCluster(EventCluster cluster) {
+    final camera = _mapController.camera;
+    final bounds = cluster.bounds;
+    if (bounds.south == bounds.north && bounds.west == bounds.east) {
+      // Aynı noktadaki etkinlikler (ör. tek mekân): yalnızca yakınlaş.
+      _mapController.move(
+        LatLng(cluster.lat, cluster.lon),
+        (camera.zoom + 2).clamp(0.0, 18.0).toDouble(),
+      );
+    } else {
+      _mapController.fitCamera(CameraFit.bounds(
+        bounds: bounds,
+        padding: const EdgeInsets.all(64),
+        maxZoom: 18,
+      ));
+    }
+    _updateViewState(_mapController.camera);
+  }
+
   Widget _buildWeatherAlert(
       BuildContext context, WidgetRef ref, Color overlayColor) {
     final weatherAsync = ref.watch(weatherProvider);
@@ -1,7 +1,10 @@
 import 'package:flutter/foundation.dart';
 import 'package:supabase_flutter/supabase_flutter.dart';
+import 'package:flutter_map/flutter_map.dart';
 import '../models/prediction.dart';
 import '../models/event.dart';
+import '../models/event_cluster.dart';
+import '../models/change_set.dart';
 
 /// Supabase üzerinden veri okuma servisi.
 /// PostgREST REST API ve RPC fonksiyonlarını kullanır.
@@ -83,6 +86,44 @@ class SupabaseService {
     }
   }
 
+  /// Görünen alan için yoğunluk katmanı. Zoom'a göre zone, ilçe ya da yaka
+  /// seviyesi döner (get_congestion_overlay); satır sayısı sınırlıdır.
+  Future<List<Prediction>> getCongestionOverlay(
+    double zoom,
+    LatLngBounds bounds,
+  ) async {
+    try {
+      final response = await _client.rpc('get_congestion_overlay', params: {
+        'p_zoom': zoom,
+        'p_min_lon': bounds.west,
+        'p_min_lat': bounds.south,
+        'p_max_lon': bounds.east,
+        'p_max_lat': bounds.north,
+      });
+
+      final list = response as List<dynamic>;
+      final predictions = list.map((row) {
+        final map = row as Map<String, dynamic>;
+        return Prediction(
+          zoneId: map['zone_id']?.hashCode ?? 0,
+          lat: (map['zone_centroid_lat'] as num?)?.toDouble() ?? 0.0,
+          lon: (map['zone_centroid_lon'] as num?)?.toDouble() ?? 0.0,
+          score: (map['congestion_score'] as num?)?.toInt() ?? 0,
+          timestamp:
+              DateTime.tryParse(map['target_time'] ?? '') ?? DateTime.now(),
+          label: scoreToLabel(map['congestion_score'] as int? ?? 0),
+          zoneName: map['zone_name'] as String?,
+        );
+      }).toList();
+      debugPrint(
+          '[SupabaseService] getCongestionOverlay ok: ${predictions.length}');
+      return predictions;
+    } catch (e) {
+      debugPrint('[SupabaseService] getCongestionOverlay error: $e');
+      return Prediction.mockData();
+    }
+  }
+
   // ── Events ────────────────────────────────────────────────────────────────
 
   /// Belirtilen koordinata yakın etkinlikleri RPC ile getirir.
@@ -110,29 +151,7 @@ class SupabaseService {
 
       final list = response as List<dynamic>;
       final events = list
-          .map((row) {
-            final map = row as Map<String, dynamic>;
-            final startTime = _parseEventDateTime(map['start_time']);
-            if (startTime == null) {
-              debugPrint(
-                  '[SupabaseService] skipping event with invalid start_time: ${map['event_id']}');
-              return null;
-            }
-
-            return TrafficEvent(
-              id: map['event_id']?.hashCode ?? 0,
-              name: map['name'] as String? ?? '',
-              category: map['category'] as String? ?? 'other',
-              lat: (map['lat'] as num?)?.toDouble() ?? 0.0,
-              lon: (map['lon'] as num?)?.toDouble() ?? 0.0,
-              startTime: startTime,
-              endTime: _parseEventDateTime(map['end_time']),
-              capacity: map['capacity'] as int?,
-              trafficImpact: estimateTrafficImpact(map['capacity'] as int?),
-              venue: map['venue_name'] as String?,
-              source: map['source'] as String?,
-            );
-          })
+          .map((row) => _eventFromRow(row as Map<String, dynamic>))
           .whereType<TrafficEvent>()
           .toList();
       debugPrint('[SupabaseService] getEvents ok: ${events.length}');
@@ -143,8 +162,136 @@ class SupabaseService {
     }
   }
 
+  /// Görünen alandaki etkinlik kümeleri (get_event_clusters); sunucu
+  /// kümeleri her etkinlik çekiminden sonra zoom başına yeniden hesaplar.
+  Future<List<EventCluster>> getEventClusters(
+    double zoom,
+    LatLngBounds bounds,
+  ) async {
+    try {
+      final response = await _client.rpc('get_event_clusters', params: {
+        'p_zoom': zoom,
+        'p_min_lon': bounds.west,
+        'p_min_lat': bounds.south,
+        'p_max_lon': bounds.east,
+        'p_max_lat': bounds.north,
+      });
+
+      final list = response as List<dynamic>;
+      final clusters = list
+          .map((row) => EventCluster.fromRow(row as Map<String, dynamic>))
+          .toList();
+      debugPrint('[SupabaseService] getEventClusters ok: ${clusters.length}');
+      return clusters;
+    } catch (e) {
+      debugPrint('[SupabaseService] getEventClusters error: $e');
+      return const [];
+    }
+  }
+
+  // ── Delta sync ────────────────────────────────────────────────────────────
+
+  /// [version]'dan bu yana değişen tahmin hücreleri ve etkinlikler
+  /// (changes_since). [version] null ise yalnızca güncel token döner
+  /// (reset). [bounds] verilirse yalnızca o alandaki değişiklikler gelir.
+  Future<ChangeSet?> getChangesSince(
+    int? version, {
+    LatLngBounds? bounds,
+  }) async {
+    try {
+      final params = <String, dynamic>{'p_version': version};
+      if (bounds != null) {
+        params['p_min_lon'] = bounds.west;
+        params['p_min_lat'] = bounds.south;
+        params['p_max_lon'] = bounds.east;
+        params['p_max_lat'] = bounds.north;
+      }
+
+      final response = await _client.rpc('changes_since', params: params);
+
+      final map = response as Map<String, dynamic>;
+      final deleted = map['deleted'] as Map<String, dynamic>? ?? const {};
+      final changes = ChangeSet(
+        version: (map['version'] as num).toInt(),
+        reset: map['reset'] as bool? ?? false,
+        hasMore: map['has_more'] as bool? ?? false,
+        predictions: (map['predictions'] as List<dynamic>? ?? const [])
+            .map((row) {
+          final cell = row as Map<String, dynamic>;
+          final score = (cell['congestion_score'] as num?)?.toInt() ?? 0;
+          return Prediction(
+            zoneId: cell['zone_id']?.hashCode ?? 0,
+            lat: (cell['lat'] as num?)?.toDouble() ?? 0.0,
+            lon: (cell['lon'] as num?)?.toDouble() ?? 0.0,
+            score: score,
+            timestamp:
+                DateTime.tryParse(cell['target_time'] ?? '') ?? DateTime.now(),
+            label: scoreToLabel(score),
+            zoneName: cell['zone_name'] as String?,
+          );
+        }).toList(),
+        events: (map['events'] as List<dynamic>? ?? const [])
+            .map((row) => _eventFromRow(row as Map<String, dynamic>))
+            .whereType<TrafficEvent>()
+            .toList(),
+        deletedPredictions:
+            (deleted['predictions'] as List<dynamic>? ?? const [])
+                .map((row) {
+                  final cell = row as Map<String, dynamic>;
+                  final targetTime =
+                      DateTime.tryParse(cell['target_time'] ?? '');
+                  if (targetTime == null) return null;
+                  return DeletedPrediction(
+                    zoneId: cell['zone_id']?.hashCode ?? 0,
+                    targetTime: targetTime,
+                  );
+                })
+                .whereType<DeletedPrediction>()
+                .toList(),
+        deletedZoneIds: (deleted['zones'] as List<dynamic>? ?? const [])
+            .map((id) => id.hashCode)
+            .toList(),
+        deletedEventIds: (deleted['events'] as List<dynamic>? ?? const [])
+            .map((id) => id.hashCode)
+            .toList(),
+      );
+      debugPrint('[SupabaseService] getChangesSince ok: '
+          '${changes.predictions.length} cell, ${changes.events.length} event '
+          '→ v${changes.version}');
+      return changes;
+    } catch (e) {
+      debugPrint('[SupabaseService] getChangesSince error: $e');
+      return null;
+    }
+  }
+
   // ── Helpers ───────────────────────────────────────────────────────────────
 
+  /// get_events_nearby / changes_since satırından etkinlik; geçersiz
+  /// start_time ise null.
+  static TrafficEvent? _eventFromRow(Map<String, dynamic> map) {
+    final startTime = _parseEventDateTime(map['start_time']);
+    if (startTime == null) {
+      debugPrint(
+          '[SupabaseService] skipping event with invalid start_time: ${map['event_id']}');
+      return null;
+    }
+
+    return TrafficEvent(
+      id: map['event_id']?.hashCode ?? 0,
+      name: map['name'] as String? ?? '',
+      category: map['category'] as String? ?? 'other',
+      lat: (map['lat'] as num?)?.toDouble() ?? 0.0,
+      lon: (map['lon'] as num?)?.toDouble() ?? 0.0,
+      startTime: startTime,
+      endTime: _parseEventDateTime(map['end_time']),
+      capacity: map['capacity'] as int?,
+      trafficImpact: estimateTrafficImpact(map['capacity'] as int?),
+      venue: map['venue_name'] as String?,
+      source: map['source'] as String?,
+    );
+  }
+
   static String scoreToLabel(int score) {
     if (score <= 30) return 'Az';
     if (score <= 60) return 'Orta';
@@ -1,8 +1,11 @@
+import 'dart:math' as math;
+
 import 'package:flutter/material.dart';
 import 'package:flutter_map/flutter_map.dart';
 import 'package:flutter_riverpod/flutter_riverpod.dart';
 import 'package:latlong2/latlong.dart';
 import '../models/event.dart';
+import '../models/event_cluster.dart';
 import '../core/theme.dart';
 import '../providers/map_provider.dart';
 import 'event_detail_sheet.dart';
@@ -90,6 +93,59 @@ class EventMarker {
     );
   }
 
+  /// Birden çok etkinlik (ya da listede olmayan tek etkinlik) için sayılı
+  /// küme marker'ı; boyut etkinlik sayısıyla büyür.
+  static Marker buildClusterMarker(
+      EventCluster cluster, VoidCallback onTap) {
+    final markerColor = categoryColor(cluster.category);
+    // 1 → 36 px, 10 → 48 px, 100+ → 60-64 px.
+    final size =
+        (36 + 12 * math.log(math.max(cluster.count, 1)) / math.ln10)
+            .clamp(36.0, 64.0)
+            .toDouble();
+    final capacity = cluster.maxCapacity;
+
+    return Marker(
+      point: LatLng(cluster.lat, cluster.lon),
+      width: size,
+      height: size,
+      child: GestureDetector(
+        onTap: onTap,
+        child: Tooltip(
+          message: cluster.isSingle && cluster.name != null
+              ? cluster.name!
+              : '${cluster.count} etkinlik'
+                  '${capacity != null ? '\nEn büyük kapasite: $capacity' : ''}',
+          child: Container(
+            decoration: BoxDecoration(
+              shape: BoxShape.circle,
+              color: markerColor.withAlpha(200),
+              border:
+                  Border.all(color: Colors.white.withAlpha(230), width: 2),
+              boxShadow: [
+                BoxShadow(
+                  color: markerColor.withAlpha(130),
+                  blurRadius: 12,
+                  spreadRadius: 2,
+                ),
+              ],
+            ),
+            child: Center(
+              child: Text(
+                '${cluster.count}',
+                style: const TextStyle(
+                  color: Colors.white,
+                  fontWeight: FontWeight.bold,
+                  fontSize: 14,
+                ),
+              ),
+            ),
+          ),
+        ),
+      ),
+    );
+  }
+
   static void _showEventDetails(BuildContext context, TrafficEvent event) {
     showModalBottomSheet(
       context: context,
@@ -12,11 +12,17 @@ CREATE TABLE IF NOT EXISTS traffic_zones (
     name                   VARCHAR(255) NOT NULL UNIQUE,
     polygon                geometry(POLYGON, 4326) NOT NULL,
     base_congestion_level  DOUBLE PRECISION NOT NULL DEFAULT 0.5,
-    rush_hour_multiplier   DOUBLE PRECISION NOT NULL DEFAULT 1.5
+    rush_hour_multiplier   DOUBLE PRECISION NOT NULL DEFAULT 1.5,
+
+    -- Derived once on write so RPCs never cast/centroid per row per call.
+    polygon_geog   geography(POLYGON, 4326) GENERATED ALWAYS AS (polygon::geography) STORED,
+    centroid       geometry(POINT, 4326)    GENERATED ALWAYS AS (ST_Centroid(polygon)) STORED,
+    centroid_geog  geography(POINT, 4326)   GENERATED ALWAYS AS (ST_Centroid(polygon)::geography) STORED
 );
 
-CREATE INDEX IF NOT EXISTS ix_traffic_zones_name     ON traffic_zones (name);
-CREATE INDEX IF NOT EXISTS ix_traffic_zones_polygon  ON traffic_zones USING GIST (polygon);
+CREATE INDEX IF NOT EXISTS ix_traffic_zones_name          ON traffic_zones (name);
+CREATE INDEX IF NOT EXISTS ix_traffic_zones_polygon       ON traffic_zones USING GIST (polygon);
+CREATE INDEX IF NOT EXISTS ix_traffic_zones_polygon_geog  ON traffic_zones USING GIST (polygon_geog);
 
 -- ── events ──────────────────────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS events (
@@ -33,13 +39,16 @@ CREATE TABLE IF NOT EXISTS events (
     category    VARCHAR(50) NOT NULL,   -- concert | sports | conference | other
     source      VARCHAR(100) NOT NULL,
     source_id   VARCHAR(255) NOT NULL,
-    updated_at  TIMESTAMPTZ
+    updated_at  TIMESTAMPTZ,
+
+    location_geog  geography(POINT, 4326) GENERATED ALWAYS AS (location::geography) STORED
 );
 
 CREATE INDEX IF NOT EXISTS ix_events_start_time          ON events (start_time);
 CREATE INDEX IF NOT EXISTS ix_events_category             ON events (category);
 CREATE UNIQUE INDEX IF NOT EXISTS ix_events_source_source_id ON events (source, source_id);
 CREATE INDEX IF NOT EXISTS ix_events_location             ON events USING GIST (location);
+CREATE INDEX IF NOT EXISTS ix_events_location_geog        ON events USING GIST (location_geog);
 
 -- ── predictions ─────────────────────────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS predictions (
@@ -68,6 +77,6 @@ BEGIN
     END IF;
 END
 $$;
-ALTER PUBLICATION supabase_realtime ADD TABLE predictions;
-ALTER PUBLICATION supabase_realtime ADD TABLE events;
+-- predictions / events are announced per batch through realtime_notifications
+-- (18-realtime-notifications.sql), not row by row.
 ALTER PUBLICATION supabase_realtime ADD TABLE traffic_zones;
@@ -0,0 +1,459 @@
+-- ============================================================================
+-- 06-traffic-rollups.sql
+-- Raw İBB traffic snapshots (15 min) and their hourly / daily rollups.
+--
+-- traffic_snapshots is range-partitioned by day on observed_at so that raw
+-- retention is a DROP TABLE per partition. Rollup jobs are incremental: each
+-- level keeps a watermark in traffic_rollup_watermarks and only aggregates
+-- complete buckets newer than it. Snapshots that arrive late (behind the
+-- hourly watermark) set the level's dirty_from, and the next run re-aggregates
+-- from there; the hourly run passes the dirty range on to the daily level.
+--
+-- Scheduled from the Python worker (app/tasks/rollups.py).
+-- ============================================================================
+
+-- ── traffic_snapshots (raw, short retention) ────────────────────────────────
+CREATE TABLE IF NOT EXISTS traffic_snapshots (
+    observed_at    TIMESTAMPTZ NOT NULL,       -- floored to the 15-min fetch slot
+    segment_id     VARCHAR(32) NOT NULL,       -- İBB GEOHASH
+    zone_id        UUID,                       -- resolved on insert, may be NULL
+    road_name      VARCHAR(255),
+    direction      VARCHAR(64),
+    speed_kmh      DOUBLE PRECISION NOT NULL,
+    vehicle_count  INTEGER NOT NULL DEFAULT 0,
+    location       geometry(POINT, 4326),
+    PRIMARY KEY (segment_id, observed_at)
+) PARTITION BY RANGE (observed_at);
+
+CREATE INDEX IF NOT EXISTS ix_traffic_snapshots_observed_at ON traffic_snapshots (observed_at);
+CREATE INDEX IF NOT EXISTS ix_traffic_snapshots_zone_observed ON traffic_snapshots (zone_id, observed_at);
+
+-- Assign the containing zone once at write time so rollups never need a
+-- spatial join. Uses the GIST index on traffic_zones.polygon.
+CREATE OR REPLACE FUNCTION traffic_snapshots_assign_zone()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.zone_id IS NULL AND NEW.location IS NOT NULL THEN
+        SELECT z.id INTO NEW.zone_id
+        FROM traffic_zones z
+        WHERE ST_Intersects(z.polygon, NEW.location)
+        LIMIT 1;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_snapshots_assign_zone ON traffic_snapshots;
+CREATE TRIGGER trg_traffic_snapshots_assign_zone
+    BEFORE INSERT ON traffic_snapshots
+    FOR EACH ROW EXECUTE FUNCTION traffic_snapshots_assign_zone();
+
+-- ── Rollup tables (long retention) ──────────────────────────────────────────
+-- scope = 'segment' (scope_key = İBB GEOHASH) | 'zone' (scope_key = zone UUID)
+CREATE TABLE IF NOT EXISTS traffic_rollups_hourly (
+    scope              VARCHAR(8)  NOT NULL,
+    scope_key          VARCHAR(64) NOT NULL,
+    bucket_start       TIMESTAMPTZ NOT NULL,
+    sample_count       INTEGER NOT NULL,
+    avg_speed_kmh      DOUBLE PRECISION NOT NULL,
+    min_speed_kmh      DOUBLE PRECISION NOT NULL,
+    max_speed_kmh      DOUBLE PRECISION NOT NULL,
+    avg_vehicle_count  DOUBLE PRECISION NOT NULL,
+    max_vehicle_count  INTEGER NOT NULL,
+    PRIMARY KEY (scope, scope_key, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS ix_traffic_rollups_hourly_bucket ON traffic_rollups_hourly (bucket_start);
+
+CREATE TABLE IF NOT EXISTS traffic_rollups_daily (
+    scope              VARCHAR(8)  NOT NULL,
+    scope_key          VARCHAR(64) NOT NULL,
+    bucket_start       TIMESTAMPTZ NOT NULL,   -- Europe/Istanbul midnight
+    sample_count       INTEGER NOT NULL,
+    avg_speed_kmh      DOUBLE PRECISION NOT NULL,
+    min_speed_kmh      DOUBLE PRECISION NOT NULL,
+    max_speed_kmh      DOUBLE PRECISION NOT NULL,
+    avg_vehicle_count  DOUBLE PRECISION NOT NULL,
+    max_vehicle_count  INTEGER NOT NULL,
+    PRIMARY KEY (scope, scope_key, bucket_start)
+);
+
+CREATE INDEX IF NOT EXISTS ix_traffic_rollups_daily_bucket ON traffic_rollups_daily (bucket_start);
+
+CREATE TABLE IF NOT EXISTS traffic_rollup_watermarks (
+    level            VARCHAR(16) PRIMARY KEY,   -- 'hourly' | 'daily'
+    processed_until  TIMESTAMPTZ NOT NULL,      -- exclusive upper bound
+    dirty_from       TIMESTAMPTZ,               -- oldest late input behind the watermark
+    updated_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE traffic_rollup_watermarks ADD COLUMN IF NOT EXISTS dirty_from TIMESTAMPTZ;
+
+-- Late snapshots (İBB sometimes re-serves old slots; the fetch job accepts
+-- them within raw retention) land in hours the hourly rollup has already
+-- passed. Record the oldest one so the next run re-aggregates from there.
+-- A rollup running concurrently holds the watermark row; the UPDATE waits
+-- and re-checks against the watermark that run commits.
+CREATE OR REPLACE FUNCTION traffic_snapshots_mark_late()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_oldest TIMESTAMPTZ;
+BEGIN
+    SELECT min(observed_at) INTO v_oldest FROM new_rows;
+
+    UPDATE traffic_rollup_watermarks
+    SET dirty_from = least(dirty_from, v_oldest)
+    WHERE level = 'hourly'
+      AND processed_until > v_oldest;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_snapshots_mark_late_ins ON traffic_snapshots;
+CREATE TRIGGER trg_traffic_snapshots_mark_late_ins
+    AFTER INSERT ON traffic_snapshots
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION traffic_snapshots_mark_late();
+
+-- The fetch job upserts; a re-served slot arrives as an UPDATE.
+DROP TRIGGER IF EXISTS trg_traffic_snapshots_mark_late_upd ON traffic_snapshots;
+CREATE TRIGGER trg_traffic_snapshots_mark_late_upd
+    AFTER UPDATE ON traffic_snapshots
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION traffic_snapshots_mark_late();
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- ensure_traffic_snapshot_partitions
+-- Creates daily partitions from p_days_back days ago up to p_days_ahead days
+-- in the future. Called by the traffic fetch job before each insert batch
+-- (cheap no-op when partitions already exist); the job passes the age of
+-- its oldest row so late samples still have a partition.
+-- ─────────────────────────────────────────────────────────────────────────────
+-- The one-argument version would make named-argument calls ambiguous.
+DROP FUNCTION IF EXISTS ensure_traffic_snapshot_partitions(INTEGER);
+
+CREATE OR REPLACE FUNCTION ensure_traffic_snapshot_partitions(
+    p_days_ahead INTEGER DEFAULT 2,
+    p_days_back  INTEGER DEFAULT 1
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_day     DATE;
+    v_name    TEXT;
+    v_created INTEGER := 0;
+BEGIN
+    FOR v_day IN
+        SELECT generate_series(
+            (now() AT TIME ZONE 'UTC')::date - greatest(p_days_back, 0),
+            (now() AT TIME ZONE 'UTC')::date + p_days_ahead,
+            INTERVAL '1 day'
+        )::date
+    LOOP
+        v_name := 'traffic_snapshots_p' || to_char(v_day, 'YYYYMMDD');
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF traffic_snapshots FOR VALUES FROM (%L) TO (%L)',
+                v_name,
+                v_day::timestamp AT TIME ZONE 'UTC',
+                (v_day + 1)::timestamp AT TIME ZONE 'UTC'
+            );
+            v_created := v_created + 1;
+        END IF;
+    END LOOP;
+    RETURN v_created;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- rollup_traffic_hourly
+-- Aggregates complete hours of traffic_snapshots newer than the 'hourly'
+-- watermark (or its dirty_from, when late snapshots arrived) into
+-- traffic_rollups_hourly, per segment and per zone. Re-aggregated hours are
+-- passed on to the 'daily' level's dirty_from. Returns the number of rollup
+-- rows written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION rollup_traffic_hourly()
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_from  TIMESTAMPTZ;
+    v_to    TIMESTAMPTZ := date_trunc('hour', now());
+    v_dirty TIMESTAMPTZ;
+    v_rows  INTEGER := 0;
+    v_count INTEGER;
+BEGIN
+    SELECT processed_until, date_trunc('hour', dirty_from) INTO v_from, v_dirty
+    FROM traffic_rollup_watermarks
+    WHERE level = 'hourly'
+    FOR UPDATE;
+
+    IF v_from IS NULL THEN
+        SELECT date_trunc('hour', min(observed_at)) INTO v_from FROM traffic_snapshots;
+    END IF;
+
+    -- Geç gelen örnekler: o saatten itibaren yeniden topla (saatler baştan
+    -- hesaplanır, ON CONFLICT eski değeri ezer).
+    v_from := least(v_from, v_dirty);
+
+    IF v_from IS NULL OR v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    INSERT INTO traffic_rollups_hourly AS r (
+        scope, scope_key, bucket_start, sample_count,
+        avg_speed_kmh, min_speed_kmh, max_speed_kmh,
+        avg_vehicle_count, max_vehicle_count
+    )
+    SELECT
+        'segment',
+        s.segment_id,
+        date_trunc('hour', s.observed_at),
+        count(*),
+        avg(s.speed_kmh),
+        min(s.speed_kmh),
+        max(s.speed_kmh),
+        avg(s.vehicle_count),
+        max(s.vehicle_count)
+    FROM traffic_snapshots s
+    WHERE s.observed_at >= v_from AND s.observed_at < v_to
+    GROUP BY s.segment_id, date_trunc('hour', s.observed_at)
+    ON CONFLICT (scope, scope_key, bucket_start) DO UPDATE SET
+        sample_count      = EXCLUDED.sample_count,
+        avg_speed_kmh     = EXCLUDED.avg_speed_kmh,
+        min_speed_kmh     = EXCLUDED.min_speed_kmh,
+        max_speed_kmh     = EXCLUDED.max_speed_kmh,
+        avg_vehicle_count = EXCLUDED.avg_vehicle_count,
+        max_vehicle_count = EXCLUDED.max_vehicle_count;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    v_rows := v_rows + v_count;
+
+    INSERT INTO traffic_rollups_hourly AS r (
+        scope, scope_key, bucket_start, sample_count,
+        avg_speed_kmh, min_speed_kmh, max_speed_kmh,
+        avg_vehicle_count, max_vehicle_count
+    )
+    SELECT
+        'zone',
+        s.zone_id::text,
+        date_trunc('hour', s.observed_at),
+        count(*),
+        avg(s.speed_kmh),
+        min(s.speed_kmh),
+        max(s.speed_kmh),
+        avg(s.vehicle_count),
+        max(s.vehicle_count)
+    FROM traffic_snapshots s
+    WHERE s.observed_at >= v_from AND s.observed_at < v_to
+      AND s.zone_id IS NOT NULL
+    GROUP BY s.zone_id, date_trunc('hour', s.observed_at)
+    ON CONFLICT (scope, scope_key, bucket_start) DO UPDATE SET
+        sample_count      = EXCLUDED.sample_count,
+        avg_speed_kmh     = EXCLUDED.avg_speed_kmh,
+        min_speed_kmh     = EXCLUDED.min_speed_kmh,
+        max_speed_kmh     = EXCLUDED.max_speed_kmh,
+        avg_vehicle_count = EXCLUDED.avg_vehicle_count,
+        max_vehicle_count = EXCLUDED.max_vehicle_count;
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    v_rows := v_rows + v_count;
+
+    IF v_dirty IS NOT NULL THEN
+        UPDATE traffic_rollup_watermarks
+        SET dirty_from = least(dirty_from, v_dirty)
+        WHERE level = 'daily'
+          AND processed_until > v_dirty;
+    END IF;
+
+    INSERT INTO traffic_rollup_watermarks (level, processed_until, updated_at)
+    VALUES ('hourly', v_to, now())
+    ON CONFLICT (level) DO UPDATE SET
+        processed_until = EXCLUDED.processed_until,
+        dirty_from      = NULL,
+        updated_at      = EXCLUDED.updated_at;
+
+    RETURN v_rows;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- rollup_traffic_daily
+-- Folds complete Istanbul-local days of traffic_rollups_hourly newer than the
+-- 'daily' watermark (or the day of its dirty_from) into traffic_rollups_daily.
+-- Never reads raw snapshots and never runs ahead of the hourly watermark.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION rollup_traffic_daily()
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_from    TIMESTAMPTZ;
+    v_to      TIMESTAMPTZ;
+    v_hourly  TIMESTAMPTZ;
+    v_dirty   TIMESTAMPTZ;
+    v_rows    INTEGER;
+BEGIN
+    SELECT processed_until INTO v_hourly
+    FROM traffic_rollup_watermarks
+    WHERE level = 'hourly';
+
+    IF v_hourly IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    v_to := date_trunc('day', v_hourly, 'Europe/Istanbul');
+
+    SELECT processed_until, date_trunc('day', dirty_from, 'Europe/Istanbul') INTO v_from, v_dirty
+    FROM traffic_rollup_watermarks
+    WHERE level = 'daily'
+    FOR UPDATE;
+
+    IF v_from IS NULL THEN
+        SELECT date_trunc('day', min(bucket_start), 'Europe/Istanbul') INTO v_from
+        FROM traffic_rollups_hourly;
+    END IF;
+
+    v_from := least(v_from, v_dirty);
+
+    IF v_from IS NULL OR v_from >= v_to THEN
+        RETURN 0;
+    END IF;
+
+    INSERT INTO traffic_rollups_daily AS r (
+        scope, scope_key, bucket_start, sample_count,
+        avg_speed_kmh, min_speed_kmh, max_speed_kmh,
+        avg_vehicle_count, max_vehicle_count
+    )
+    SELECT
+        h.scope,
+        h.scope_key,
+        date_trunc('day', h.bucket_start, 'Europe/Istanbul'),
+        sum(h.sample_count),
+        sum(h.avg_speed_kmh * h.sample_count) / sum(h.sample_count),
+        min(h.min_speed_kmh),
+        max(h.max_speed_kmh),
+        sum(h.avg_vehicle_count * h.sample_count) / sum(h.sample_count),
+        max(h.max_vehicle_count)
+    FROM traffic_rollups_hourly h
+    WHERE h.bucket_start >= v_from AND h.bucket_start < v_to
+    GROUP BY h.scope, h.scope_key, date_trunc('day', h.bucket_start, 'Europe/Istanbul')
+    ON CONFLICT (scope, scope_key, bucket_start) DO UPDATE SET
+        sample_count      = EXCLUDED.sample_count,
+        avg_speed_kmh     = EXCLUDED.avg_speed_kmh,
+        min_speed_kmh     = EXCLUDED.min_speed_kmh,
+        max_speed_kmh     = EXCLUDED.max_speed_kmh,
+        avg_vehicle_count = EXCLUDED.avg_vehicle_count,
+        max_vehicle_count = EXCLUDED.max_vehicle_count;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    INSERT INTO traffic_rollup_watermarks (level, processed_until, updated_at)
+    VALUES ('daily', v_to, now())
+    ON CONFLICT (level) DO UPDATE SET
+        processed_until = EXCLUDED.processed_until,
+        dirty_from      = NULL,
+        updated_at      = EXCLUDED.updated_at;
+
+    RETURN v_rows;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prune_traffic_history
+-- Drops raw snapshot partitions older than p_raw_days (never past the hourly
+-- watermark, so nothing is dropped before it is rolled up) and deletes rollup
+-- rows past their retention. Returns the number of raw partitions dropped.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION prune_traffic_history(
+    p_raw_days     INTEGER DEFAULT 7,
+    p_hourly_days  INTEGER DEFAULT 90,
+    p_daily_days   INTEGER DEFAULT 730
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_cutoff   TIMESTAMPTZ := now() - make_interval(days => p_raw_days);
+    v_hourly   TIMESTAMPTZ;
+    v_part     RECORD;
+    v_dropped  INTEGER := 0;
+BEGIN
+    SELECT processed_until INTO v_hourly
+    FROM traffic_rollup_watermarks
+    WHERE level = 'hourly';
+
+    v_cutoff := least(v_cutoff, coalesce(v_hourly, '-infinity'::timestamptz));
+
+    FOR v_part IN
+        SELECT
+            c.relname,
+            (regexp_match(
+                pg_get_expr(c.relpartbound, c.oid),
+                'TO \(''([^'']+)''\)'
+            ))[1]::timestamptz AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'traffic_snapshots'::regclass
+    LOOP
+        IF v_part.upper_bound <= v_cutoff THEN
+            EXECUTE format('DROP TABLE IF EXISTS %I', v_part.relname);
+            v_dropped := v_dropped + 1;
+        END IF;
+    END LOOP;
+
+    DELETE FROM traffic_rollups_hourly
+    WHERE bucket_start < now() - make_interval(days => p_hourly_days);
+
+    DELETE FROM traffic_rollups_daily
+    WHERE bucket_start < now() - make_interval(days => p_daily_days);
+
+    RETURN v_dropped;
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+-- Rollups are public-read (historical views in the app); raw snapshots and
+-- watermarks stay service-only.
+ALTER TABLE traffic_snapshots         ENABLE ROW LEVEL SECURITY;
+ALTER TABLE traffic_rollups_hourly    ENABLE ROW LEVEL SECURITY;
+ALTER TABLE traffic_rollups_daily     ENABLE ROW LEVEL SECURITY;
+ALTER TABLE traffic_rollup_watermarks ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "traffic_rollups_hourly_select_public" ON traffic_rollups_hourly;
+CREATE POLICY "traffic_rollups_hourly_select_public"
+    ON traffic_rollups_hourly FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "traffic_rollups_daily_select_public" ON traffic_rollups_daily;
+CREATE POLICY "traffic_rollups_daily_select_public"
+    ON traffic_rollups_daily FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "traffic_snapshots_all_service" ON traffic_snapshots;
+CREATE POLICY "traffic_snapshots_all_service"
+    ON traffic_snapshots FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON traffic_rollups_hourly, traffic_rollups_daily TO anon, authenticated;
+GRANT ALL    ON traffic_snapshots, traffic_rollups_hourly, traffic_rollups_daily,
+                traffic_rollup_watermarks TO service_role, supabase_admin;
+
+GRANT EXECUTE ON FUNCTION ensure_traffic_snapshot_partitions, rollup_traffic_hourly,
+    rollup_traffic_daily, prune_traffic_history TO service_role;
+-- Fonksiyonlar varsayılan olarak PUBLIC'e EXECUTE ile oluşur (Supabase
+-- default privileges anon/authenticated'a da verir); SECURITY DEFINER
+-- yazıcılar yalnızca service_role'de kalsın.
+REVOKE EXECUTE ON FUNCTION ensure_traffic_snapshot_partitions, rollup_traffic_hourly,
+    rollup_traffic_daily, prune_traffic_history FROM PUBLIC, anon, authenticated;
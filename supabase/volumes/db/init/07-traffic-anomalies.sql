@@ -0,0 +1,52 @@
+-- ============================================================================
+-- 07-traffic-anomalies.sql
+-- Sudden-slowdown anomalies flagged by the online detector
+-- (app/prediction/anomaly.py) on each 15-minute İBB fetch.
+-- Published to Realtime so clients and the prediction job can react.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS traffic_anomalies (
+    id            UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    scope         VARCHAR(8)  NOT NULL,     -- 'segment' | 'zone'
+    scope_key     VARCHAR(64) NOT NULL,     -- İBB GEOHASH or zone UUID
+    zone_id       UUID REFERENCES traffic_zones(id) ON DELETE CASCADE,
+    observed_at   TIMESTAMPTZ NOT NULL,
+    speed_kmh     DOUBLE PRECISION NOT NULL,
+    baseline_kmh  DOUBLE PRECISION NOT NULL,  -- hour-of-week EWMA before this sample
+    z_score       DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_traffic_anomalies_observed_at ON traffic_anomalies (observed_at);
+CREATE INDEX IF NOT EXISTS ix_traffic_anomalies_zone_observed ON traffic_anomalies (zone_id, observed_at);
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE traffic_anomalies ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "traffic_anomalies_select_public" ON traffic_anomalies;
+CREATE POLICY "traffic_anomalies_select_public"
+    ON traffic_anomalies FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "traffic_anomalies_write_service" ON traffic_anomalies;
+CREATE POLICY "traffic_anomalies_write_service"
+    ON traffic_anomalies FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON traffic_anomalies TO anon, authenticated;
+GRANT ALL    ON traffic_anomalies TO service_role, supabase_admin;
+
+-- ── Realtime ────────────────────────────────────────────────────────────────
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND tablename = 'traffic_anomalies'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE traffic_anomalies;
+    END IF;
+END
+$$;
@@ -0,0 +1,406 @@
+-- ============================================================================
+-- 08-zone-prediction-current.sql
+-- Compact read model for the latest prediction run.
+--
+-- The prediction job writes one row per zone into zone_prediction_current
+-- under a new prediction_runs id (status 'building'), then calls
+-- publish_prediction_run() which flips the run to 'current' and drops older
+-- runs in one transaction. Readers only ever see one complete run, and read
+-- cost depends on zone count, not on the size of the predictions history.
+--
+-- A row holds the whole 24-hour horizon as arrays (scores smallint[24],
+-- confidence real[24], factor bitmasks smallint[24]); the helpers below
+-- expand it on demand.
+--
+-- get_predictions_nearby / get_latest_predictions are defined here (they
+-- used to scan predictions in 04-rpc-functions.sql).
+-- ============================================================================
+
+-- ── prediction_runs ─────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS prediction_runs (
+    id            UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    predicted_at  TIMESTAMPTZ NOT NULL,
+    status        VARCHAR(16) NOT NULL DEFAULT 'building',  -- building | current | retired
+    published_at  TIMESTAMPTZ,
+    zone_count    INTEGER,
+    row_count     INTEGER
+);
+
+-- At most one current run.
+CREATE UNIQUE INDEX IF NOT EXISTS ux_prediction_runs_current
+    ON prediction_runs ((true)) WHERE status = 'current';
+
+-- ── zone_prediction_current ─────────────────────────────────────────────────
+-- Horizon h (1..24) is element h of each array, for
+-- target_time = first_target + (h - 1) hours.
+-- factor_bits: rush_hour=1, weekend_start=2, event_nearby=4, large_event=8,
+-- rain=16 (FACTOR_RULES in app/prediction/rule_engine.py).
+
+-- Earlier deployments stored one row per horizon; the table only ever holds
+-- the current run and is rebuilt by the next prediction job.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND table_name = 'zone_prediction_current'
+          AND column_name = 'horizon'
+    ) THEN
+        DROP TABLE zone_prediction_current;
+        DELETE FROM prediction_runs;
+    END IF;
+END
+$$;
+
+CREATE TABLE IF NOT EXISTS zone_prediction_current (
+    run_id        UUID NOT NULL REFERENCES prediction_runs(id) ON DELETE CASCADE,
+    zone_id       UUID NOT NULL REFERENCES traffic_zones(id) ON DELETE CASCADE,
+
+    first_target  TIMESTAMPTZ NOT NULL,
+    base_score    REAL NOT NULL,
+    scores        SMALLINT[] NOT NULL CHECK (cardinality(scores) = 24),
+    confidence    REAL[] NOT NULL CHECK (cardinality(confidence) = 24),
+    factor_bits   SMALLINT[] NOT NULL CHECK (cardinality(factor_bits) = 24),
+    event_ids     UUID[] CHECK (event_ids IS NULL OR cardinality(event_ids) = 24),  -- NULL: no events
+
+    PRIMARY KEY (run_id, zone_id)
+);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prediction_total_score / get_prediction_factors
+-- Rebuild the rule engine's total (base + factor points, clamped to 0..100)
+-- and factors JSON from a bitmask. Points are added in FACTOR_RULES order so
+-- the float result matches predict(). Bit 32 (MODEL_SCORED_BIT) marks a
+-- model-scored cell: the factors stay as the explanation, 'model' is set and
+-- there is no rule total_score.
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS get_prediction_factors(SMALLINT, REAL, SMALLINT);
+
+CREATE OR REPLACE FUNCTION prediction_total_score(
+    p_bits        SMALLINT,
+    p_base_score  DOUBLE PRECISION
+)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT least(100, greatest(0,
+        p_base_score
+        + CASE WHEN p_bits & 1  <> 0 THEN 25 ELSE 0 END
+        + CASE WHEN p_bits & 2  <> 0 THEN 15 ELSE 0 END
+        + CASE WHEN p_bits & 4  <> 0 THEN 20 ELSE 0 END
+        + CASE WHEN p_bits & 8  <> 0 THEN 15 ELSE 0 END
+        + CASE WHEN p_bits & 16 <> 0 THEN 10 ELSE 0 END
+    ))::double precision;
+$$;
+
+CREATE OR REPLACE FUNCTION get_prediction_factors(
+    p_bits        SMALLINT,
+    p_base_score  DOUBLE PRECISION
+)
+RETURNS JSONB
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT jsonb_strip_nulls(jsonb_build_object(
+        'base_score',    p_base_score,
+        'rush_hour',     CASE WHEN p_bits & 1  <> 0 THEN 25 END,
+        'weekend_start', CASE WHEN p_bits & 2  <> 0 THEN 15 END,
+        'event_nearby',  CASE WHEN p_bits & 4  <> 0 THEN 20 END,
+        'large_event',   CASE WHEN p_bits & 8  <> 0 THEN 15 END,
+        'rain',          CASE WHEN p_bits & 16 <> 0 THEN 10 END,
+        'model',         CASE WHEN p_bits & 32 <> 0 THEN true END,
+        'total_score',   CASE WHEN p_bits & 32 = 0 THEN prediction_total_score(p_bits, p_base_score) END
+    ));
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prediction_horizon
+-- Array index (1..24) of the horizon closest to p_ts for a run row.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION prediction_horizon(
+    p_first_target  TIMESTAMPTZ,
+    p_ts            TIMESTAMPTZ
+)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT least(24, greatest(1,
+        round(extract(epoch FROM (p_ts - p_first_target)) / 3600.0)::integer + 1
+    ));
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- publish_prediction_run
+-- Makes p_run_id the current run and deletes superseded runs (their
+-- zone_prediction_current rows cascade). Stale 'building' runs from failed
+-- jobs are cleaned up after a day. The run's zone-group aggregates are
+-- built first (rollup_prediction_run, 15-zone-hierarchy.sql) and the cells
+-- that differ from the current run are logged for delta sync
+-- (log_prediction_run_changes, 17-change-log.sql); clients get one
+-- Realtime message for the run (publish_change_notification,
+-- 18-realtime-notifications.sql). Returns the
+-- number of zone × horizon predictions published.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION publish_prediction_run(p_run_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_rows   INTEGER;
+    v_zones  INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('publish_prediction_run'));
+
+    SELECT count(*) * 24, count(*) INTO v_rows, v_zones
+    FROM zone_prediction_current
+    WHERE run_id = p_run_id;
+
+    PERFORM rollup_prediction_run(p_run_id);
+    PERFORM log_prediction_run_changes(p_run_id);
+
+    UPDATE prediction_runs
+    SET status = 'retired'
+    WHERE status = 'current' AND id <> p_run_id;
+
+    UPDATE prediction_runs
+    SET status       = 'current',
+        published_at = now(),
+        zone_count   = v_zones,
+        row_count    = v_rows
+    WHERE id = p_run_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'prediction run % not found', p_run_id;
+    END IF;
+
+    DELETE FROM prediction_runs
+    WHERE status = 'retired'
+       OR (status = 'building' AND created_at < now() - INTERVAL '1 day');
+
+    PERFORM publish_change_notification('prediction_run', p_run_id);
+
+    RETURN v_rows;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- expand_zone_predictions
+-- Expands the current run into one row per zone × horizon (24-hour series),
+-- optionally limited to p_zone_ids.
+-- Usage: supabase.rpc('expand_zone_predictions', { p_zone_ids })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION expand_zone_predictions(p_zone_ids UUID[] DEFAULT NULL)
+RETURNS TABLE (
+    zone_id           UUID,
+    horizon           INTEGER,
+    target_time       TIMESTAMPTZ,
+    congestion_score  INTEGER,
+    confidence        DOUBLE PRECISION,
+    factors           JSONB,
+    event_id          UUID,
+    predicted_at      TIMESTAMPTZ
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        c.zone_id,
+        h.i,
+        c.first_target + make_interval(hours => h.i - 1),
+        c.scores[h.i]::integer,
+        c.confidence[h.i]::numeric::double precision,
+        get_prediction_factors(c.factor_bits[h.i], c.base_score),
+        c.event_ids[h.i],
+        r.predicted_at
+    FROM prediction_runs r
+    JOIN zone_prediction_current c ON c.run_id = r.id
+    CROSS JOIN generate_series(1, 24) AS h(i)
+    WHERE r.status = 'current'
+      AND (p_zone_ids IS NULL OR c.zone_id = ANY (p_zone_ids))
+    ORDER BY c.zone_id, h.i;
+$$;
+
+GRANT EXECUTE ON FUNCTION expand_zone_predictions TO anon, authenticated;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_predictions_nearby
+-- For the p_limit zones nearest to a point (within radius), returns the
+-- current run's horizon whose target_time is closest to p_target_ts
+-- (defaults to now()). One PK lookup and an array subscript per zone.
+-- prediction_id is the matching predictions (history) row, if still kept.
+-- Usage: supabase.rpc('get_predictions_nearby', { lat, lon, radius_km, target_ts, limit })
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS get_predictions_nearby(
+    DOUBLE PRECISION, DOUBLE PRECISION, DOUBLE PRECISION, TIMESTAMPTZ
+);
+DROP FUNCTION IF EXISTS get_predictions_nearby(
+    DOUBLE PRECISION, DOUBLE PRECISION, DOUBLE PRECISION, TIMESTAMPTZ, INTEGER
+);
+
+CREATE OR REPLACE FUNCTION get_predictions_nearby(
+    p_lat        DOUBLE PRECISION,
+    p_lon        DOUBLE PRECISION,
+    p_radius_km  DOUBLE PRECISION DEFAULT 5.0,
+    p_target_ts  TIMESTAMPTZ DEFAULT NULL,
+    p_limit      INTEGER DEFAULT 100
+)
+RETURNS TABLE (
+    prediction_id       UUID,
+    zone_id             UUID,
+    zone_name           VARCHAR(255),
+    congestion_score    INTEGER,
+    confidence          DOUBLE PRECISION,
+    target_time         TIMESTAMPTZ,
+    predicted_at        TIMESTAMPTZ,
+    factors             JSONB,
+    event_id            UUID,
+    zone_centroid_lat   DOUBLE PRECISION,
+    zone_centroid_lon   DOUBLE PRECISION,
+    distance_km         DOUBLE PRECISION
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    WITH origin AS (
+        SELECT
+            ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography AS geog,
+            coalesce(p_target_ts, now())                            AS ts
+    ),
+    run AS (
+        SELECT r.id, r.predicted_at
+        FROM prediction_runs r
+        WHERE r.status = 'current'
+    ),
+    nearby AS (
+        SELECT
+            z.id,
+            z.name,
+            z.centroid,
+            ST_Distance(z.centroid_geog, o.geog) / 1000.0 AS distance_km
+        FROM traffic_zones z, origin o
+        WHERE ST_DWithin(z.polygon_geog, o.geog, p_radius_km * 1000)
+        ORDER BY distance_km
+        LIMIT p_limit
+    ),
+    picked AS (
+        SELECT
+            n.*,
+            run.predicted_at,
+            c.*,
+            prediction_horizon(c.first_target, o.ts) AS h
+        FROM nearby n
+        CROSS JOIN origin o
+        CROSS JOIN run
+        JOIN zone_prediction_current c
+            ON c.run_id = run.id AND c.zone_id = n.id
+    )
+    SELECT
+        p.id              AS prediction_id,
+        k.id              AS zone_id,
+        k.name            AS zone_name,
+        k.scores[k.h]::integer,
+        k.confidence[k.h]::numeric::double precision,
+        k.first_target + make_interval(hours => k.h - 1),
+        k.predicted_at,
+        get_prediction_factors(k.factor_bits[k.h], k.base_score),
+        k.event_ids[k.h],
+        ST_Y(k.centroid)  AS zone_centroid_lat,
+        ST_X(k.centroid)  AS zone_centroid_lon,
+        k.distance_km
+    FROM picked k
+    LEFT JOIN predictions p
+        ON p.zone_id = k.id
+       AND p.target_time = k.first_target + make_interval(hours => k.h - 1)
+    ORDER BY k.distance_km;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_predictions_nearby TO anon, authenticated;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_latest_predictions
+-- One row per zone from the current run: the horizon closest to now()
+-- (heatmap overlay). One array subscript per zone.
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS get_latest_predictions();
+
+CREATE OR REPLACE FUNCTION get_latest_predictions()
+RETURNS TABLE (
+    prediction_id       UUID,
+    zone_id             UUID,
+    zone_name           VARCHAR(255),
+    congestion_score    INTEGER,
+    confidence          DOUBLE PRECISION,
+    target_time         TIMESTAMPTZ,
+    predicted_at        TIMESTAMPTZ,
+    factors             JSONB,
+    zone_centroid_lat   DOUBLE PRECISION,
+    zone_centroid_lon   DOUBLE PRECISION
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    WITH picked AS (
+        SELECT
+            c.*,
+            r.predicted_at,
+            prediction_horizon(c.first_target, now()) AS h
+        FROM prediction_runs r
+        JOIN zone_prediction_current c ON c.run_id = r.id
+        WHERE r.status = 'current'
+    )
+    SELECT
+        p.id              AS prediction_id,
+        z.id              AS zone_id,
+        z.name            AS zone_name,
+        k.scores[k.h]::integer,
+        k.confidence[k.h]::numeric::double precision,
+        k.first_target + make_interval(hours => k.h - 1),
+        k.predicted_at,
+        get_prediction_factors(k.factor_bits[k.h], k.base_score),
+        ST_Y(z.centroid)  AS zone_centroid_lat,
+        ST_X(z.centroid)  AS zone_centroid_lon
+    FROM picked k
+    JOIN traffic_zones z ON z.id = k.zone_id
+    LEFT JOIN predictions p
+        ON p.zone_id = k.zone_id
+       AND p.target_time = k.first_target + make_interval(hours => k.h - 1)
+    ORDER BY z.id;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_latest_predictions TO anon, authenticated;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE prediction_runs         ENABLE ROW LEVEL SECURITY;
+ALTER TABLE zone_prediction_current ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "prediction_runs_select_public" ON prediction_runs;
+CREATE POLICY "prediction_runs_select_public"
+    ON prediction_runs FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "prediction_runs_write_service" ON prediction_runs;
+CREATE POLICY "prediction_runs_write_service"
+    ON prediction_runs FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+DROP POLICY IF EXISTS "zone_prediction_current_select_public" ON zone_prediction_current;
+CREATE POLICY "zone_prediction_current_select_public"
+    ON zone_prediction_current FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "zone_prediction_current_write_service" ON zone_prediction_current;
+CREATE POLICY "zone_prediction_current_write_service"
+    ON zone_prediction_current FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON prediction_runs, zone_prediction_current TO anon, authenticated;
+GRANT ALL    ON prediction_runs, zone_prediction_current TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION publish_prediction_run TO service_role;
+REVOKE EXECUTE ON FUNCTION publish_prediction_run FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION prediction_total_score, get_prediction_factors, prediction_horizon TO anon, authenticated, service_role;
@@ -0,0 +1,143 @@
+-- ============================================================================
+-- 09-prediction-upsert.sql
+-- Upsert-and-delta storage for predictions.
+--
+-- Predictions are keyed by (zone_id, target_time) with hour-aligned
+-- target_time. Each hourly run upserts its 24 horizons per zone through
+-- upsert_predictions(); rows whose score, confidence and event are unchanged
+-- are not written at all. Replaced values are kept in the narrow
+-- prediction_audit table; expired horizons are removed by prune_predictions()
+-- (10-prediction-partitions.sql).
+-- ============================================================================
+
+-- ── Unique (zone_id, target_time) ───────────────────────────────────────────
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'uq_predictions_zone_target'
+    ) THEN
+        -- Eski run'lardan kalan çakışmalarda en yeni tahmin kalır.
+        DELETE FROM predictions p
+        USING predictions q
+        WHERE p.zone_id = q.zone_id
+          AND p.target_time = q.target_time
+          AND (p.predicted_at, p.id) < (q.predicted_at, q.id);
+
+        ALTER TABLE predictions
+            ADD CONSTRAINT uq_predictions_zone_target UNIQUE (zone_id, target_time);
+    END IF;
+END
+$$;
+
+-- The unique index covers every lookup the plain composite index served.
+DROP INDEX IF EXISTS ix_predictions_zone_target;
+
+-- ── prediction_audit ────────────────────────────────────────────────────────
+-- Previous values of a (zone_id, target_time) prediction, written only when
+-- a later run changes it. No factors: this is for "how did the forecast
+-- evolve", not for explaining it.
+CREATE TABLE IF NOT EXISTS prediction_audit (
+    zone_id           UUID NOT NULL REFERENCES traffic_zones(id) ON DELETE CASCADE,
+    target_time       TIMESTAMPTZ NOT NULL,
+    predicted_at      TIMESTAMPTZ NOT NULL,      -- when the replaced value was predicted
+    congestion_score  SMALLINT NOT NULL,
+    confidence        REAL NOT NULL,
+    event_id          UUID,
+    replaced_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_prediction_audit_zone_target
+    ON prediction_audit (zone_id, target_time);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- upsert_predictions
+-- p_rows: JSON array of {zone_id, target_time, predicted_at, congestion_score,
+-- confidence, factors, event_id}. Inserts new keys, updates keys whose
+-- score / confidence (> 0.001) / event changed (auditing the old value) and
+-- leaves the rest untouched. Returns the stored id of every input row and
+-- whether it was written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION upsert_predictions(p_rows JSONB)
+RETURNS TABLE (
+    zone_id        UUID,
+    target_time    TIMESTAMPTZ,
+    prediction_id  UUID,
+    written        BOOLEAN
+)
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH incoming AS (
+        SELECT r.*
+        FROM jsonb_to_recordset(p_rows) AS r(
+            zone_id UUID, target_time TIMESTAMPTZ, predicted_at TIMESTAMPTZ,
+            congestion_score INTEGER, confidence DOUBLE PRECISION,
+            factors JSONB, event_id UUID
+        )
+    ),
+    classified AS (
+        SELECT
+            i.*,
+            cur.id                AS cur_id,
+            cur.predicted_at      AS cur_predicted_at,
+            cur.congestion_score  AS cur_score,
+            cur.confidence        AS cur_confidence,
+            cur.event_id          AS cur_event_id,
+            cur.id IS NULL
+              OR cur.congestion_score <> i.congestion_score
+              OR abs(cur.confidence - i.confidence) > 0.001
+              OR cur.event_id IS DISTINCT FROM i.event_id AS changed
+        FROM incoming i
+        LEFT JOIN predictions cur
+            ON cur.zone_id = i.zone_id AND cur.target_time = i.target_time
+    ),
+    audit AS (
+        INSERT INTO prediction_audit (
+            zone_id, target_time, predicted_at, congestion_score, confidence, event_id
+        )
+        SELECT c.zone_id, c.target_time, c.cur_predicted_at,
+               c.cur_score, c.cur_confidence, c.cur_event_id
+        FROM classified c
+        WHERE c.changed AND c.cur_id IS NOT NULL
+    ),
+    written AS (
+        INSERT INTO predictions AS p (
+            zone_id, target_time, predicted_at, congestion_score, confidence, factors, event_id
+        )
+        SELECT c.zone_id, c.target_time, c.predicted_at, c.congestion_score,
+               c.confidence, c.factors, c.event_id
+        FROM classified c
+        WHERE c.changed
+        ON CONFLICT (zone_id, target_time) DO UPDATE
+        SET predicted_at     = EXCLUDED.predicted_at,
+            congestion_score = EXCLUDED.congestion_score,
+            confidence       = EXCLUDED.confidence,
+            factors          = EXCLUDED.factors,
+            event_id         = EXCLUDED.event_id
+        RETURNING p.id, p.zone_id, p.target_time
+    )
+    SELECT c.zone_id, c.target_time, coalesce(w.id, c.cur_id), c.changed
+    FROM classified c
+    LEFT JOIN written w
+        ON w.zone_id = c.zone_id AND w.target_time = c.target_time;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE prediction_audit ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "prediction_audit_select_public" ON prediction_audit;
+CREATE POLICY "prediction_audit_select_public"
+    ON prediction_audit FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "prediction_audit_write_service" ON prediction_audit;
+CREATE POLICY "prediction_audit_write_service"
+    ON prediction_audit FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON prediction_audit TO anon, authenticated;
+GRANT ALL    ON prediction_audit TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION upsert_predictions TO service_role;
+REVOKE EXECUTE ON FUNCTION upsert_predictions FROM PUBLIC, anon, authenticated;
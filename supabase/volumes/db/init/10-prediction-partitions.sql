@@ -0,0 +1,103 @@
+-- ============================================================================
+-- 10-prediction-partitions.sql
+-- Partition maintenance for predictions.
+--
+-- The Alembic revision a1f3c9e2b7d4 turns predictions into a table
+-- range-partitioned by target_time with daily partitions
+-- (predictions_pYYYYMMDD, UTC days). These functions keep partitions ahead
+-- of the prediction horizon and turn retention into DROP TABLE. Until the
+-- migration has run they fall back to the plain-table behaviour.
+-- ============================================================================
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- ensure_prediction_partitions
+-- Creates daily partitions from today up to p_days_ahead days in the future.
+-- No-op (returns 0) while predictions is not partitioned.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION ensure_prediction_partitions(
+    p_days_ahead INTEGER DEFAULT 3
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_day     DATE;
+    v_name    TEXT;
+    v_created INTEGER := 0;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'predictions'::regclass) <> 'p' THEN
+        RETURN 0;
+    END IF;
+
+    FOR v_day IN
+        SELECT generate_series(
+            (now() AT TIME ZONE 'UTC')::date,
+            (now() AT TIME ZONE 'UTC')::date + p_days_ahead,
+            INTERVAL '1 day'
+        )::date
+    LOOP
+        v_name := 'predictions_p' || to_char(v_day, 'YYYYMMDD');
+        IF to_regclass(v_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF predictions FOR VALUES FROM (%L) TO (%L)',
+                v_name,
+                v_day::timestamp AT TIME ZONE 'UTC',
+                (v_day + 1)::timestamp AT TIME ZONE 'UTC'
+            );
+            v_created := v_created + 1;
+        END IF;
+    END LOOP;
+    RETURN v_created;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prune_predictions
+-- Removes predictions (and their audit trail) whose target_time is more than
+-- p_keep_hours in the past. On the partitioned table only whole partitions
+-- below the cutoff are dropped, so rows may outlive the cutoff by up to a
+-- day. Returns the number of partitions dropped (rows deleted while
+-- predictions is still a plain table).
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION prune_predictions(p_keep_hours INTEGER DEFAULT 48)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_cutoff   TIMESTAMPTZ := now() - make_interval(hours => p_keep_hours);
+    v_part     RECORD;
+    v_removed  INTEGER := 0;
+BEGIN
+    DELETE FROM prediction_audit WHERE target_time < v_cutoff;
+
+    IF (SELECT relkind FROM pg_class WHERE oid = 'predictions'::regclass) <> 'p' THEN
+        DELETE FROM predictions WHERE target_time < v_cutoff;
+        GET DIAGNOSTICS v_removed = ROW_COUNT;
+        RETURN v_removed;
+    END IF;
+
+    FOR v_part IN
+        SELECT
+            c.relname,
+            (regexp_match(
+                pg_get_expr(c.relpartbound, c.oid),
+                'TO \(''([^'']+)''\)'
+            ))[1]::timestamptz AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'predictions'::regclass
+    LOOP
+        IF v_part.upper_bound <= v_cutoff THEN
+            EXECUTE format('DROP TABLE IF EXISTS %I', v_part.relname);
+            v_removed := v_removed + 1;
+        END IF;
+    END LOOP;
+
+    RETURN v_removed;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION ensure_prediction_partitions, prune_predictions TO service_role;
+REVOKE EXECUTE ON FUNCTION ensure_prediction_partitions, prune_predictions FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,142 @@
+-- ============================================================================
+-- 11-compute-predictions.sql
+-- Set-based rule engine: the rules of app/prediction/rule_engine.predict()
+-- for every zone × horizon (or an explicit cell list) in one statement.
+-- run_prediction_batch() in 12-prediction-dirty-cells.sql stores and
+-- publishes the result.
+--
+-- Kept in parity with the Python engine (tests/test_compute_predictions_parity.py),
+-- including its use of the UTC hour / weekday of target_time.
+-- ============================================================================
+
+-- The 2 km event radius is measured in EPSG:3857 like the Python engine;
+-- this expression index lets ST_DWithin on the transformed polygon use GiST
+-- here and in mark_event_cells_dirty (12-prediction-dirty-cells.sql)
+-- instead of transforming every zone.
+CREATE INDEX IF NOT EXISTS ix_traffic_zones_polygon_3857
+    ON traffic_zones USING GIST (ST_Transform(polygon, 3857));
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- compute_predictions
+-- Zones × p_horizons hour-aligned target times after p_now. Per cell:
+--   base   zone.base_congestion_level * 100
+--   +25    07-09 / 17-19 (rush_hour)
+--   +15    Friday, Saturday (weekend_start)
+--   +20    largest event with capacity > 5000 within 2 km (EPSG:3857) whose
+--          window [start - 2h, coalesce(end + 1h, start + 4h)] covers the cell
+--   +15    that event's capacity > 20000
+--   +10    p_is_raining (confidence 0.7 instead of 0.8)
+-- clamped to 0..100.
+--
+-- With p_zone_ids / p_targets (parallel arrays) only those cells are
+-- computed; targets must be hour-aligned horizons 1..p_horizons of p_now.
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS compute_predictions(TIMESTAMPTZ, INTEGER, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION compute_predictions(
+    p_now          TIMESTAMPTZ DEFAULT NULL,
+    p_horizons     INTEGER DEFAULT 24,
+    p_is_raining   BOOLEAN DEFAULT false,
+    p_zone_ids     UUID[] DEFAULT NULL,
+    p_targets      TIMESTAMPTZ[] DEFAULT NULL
+)
+RETURNS TABLE (
+    zone_id           UUID,
+    horizon           INTEGER,
+    target_time       TIMESTAMPTZ,
+    congestion_score  INTEGER,
+    confidence        DOUBLE PRECISION,
+    factors           JSONB,
+    factor_bits       SMALLINT,
+    base_score        DOUBLE PRECISION,
+    event_id          UUID
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    WITH params AS (
+        SELECT date_trunc('hour', coalesce(p_now, now())) AS base_hour
+    ),
+    cells AS (
+        SELECT
+            z.id                                       AS zone_id,
+            z.base_congestion_level * 100              AS base_score,
+            h.i                                        AS horizon,
+            p.base_hour + make_interval(hours => h.i)  AS target_time
+        FROM traffic_zones z
+        CROSS JOIN params p
+        CROSS JOIN generate_series(1, p_horizons) AS h(i)
+        WHERE p_zone_ids IS NULL
+        UNION ALL
+        SELECT
+            z.id,
+            z.base_congestion_level * 100,
+            round(extract(epoch FROM (c.target_time - p.base_hour)) / 3600)::integer,
+            c.target_time
+        FROM unnest(p_zone_ids, p_targets) AS c(zone_id, target_time)
+        JOIN traffic_zones z ON z.id = c.zone_id
+        CROSS JOIN params p
+        WHERE p_zone_ids IS NOT NULL
+    ),
+    -- Events that can affect any cell of this batch.
+    candidate_events AS (
+        SELECT
+            e.id,
+            e.capacity,
+            e.start_time - INTERVAL '2 hours'                                  AS active_from,
+            coalesce(e.end_time + INTERVAL '1 hour', e.start_time + INTERVAL '4 hours') AS active_to,
+            ST_Transform(e.location, 3857)                                     AS geom
+        FROM events e, params p
+        WHERE e.capacity > 5000
+          AND e.start_time - INTERVAL '2 hours' <= p.base_hour + make_interval(hours => p_horizons)
+          AND coalesce(e.end_time + INTERVAL '1 hour', e.start_time + INTERVAL '4 hours')
+              >= p.base_hour + INTERVAL '1 hour'
+    ),
+    -- p_zone_ids has one entry per cell; the IN subquery is hashed once
+    -- instead of scanning the whole array for every zone.
+    zone_events AS (
+        SELECT z.id AS zone_id, ce.id, ce.capacity, ce.active_from, ce.active_to
+        FROM traffic_zones z
+        JOIN candidate_events ce
+            ON ST_DWithin(ST_Transform(z.polygon, 3857), ce.geom, 2000)
+        WHERE p_zone_ids IS NULL OR z.id IN (SELECT unnest(p_zone_ids))
+    ),
+    matched AS (
+        SELECT DISTINCT ON (c.zone_id, c.horizon)
+            c.zone_id, c.horizon, ze.id AS event_id, ze.capacity
+        FROM cells c
+        JOIN zone_events ze
+            ON ze.zone_id = c.zone_id
+           AND c.target_time BETWEEN ze.active_from AND ze.active_to
+        ORDER BY c.zone_id, c.horizon, ze.capacity DESC, ze.id
+    ),
+    flagged AS (
+        SELECT
+            c.*,
+            m.event_id,
+            (  CASE WHEN extract(hour FROM c.target_time AT TIME ZONE 'UTC') IN (7, 8, 17, 18) THEN 1 ELSE 0 END
+             | CASE WHEN extract(isodow FROM c.target_time AT TIME ZONE 'UTC') IN (5, 6) THEN 2 ELSE 0 END
+             | CASE WHEN m.event_id IS NOT NULL THEN 4 ELSE 0 END
+             | CASE WHEN m.capacity > 20000 THEN 8 ELSE 0 END
+             | CASE WHEN p_is_raining THEN 16 ELSE 0 END
+            )::smallint AS bits
+        FROM cells c
+        LEFT JOIN matched m
+            ON m.zone_id = c.zone_id AND m.horizon = c.horizon
+    )
+    SELECT
+        f.zone_id,
+        f.horizon,
+        f.target_time,
+        trunc(prediction_total_score(f.bits, f.base_score))::integer,
+        CASE WHEN p_is_raining THEN 0.7 ELSE 0.8 END,
+        get_prediction_factors(f.bits, f.base_score),
+        f.bits,
+        f.base_score,
+        f.event_id
+    FROM flagged f
+    ORDER BY f.zone_id, f.horizon;
+$$;
+
+GRANT EXECUTE ON FUNCTION compute_predictions TO service_role;
+REVOKE EXECUTE ON FUNCTION compute_predictions FROM PUBLIC, anon, authenticated;
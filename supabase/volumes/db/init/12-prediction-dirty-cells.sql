@@ -0,0 +1,334 @@
+-- ============================================================================
+-- 12-prediction-dirty-cells.sql
+-- Incremental prediction runs.
+--
+-- A cell (zone_id, target_time) only changes when its inputs change: the
+-- hour/weekday rules are a function of target_time itself, so an unchanged
+-- cell has the same score in every run that covers it. Input changes mark
+-- (zone, time range) entries in prediction_dirty_cells:
+--   events          insert / delete, or update of location, start/end time
+--                   or capacity — zones within 2 km, over the event's active
+--                   window [start - 2h, coalesce(end + 1h, start + 4h)]
+--   traffic_zones   base_congestion_level / polygon update — whole zone
+-- Traffic rollups are not an input of compute_predictions(), so they mark
+-- nothing.
+-- run_prediction_batch() recomputes dirty cells, the horizon hours the
+-- previous run did not cover and zones missing from it; every other cell is
+-- carried over from the current run.
+--
+-- The Python engine (PREDICTION_ENGINE=python) recomputes every cell and
+-- does not read the queue; it clears it after each published run
+-- (prune_prediction_dirty_cells). The prune job also drops entries whose
+-- window has passed, so the queue stays bounded if batches stop running.
+--
+-- After changing the rules in compute_predictions(), publish one full run:
+--   SELECT run_prediction_batch(p_full => true);
+-- ============================================================================
+
+-- ── prediction_dirty_cells ──────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS prediction_dirty_cells (
+    id          BIGSERIAL PRIMARY KEY,
+    marked_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    zone_id     UUID NOT NULL REFERENCES traffic_zones(id) ON DELETE CASCADE,
+    dirty_from  TIMESTAMPTZ NOT NULL,
+    dirty_to    TIMESTAMPTZ NOT NULL,   -- inclusive
+    reason      VARCHAR(32) NOT NULL    -- event | zone
+);
+
+CREATE INDEX IF NOT EXISTS ix_prediction_dirty_cells_zone ON prediction_dirty_cells (zone_id);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- mark_event_cells_dirty
+-- Marks the cells an event with this footprint can affect. Events below the
+-- rule engine's capacity threshold or whose window has already passed are
+-- ignored. Returns the number of zones marked.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION mark_event_cells_dirty(
+    p_location  geometry,
+    p_start     TIMESTAMPTZ,
+    p_end       TIMESTAMPTZ,
+    p_capacity  INTEGER
+)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH marked AS (
+        INSERT INTO prediction_dirty_cells (zone_id, dirty_from, dirty_to, reason)
+        SELECT
+            z.id,
+            p_start - INTERVAL '2 hours',
+            coalesce(p_end + INTERVAL '1 hour', p_start + INTERVAL '4 hours'),
+            'event'
+        FROM traffic_zones z
+        WHERE p_capacity > 5000
+          AND coalesce(p_end + INTERVAL '1 hour', p_start + INTERVAL '4 hours') >= now()
+          AND ST_DWithin(ST_Transform(z.polygon, 3857), ST_Transform(p_location, 3857), 2000)
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM marked;
+$$;
+
+-- Statement-level: the events job upserts whole batches, and re-upserting an
+-- unchanged event must not dirty anything.
+CREATE OR REPLACE FUNCTION events_mark_prediction_cells()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM mark_event_cells_dirty(n.location, n.start_time, n.end_time, n.capacity)
+        FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM mark_event_cells_dirty(o.location, o.start_time, o.end_time, o.capacity)
+        FROM old_rows o;
+    ELSE
+        PERFORM mark_event_cells_dirty(c.location, c.start_time, c.end_time, c.capacity)
+        FROM (
+            SELECT o.location, o.start_time, o.end_time, o.capacity, n.location AS n_location,
+                   n.start_time AS n_start, n.end_time AS n_end, n.capacity AS n_capacity
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            WHERE (o.location::text, o.start_time, o.end_time, o.capacity)
+                  IS DISTINCT FROM (n.location::text, n.start_time, n.end_time, n.capacity)
+        ) ch
+        CROSS JOIN LATERAL (
+            VALUES (ch.location, ch.start_time, ch.end_time, ch.capacity),
+                   (ch.n_location, ch.n_start, ch.n_end, ch.n_capacity)
+        ) AS c(location, start_time, end_time, capacity);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_events_mark_prediction_cells_ins ON events;
+CREATE TRIGGER trg_events_mark_prediction_cells_ins
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_mark_prediction_cells();
+
+DROP TRIGGER IF EXISTS trg_events_mark_prediction_cells_upd ON events;
+CREATE TRIGGER trg_events_mark_prediction_cells_upd
+    AFTER UPDATE ON events
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_mark_prediction_cells();
+
+DROP TRIGGER IF EXISTS trg_events_mark_prediction_cells_del ON events;
+CREATE TRIGGER trg_events_mark_prediction_cells_del
+    AFTER DELETE ON events
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_mark_prediction_cells();
+
+-- Zone inputs of every horizon.
+CREATE OR REPLACE FUNCTION traffic_zones_mark_prediction_cells()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF NEW.base_congestion_level IS DISTINCT FROM OLD.base_congestion_level
+       OR NEW.polygon::text IS DISTINCT FROM OLD.polygon::text THEN
+        INSERT INTO prediction_dirty_cells (zone_id, dirty_from, dirty_to, reason)
+        VALUES (NEW.id, '-infinity', 'infinity', 'zone');
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_mark_prediction_cells ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_mark_prediction_cells
+    AFTER UPDATE ON traffic_zones
+    FOR EACH ROW EXECUTE FUNCTION traffic_zones_mark_prediction_cells();
+
+-- Earlier versions also marked cells on revised traffic rollups.
+DROP TRIGGER IF EXISTS trg_traffic_rollups_mark_prediction_cells ON traffic_rollups_hourly;
+DROP FUNCTION IF EXISTS traffic_rollups_mark_prediction_cells();
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- run_prediction_batch
+-- Builds the next 24 hours for every zone: dirty / uncovered cells through
+-- compute_predictions(), the rest copied from the current run. Recomputed
+-- cells go through upsert_predictions (copied ones are already stored), the
+-- compact run is written to zone_prediction_current and published — one
+-- transaction, one call. Consumes the dirty entries it saw.
+-- p_full => true recomputes every cell.
+-- Returns {run_id, zones, cells, recomputed, skipped, written, unchanged}.
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS run_prediction_batch(TIMESTAMPTZ);
+
+CREATE OR REPLACE FUNCTION run_prediction_batch(
+    p_now   TIMESTAMPTZ DEFAULT NULL,
+    p_full  BOOLEAN DEFAULT false
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_now         TIMESTAMPTZ := coalesce(p_now, now());
+    v_base_hour   TIMESTAMPTZ := date_trunc('hour', coalesce(p_now, now()));
+    v_prev        UUID;
+    v_run         UUID;
+    v_cells       INTEGER;
+    v_dirty       INTEGER;
+    v_zone_ids    UUID[];
+    v_targets     TIMESTAMPTZ[];
+    v_recomputed  INTEGER;
+    v_written     INTEGER;
+    v_zones       INTEGER;
+BEGIN
+    PERFORM ensure_prediction_partitions(2);
+
+    SELECT id INTO v_prev FROM prediction_runs WHERE status = 'current';
+
+    DROP TABLE IF EXISTS _prediction_dirty;
+    CREATE TEMP TABLE _prediction_dirty ON COMMIT DROP AS
+    WITH consumed AS (
+        DELETE FROM prediction_dirty_cells RETURNING zone_id, dirty_from, dirty_to
+    )
+    SELECT * FROM consumed;
+
+    -- Every cell of the new run, with its slot in the previous run if any.
+    DROP TABLE IF EXISTS _prediction_cells;
+    CREATE TEMP TABLE _prediction_cells ON COMMIT DROP AS
+    SELECT
+        s.zone_id,
+        s.horizon,
+        s.target_time,
+        s.prev_base_score,
+        p_full
+            OR s.prev_idx NOT BETWEEN 1 AND 24
+            OR s.prev_idx IS NULL
+            OR EXISTS (
+                SELECT 1 FROM _prediction_dirty d
+                WHERE d.zone_id = s.zone_id
+                  AND s.target_time BETWEEN d.dirty_from AND d.dirty_to
+            ) AS dirty,
+        s.scores[s.prev_idx]      AS score,
+        s.confidence[s.prev_idx]  AS confidence,
+        s.factor_bits[s.prev_idx] AS factor_bits,
+        s.event_ids[s.prev_idx]   AS event_id
+    FROM (
+        SELECT
+            z.id AS zone_id,
+            h.i  AS horizon,
+            v_base_hour + make_interval(hours => h.i) AS target_time,
+            round(extract(epoch FROM (
+                v_base_hour + make_interval(hours => h.i) - c.first_target)) / 3600)::integer + 1 AS prev_idx,
+            c.base_score AS prev_base_score,
+            c.scores, c.confidence, c.factor_bits, c.event_ids
+        FROM traffic_zones z
+        CROSS JOIN generate_series(1, 24) AS h(i)
+        LEFT JOIN zone_prediction_current c
+            ON c.run_id = v_prev AND c.zone_id = z.id
+    ) s;
+
+    SELECT count(*), count(*) FILTER (WHERE dirty) INTO v_cells, v_dirty FROM _prediction_cells;
+
+    -- Her hücre kirliyse (p_full, ilk run) liste yerine tüm zone'lar: büyük
+    -- dizileri taşımaya gerek yok.
+    IF v_dirty < v_cells THEN
+        SELECT coalesce(array_agg(zone_id), '{}'), coalesce(array_agg(target_time), '{}')
+        INTO v_zone_ids, v_targets
+        FROM _prediction_cells
+        WHERE dirty;
+    END IF;
+
+    DROP TABLE IF EXISTS _prediction_batch;
+    CREATE TEMP TABLE _prediction_batch ON COMMIT DROP AS
+    SELECT * FROM compute_predictions(v_now, 24, false, v_zone_ids, v_targets);
+
+    SELECT count(*), count(*) FILTER (WHERE u.written)
+    INTO v_recomputed, v_written
+    FROM upsert_predictions((
+        SELECT coalesce(jsonb_agg(jsonb_build_object(
+            'zone_id',          b.zone_id,
+            'target_time',      b.target_time,
+            'predicted_at',     v_now,
+            'congestion_score', b.congestion_score,
+            'confidence',       b.confidence,
+            'factors',          b.factors,
+            'event_id',         b.event_id
+        )), '[]'::jsonb)
+        FROM _prediction_batch b
+    )) u;
+
+    INSERT INTO prediction_runs (predicted_at) VALUES (v_now) RETURNING id INTO v_run;
+
+    INSERT INTO zone_prediction_current (
+        run_id, zone_id, first_target, base_score, scores, confidence, factor_bits, event_ids
+    )
+    SELECT
+        v_run,
+        x.zone_id,
+        min(x.target_time),
+        max(x.base_score),
+        array_agg(x.score ORDER BY x.horizon),
+        array_agg(x.confidence ORDER BY x.horizon),
+        array_agg(x.factor_bits ORDER BY x.horizon),
+        CASE WHEN bool_or(x.event_id IS NOT NULL)
+             THEN array_agg(x.event_id ORDER BY x.horizon) END
+    FROM (
+        SELECT b.zone_id, b.horizon, b.target_time, b.base_score::real AS base_score,
+               b.congestion_score::smallint AS score, b.confidence::real AS confidence,
+               b.factor_bits, b.event_id
+        FROM _prediction_batch b
+        UNION ALL
+        SELECT c.zone_id, c.horizon, c.target_time, c.prev_base_score,
+               c.score, c.confidence, c.factor_bits, c.event_id
+        FROM _prediction_cells c
+        WHERE NOT c.dirty
+    ) x
+    GROUP BY x.zone_id;
+    GET DIAGNOSTICS v_zones = ROW_COUNT;
+
+    PERFORM publish_prediction_run(v_run);
+
+    RETURN jsonb_build_object(
+        'run_id',     v_run,
+        'zones',      v_zones,
+        'cells',      v_cells,
+        'recomputed', v_recomputed,
+        'skipped',    v_cells - v_recomputed,
+        'written',    v_written,
+        'unchanged',  v_recomputed - v_written
+    );
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prune_prediction_dirty_cells
+-- Deletes entries whose window ended before now() (no future cell can be
+-- affected) and, with p_marked_before, every entry marked before it — a run
+-- that recomputed all cells from that point on has consumed them.
+-- Returns the number of entries deleted.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION prune_prediction_dirty_cells(p_marked_before TIMESTAMPTZ DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH deleted AS (
+        DELETE FROM prediction_dirty_cells
+        WHERE dirty_to < now()
+           OR marked_at < p_marked_before
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM deleted;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE prediction_dirty_cells ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "prediction_dirty_cells_all_service" ON prediction_dirty_cells;
+CREATE POLICY "prediction_dirty_cells_all_service"
+    ON prediction_dirty_cells FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT ALL ON prediction_dirty_cells TO service_role, supabase_admin;
+GRANT USAGE ON SEQUENCE prediction_dirty_cells_id_seq TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION mark_event_cells_dirty, run_prediction_batch, prune_prediction_dirty_cells TO service_role;
+REVOKE EXECUTE ON FUNCTION mark_event_cells_dirty, run_prediction_batch, prune_prediction_dirty_cells
+    FROM PUBLIC, anon, authenticated;
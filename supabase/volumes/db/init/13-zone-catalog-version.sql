@@ -0,0 +1,50 @@
+-- ============================================================================
+-- 13-zone-catalog-version.sql
+-- Single-row counter bumped whenever zone geometry changes (insert, delete,
+-- truncate, polygon update). Workers keep an in-process spatial index of the
+-- zones (app/prediction/spatial_index.py) and rebuild it when the version
+-- they built from is no longer current.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS zone_catalog_version (
+    id          BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    version     BIGINT NOT NULL DEFAULT 1,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO zone_catalog_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_zone_catalog_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    UPDATE zone_catalog_version
+    SET version = version + 1, updated_at = now()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_catalog_version ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_catalog_version
+    AFTER INSERT OR DELETE OR UPDATE OF polygon ON traffic_zones
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_zone_catalog_version();
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_catalog_version_truncate ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_catalog_version_truncate
+    AFTER TRUNCATE ON traffic_zones
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_zone_catalog_version();
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE zone_catalog_version ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "zone_catalog_version_select_public" ON zone_catalog_version;
+CREATE POLICY "zone_catalog_version_select_public"
+    ON zone_catalog_version FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+GRANT SELECT ON zone_catalog_version TO anon, authenticated;
+GRANT ALL    ON zone_catalog_version TO service_role, supabase_admin;
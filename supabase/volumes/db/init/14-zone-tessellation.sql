@@ -0,0 +1,188 @@
+-- ============================================================================
+-- 14-zone-tessellation.sql
+-- Generated zone sets (H3 hex grids, district / mahalle boundaries) at
+-- thousands of zones.
+--
+-- Every generated zone has a zone_key ("h3:<cell>", "ilce:<code>", ...)
+-- and its id is derived from it (zone_id_for_key), so regenerating the same
+-- tessellation keeps zone ids — and the predictions, rollups and anomalies
+-- that reference them — stable. Hand-drawn zones keep zone_key NULL.
+--
+-- Loading: the generator (app/services/zone_tessellation.py) COPYs raw
+-- GeoJSON rows into traffic_zone_staging under a batch id, then
+-- merge_zone_staging() validates / simplifies / splits them and upserts
+-- into traffic_zones in one statement. Unchanged zones are not rewritten,
+-- so dirty-cell triggers only fire for zones whose polygon really moved.
+-- ============================================================================
+
+ALTER TABLE traffic_zones ADD COLUMN IF NOT EXISTS zone_key VARCHAR(128);
+ALTER TABLE traffic_zones ADD COLUMN IF NOT EXISTS source   VARCHAR(32);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_traffic_zones_zone_key ON traffic_zones (zone_key);
+CREATE INDEX IF NOT EXISTS ix_traffic_zones_source ON traffic_zones (source);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- zone_id_for_key
+-- Deterministic UUID for a zone key (md5 based, same value on every
+-- database and every regeneration).
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION zone_id_for_key(p_zone_key TEXT)
+RETURNS UUID
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT md5('traffic_zone:' || p_zone_key)::uuid;
+$$;
+
+-- ── traffic_zone_staging ────────────────────────────────────────────────────
+-- UNLOGGED: rows only live between COPY and merge_zone_staging().
+CREATE UNLOGGED TABLE IF NOT EXISTS traffic_zone_staging (
+    batch_id               UUID NOT NULL,
+    zone_key               VARCHAR(128) NOT NULL,
+    name                   VARCHAR(255) NOT NULL,
+    geojson                TEXT NOT NULL,      -- Polygon | MultiPolygon, EPSG:4326
+    base_congestion_level  DOUBLE PRECISION NOT NULL DEFAULT 0.5,
+    rush_hour_multiplier   DOUBLE PRECISION NOT NULL DEFAULT 1.5
+);
+
+CREATE INDEX IF NOT EXISTS ix_traffic_zone_staging_batch ON traffic_zone_staging (batch_id);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- merge_zone_staging
+-- Upserts one staged batch into traffic_zones.
+--   * geometry: ST_MakeValid, optional ST_SimplifyPreserveTopology with a
+--     tolerance in metres (applied in EPSG:3857), split into polygons; a
+--     multi-part zone becomes "<key>#<n>" zones (n = 1..parts)
+--   * id: zone_id_for_key(zone_key)
+--   * existing zones keep base_congestion_level / rush_hour_multiplier
+--     (tuned values survive regeneration); only name / polygon are updated,
+--     and only when they changed
+--   * a name already used by another zone gets " (<zone_key>)" appended
+--   * p_prune: zones of p_source missing from the batch are deleted
+-- The staged rows are removed. Returns
+-- {zones, inserted, updated, unchanged, deleted}.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION merge_zone_staging(
+    p_batch_id     UUID,
+    p_source       TEXT,
+    p_simplify_m   DOUBLE PRECISION DEFAULT 0,
+    p_prune        BOOLEAN DEFAULT false
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_zones     INTEGER;
+    v_inserted  INTEGER;
+    v_updated   INTEGER;
+    v_deleted   INTEGER := 0;
+BEGIN
+    CREATE TEMP TABLE _zone_merge ON COMMIT DROP AS
+    WITH geoms AS (
+        SELECT
+            s.zone_key,
+            s.name,
+            s.base_congestion_level,
+            s.rush_hour_multiplier,
+            CASE WHEN p_simplify_m > 0
+                THEN ST_Transform(
+                         ST_SimplifyPreserveTopology(
+                             ST_Transform(ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(s.geojson), 4326)), 3857),
+                             p_simplify_m),
+                         4326)
+                ELSE ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(s.geojson), 4326))
+            END AS geom
+        FROM traffic_zone_staging s
+        WHERE s.batch_id = p_batch_id
+    ),
+    parts AS (
+        SELECT
+            g.zone_key,
+            g.name,
+            g.base_congestion_level,
+            g.rush_hour_multiplier,
+            d.geom AS polygon,
+            row_number() OVER (PARTITION BY g.zone_key ORDER BY ST_Area(d.geom) DESC, d.path) AS part,
+            count(*)     OVER (PARTITION BY g.zone_key) AS parts
+        FROM geoms g
+        CROSS JOIN LATERAL ST_Dump(ST_CollectionExtract(g.geom, 3)) AS d
+    )
+    SELECT DISTINCT ON (zone_key)
+        zone_id_for_key(zone_key) AS id,
+        zone_key,
+        name,
+        polygon,
+        base_congestion_level,
+        rush_hour_multiplier
+    FROM (
+        SELECT
+            CASE WHEN p.parts > 1 THEN p.zone_key || '#' || p.part ELSE p.zone_key END AS zone_key,
+            CASE WHEN p.parts > 1 THEN p.name || ' #' || p.part ELSE p.name END AS name,
+            p.polygon,
+            p.base_congestion_level,
+            p.rush_hour_multiplier
+        FROM parts p
+    ) k
+    ORDER BY zone_key;
+
+    -- Başka bir zone'un (elle çizilmiş ya da başka kaynak) adını kullananlar.
+    UPDATE _zone_merge m
+    SET name = left(m.name, 250 - length(m.zone_key)) || ' (' || m.zone_key || ')'
+    WHERE EXISTS (
+        SELECT 1 FROM traffic_zones t
+        WHERE t.name = m.name AND t.zone_key IS DISTINCT FROM m.zone_key
+    );
+
+    SELECT count(*) INTO v_zones FROM _zone_merge;
+
+    SELECT count(*) INTO v_inserted
+    FROM _zone_merge m
+    WHERE NOT EXISTS (SELECT 1 FROM traffic_zones t WHERE t.zone_key = m.zone_key);
+
+    INSERT INTO traffic_zones AS t (id, zone_key, source, name, polygon, base_congestion_level, rush_hour_multiplier)
+    SELECT m.id, m.zone_key, p_source, m.name, m.polygon, m.base_congestion_level, m.rush_hour_multiplier
+    FROM _zone_merge m
+    ON CONFLICT (zone_key) DO UPDATE
+        SET name = EXCLUDED.name,
+            polygon = EXCLUDED.polygon,
+            source = EXCLUDED.source
+        WHERE t.name IS DISTINCT FROM EXCLUDED.name
+           OR t.source IS DISTINCT FROM EXCLUDED.source
+           OR NOT ST_Equals(t.polygon, EXCLUDED.polygon);
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    v_updated := v_updated - v_inserted;
+
+    IF p_prune THEN
+        DELETE FROM traffic_zones t
+        WHERE t.source = p_source
+          AND NOT EXISTS (SELECT 1 FROM _zone_merge m WHERE m.zone_key = t.zone_key);
+        GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    END IF;
+
+    DELETE FROM traffic_zone_staging WHERE batch_id = p_batch_id;
+    DROP TABLE _zone_merge;
+
+    RETURN jsonb_build_object(
+        'zones',     v_zones,
+        'inserted',  v_inserted,
+        'updated',   v_updated,
+        'unchanged', v_zones - v_inserted - v_updated,
+        'deleted',   v_deleted
+    );
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE traffic_zone_staging ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "traffic_zone_staging_service_all" ON traffic_zone_staging;
+CREATE POLICY "traffic_zone_staging_service_all"
+    ON traffic_zone_staging FOR ALL
+    TO supabase_admin, service_role
+    USING (true)
+    WITH CHECK (true);
+
+GRANT ALL ON traffic_zone_staging TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION zone_id_for_key(TEXT) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION merge_zone_staging(UUID, TEXT, DOUBLE PRECISION, BOOLEAN) TO service_role;
+REVOKE EXECUTE ON FUNCTION merge_zone_staging(UUID, TEXT, DOUBLE PRECISION, BOOLEAN) FROM PUBLIC, anon, authenticated;
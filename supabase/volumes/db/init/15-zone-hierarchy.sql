@@ -0,0 +1,448 @@
+-- ============================================================================
+-- 15-zone-hierarchy.sql
+-- Coarser zone levels for zoomed-out maps.
+--
+--   level 0  traffic_zones (H3 hexes, mahalle, hand-drawn zones)
+--   level 1  districts (ilçe)
+--   level 2  city sides (Avrupa / Anadolu)
+--
+-- Levels 1+ live in zone_groups; a group may name its parent by key
+-- (district → side), and a group loaded without geometry is the union of its
+-- children. Every zone is assigned to at most one group per level by its
+-- point on surface (zone_group_members, kept current by a traffic_zones
+-- trigger and by merge_zone_groups()).
+--
+-- publish_prediction_run() calls rollup_prediction_run(), which aggregates
+-- the run's zone arrays into zone_group_prediction_current (mean / max score
+-- per horizon). get_congestion_overlay() returns one level for a zoom + bbox,
+-- so the payload depends on the viewport, not on the fine zone count.
+-- ============================================================================
+
+-- ── zone_groups ─────────────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS zone_groups (
+    id          UUID PRIMARY KEY,             -- zone_group_id_for_key(group_key)
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    level       SMALLINT NOT NULL CHECK (level > 0),
+    group_key   VARCHAR(128) NOT NULL UNIQUE, -- "ilce:34", "yaka:anadolu"
+    name        VARCHAR(255) NOT NULL,
+    parent_key  VARCHAR(128),                 -- group_key of the level above
+    polygon     geometry(MULTIPOLYGON, 4326) NOT NULL,
+    centroid    geometry(POINT, 4326) GENERATED ALWAYS AS (ST_PointOnSurface(polygon)) STORED
+);
+
+CREATE INDEX IF NOT EXISTS ix_zone_groups_level   ON zone_groups (level);
+CREATE INDEX IF NOT EXISTS ix_zone_groups_parent  ON zone_groups (parent_key);
+CREATE INDEX IF NOT EXISTS ix_zone_groups_polygon ON zone_groups USING GIST (polygon);
+
+CREATE OR REPLACE FUNCTION zone_group_id_for_key(p_group_key TEXT)
+RETURNS UUID
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT md5('zone_group:' || p_group_key)::uuid;
+$$;
+
+-- ── zone_group_members ──────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS zone_group_members (
+    zone_id   UUID NOT NULL REFERENCES traffic_zones(id) ON DELETE CASCADE,
+    level     SMALLINT NOT NULL,
+    group_id  UUID NOT NULL REFERENCES zone_groups(id) ON DELETE CASCADE,
+
+    PRIMARY KEY (zone_id, level)
+);
+
+CREATE INDEX IF NOT EXISTS ix_zone_group_members_group ON zone_group_members (group_id);
+
+-- ── zone_group_prediction_current ───────────────────────────────────────────
+-- Same layout as zone_prediction_current: element h of each array is
+-- horizon h. scores = rounded mean of member zone scores, max_scores = the
+-- worst member zone.
+CREATE TABLE IF NOT EXISTS zone_group_prediction_current (
+    run_id        UUID NOT NULL REFERENCES prediction_runs(id) ON DELETE CASCADE,
+    group_id      UUID NOT NULL REFERENCES zone_groups(id) ON DELETE CASCADE,
+
+    level         SMALLINT NOT NULL,
+    first_target  TIMESTAMPTZ NOT NULL,
+    zone_count    INTEGER NOT NULL,
+    scores        SMALLINT[] NOT NULL CHECK (cardinality(scores) = 24),
+    max_scores    SMALLINT[] NOT NULL CHECK (cardinality(max_scores) = 24),
+    confidence    REAL[] NOT NULL CHECK (cardinality(confidence) = 24),
+
+    PRIMARY KEY (run_id, group_id)
+);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- assign_zone_groups
+-- (Re)computes zone_group_members for p_zone_ids (NULL: every zone). A zone
+-- belongs to the smallest group of each level containing its point on
+-- surface. Returns the number of memberships written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION assign_zone_groups(p_zone_ids UUID[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_rows  INTEGER;
+BEGIN
+    DELETE FROM zone_group_members
+    WHERE p_zone_ids IS NULL OR zone_id = ANY (p_zone_ids);
+
+    INSERT INTO zone_group_members (zone_id, level, group_id)
+    SELECT DISTINCT ON (z.id, g.level) z.id, g.level, g.id
+    FROM traffic_zones z
+    JOIN zone_groups g ON ST_Intersects(g.polygon, ST_PointOnSurface(z.polygon))
+    WHERE p_zone_ids IS NULL OR z.id = ANY (p_zone_ids)
+    ORDER BY z.id, g.level, ST_Area(g.polygon), g.id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    RETURN v_rows;
+END;
+$$;
+
+-- New or moved zones join their groups (statement-level: merge_zone_staging
+-- inserts thousands of zones in one statement).
+CREATE OR REPLACE FUNCTION traffic_zones_assign_groups()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_ids  UUID[];
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM zone_groups) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(n.id) INTO v_ids FROM new_rows n;
+    ELSE
+        SELECT array_agg(n.id) INTO v_ids
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.polygon::text IS DISTINCT FROM o.polygon::text;
+    END IF;
+
+    IF v_ids IS NOT NULL THEN
+        PERFORM assign_zone_groups(v_ids);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_assign_groups_ins ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_assign_groups_ins
+    AFTER INSERT ON traffic_zones
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION traffic_zones_assign_groups();
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_assign_groups_upd ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_assign_groups_upd
+    AFTER UPDATE ON traffic_zones
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION traffic_zones_assign_groups();
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- rollup_prediction_run
+-- Aggregates a run's zone_prediction_current rows per group and horizon.
+-- Called by publish_prediction_run() before the run becomes current, and by
+-- merge_zone_groups() for the current run when the hierarchy changes.
+-- Returns the number of group rows written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION rollup_prediction_run(p_run_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_rows  INTEGER;
+BEGIN
+    DELETE FROM zone_group_prediction_current WHERE run_id = p_run_id;
+
+    INSERT INTO zone_group_prediction_current (
+        run_id, group_id, level, first_target, zone_count, scores, max_scores, confidence
+    )
+    SELECT
+        p_run_id,
+        a.group_id,
+        min(a.level),
+        min(a.first_target),
+        max(a.zone_count),
+        array_agg(a.score ORDER BY a.h),
+        array_agg(a.max_score ORDER BY a.h),
+        array_agg(a.confidence ORDER BY a.h)
+    FROM (
+        SELECT
+            m.group_id,
+            m.level,
+            u.h,
+            min(c.first_target)        AS first_target,
+            count(*)::integer          AS zone_count,
+            round(avg(u.score))::smallint AS score,
+            max(u.score)               AS max_score,
+            avg(u.confidence)::real    AS confidence
+        FROM zone_prediction_current c
+        JOIN zone_group_members m ON m.zone_id = c.zone_id
+        CROSS JOIN LATERAL unnest(c.scores, c.confidence) WITH ORDINALITY AS u(score, confidence, h)
+        WHERE c.run_id = p_run_id
+        GROUP BY m.group_id, m.level, u.h
+    ) a
+    GROUP BY a.group_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    RETURN v_rows;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- merge_zone_groups
+-- Upserts one level of groups from a JSON array of
+--   {group_key, name, geojson (Polygon | MultiPolygon, may be null), parent_key}
+-- Groups without geojson take the union of the groups naming them as
+-- parent_key (city sides from districts). p_prune deletes this level's groups
+-- missing from the array. Memberships and the current run's aggregates are
+-- rebuilt. Returns {groups, deleted, members, rollups}.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION merge_zone_groups(
+    p_level   SMALLINT,
+    p_groups  JSONB,
+    p_prune   BOOLEAN DEFAULT false
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_groups   INTEGER;
+    v_deleted  INTEGER := 0;
+    v_members  INTEGER;
+    v_rollups  INTEGER := 0;
+    v_run      UUID;
+BEGIN
+    IF p_level < 1 THEN
+        RAISE EXCEPTION 'zone group level must be >= 1 (level 0 is traffic_zones)';
+    END IF;
+
+    INSERT INTO zone_groups AS t (id, level, group_key, name, parent_key, polygon)
+    SELECT
+        zone_group_id_for_key(g.group_key),
+        p_level,
+        g.group_key,
+        g.name,
+        g.parent_key,
+        CASE WHEN g.geojson IS NOT NULL
+            THEN ST_Multi(ST_CollectionExtract(ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(g.geojson), 4326)), 3))
+            ELSE (
+                SELECT ST_Multi(ST_Union(c.polygon))
+                FROM zone_groups c
+                WHERE c.parent_key = g.group_key
+            )
+        END
+    FROM jsonb_to_recordset(p_groups) AS g(group_key TEXT, name TEXT, geojson TEXT, parent_key TEXT)
+    ON CONFLICT (group_key) DO UPDATE
+        SET level      = EXCLUDED.level,
+            name       = EXCLUDED.name,
+            parent_key = EXCLUDED.parent_key,
+            polygon    = EXCLUDED.polygon;
+    GET DIAGNOSTICS v_groups = ROW_COUNT;
+
+    IF p_prune THEN
+        DELETE FROM zone_groups t
+        WHERE t.level = p_level
+          AND NOT EXISTS (
+              SELECT 1 FROM jsonb_to_recordset(p_groups) AS g(group_key TEXT)
+              WHERE g.group_key = t.group_key
+          );
+        GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    END IF;
+
+    v_members := assign_zone_groups();
+
+    SELECT id INTO v_run FROM prediction_runs WHERE status = 'current';
+    IF v_run IS NOT NULL THEN
+        v_rollups := rollup_prediction_run(v_run);
+    END IF;
+
+    RETURN jsonb_build_object(
+        'groups',   v_groups,
+        'deleted',  v_deleted,
+        'members',  v_members,
+        'rollups',  v_rollups
+    );
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- zone_overlay_level
+-- Default level for a web-mercator zoom: ≥ 13 zones, 10–12 districts,
+-- below 10 city sides.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION zone_overlay_level(p_zoom DOUBLE PRECISION)
+RETURNS SMALLINT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT CASE WHEN p_zoom >= 13 THEN 0
+                WHEN p_zoom >= 10 THEN 1
+                ELSE 2 END::smallint;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_congestion_overlay
+-- One row per zone (level 0) or zone group (level ≥ 1) intersecting the
+-- bbox, at the horizon closest to p_target_ts (defaults to now()), from the
+-- current run. The level comes from zone_overlay_level(p_zoom), capped at the
+-- highest loaded level; when a level still has more than p_limit rows in the
+-- bbox the next coarser one is used. At most p_limit rows, worst first.
+-- Usage: supabase.rpc('get_congestion_overlay',
+--            { p_zoom, p_min_lon, p_min_lat, p_max_lon, p_max_lat })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION get_congestion_overlay(
+    p_zoom       DOUBLE PRECISION,
+    p_min_lon    DOUBLE PRECISION,
+    p_min_lat    DOUBLE PRECISION,
+    p_max_lon    DOUBLE PRECISION,
+    p_max_lat    DOUBLE PRECISION,
+    p_target_ts  TIMESTAMPTZ DEFAULT NULL,
+    p_limit      INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    level                 SMALLINT,
+    zone_id               UUID,     -- zone id (level 0) or zone group id
+    zone_name             VARCHAR(255),
+    congestion_score      INTEGER,
+    max_congestion_score  INTEGER,
+    confidence            DOUBLE PRECISION,
+    zone_count            INTEGER,
+    target_time           TIMESTAMPTZ,
+    predicted_at          TIMESTAMPTZ,
+    zone_centroid_lat     DOUBLE PRECISION,
+    zone_centroid_lon     DOUBLE PRECISION
+)
+LANGUAGE plpgsql STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_bbox       geometry := ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326);
+    v_ts         TIMESTAMPTZ := coalesce(p_target_ts, now());
+    v_max_level  SMALLINT;
+    v_level      SMALLINT;
+    v_count      INTEGER;
+BEGIN
+    SELECT coalesce(max(g.level), 0) INTO v_max_level FROM zone_groups g;
+    v_level := least(zone_overlay_level(p_zoom), v_max_level);
+
+    LOOP
+        EXIT WHEN v_level >= v_max_level;
+        IF v_level = 0 THEN
+            SELECT count(*) INTO v_count FROM (
+                SELECT 1 FROM traffic_zones z
+                WHERE ST_Intersects(z.polygon, v_bbox)
+                LIMIT p_limit + 1
+            ) s;
+        ELSE
+            SELECT count(*) INTO v_count FROM (
+                SELECT 1 FROM zone_groups g
+                WHERE g.level = v_level AND ST_Intersects(g.polygon, v_bbox)
+                LIMIT p_limit + 1
+            ) s;
+        END IF;
+        EXIT WHEN v_count <= p_limit;
+        v_level := v_level + 1;
+    END LOOP;
+
+    IF v_level = 0 THEN
+        RETURN QUERY
+        SELECT
+            0::smallint,
+            z.id,
+            z.name,
+            c.scores[k.h]::integer,
+            c.scores[k.h]::integer,
+            c.confidence[k.h]::numeric::double precision,
+            1,
+            c.first_target + make_interval(hours => k.h - 1),
+            r.predicted_at,
+            ST_Y(z.centroid),
+            ST_X(z.centroid)
+        FROM prediction_runs r
+        JOIN zone_prediction_current c ON c.run_id = r.id
+        JOIN traffic_zones z ON z.id = c.zone_id
+        CROSS JOIN LATERAL (SELECT prediction_horizon(c.first_target, v_ts) AS h) k
+        WHERE r.status = 'current'
+          AND ST_Intersects(z.polygon, v_bbox)
+        ORDER BY c.scores[k.h] DESC, z.id
+        LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+        SELECT
+            v_level,
+            g.id,
+            g.name,
+            c.scores[k.h]::integer,
+            c.max_scores[k.h]::integer,
+            c.confidence[k.h]::numeric::double precision,
+            c.zone_count,
+            c.first_target + make_interval(hours => k.h - 1),
+            r.predicted_at,
+            ST_Y(g.centroid),
+            ST_X(g.centroid)
+        FROM prediction_runs r
+        JOIN zone_group_prediction_current c ON c.run_id = r.id
+        JOIN zone_groups g ON g.id = c.group_id
+        CROSS JOIN LATERAL (SELECT prediction_horizon(c.first_target, v_ts) AS h) k
+        WHERE r.status = 'current'
+          AND g.level = v_level
+          AND ST_Intersects(g.polygon, v_bbox)
+        ORDER BY c.scores[k.h] DESC, g.id
+        LIMIT p_limit;
+    END IF;
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE zone_groups                   ENABLE ROW LEVEL SECURITY;
+ALTER TABLE zone_group_members            ENABLE ROW LEVEL SECURITY;
+ALTER TABLE zone_group_prediction_current ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "zone_groups_select_public" ON zone_groups;
+CREATE POLICY "zone_groups_select_public"
+    ON zone_groups FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "zone_groups_write_service" ON zone_groups;
+CREATE POLICY "zone_groups_write_service"
+    ON zone_groups FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+DROP POLICY IF EXISTS "zone_group_members_select_public" ON zone_group_members;
+CREATE POLICY "zone_group_members_select_public"
+    ON zone_group_members FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "zone_group_members_write_service" ON zone_group_members;
+CREATE POLICY "zone_group_members_write_service"
+    ON zone_group_members FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+DROP POLICY IF EXISTS "zone_group_prediction_current_select_public" ON zone_group_prediction_current;
+CREATE POLICY "zone_group_prediction_current_select_public"
+    ON zone_group_prediction_current FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "zone_group_prediction_current_write_service" ON zone_group_prediction_current;
+CREATE POLICY "zone_group_prediction_current_write_service"
+    ON zone_group_prediction_current FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON zone_groups, zone_group_members, zone_group_prediction_current TO anon, authenticated;
+GRANT ALL    ON zone_groups, zone_group_members, zone_group_prediction_current TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION zone_group_id_for_key(TEXT), zone_overlay_level(DOUBLE PRECISION) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION get_congestion_overlay TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION assign_zone_groups, rollup_prediction_run, merge_zone_groups TO service_role;
+REVOKE EXECUTE ON FUNCTION assign_zone_groups, rollup_prediction_run, merge_zone_groups FROM PUBLIC, anon, authenticated;
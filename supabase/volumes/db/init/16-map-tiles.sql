@@ -0,0 +1,301 @@
+-- ============================================================================
+-- 16-map-tiles.sql
+-- Mapbox vector tiles (z/x/y) for the congestion map.
+--
+-- get_map_tile() returns one binary tile with two layers:
+--   zones   zone polygons (or zone_groups at low zoom, zone_overlay_level in
+--           15-zone-hierarchy.sql) with the current run's score at the
+--           requested horizon; simplified to about one pixel per zoom
+--   events  event points clustered on a grid in tile space (count, largest
+--           capacity; id / name / category for single events)
+--
+-- Tiles are cached in map_tile_cache per (prediction run, horizon, z, x, y).
+-- get_map_tile is open to anon, so only what the map actually serves is
+-- written: the horizon of the current hour, zoom <= 16 and non-empty tiles
+-- (the cache is bounded by the data's extent, not by what clients ask for).
+-- Other tiles are rendered on every request.
+-- A run's tiles go away with the run (ON DELETE CASCADE); zone geometry and
+-- event changes are detected through zone_catalog_version / map_event_version
+-- and the stale tile is rebuilt on the next request.
+--
+-- PostgREST returns the raw tile for
+--   POST /rest/v1/rpc/get_map_tile  {"z":..,"x":..,"y":..}
+--   Accept: application/octet-stream
+-- ============================================================================
+
+-- ── map_event_version ───────────────────────────────────────────────────────
+-- Bumped when an event's map attributes change. The events job re-upserts
+-- whole batches; unchanged rows do not bump it.
+CREATE TABLE IF NOT EXISTS map_event_version (
+    id          BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    version     BIGINT NOT NULL DEFAULT 1,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO map_event_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION events_bump_map_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- Statement triggers also fire for statements that touched no row
+    -- (e.g. an upsert whose rows all conflicted).
+    IF TG_OP = 'INSERT' THEN
+        IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF NOT EXISTS (
+        SELECT 1
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        WHERE (o.location::text, o.start_time, o.end_time, o.capacity, o.name, o.category)
+              IS DISTINCT FROM (n.location::text, n.start_time, n.end_time, n.capacity, n.name, n.category)
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE map_event_version
+    SET version = version + 1, updated_at = now()
+    WHERE id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_events_map_version_ins ON events;
+CREATE TRIGGER trg_events_map_version_ins
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_bump_map_version();
+
+DROP TRIGGER IF EXISTS trg_events_map_version_upd ON events;
+CREATE TRIGGER trg_events_map_version_upd
+    AFTER UPDATE ON events
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_bump_map_version();
+
+DROP TRIGGER IF EXISTS trg_events_map_version_del ON events;
+CREATE TRIGGER trg_events_map_version_del
+    AFTER DELETE ON events
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_bump_map_version();
+
+-- ── map_tile_cache ──────────────────────────────────────────────────────────
+-- UNLOGGED: a cache; lost tiles are rebuilt on demand.
+CREATE UNLOGGED TABLE IF NOT EXISTS map_tile_cache (
+    run_id         UUID NOT NULL REFERENCES prediction_runs(id) ON DELETE CASCADE,
+    horizon        SMALLINT NOT NULL,
+    z              SMALLINT NOT NULL,
+    x              INTEGER NOT NULL,
+    y              INTEGER NOT NULL,
+
+    zone_version   BIGINT NOT NULL,
+    event_version  BIGINT NOT NULL,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+    tile           BYTEA NOT NULL,
+
+    PRIMARY KEY (run_id, horizon, z, x, y)
+);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- build_map_tile
+-- Renders one tile for a run and horizon (no caching). Empty tile: ''.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION build_map_tile(
+    p_run_id   UUID,
+    p_horizon  INTEGER,
+    p_z        INTEGER,
+    p_x        INTEGER,
+    p_y        INTEGER
+)
+RETURNS BYTEA
+LANGUAGE plpgsql STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_bounds     geometry := ST_TileEnvelope(p_z, p_x, p_y);           -- EPSG:3857
+    v_bbox       geometry := ST_Transform(ST_TileEnvelope(p_z, p_x, p_y), 4326);
+    -- One pixel of a 256 px tile, in metres.
+    v_tolerance  DOUBLE PRECISION := 40075016.686 / (256 * 2 ^ p_z);
+    v_level      SMALLINT;
+    v_zones      BYTEA;
+    v_events     BYTEA;
+BEGIN
+    SELECT least(zone_overlay_level(p_z), coalesce(max(g.level), 0)) INTO v_level FROM zone_groups g;
+
+    IF v_level = 0 THEN
+        SELECT ST_AsMVT(t, 'zones', 4096, 'geom') INTO v_zones
+        FROM (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_SimplifyPreserveTopology(ST_Transform(z.polygon, 3857), v_tolerance),
+                    v_bounds, 4096, 64, true) AS geom,
+                z.id::text           AS zone_id,
+                z.name               AS name,
+                0                    AS level,
+                c.scores[p_horizon]  AS score,
+                c.scores[p_horizon]  AS max_score
+            FROM zone_prediction_current c
+            JOIN traffic_zones z ON z.id = c.zone_id
+            WHERE c.run_id = p_run_id
+              AND ST_Intersects(z.polygon, v_bbox)
+        ) t
+        WHERE t.geom IS NOT NULL;
+    ELSE
+        SELECT ST_AsMVT(t, 'zones', 4096, 'geom') INTO v_zones
+        FROM (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_SimplifyPreserveTopology(ST_Transform(g.polygon, 3857), v_tolerance),
+                    v_bounds, 4096, 64, true) AS geom,
+                g.id::text               AS zone_id,
+                g.name                   AS name,
+                g.level                  AS level,
+                c.scores[p_horizon]      AS score,
+                c.max_scores[p_horizon]  AS max_score
+            FROM zone_group_prediction_current c
+            JOIN zone_groups g ON g.id = c.group_id
+            WHERE c.run_id = p_run_id
+              AND g.level = v_level
+              AND ST_Intersects(g.polygon, v_bbox)
+        ) t
+        WHERE t.geom IS NOT NULL;
+    END IF;
+
+    -- Events active at or after the horizon's hour, within the run's window.
+    -- Grid cells of 256 tile units (16 per tile side).
+    SELECT ST_AsMVT(t, 'events', 4096, 'geom') INTO v_events
+    FROM (
+        SELECT
+            ST_MakePoint(avg(ST_X(p.geom)), avg(ST_Y(p.geom))) AS geom,
+            count(*)::integer                                  AS count,
+            max(p.capacity)                                    AS max_capacity,
+            CASE WHEN count(*) = 1 THEN min(p.id::text) END    AS event_id,
+            CASE WHEN count(*) = 1 THEN min(p.name) END        AS name,
+            CASE WHEN count(*) = 1 THEN min(p.category) END    AS category
+        FROM (
+            SELECT
+                e.id, e.name, e.category, e.capacity,
+                ST_AsMVTGeom(ST_Transform(e.location, 3857), v_bounds, 4096, 0, true) AS geom
+            FROM events e
+            CROSS JOIN (
+                SELECT c.first_target + make_interval(hours => p_horizon - 1) AS target_time,
+                       c.first_target + INTERVAL '24 hours'                   AS run_end
+                FROM zone_prediction_current c
+                WHERE c.run_id = p_run_id
+                LIMIT 1
+            ) w
+            WHERE ST_Intersects(e.location, v_bbox)
+              AND e.start_time < w.run_end
+              AND coalesce(e.end_time, e.start_time + INTERVAL '4 hours') >= w.target_time
+        ) p
+        WHERE p.geom IS NOT NULL
+        GROUP BY floor(ST_X(p.geom) / 256), floor(ST_Y(p.geom) / 256)
+    ) t;
+
+    RETURN coalesce(v_zones, ''::bytea) || coalesce(v_events, ''::bytea);
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_map_tile
+-- Tile of the current run at the horizon closest to p_target_ts
+-- (defaults to now()). NULL when no run is published yet. Cached only for
+-- the current hour's horizon, up to v_cache_max_zoom, and when non-empty.
+-- Usage: supabase.rpc('get_map_tile', { z, x, y })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION get_map_tile(
+    z            INTEGER,
+    x            INTEGER,
+    y            INTEGER,
+    p_target_ts  TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS BYTEA
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+#variable_conflict use_variable
+DECLARE
+    v_cache_max_zoom CONSTANT INTEGER := 16;
+    v_run            UUID;
+    v_horizon        INTEGER;
+    v_now_horizon    INTEGER;
+    v_zone_version   BIGINT;
+    v_event_version  BIGINT;
+    v_tile           BYTEA;
+BEGIN
+    IF z < 0 OR z > 22 OR x < 0 OR y < 0 OR x >= 2 ^ z OR y >= 2 ^ z THEN
+        RAISE EXCEPTION 'invalid tile %/%/%', z, x, y;
+    END IF;
+
+    SELECT r.id,
+           prediction_horizon(c.first_target, coalesce(p_target_ts, now())),
+           prediction_horizon(c.first_target, now())
+    INTO v_run, v_horizon, v_now_horizon
+    FROM prediction_runs r
+    JOIN zone_prediction_current c ON c.run_id = r.id
+    WHERE r.status = 'current'
+    LIMIT 1;
+
+    IF v_run IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT v.version INTO v_zone_version FROM zone_catalog_version v WHERE v.id;
+    SELECT v.version INTO v_event_version FROM map_event_version v WHERE v.id;
+
+    SELECT t.tile INTO v_tile
+    FROM map_tile_cache t
+    WHERE t.run_id = v_run AND t.horizon = v_horizon
+      AND t.z = z AND t.x = x AND t.y = y
+      AND t.zone_version = v_zone_version
+      AND t.event_version = v_event_version;
+
+    IF FOUND THEN
+        RETURN v_tile;
+    END IF;
+
+    v_tile := build_map_tile(v_run, v_horizon, z, x, y);
+
+    IF z > v_cache_max_zoom OR v_horizon <> v_now_horizon OR v_tile = ''::bytea THEN
+        RETURN v_tile;
+    END IF;
+
+    INSERT INTO map_tile_cache AS t (run_id, horizon, z, x, y, zone_version, event_version, tile)
+    VALUES (v_run, v_horizon, z, x, y, v_zone_version, v_event_version, v_tile)
+    ON CONFLICT ON CONSTRAINT map_tile_cache_pkey DO UPDATE
+        SET zone_version  = EXCLUDED.zone_version,
+            event_version = EXCLUDED.event_version,
+            created_at    = now(),
+            tile          = EXCLUDED.tile;
+
+    RETURN v_tile;
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE map_event_version ENABLE ROW LEVEL SECURITY;
+ALTER TABLE map_tile_cache    ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "map_event_version_select_public" ON map_event_version;
+CREATE POLICY "map_event_version_select_public"
+    ON map_event_version FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "map_tile_cache_all_service" ON map_tile_cache;
+CREATE POLICY "map_tile_cache_all_service"
+    ON map_tile_cache FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON map_event_version TO anon, authenticated;
+GRANT ALL    ON map_event_version, map_tile_cache TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION get_map_tile TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION build_map_tile TO service_role;
+REVOKE EXECUTE ON FUNCTION build_map_tile FROM PUBLIC, anon, authenticated;
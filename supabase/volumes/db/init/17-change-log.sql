@@ -0,0 +1,404 @@
+-- ============================================================================
+-- 17-change-log.sql
+-- Delta sync: what changed since a version token.
+--
+-- change_log records one row per changed prediction cell (zone × target
+-- hour), deleted zone and changed / deleted event, numbered by a monotonic
+-- version. changes_since(version, bbox) returns the latest state of every
+-- key changed after the token, the keys that were deleted, and a new token,
+-- so a client refresh or reconnect catch-up costs what changed rather than
+-- the whole dataset.
+--
+-- Prediction cells are logged by publish_prediction_run() by comparing the
+-- new run with the current one at equal target_time (both engines publish
+-- through it; triggers on predictions would not survive the partition swap
+-- in alembic a1f3c9e2b7d4). Hours that fall off the front of the window are
+-- not logged: clients drop past hours themselves. Events are logged by
+-- statement triggers; upserts that rewrite a row unchanged are not.
+--
+-- Every writer takes the transaction-scoped change_log advisory lock before
+-- its first version, so versions are handed out in commit order: a
+-- transaction that still holds uncommitted log rows blocks every later
+-- writer, and a committed version is never lower than one still in flight.
+--
+-- Tokens older than the pruned part of the log get {"reset": true}: the
+-- client reloads through the regular RPCs and continues from the returned
+-- version.
+-- ============================================================================
+
+-- ── change_log ──────────────────────────────────────────────────────────────
+-- entity: prediction (entity_id = zone_id, target_time set) | zone (delete
+-- only; all of the zone's cells) | event.  op: u = inserted/updated, d = deleted.
+-- location: zone centroid / event point at change time, for the bbox filter
+-- (deleted rows cannot be joined any more).
+CREATE TABLE IF NOT EXISTS change_log (
+    version      BIGSERIAL PRIMARY KEY,
+    changed_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    entity       VARCHAR(16) NOT NULL CHECK (entity IN ('prediction', 'zone', 'event')),
+    entity_id    UUID NOT NULL,
+    target_time  TIMESTAMPTZ,
+    op           CHAR(1) NOT NULL CHECK (op IN ('u', 'd')),
+    location     geometry(POINT, 4326)
+);
+
+CREATE INDEX IF NOT EXISTS ix_change_log_changed_at ON change_log (changed_at);
+
+-- Highest version removed by prune_change_log(); older tokens must reset.
+CREATE TABLE IF NOT EXISTS change_log_state (
+    id              BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    pruned_through  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO change_log_state (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- log_prediction_run_changes
+-- Logs the cells of p_run_id that differ from the current run at the same
+-- target_time (score, confidence > 0.001, event), new cells, and cells the
+-- current run has but p_run_id does not. Called by publish_prediction_run()
+-- before the flip. Returns the number of log rows written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION log_prediction_run_changes(p_run_id UUID)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_prev     UUID;
+    v_logged   INTEGER;
+BEGIN
+    SELECT id INTO v_prev
+    FROM prediction_runs
+    WHERE status = 'current' AND id <> p_run_id;
+
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    WITH new_cells AS (
+        SELECT c.zone_id,
+               c.first_target + make_interval(hours => h.i - 1) AS target_time,
+               c.scores[h.i] AS score, c.confidence[h.i] AS confidence,
+               c.event_ids[h.i] AS event_id
+        FROM zone_prediction_current c
+        CROSS JOIN generate_series(1, 24) AS h(i)
+        WHERE c.run_id = p_run_id
+    ),
+    new_start AS (
+        SELECT zone_id, min(target_time) AS first_target
+        FROM new_cells
+        GROUP BY zone_id
+    ),
+    prev_cells AS (
+        SELECT c.zone_id,
+               c.first_target + make_interval(hours => h.i - 1) AS target_time,
+               c.scores[h.i] AS score, c.confidence[h.i] AS confidence,
+               c.event_ids[h.i] AS event_id
+        FROM zone_prediction_current c
+        CROSS JOIN generate_series(1, 24) AS h(i)
+        WHERE c.run_id = v_prev
+    ),
+    changed AS (
+        SELECT coalesce(n.zone_id, p.zone_id) AS zone_id,
+               coalesce(n.target_time, p.target_time) AS target_time,
+               CASE WHEN n.zone_id IS NULL THEN 'd' ELSE 'u' END AS op
+        FROM new_cells n
+        FULL JOIN prev_cells p
+            ON p.zone_id = n.zone_id AND p.target_time = n.target_time
+        LEFT JOIN new_start s ON s.zone_id = p.zone_id
+        WHERE (n.zone_id IS NULL
+               -- Pencerenin önünden düşen saatler silme değil.
+               AND p.target_time >= coalesce(s.first_target, '-infinity'))
+           OR p.zone_id IS NULL
+           OR n.score <> p.score
+           OR abs(n.confidence - p.confidence) > 0.001
+           OR n.event_id IS DISTINCT FROM p.event_id
+    )
+    INSERT INTO change_log (entity, entity_id, target_time, op, location)
+    SELECT 'prediction', ch.zone_id, ch.target_time, ch.op, z.centroid
+    FROM changed ch
+    JOIN traffic_zones z ON z.id = ch.zone_id
+    ORDER BY ch.zone_id, ch.target_time;
+    GET DIAGNOSTICS v_logged = ROW_COUNT;
+
+    RETURN v_logged;
+END;
+$$;
+
+-- ── Zone deletes ────────────────────────────────────────────────────────────
+-- A deleted zone's cells cascade out of zone_prediction_current before the
+-- next run is compared, so the delete itself is logged.
+CREATE OR REPLACE FUNCTION traffic_zones_log_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+    INSERT INTO change_log (entity, entity_id, op, location)
+    SELECT 'zone', o.id, 'd', o.centroid
+    FROM old_rows o;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_traffic_zones_change_log ON traffic_zones;
+CREATE TRIGGER trg_traffic_zones_change_log
+    AFTER DELETE ON traffic_zones
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION traffic_zones_log_delete();
+
+-- ── Event changes ───────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION events_log_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO change_log (entity, entity_id, op, location)
+        SELECT 'event', n.id, 'u', n.location
+        FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO change_log (entity, entity_id, op, location)
+        SELECT 'event', o.id, 'd', o.location
+        FROM old_rows o;
+    ELSE
+        -- Scraper aynı satırı değişmeden yeniden yazabilir; updated_at sayılmaz.
+        INSERT INTO change_log (entity, entity_id, op, location)
+        SELECT 'event', n.id, 'u', n.location
+        FROM old_rows o
+        JOIN new_rows n ON n.id = o.id
+        WHERE to_jsonb(o) - 'updated_at' IS DISTINCT FROM to_jsonb(n) - 'updated_at';
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_events_change_log_ins ON events;
+CREATE TRIGGER trg_events_change_log_ins
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_log_changes();
+
+DROP TRIGGER IF EXISTS trg_events_change_log_upd ON events;
+CREATE TRIGGER trg_events_change_log_upd
+    AFTER UPDATE ON events
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_log_changes();
+
+DROP TRIGGER IF EXISTS trg_events_change_log_del ON events;
+CREATE TRIGGER trg_events_change_log_del
+    AFTER DELETE ON events
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION events_log_changes();
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- changes_since
+-- Changes after p_version, optionally limited to a lon/lat box, at most
+-- p_limit keys per call (keys changed several times count once, with their
+-- current state). Returns
+--   {version, reset, has_more,
+--    predictions: [{zone_id, zone_name, lat, lon, target_time,
+--                   congestion_score, confidence}],
+--    events:      [{event_id, name, description, venue_name, category,
+--                   start_time, end_time, capacity, source, lat, lon}],
+--    deleted:     {predictions: [{zone_id, target_time}], zones: [..], events: [..]}}
+-- Call again with the returned version while has_more. p_version NULL (first
+-- sync) or older than the retained log returns reset = true and the current
+-- version only. A box only yields changes inside it: after moving the box
+-- the client reloads.
+--
+-- Writers serialize on the change_log lock, so every version below the
+-- highest visible one is already visible and a token never skips a row.
+-- Usage: supabase.rpc('changes_since', { p_version, p_min_lon, ... })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION changes_since(
+    p_version  BIGINT,
+    p_min_lon  DOUBLE PRECISION DEFAULT NULL,
+    p_min_lat  DOUBLE PRECISION DEFAULT NULL,
+    p_max_lon  DOUBLE PRECISION DEFAULT NULL,
+    p_max_lat  DOUBLE PRECISION DEFAULT NULL,
+    p_limit    INTEGER DEFAULT 5000
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_pruned   BIGINT;
+    v_head     BIGINT;
+    v_box      geometry;
+    v_keys     INTEGER;
+    v_last     BIGINT;
+    v_result   JSONB;
+BEGIN
+    IF p_limit IS NULL OR p_limit < 1 THEN
+        RAISE EXCEPTION 'p_limit must be positive';
+    END IF;
+
+    SELECT pruned_through INTO v_pruned FROM change_log_state WHERE id;
+
+    SELECT coalesce(max(version), v_pruned) INTO v_head FROM change_log;
+
+    IF p_version IS NULL OR p_version < v_pruned OR p_version > v_head THEN
+        RETURN jsonb_build_object(
+            'version', v_head, 'reset', true, 'has_more', false,
+            'predictions', '[]'::jsonb, 'events', '[]'::jsonb,
+            'deleted', jsonb_build_object(
+                'predictions', '[]'::jsonb, 'zones', '[]'::jsonb, 'events', '[]'::jsonb)
+        );
+    END IF;
+
+    IF p_min_lon IS NOT NULL THEN
+        v_box := ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326);
+    END IF;
+
+    DROP TABLE IF EXISTS _changes;
+    CREATE TEMP TABLE _changes ON COMMIT DROP AS
+    SELECT entity, entity_id, target_time,
+           max(version) AS version,
+           (array_agg(op ORDER BY version DESC))[1] AS op
+    FROM change_log
+    WHERE version > p_version
+      AND version <= v_head
+      AND (v_box IS NULL OR ST_Intersects(location, v_box))
+    GROUP BY entity, entity_id, target_time
+    ORDER BY max(version)
+    LIMIT p_limit + 1;
+
+    SELECT count(*) INTO v_keys FROM _changes;
+    IF v_keys > p_limit THEN
+        -- Son sayfa sınırı: bu versiyona kadar her anahtar döndü.
+        SELECT version INTO v_last FROM _changes ORDER BY version OFFSET p_limit - 1 LIMIT 1;
+        DELETE FROM _changes WHERE version > v_last;
+    ELSE
+        v_last := v_head;
+    END IF;
+
+    WITH current_run AS (
+        SELECT id FROM prediction_runs WHERE status = 'current'
+    ),
+    cells AS (
+        SELECT ch.entity_id AS zone_id, ch.target_time,
+               z.name AS zone_name, ST_Y(z.centroid) AS lat, ST_X(z.centroid) AS lon,
+               c.scores[h.i]::integer AS congestion_score,
+               c.confidence[h.i]::numeric::double precision AS confidence
+        FROM _changes ch
+        LEFT JOIN zone_prediction_current c
+            ON c.run_id = (SELECT id FROM current_run) AND c.zone_id = ch.entity_id
+        LEFT JOIN traffic_zones z ON z.id = ch.entity_id
+        CROSS JOIN LATERAL (
+            SELECT round(extract(epoch FROM (ch.target_time - c.first_target)) / 3600)::integer + 1 AS i
+        ) h
+        WHERE ch.entity = 'prediction'
+    ),
+    changed_events AS (
+        SELECT ch.entity_id, e.*
+        FROM _changes ch
+        LEFT JOIN events e ON e.id = ch.entity_id
+        WHERE ch.entity = 'event'
+    )
+    SELECT jsonb_build_object(
+        'version', v_last,
+        'reset', false,
+        'has_more', v_keys > p_limit,
+        'predictions', coalesce((
+            SELECT jsonb_agg(jsonb_build_object(
+                       'zone_id', zone_id, 'zone_name', zone_name, 'lat', lat, 'lon', lon,
+                       'target_time', target_time,
+                       'congestion_score', congestion_score, 'confidence', confidence)
+                   ORDER BY zone_id, target_time)
+            FROM cells WHERE congestion_score IS NOT NULL
+        ), '[]'::jsonb),
+        'events', coalesce((
+            SELECT jsonb_agg(jsonb_build_object(
+                       'event_id', id, 'name', name, 'description', description,
+                       'venue_name', venue_name, 'category', category,
+                       'start_time', start_time, 'end_time', end_time,
+                       'capacity', capacity, 'source', source,
+                       'lat', ST_Y(location), 'lon', ST_X(location))
+                   ORDER BY start_time, id)
+            FROM changed_events WHERE id IS NOT NULL
+        ), '[]'::jsonb),
+        'deleted', jsonb_build_object(
+            -- Silinen ya da artık güncel run'da olmayan hücreler.
+            'predictions', coalesce((
+                SELECT jsonb_agg(jsonb_build_object('zone_id', zone_id, 'target_time', target_time)
+                                 ORDER BY zone_id, target_time)
+                FROM cells WHERE congestion_score IS NULL
+            ), '[]'::jsonb),
+            'zones', coalesce((
+                SELECT jsonb_agg(entity_id ORDER BY entity_id)
+                FROM _changes WHERE entity = 'zone'
+            ), '[]'::jsonb),
+            'events', coalesce((
+                SELECT jsonb_agg(entity_id ORDER BY entity_id)
+                FROM changed_events WHERE id IS NULL
+            ), '[]'::jsonb)
+        )
+    )
+    INTO v_result;
+
+    RETURN v_result;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- prune_change_log
+-- Deletes log rows older than p_keep_hours and remembers the highest removed
+-- version (tokens at or below it reset). Realtime notifications of the same
+-- age go too. Returns the number of log rows deleted.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION prune_change_log(p_keep_hours INTEGER DEFAULT 24)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_through  BIGINT;
+    v_deleted  INTEGER;
+BEGIN
+    DELETE FROM realtime_notifications
+    WHERE created_at < now() - make_interval(hours => p_keep_hours);
+
+    SELECT max(version) INTO v_through
+    FROM change_log
+    WHERE changed_at < now() - make_interval(hours => p_keep_hours);
+
+    IF v_through IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    UPDATE change_log_state
+    SET pruned_through = greatest(pruned_through, v_through)
+    WHERE id;
+
+    DELETE FROM change_log WHERE version <= v_through;
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+-- Clients read through changes_since(); the log itself is service-only.
+ALTER TABLE change_log       ENABLE ROW LEVEL SECURITY;
+ALTER TABLE change_log_state ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "change_log_all_service" ON change_log;
+CREATE POLICY "change_log_all_service"
+    ON change_log FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+DROP POLICY IF EXISTS "change_log_state_all_service" ON change_log_state;
+CREATE POLICY "change_log_state_all_service"
+    ON change_log_state FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT ALL ON change_log, change_log_state TO service_role, supabase_admin;
+GRANT USAGE ON SEQUENCE change_log_version_seq TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION changes_since TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION log_prediction_run_changes, prune_change_log TO service_role;
+REVOKE EXECUTE ON FUNCTION log_prediction_run_changes, prune_change_log FROM PUBLIC, anon, authenticated;
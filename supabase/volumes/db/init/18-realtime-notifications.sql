@@ -0,0 +1,177 @@
+-- ============================================================================
+-- 18-realtime-notifications.sql
+-- One Realtime message per prediction run / events batch.
+--
+-- predictions and events used to be in the supabase_realtime publication,
+-- so an hourly run (zones × 24 rows) and every scraped event fanned out as
+-- single-row messages to every client. They leave the publication; instead
+-- each published run and each events batch inserts one realtime_notifications
+-- row (kind, run id, change_log version range, summary of what changed).
+-- Clients subscribe to inserts on that table and pull the rows themselves
+-- with changes_since() (17-change-log.sql).
+-- ============================================================================
+
+-- ── Publication ─────────────────────────────────────────────────────────────
+DO $$
+DECLARE
+    v_table TEXT;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['predictions', 'events']
+    LOOP
+        IF EXISTS (
+            SELECT 1 FROM pg_publication_tables
+            WHERE pubname = 'supabase_realtime'
+              AND schemaname = current_schema()
+              AND tablename = v_table
+        ) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime DROP TABLE %I', v_table);
+        END IF;
+    END LOOP;
+END
+$$;
+
+-- ── realtime_notifications ──────────────────────────────────────────────────
+-- kind: prediction_run (run_id set) | events.
+-- from_version / to_version: change_log versions the message covers
+-- (from exclusive); NULL when the batch changed nothing.
+-- summary: prediction_run {predicted_at, first_target, zones, cells,
+--          deleted_zones, bbox}; events {events, deleted, bbox}.
+--          bbox = [min_lon, min_lat, max_lon, max_lat] of the changes.
+CREATE TABLE IF NOT EXISTS realtime_notifications (
+    id            BIGSERIAL PRIMARY KEY,
+    created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    kind          VARCHAR(16) NOT NULL CHECK (kind IN ('prediction_run', 'events')),
+    run_id        UUID,                       -- no FK: runs are deleted when superseded
+    from_version  BIGINT,
+    to_version    BIGINT,
+    summary       JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS ix_realtime_notifications_kind
+    ON realtime_notifications (kind, id DESC);
+CREATE INDEX IF NOT EXISTS ix_realtime_notifications_created_at
+    ON realtime_notifications (created_at);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- publish_change_notification
+-- Summarises the change_log rows of p_kind written since its previous
+-- notification and inserts one realtime_notifications row. A prediction run
+-- is always announced (p_run_id); an events batch only if it changed
+-- something. Called by publish_prediction_run() and by the events job after
+-- each batch. Returns the notification id, or NULL if none was sent.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION publish_change_notification(
+    p_kind    VARCHAR,
+    p_run_id  UUID DEFAULT NULL
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_entities  TEXT[];
+    v_from      BIGINT;
+    v_to        BIGINT;
+    v_summary   JSONB;
+    v_id        BIGINT;
+BEGIN
+    IF p_kind = 'prediction_run' THEN
+        IF p_run_id IS NULL THEN
+            RAISE EXCEPTION 'p_run_id is required for prediction_run notifications';
+        END IF;
+        v_entities := ARRAY['prediction', 'zone'];
+    ELSIF p_kind = 'events' THEN
+        v_entities := ARRAY['event'];
+    ELSE
+        RAISE EXCEPTION 'unknown notification kind %', p_kind;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('publish_change_notification:' || p_kind));
+
+    SELECT greatest(
+               max(n.to_version),
+               (SELECT pruned_through FROM change_log_state WHERE id)
+           )
+    INTO v_from
+    FROM realtime_notifications n
+    WHERE n.kind = p_kind;
+
+    WITH changes AS (
+        SELECT l.*, ST_X(l.location) AS lon, ST_Y(l.location) AS lat
+        FROM change_log l
+        WHERE l.version > v_from
+          AND l.entity = ANY (v_entities)
+    )
+    SELECT
+        max(version),
+        CASE WHEN p_kind = 'prediction_run' THEN
+            jsonb_build_object(
+                'zones',         count(DISTINCT entity_id) FILTER (WHERE entity = 'prediction'),
+                'cells',         count(*) FILTER (WHERE entity = 'prediction'),
+                'deleted_zones', count(*) FILTER (WHERE entity = 'zone'))
+        ELSE
+            jsonb_build_object(
+                'events',  count(*) FILTER (WHERE op = 'u'),
+                'deleted', count(*) FILTER (WHERE op = 'd'))
+        END
+        || jsonb_build_object('bbox', CASE WHEN count(lon) > 0 THEN
+               jsonb_build_array(min(lon), min(lat), max(lon), max(lat)) END)
+    INTO v_to, v_summary
+    FROM changes;
+
+    IF v_to IS NULL AND p_kind = 'events' THEN
+        RETURN NULL;
+    END IF;
+
+    IF p_kind = 'prediction_run' THEN
+        SELECT v_summary || jsonb_build_object(
+                   'predicted_at', r.predicted_at,
+                   'first_target', (SELECT min(c.first_target)
+                                    FROM zone_prediction_current c
+                                    WHERE c.run_id = r.id))
+        INTO v_summary
+        FROM prediction_runs r
+        WHERE r.id = p_run_id;
+    END IF;
+
+    INSERT INTO realtime_notifications (kind, run_id, from_version, to_version, summary)
+    VALUES (p_kind, p_run_id, CASE WHEN v_to IS NOT NULL THEN v_from END, v_to, v_summary)
+    RETURNING id INTO v_id;
+
+    RETURN v_id;
+END;
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE realtime_notifications ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "realtime_notifications_select_public" ON realtime_notifications;
+CREATE POLICY "realtime_notifications_select_public"
+    ON realtime_notifications FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "realtime_notifications_write_service" ON realtime_notifications;
+CREATE POLICY "realtime_notifications_write_service"
+    ON realtime_notifications FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON realtime_notifications TO anon, authenticated;
+GRANT ALL    ON realtime_notifications TO service_role, supabase_admin;
+GRANT USAGE ON SEQUENCE realtime_notifications_id_seq TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION publish_change_notification TO service_role;
+REVOKE EXECUTE ON FUNCTION publish_change_notification FROM PUBLIC, anon, authenticated;
+
+-- ── Realtime ────────────────────────────────────────────────────────────────
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND tablename = 'realtime_notifications'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE realtime_notifications;
+    END IF;
+END
+$$;
@@ -0,0 +1,102 @@
+-- ============================================================================
+-- 19-events-nearby.sql
+-- get_events_nearby with a spatio-temporal index, a row limit and keyset
+-- pagination.
+--
+-- The previous version had no LIMIT, filtered distance and start_time with
+-- separate indexes (the planner had to pick one) and sorted every hit by
+-- distance. A btree_gist composite GiST index on (location_geog, start_time)
+-- now answers the radius and the time window in one scan, and the default
+-- window is upcoming / ongoing events only, so the result stays bounded as
+-- old events accumulate.
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE INDEX IF NOT EXISTS ix_events_location_geog_start
+    ON events USING GIST (location_geog, start_time);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_events_nearby
+-- Events within p_radius_km of a point, nearest first, at most p_limit rows
+-- (capped at 1000).
+-- Without p_start_date only events that have not ended yet are returned
+-- (end_time, or start_time + 4 hours when unknown), among those that started
+-- in the last 7 days; pass p_start_date for history.
+-- Next page: pass the last row's distance_km / event_id as p_after_distance_km
+-- / p_after_id (ties on distance are ordered by event_id).
+-- Usage: supabase.rpc('get_events_nearby', { p_lat, p_lon, p_radius_km, p_limit })
+-- ─────────────────────────────────────────────────────────────────────────────
+DROP FUNCTION IF EXISTS get_events_nearby(
+    DOUBLE PRECISION, DOUBLE PRECISION, DOUBLE PRECISION, VARCHAR, TIMESTAMPTZ, TIMESTAMPTZ
+);
+
+CREATE OR REPLACE FUNCTION get_events_nearby(
+    p_lat               DOUBLE PRECISION,
+    p_lon               DOUBLE PRECISION,
+    p_radius_km         DOUBLE PRECISION DEFAULT 5.0,
+    p_category          VARCHAR DEFAULT NULL,
+    p_start_date        TIMESTAMPTZ DEFAULT NULL,
+    p_end_date          TIMESTAMPTZ DEFAULT NULL,
+    p_limit             INTEGER DEFAULT 200,
+    p_after_distance_km DOUBLE PRECISION DEFAULT NULL,
+    p_after_id          UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    event_id     UUID,
+    name         VARCHAR(255),
+    description  TEXT,
+    venue_name   VARCHAR(255),
+    category     VARCHAR(50),
+    start_time   TIMESTAMPTZ,
+    end_time     TIMESTAMPTZ,
+    capacity     INTEGER,
+    source       VARCHAR(100),
+    lat          DOUBLE PRECISION,
+    lon          DOUBLE PRECISION,
+    distance_km  DOUBLE PRECISION
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    WITH hits AS (
+        SELECT
+            e.*,
+            ST_Distance(
+                e.location_geog,
+                ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography
+            ) / 1000.0 AS dist_km
+        FROM events e
+        WHERE ST_DWithin(
+            e.location_geog,
+            ST_SetSRID(ST_MakePoint(p_lon, p_lat), 4326)::geography,
+            p_radius_km * 1000
+        )
+        -- Her iki koşul da ix_events_location_geog_start ile tek taramada.
+        AND e.start_time >= coalesce(p_start_date, now() - INTERVAL '7 days')
+        AND (p_end_date IS NULL OR e.start_time <= p_end_date)
+        AND (p_start_date IS NOT NULL
+             OR coalesce(e.end_time, e.start_time + INTERVAL '4 hours') >= now())
+        AND (p_category IS NULL OR e.category = p_category)
+    )
+    SELECT
+        h.id AS event_id,
+        h.name,
+        h.description,
+        h.venue_name,
+        h.category,
+        h.start_time,
+        h.end_time,
+        h.capacity,
+        h.source,
+        ST_Y(h.location) AS lat,
+        ST_X(h.location) AS lon,
+        h.dist_km        AS distance_km
+    FROM hits h
+    WHERE p_after_distance_km IS NULL
+       OR (h.dist_km, h.id) > (p_after_distance_km, coalesce(p_after_id, '00000000-0000-0000-0000-000000000000'::uuid))
+    ORDER BY h.dist_km, h.id
+    LIMIT least(greatest(coalesce(p_limit, 200), 1), 1000);
+$$;
+
+GRANT EXECUTE ON FUNCTION get_events_nearby TO anon, authenticated, service_role;
@@ -0,0 +1,189 @@
+-- ============================================================================
+-- 20-event-clusters.sql
+-- Precomputed event clusters per zoom level for the map's event markers.
+--
+-- Dense venues and events without coordinates (all pinned to the city
+-- center by the events job) stack hundreds of markers on the same pixels.
+-- refresh_event_clusters() groups the upcoming events of every zoom level
+-- EVENT_CLUSTER_MIN_ZOOM..EVENT_CLUSTER_MAX_ZOOM on a web-mercator grid of
+-- 64 px cells (4 per 256 px tile side) into event_clusters; the events job
+-- calls it after each run. get_event_clusters() returns the clusters of one
+-- zoom in a bbox, so the client draws one marker per cell instead of one per
+-- event.
+--
+-- A cluster's point is the mean of its events, so a stack at one venue stays
+-- on the venue. Clusters are as old as the last events run: events that end
+-- in between drop out on the next refresh.
+-- ============================================================================
+
+-- ── event_clusters ──────────────────────────────────────────────────────────
+-- (zoom, cell_x, cell_y): grid cell in 64 px units of that zoom.
+-- event_id / name: set only for single-event clusters.
+-- category: the most common category among the cluster's events.
+-- min_* / max_*: bbox of the members; zooming to it splits the cluster.
+CREATE TABLE IF NOT EXISTS event_clusters (
+    zoom          SMALLINT NOT NULL,
+    cell_x        INTEGER NOT NULL,
+    cell_y        INTEGER NOT NULL,
+    refreshed_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    location      geometry(POINT, 4326) NOT NULL,
+    event_count   INTEGER NOT NULL,
+    max_capacity  INTEGER,
+    first_start   TIMESTAMPTZ NOT NULL,
+    category      VARCHAR(50),
+    event_id      UUID,
+    name          VARCHAR(255),
+    min_lon       DOUBLE PRECISION NOT NULL,
+    min_lat       DOUBLE PRECISION NOT NULL,
+    max_lon       DOUBLE PRECISION NOT NULL,
+    max_lat       DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (zoom, cell_x, cell_y)
+);
+
+-- btree_gist (19-events-nearby.sql): zoom equality + bbox in one scan.
+CREATE INDEX IF NOT EXISTS ix_event_clusters_zoom_location
+    ON event_clusters USING GIST (zoom, location);
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- event_cluster_zoom
+-- Precomputed zoom level for a map zoom: floor, clamped to 6..16. Above 16
+-- only events at (almost) the same spot are still grouped.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION event_cluster_zoom(p_zoom DOUBLE PRECISION)
+RETURNS SMALLINT
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT least(greatest(floor(coalesce(p_zoom, 6)), 6), 16)::smallint;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- refresh_event_clusters
+-- Rebuilds event_clusters from the events that have not ended yet (end_time,
+-- or start_time + 4 hours when unknown) and start within p_days. Readers
+-- keep seeing the previous clusters until the transaction commits.
+-- Returns the number of clusters written.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION refresh_event_clusters(p_days INTEGER DEFAULT 7)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_count  INTEGER;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_event_clusters'));
+
+    DELETE FROM event_clusters WHERE true;
+
+    -- Web-mercator pixel coordinates (tile units × 4) computed from lon/lat;
+    -- latitude clamped to the mercator limit.
+    INSERT INTO event_clusters (
+        zoom, cell_x, cell_y, location, event_count, max_capacity, first_start,
+        category, event_id, name, min_lon, min_lat, max_lon, max_lat
+    )
+    SELECT
+        z.zoom,
+        floor((p.lon + 180.0) / 360.0 * 4 * 2 ^ z.zoom)::integer,
+        floor((1 - ln(tan(radians(p.lat)) + 1 / cos(radians(p.lat))) / pi()) / 2 * 4 * 2 ^ z.zoom)::integer,
+        ST_SetSRID(ST_MakePoint(avg(p.lon), avg(p.lat)), 4326),
+        count(*)::integer,
+        max(p.capacity),
+        min(p.start_time),
+        mode() WITHIN GROUP (ORDER BY p.category),
+        CASE WHEN count(*) = 1 THEN min(p.id::text)::uuid END,
+        CASE WHEN count(*) = 1 THEN min(p.name) END,
+        min(p.lon), min(p.lat), max(p.lon), max(p.lat)
+    FROM (
+        SELECT
+            e.id, e.name, e.category, e.capacity, e.start_time,
+            ST_X(e.location) AS lon,
+            least(greatest(ST_Y(e.location), -85.05), 85.05) AS lat
+        FROM events e
+        WHERE e.start_time < now() + make_interval(days => p_days)
+          AND coalesce(e.end_time, e.start_time + INTERVAL '4 hours') >= now()
+    ) p
+    CROSS JOIN generate_series(6, 16) AS z(zoom)
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_event_clusters
+-- Clusters of event_cluster_zoom(p_zoom) whose point is in the bbox, largest
+-- first, at most p_limit rows.
+-- Usage: supabase.rpc('get_event_clusters',
+--            { p_zoom, p_min_lon, p_min_lat, p_max_lon, p_max_lat })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION get_event_clusters(
+    p_zoom     DOUBLE PRECISION,
+    p_min_lon  DOUBLE PRECISION,
+    p_min_lat  DOUBLE PRECISION,
+    p_max_lon  DOUBLE PRECISION,
+    p_max_lat  DOUBLE PRECISION,
+    p_limit    INTEGER DEFAULT 500
+)
+RETURNS TABLE (
+    cluster_key   TEXT,          -- "zoom/cell_x/cell_y"
+    lat           DOUBLE PRECISION,
+    lon           DOUBLE PRECISION,
+    event_count   INTEGER,
+    max_capacity  INTEGER,
+    first_start   TIMESTAMPTZ,
+    category      VARCHAR(50),
+    event_id      UUID,
+    name          VARCHAR(255),
+    min_lon       DOUBLE PRECISION,
+    min_lat       DOUBLE PRECISION,
+    max_lon       DOUBLE PRECISION,
+    max_lat       DOUBLE PRECISION
+)
+LANGUAGE sql STABLE
+SECURITY DEFINER
+AS $$
+    SELECT
+        c.zoom || '/' || c.cell_x || '/' || c.cell_y,
+        ST_Y(c.location),
+        ST_X(c.location),
+        c.event_count,
+        c.max_capacity,
+        c.first_start,
+        c.category,
+        c.event_id,
+        c.name,
+        c.min_lon,
+        c.min_lat,
+        c.max_lon,
+        c.max_lat
+    FROM event_clusters c
+    WHERE c.zoom = event_cluster_zoom(p_zoom)
+      AND ST_Intersects(c.location, ST_MakeEnvelope(p_min_lon, p_min_lat, p_max_lon, p_max_lat, 4326))
+    ORDER BY c.event_count DESC, c.max_capacity DESC NULLS LAST, c.cell_x, c.cell_y
+    LIMIT least(greatest(coalesce(p_limit, 500), 1), 2000);
+$$;
+
+-- ── RLS ─────────────────────────────────────────────────────────────────────
+ALTER TABLE event_clusters ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "event_clusters_select_public" ON event_clusters;
+CREATE POLICY "event_clusters_select_public"
+    ON event_clusters FOR SELECT
+    TO anon, authenticated, service_role, supabase_admin
+    USING (true);
+
+DROP POLICY IF EXISTS "event_clusters_write_service" ON event_clusters;
+CREATE POLICY "event_clusters_write_service"
+    ON event_clusters FOR ALL
+    TO supabase_admin, service_role
+    USING (true) WITH CHECK (true);
+
+GRANT SELECT ON event_clusters TO anon, authenticated;
+GRANT ALL    ON event_clusters TO service_role, supabase_admin;
+GRANT EXECUTE ON FUNCTION event_cluster_zoom(DOUBLE PRECISION) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION get_event_clusters TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION refresh_event_clusters TO service_role;
+REVOKE EXECUTE ON FUNCTION refresh_event_clusters FROM PUBLIC, anon, authenticated;
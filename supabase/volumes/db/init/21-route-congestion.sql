@@ -0,0 +1,180 @@
+-- ============================================================================
+-- 21-route-congestion.sql
+-- Predicted congestion along a route (courier corridors).
+--
+-- get_route_congestion() takes a route as an encoded polyline or GeoJSON
+-- LineString plus a departure time and walks it in fixed-length segments.
+-- Each segment gets an estimated arrival (departure + distance / speed) and
+-- the scores of the zones within p_buffer_m of it at the horizon of that
+-- arrival, from the current run. Zones are found with one indexed
+-- ST_DWithin on traffic_zones.polygon_geog for the whole route; segments
+-- then only test those candidates.
+-- ============================================================================
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- route_geometry
+-- LineString (4326) from an encoded polyline (p_precision digits, 5 for
+-- Google / OSRM, 6 for Valhalla) or a GeoJSON LineString / Feature.
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION route_geometry(
+    p_route      TEXT,
+    p_precision  INTEGER DEFAULT 5
+)
+RETURNS geometry
+LANGUAGE plpgsql IMMUTABLE
+AS $$
+DECLARE
+    v_json  JSONB;
+    v_line  geometry;
+BEGIN
+    IF p_route IS NULL OR btrim(p_route) = '' THEN
+        RAISE EXCEPTION 'route is empty';
+    END IF;
+
+    IF left(ltrim(p_route), 1) = '{' THEN
+        v_json := p_route::jsonb;
+        IF v_json->>'type' = 'Feature' THEN
+            v_json := v_json->'geometry';
+        END IF;
+        v_line := ST_SetSRID(ST_GeomFromGeoJSON(v_json::text), 4326);
+    ELSE
+        v_line := ST_LineFromEncodedPolyline(p_route, p_precision);
+    END IF;
+
+    IF ST_GeometryType(v_line) <> 'ST_LineString' THEN
+        RAISE EXCEPTION 'route must be a LineString, got %', ST_GeometryType(v_line);
+    END IF;
+    RETURN v_line;
+END;
+$$;
+
+-- ─────────────────────────────────────────────────────────────────────────────
+-- get_route_congestion
+-- One row per p_segment_m of route, in order. eta is the arrival at the
+-- segment's midpoint at p_speed_kmh (default departure: now()).
+-- congestion_score is the worst zone near the segment at that hour,
+-- mean_score the average of those zones; both NULL when no zone is near or
+-- the arrival is past the current run's 24 hours. Routes longer than
+-- p_max_km are rejected.
+-- Usage: supabase.rpc('get_route_congestion', { p_route, p_departure })
+-- ─────────────────────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION get_route_congestion(
+    p_route      TEXT,
+    p_departure  TIMESTAMPTZ DEFAULT NULL,
+    p_speed_kmh  DOUBLE PRECISION DEFAULT 25.0,
+    p_buffer_m   DOUBLE PRECISION DEFAULT 100.0,
+    p_segment_m  DOUBLE PRECISION DEFAULT 500.0,
+    p_precision  INTEGER DEFAULT 5,
+    p_max_km     DOUBLE PRECISION DEFAULT 200.0
+)
+RETURNS TABLE (
+    seq               INTEGER,
+    from_km           DOUBLE PRECISION,
+    to_km             DOUBLE PRECISION,
+    eta               TIMESTAMPTZ,
+    target_time       TIMESTAMPTZ,
+    congestion_score  INTEGER,
+    mean_score        DOUBLE PRECISION,
+    confidence        DOUBLE PRECISION,
+    zone_count        INTEGER,
+    worst_zone_id     UUID,
+    worst_zone_name   VARCHAR(255),
+    lat               DOUBLE PRECISION,
+    lon               DOUBLE PRECISION
+)
+LANGUAGE plpgsql STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    v_line       geometry := route_geometry(p_route, p_precision);
+    v_departure  TIMESTAMPTZ := coalesce(p_departure, now());
+    v_length_m   DOUBLE PRECISION;
+    v_step_m     DOUBLE PRECISION;
+    v_pieces     INTEGER;
+BEGIN
+    IF p_speed_kmh IS NULL OR p_speed_kmh <= 0 THEN
+        RAISE EXCEPTION 'p_speed_kmh must be positive';
+    END IF;
+
+    v_length_m := ST_Length(v_line::geography);
+    IF v_length_m > p_max_km * 1000 THEN
+        RAISE EXCEPTION 'route is % km, longer than % km', round((v_length_m / 1000)::numeric, 1), p_max_km;
+    END IF;
+
+    -- En fazla 1000 parça; kısa parça buffer'dan küçük olmasın.
+    v_step_m := greatest(coalesce(p_segment_m, 500.0), p_buffer_m, v_length_m / 1000, 1.0);
+    v_pieces := greatest(ceil(v_length_m / v_step_m)::integer, 1);
+
+    RETURN QUERY
+    WITH candidates AS MATERIALIZED (
+        -- Tek indexli sorgu: rotanın p_buffer_m yakınındaki zone'lar.
+        SELECT z.id, z.name, z.polygon_geog, c.first_target, c.scores, c.confidence
+        FROM prediction_runs r
+        JOIN zone_prediction_current c ON c.run_id = r.id
+        JOIN traffic_zones z ON z.id = c.zone_id
+        WHERE r.status = 'current'
+          AND ST_DWithin(z.polygon_geog, v_line::geography, p_buffer_m)
+    ),
+    pieces AS (
+        SELECT
+            i + 1 AS seq,
+            i * v_step_m AS from_m,
+            least((i + 1) * v_step_m, v_length_m) AS to_m,
+            ST_LineSubstring(
+                v_line,
+                least(i * v_step_m / nullif(v_length_m, 0), 1),
+                least((i + 1) * v_step_m / nullif(v_length_m, 0), 1)
+            ) AS geom
+        FROM generate_series(0, v_pieces - 1) AS i
+    ),
+    timed AS (
+        SELECT
+            p.*,
+            v_departure + make_interval(
+                secs => (p.from_m + p.to_m) / 2 / (p_speed_kmh / 3.6)
+            ) AS eta,
+            ST_LineInterpolatePoint(p.geom, 0.5) AS mid
+        FROM pieces p
+    )
+    SELECT
+        t.seq,
+        t.from_m / 1000,
+        t.to_m / 1000,
+        t.eta,
+        s.target_time,
+        s.worst_score,
+        s.mean_score,
+        s.confidence,
+        coalesce(s.zone_count, 0),
+        s.worst_zone_id,
+        s.worst_zone_name,
+        ST_Y(t.mid),
+        ST_X(t.mid)
+    FROM timed t
+    LEFT JOIN LATERAL (
+        SELECT
+            min(h.target_time)                                         AS target_time,
+            max(h.score)::integer                                      AS worst_score,
+            round(avg(h.score)::numeric, 1)::double precision          AS mean_score,
+            round(avg(h.confidence)::numeric, 2)::double precision     AS confidence,
+            count(*)::integer                                          AS zone_count,
+            (array_agg(h.id ORDER BY h.score DESC, h.id))[1]           AS worst_zone_id,
+            (array_agg(h.name ORDER BY h.score DESC, h.id))[1]         AS worst_zone_name
+        FROM (
+            SELECT
+                cz.id, cz.name,
+                cz.first_target + make_interval(hours => k.h - 1) AS target_time,
+                cz.scores[k.h]     AS score,
+                cz.confidence[k.h] AS confidence
+            FROM candidates cz
+            CROSS JOIN LATERAL (SELECT prediction_horizon(cz.first_target, t.eta) AS h) k
+            WHERE t.eta < cz.first_target + INTERVAL '24 hours'
+              AND ST_DWithin(cz.polygon_geog, t.geom::geography, p_buffer_m)
+        ) h
+    ) s ON true
+    ORDER BY t.seq;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION route_geometry TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION get_route_congestion TO anon, authenticated, service_role;